@@ -0,0 +1,54 @@
+"""
+Benchmark del almacén offline: entrega en bloque de 10k mensajes encolados
+
+Uso:
+    python chatTCP/benchmarks/bench_almacen_offline.py [num_mensajes]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.Datos.AlmacenOffline import AlmacenOffline
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+
+    print("=" * 60)
+    print(f"BENCHMARK ALMACÉN OFFLINE - {total} mensajes")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as directorio:
+        almacen = AlmacenOffline(directorio, max_mensajes_por_usuario=total, sincronizar=False)
+        mensaje = {"origen": "emisor", "contenido": {"mensaje": "Hola, este es un mensaje de prueba", "remitente": "emisor"}}
+
+        inicio = time.perf_counter()
+        for _ in range(total):
+            almacen.encolar("destino", mensaje)
+        t_encolar = time.perf_counter() - inicio
+
+        # Reabrir para medir también la reconstrucción del índice
+        inicio = time.perf_counter()
+        almacen = AlmacenOffline(directorio, max_mensajes_por_usuario=total, sincronizar=False)
+        t_indice = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        pendientes = almacen.pendientes("destino")
+        t_entrega = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        almacen.confirmar("destino", pendientes[-1][0])
+        t_confirmar = time.perf_counter() - inicio
+
+    print(f"  Encolar:              {total / t_encolar:12,.0f} msg/s ({t_encolar:.3f} s)")
+    print(f"  Reconstruir índice:   {total / t_indice:12,.0f} msg/s ({t_indice:.3f} s)")
+    print(f"  Entrega en bloque:    {total / t_entrega:12,.0f} msg/s ({t_entrega:.3f} s)")
+    print(f"  Confirmar (ACK):      {t_confirmar * 1000:12.2f} ms")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
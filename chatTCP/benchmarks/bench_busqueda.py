@@ -0,0 +1,91 @@
+"""
+Benchmark del índice de búsqueda: velocidad de construcción y latencia de consulta
+
+Uso:
+    python chatTCP/benchmarks/bench_busqueda.py [num_mensajes] [num_consultas]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from chatTCP.src.Datos.IndiceBusqueda import IndiceBusqueda
+
+VOCABULARIO = (
+    "hola adiós servidor cliente mensaje reunión proyecto seguridad llave cifrado red puerto "
+    "mañana tarde noche equipo prueba error registro sesión usuario contraseña chat grupo "
+    "archivo código revisión cambio versión entrega tarea lunes martes viernes café"
+).split()
+
+
+def generar_mensajes(total, usuarios, semilla=42):
+    azar = random.Random(semilla)
+    inicio = time.time() - total
+    for i in range(total):
+        remitente = azar.choice(usuarios)
+        destino = "TODOS" if azar.random() < 0.3 else azar.choice(usuarios)
+        texto = " ".join(azar.choices(VOCABULARIO, k=azar.randint(3, 15)))
+        yield remitente, destino, texto, inicio + i
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    consultas = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    usuarios = [f"usuario{i}" for i in range(500)]
+
+    print("=" * 60)
+    print(f"BENCHMARK ÍNDICE DE BÚSQUEDA - {total:,} mensajes")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as directorio:
+        indice = IndiceBusqueda(os.path.join(directorio, "busqueda.db"))
+
+        lote = []
+        inicio = time.perf_counter()
+        for mensaje in generar_mensajes(total, usuarios):
+            lote.append(mensaje)
+            if len(lote) == 10_000:
+                indice.indexar_lote(lote)
+                lote.clear()
+        if lote:
+            indice.indexar_lote(lote)
+        t_construir = time.perf_counter() - inicio
+
+        # Indexado incremental, como lo hace el servidor mensaje a mensaje
+        incrementales = min(total, 20_000)
+        inicio = time.perf_counter()
+        for remitente, destino, texto, fecha in generar_mensajes(incrementales, usuarios, semilla=7):
+            indice.indexar(remitente, destino, texto, fecha)
+        indice.confirmar()
+        t_incremental = time.perf_counter() - inicio
+
+        azar = random.Random(1)
+        latencias = []
+        for _ in range(consultas):
+            terminos = " ".join(azar.sample(VOCABULARIO, azar.randint(1, 3)))
+            inicio = time.perf_counter()
+            indice.buscar(azar.choice(usuarios), terminos, limite=20)
+            latencias.append((time.perf_counter() - inicio) * 1000)
+
+        tamanio = os.path.getsize(os.path.join(directorio, "busqueda.db"))
+        indice.cerrar()
+
+    print(f"  Construcción (lotes):   {total / t_construir:12,.0f} msg/s ({t_construir:.1f} s)")
+    print(f"  Indexado incremental:   {incrementales / t_incremental:12,.0f} msg/s")
+    print(f"  Tamaño del índice:      {tamanio / 1024 / 1024:12.1f} MB")
+    print(f"  Consulta p50:           {percentil(latencias, 50):12.2f} ms")
+    print(f"  Consulta p95:           {percentil(latencias, 95):12.2f} ms")
+    print(f"  Consulta p99:           {percentil(latencias, 99):12.2f} ms")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
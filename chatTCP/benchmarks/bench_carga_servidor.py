@@ -0,0 +1,269 @@
+"""
+Benchmark de carga de extremo a extremo del servidor
+
+Levanta server_main.ServidorBusApp en 127.0.0.1 (con datos y llave en una
+carpeta temporal, sin tocar los del repositorio) y lanza miles de usuarios
+simulados del modo carga de cli.py: cada uno se registra, inicia sesión y
+manda mensajes a TODOS y privados a una tasa fija.
+
+Reporta logins, mensajes/s, latencias p50/p95/p99 (login, entrega y ACK),
+CPU y RSS del servidor y guarda todo en JSON. Con --comparar se contrasta
+contra un resultado anterior y se marcan las regresiones (código de salida 1).
+
+Uso:
+    python chatTCP/benchmarks/bench_carga_servidor.py [--usuarios 1000] [--tasa 0.5] [--duracion 20]
+        [--procesos N] [--workers 0] [--salida carga.json] [--comparar anterior.json]
+
+Con miles de usuarios cada uno abre su propio socket de escucha; puede
+hacer falta subir el límite de descriptores (ulimit -n).
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from chatTCP.src.Presentacion.cli import ejecutar_carga, imprimir_resultado
+
+# Métricas que se comparan entre ejecuciones: (ruta en el resultado, mayor es mejor)
+METRICAS = [
+    (("enviados_por_segundo",), True),
+    (("entregas_por_segundo",), True),
+    (("latencia_login_ms", "p50"), False),
+    (("latencia_login_ms", "p99"), False),
+    (("latencia_entrega_ms", "p50"), False),
+    (("latencia_entrega_ms", "p95"), False),
+    (("latencia_entrega_ms", "p99"), False),
+    (("latencia_ack_ms", "p50"), False),
+    (("latencia_ack_ms", "p99"), False),
+    (("servidor", "cpu_por_mil_mensajes_s"), False),
+    (("servidor", "rss_pico_mb"), False),
+]
+
+
+def _servidor(puerto, dir_datos, ruta_pem, workers, cifrado):
+    """Proceso del servidor; su salida va a un archivo para no mezclarla con el reporte"""
+    sys.stdout = sys.stderr = open(os.path.join(dir_datos, "salida.log"), "w", buffering=1)
+    import server_main
+    server_main.configurar_bitacora(os.path.join(dir_datos, "bitacora.log"))
+    if workers:
+        server_main.iniciar_workers(workers, puerto, dir_datos, ruta_pem, cifrado=cifrado)
+    else:
+        server_main.ServidorBusApp().iniciar(puerto=puerto, dir_datos=dir_datos, ruta_pem=ruta_pem, cifrado=cifrado)
+
+
+def _esperar_servidor(puerto, ruta_pem, proceso, timeout=30):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if not proceso.is_alive():
+            raise RuntimeError("El servidor terminó antes de empezar a escuchar")
+        if os.path.exists(ruta_pem):
+            try:
+                socket.create_connection(("127.0.0.1", puerto), timeout=1).close()
+                return
+            except OSError:
+                pass
+        time.sleep(0.2)
+    raise RuntimeError(f"El servidor no empezó a escuchar en el puerto {puerto}")
+
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _arbol_de(pid):
+    """pid y todos sus descendientes (los workers del modo pre-fork)"""
+    hijos = {}
+    for entrada in os.listdir("/proc"):
+        if entrada.isdigit():
+            try:
+                with open(f"/proc/{entrada}/stat") as f:
+                    ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            hijos.setdefault(ppid, []).append(int(entrada))
+    arbol, pendientes = [], [pid]
+    while pendientes:
+        actual = pendientes.pop()
+        arbol.append(actual)
+        pendientes.extend(hijos.get(actual, []))
+    return arbol
+
+
+def uso_servidor(pid):
+    """
+    CPU y memoria del servidor leídas de /proc (solo Linux)
+
+    Returns:
+        Dict con cpu_s (usuario + sistema), rss_mb y rss_pico_mb sumados
+        sobre el proceso y sus hijos, o None si /proc no está disponible
+    """
+    if not os.path.isdir("/proc"):
+        return None
+    tics = os.sysconf("SC_CLK_TCK")
+    uso = {"cpu_s": 0.0, "rss_mb": 0.0, "rss_pico_mb": 0.0}
+    for proceso in _arbol_de(pid):
+        try:
+            with open(f"/proc/{proceso}/stat") as f:
+                campos = f.read().rsplit(")", 1)[1].split()
+            with open(f"/proc/{proceso}/status") as f:
+                estado = dict(linea.split(":", 1) for linea in f if ":" in linea)
+        except OSError:
+            continue
+        uso["cpu_s"] += (int(campos[11]) + int(campos[12])) / tics
+        uso["rss_mb"] += int(estado.get("VmRSS", "0 kB").split()[0]) / 1024
+        uso["rss_pico_mb"] += int(estado.get("VmHWM", "0 kB").split()[0]) / 1024
+    return uso
+
+
+def _commit_actual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _valor(resultado, ruta):
+    for clave in ruta:
+        if not isinstance(resultado, dict) or clave not in resultado:
+            return None
+        resultado = resultado[clave]
+    return resultado
+
+
+def comparar(anterior, actual, umbral=0.10):
+    """
+    Compara dos resultados guardados por este benchmark
+
+    Args:
+        anterior: Resultado de referencia (dict leído del JSON)
+        actual: Resultado nuevo
+        umbral: Empeoramiento relativo a partir del cual hay regresión
+
+    Returns:
+        Lista de nombres de las métricas que empeoraron más que el umbral
+    """
+    regresiones = []
+    print(f"  {'métrica':<40} {'antes':>10} {'ahora':>10} {'cambio':>8}")
+    for ruta, mayor_es_mejor in METRICAS:
+        antes, ahora = _valor(anterior["resultado"], ruta), _valor(actual["resultado"], ruta)
+        if not antes or ahora is None:
+            continue
+        cambio = (ahora - antes) / antes
+        peor = -cambio if mayor_es_mejor else cambio
+        nombre = ".".join(ruta)
+        marca = "  REGRESIÓN" if peor > umbral else ""
+        if marca:
+            regresiones.append(nombre)
+        print(f"  {nombre:<40} {antes:10.1f} {ahora:10.1f} {cambio:+8.1%}{marca}")
+    return regresiones
+
+
+def medir(args):
+    contexto = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as dir_datos:
+        ruta_pem = os.path.join(dir_datos, "server_public.pem")
+        puerto = args.puerto or _puerto_libre()
+        servidor = contexto.Process(target=_servidor, args=(puerto, dir_datos, ruta_pem, args.workers, args.cifrado))
+        servidor.start()
+        try:
+            _esperar_servidor(puerto, ruta_pem, servidor)
+            inicio_envio = {}
+
+            def al_comenzar():
+                inicio_envio.update(uso_servidor(servidor.pid) or {})
+
+            resultado = ejecutar_carga(args.usuarios, args.tasa, args.duracion, args.procesos, puerto,
+                                       args.difusion, "bench", ruta_pem, al_comenzar)
+            uso = uso_servidor(servidor.pid)
+            clientes = resource.getrusage(resource.RUSAGE_CHILDREN)
+        finally:
+            # En modo workers SIGTERM hace que el padre cierre a cada worker
+            os.kill(servidor.pid, signal.SIGTERM if args.workers else signal.SIGINT)
+            servidor.join(15)
+            if servidor.is_alive():
+                servidor.terminate()
+                servidor.join()
+
+    resultado["errores"] = len(resultado["errores"])
+    resultado["cpu_clientes_s"] = clientes.ru_utime + clientes.ru_stime
+    if uso is not None:
+        cpu_envio = uso["cpu_s"] - inicio_envio.get("cpu_s", 0.0)
+        uso["cpu_envio_s"] = cpu_envio
+        uso["nucleos_envio"] = cpu_envio / resultado["segundos"] if resultado["segundos"] else 0.0
+        mensajes = resultado["enviados"] + resultado["recibidos"]
+        uso["cpu_por_mil_mensajes_s"] = cpu_envio * 1000 / mensajes if mensajes else 0.0
+        resultado["servidor"] = uso
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de carga de extremo a extremo del servidor")
+    parser.add_argument("--usuarios", type=int, default=1000)
+    parser.add_argument("--tasa", type=float, default=0.5, help="Mensajes por segundo de cada usuario")
+    parser.add_argument("--duracion", type=float, default=20.0, help="Segundos de envío")
+    parser.add_argument("--difusion", type=float, default=0.1, help="Fracción de mensajes a TODOS")
+    parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1, help="Procesos de usuarios simulados")
+    parser.add_argument("--workers", type=int, default=0, help="Workers del servidor (modo pre-fork)")
+    parser.add_argument("--cifrado", choices=("en_linea", "hilos", "procesos"), default="en_linea")
+    parser.add_argument("--puerto", type=int, default=0, help="Puerto del servidor (0: uno libre)")
+    parser.add_argument("--salida", help="JSON de resultados (por defecto carga_<commit>.json)")
+    parser.add_argument("--comparar", help="JSON de una ejecución anterior contra el cual comparar")
+    parser.add_argument("--umbral", type=float, default=0.10, help="Empeoramiento relativo que cuenta como regresión")
+    args = parser.parse_args()
+
+    commit = _commit_actual()
+    print("=" * 60)
+    print(f"BENCHMARK DE CARGA - {args.usuarios} usuarios, {args.tasa} msg/s c/u, {args.duracion}s, "
+          f"commit {commit or '?'}")
+    print("=" * 60)
+    resultado = medir(args)
+    imprimir_resultado(dict(resultado, errores=[]))
+    if "servidor" in resultado:
+        servidor = resultado["servidor"]
+        print(f"  servidor: {servidor['cpu_envio_s']:.1f}s CPU ({servidor['nucleos_envio']:.2f} núcleos, "
+              f"{servidor['cpu_por_mil_mensajes_s']:.3f}s por mil mensajes), "
+              f"RSS {servidor['rss_mb']:.0f} MB (pico {servidor['rss_pico_mb']:.0f} MB)")
+    print(f"  clientes: {resultado['cpu_clientes_s']:.1f}s CPU, {resultado['errores']} errores")
+
+    actual = {
+        "commit": commit,
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "parametros": {clave: valor for clave, valor in vars(args).items() if clave not in ("puerto", "salida", "comparar", "umbral")},
+        "resultado": resultado,
+    }
+    salida = args.salida or f"carga_{commit or datetime.now().strftime('%Y%m%d%H%M%S')}.json"
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(actual, f, indent=2, ensure_ascii=False)
+    print(f"  resultado guardado en {salida}")
+
+    regresiones = []
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            anterior = json.load(f)
+        print("=" * 60)
+        print(f"COMPARACIÓN CONTRA {anterior.get('commit') or args.comparar}")
+        print("=" * 60)
+        if anterior.get("parametros") != actual["parametros"]:
+            print("  aviso: los parámetros de las dos ejecuciones no coinciden")
+        regresiones = comparar(anterior, actual, args.umbral)
+    print("=" * 60)
+    if regresiones:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark de la compresión antes del cifrado
+
+Arma los paquetes grandes que envía el servidor (lista de usuarios, páginas
+de historial) y mide, sin compresión, con zlib y con lzma, los bytes de la
+trama en la red y el tiempo de comprimir+cifrar y de descifrar+descomprimir.
+
+Uso:
+    python chatTCP/benchmarks/bench_compresion.py [usuarios] [repeticiones]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from chatTCP.src.Datos.HistorialMensajes import HistorialMensajes
+from chatTCP.src.PaqueteDTO.PaqueteDTO import PaqueteDTO
+from chatTCP.src.Red.Cifrado.Compresion import COMPRESIONES
+from chatTCP.src.Red.Cifrado.EjecutorCifrado import descifrar_trama
+from chatTCP.src.Red.Cifrado.seguridad import GestorSeguridad, SUITE_AESGCM
+from chatTCP.src.Red.Emisor.ClienteTCP import ClienteTCP
+from chatTCP.src.Red.Emisor.ColaEnvios import ColaEnvios
+
+PALABRAS = ("hola", "que", "tal", "nos", "vemos", "mañana", "en", "la", "clase", "de", "redes",
+            "ya", "subí", "el", "archivo", "al", "repositorio", "revisa", "cuando", "puedas")
+
+
+def lista_usuarios(usuarios):
+    nombres = [f"usuario_{n:04d}" for n in range(usuarios)]
+    return PaqueteDTO("LISTA_USUARIOS", nombres, origen="SERVIDOR", destino="ana").to_json()
+
+
+def pagina_historial(historial, mensajes):
+    pagina, cursor = historial.consultar("ana", "TODOS", limite=mensajes)
+    contenido = {"con": "TODOS", "mensajes": pagina, "cursor": cursor}
+    return PaqueteDTO("HISTORIAL", contenido, origen="SERVIDOR", destino="ana").to_json()
+
+
+def llenar_historial(mensajes):
+    rng = random.Random(42)
+    historial = HistorialMensajes(":memory:")
+    inicio = time.time() - 37 * mensajes
+    for n in range(mensajes):
+        remitente = rng.choice(("ana", "beto", "carla", "diego"))
+        texto = " ".join(rng.choice(PALABRAS) for _ in range(rng.randint(3, 15)))
+        historial.guardar(remitente, "TODOS", texto, inicio + 37 * n)
+    return historial
+
+
+def medir(seguridad, json_str, compresion, repeticiones):
+    cliente = ClienteTCP(ColaEnvios(), seguridad, seguridad.public_key, suite=SUITE_AESGCM, compresion=compresion)
+
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        trama, _ = cliente._cifrar_mensaje_dual(json_str)
+    envio_us = (time.perf_counter() - inicio) / repeticiones * 1e6
+
+    trama = trama.strip()
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        descifrado, _, _ = descifrar_trama(seguridad, trama)
+    recibo_us = (time.perf_counter() - inicio) / repeticiones * 1e6
+    assert descifrado == json_str
+    return len(trama) + 1, envio_us, recibo_us
+
+
+def main():
+    usuarios = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    repeticiones = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    seguridad = GestorSeguridad()
+    historial = llenar_historial(200)
+    cargas = (
+        (f"usuarios ({usuarios})", lista_usuarios(usuarios)),
+        ("historial (50)", pagina_historial(historial, 50)),
+        ("historial (200)", pagina_historial(historial, 200)),
+    )
+
+    print("=" * 60)
+    print(f"BENCHMARK COMPRESIÓN - AES-GCM, {repeticiones} repeticiones")
+    print("=" * 60)
+    for nombre, json_str in cargas:
+        print(f"  {nombre}: {len(json_str):,} bytes de JSON")
+        for compresion in (None,) + COMPRESIONES:
+            bytes_, envio_us, recibo_us = medir(seguridad, json_str, compresion, repeticiones)
+            print(f"    {compresion or 'ninguna':<8} {bytes_:8,} bytes en la red  "
+                  f"{envio_us:7,.0f} µs cifrar  {recibo_us:7,.0f} µs descifrar")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark de establecimiento de llaves: RSA-2048 frente a X25519 + HKDF
+
+Mide el tiempo de generar las llaves al arrancar, los handshakes/s que
+atiende el servidor (primer paquete de un cliente nuevo) y el costo por
+paquete ya establecida la sesión, en el lado del servidor.
+
+Uso:
+    python chatTCP/benchmarks/bench_handshake.py [segundos] [llaves_rsa]
+"""
+import base64
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.asymmetric.x25519 import X25519PrivateKey
+
+from src.Red.Cifrado.EjecutorCifrado import MODO_AESGCM, MODO_X25519, descifrar_trama, etiquetar_trama
+from src.Red.Cifrado.SesionesX25519 import TablaSesionesX25519
+from src.Red.Cifrado.seguridad import GestorSeguridad, SUITE_AESGCM
+
+MENSAJE = '{"tipo": "MENSAJE", "contenido": {"mensaje": "hola"}}'
+
+
+def por_segundo(funcion, segundos):
+    repeticiones = 0
+    inicio = time.perf_counter()
+    while time.perf_counter() - inicio < segundos:
+        funcion()
+        repeticiones += 1
+    return repeticiones / (time.perf_counter() - inicio)
+
+
+def medir_generacion(llaves_rsa):
+    inicio = time.perf_counter()
+    for _ in range(llaves_rsa):
+        rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    t_rsa = (time.perf_counter() - inicio) / llaves_rsa
+
+    t_x25519 = 1 / por_segundo(X25519PrivateKey.generate, 0.2)
+
+    def derivar():
+        gestor._llave_x25519 = None
+        gestor.llave_x25519()
+    gestor = GestorSeguridad()
+    t_derivada = 1 / por_segundo(derivar, 0.2)
+    return t_rsa, t_x25519, t_derivada
+
+
+def main():
+    segundos = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    llaves_rsa = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    servidor = GestorSeguridad()
+    publica_x25519 = GestorSeguridad.importar_publica_x25519(servidor.obtener_publicas_pem())
+    cliente = GestorSeguridad()
+
+    print("=" * 60)
+    print(f"BENCHMARK HANDSHAKE RSA vs X25519 - {segundos:.1f} s por caso")
+    print("=" * 60)
+
+    t_rsa, t_x25519, t_derivada = medir_generacion(llaves_rsa)
+    print("  Generación de llaves al arrancar")
+    print(f"    RSA-2048                       {t_rsa * 1e3:10,.2f} ms")
+    print(f"    X25519                         {t_x25519 * 1e6:10,.1f} µs")
+    print(f"    X25519 derivada de la RSA      {t_derivada * 1e6:10,.1f} µs")
+
+    # Handshake = primer paquete de un cliente nuevo procesado por el servidor
+    def handshake_rsa():
+        cuerpo = base64.b64encode(cliente.cifrar(MENSAJE, servidor.public_key, SUITE_AESGCM)).decode()
+        descifrar_trama(servidor, etiquetar_trama(MODO_AESGCM, cuerpo))
+
+    def handshake_x25519():
+        # Tabla nueva en cada vuelta: siempre se paga el intercambio X25519
+        tabla_cliente = TablaSesionesX25519()
+        id_sesion = tabla_cliente.crear_sesion(publica_x25519)
+        servidor._sesiones_x25519 = TablaSesionesX25519(servidor.llave_x25519())
+        cuerpo = base64.b64encode(tabla_cliente.cifrar(id_sesion, MENSAJE.encode())).decode()
+        descifrar_trama(servidor, etiquetar_trama(MODO_X25519, cuerpo))
+
+    print("  Handshakes/s (cliente + servidor, un núcleo)")
+    print(f"    RSA-OAEP + AES-GCM             {por_segundo(handshake_rsa, segundos):10,.0f}")
+    print(f"    X25519 + HKDF + AES-GCM        {por_segundo(handshake_x25519, segundos):10,.0f}")
+
+    # Paquetes ya dentro de una sesión: solo el descifrado del servidor
+    hibrida = etiquetar_trama(MODO_AESGCM, base64.b64encode(cliente.cifrar(MENSAJE, servidor.public_key, SUITE_AESGCM)).decode())
+    id_sesion = cliente.crear_sesion_x25519(publica_x25519)
+    de_sesion = etiquetar_trama(MODO_X25519, base64.b64encode(cliente.cifrar_sesion(MENSAJE, id_sesion)).decode())
+    assert descifrar_trama(servidor, de_sesion)[0] == MENSAJE
+
+    print("  Descifrado por paquete en el servidor")
+    print(f"    RSA-OAEP + AES-GCM             {1e6 / por_segundo(lambda: descifrar_trama(servidor, hibrida), segundos):10,.1f} µs")
+    print(f"    Sesión X25519 (AES-GCM)        {1e6 / por_segundo(lambda: descifrar_trama(servidor, de_sesion), segundos):10,.1f} µs")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
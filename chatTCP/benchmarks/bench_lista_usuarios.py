@@ -0,0 +1,136 @@
+"""
+Benchmark del dibujado de la lista de usuarios del menú principal
+
+Compara el dibujado anterior (destruir y recrear todas las tarjetas en cada
+actualización) con la lista virtualizada por clave, para 10, 1k y 10k
+usuarios: dibujado inicial, llegada de un MENSAJE (cambia una tarjeta) y
+desplazamiento a la mitad de la lista. Necesita una pantalla (o Xvfb).
+
+Uso:
+    python chatTCP/benchmarks/bench_lista_usuarios.py [usuarios,...] [repeticiones]
+"""
+import os
+import sys
+import time
+import tkinter as tk
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from chatTCP.src.Presentacion.ListaVirtual import ListaVirtual
+from chatTCP.src.Presentacion.ObjetosPresentacion.UsuarioOP import UsuariosOP
+
+ALTO_FILA = 64
+
+
+def vista_previa(texto):
+    return texto[:25] + "..." if len(texto) > 25 else texto
+
+
+def crear_fila(parent):
+    fila = tk.Frame(parent, bg="white", padx=10, pady=10)
+    fila.avatar = tk.Label(fila, bg="#128C7E", fg="white", width=4, height=2)
+    fila.avatar.pack(side="left", padx=(0, 10))
+    fila.contador = tk.Label(fila, bg="#25D366", fg="white", width=3)
+    info = tk.Frame(fila, bg="white")
+    info.pack(side="left", fill="x", expand=True)
+    fila.nombre = tk.Label(info, bg="white", anchor="w")
+    fila.nombre.pack(fill="x")
+    fila.mensaje = tk.Label(info, fg="#666", bg="white", anchor="w")
+    fila.mensaje.pack(fill="x")
+    return fila
+
+
+def mostrar_fila(fila, user):
+    fila.avatar.config(text=user.nombre[0].upper())
+    fila.nombre.config(text=user.nombre)
+    fila.mensaje.config(text=vista_previa(user.ultimo_mensaje))
+    if user.totalMsjNuevos > 0:
+        fila.contador.config(text=str(user.totalMsjNuevos))
+        fila.contador.pack(side="right")
+    else:
+        fila.contador.pack_forget()
+
+
+class ListaCompleta:
+    """El dibujado anterior: un Frame con todas las tarjetas, recreadas cada vez"""
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.marco = tk.Frame(canvas)
+        canvas.create_window((0, 0), window=self.marco, anchor="nw", width=430)
+        self.marco.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
+
+    def set_elementos(self, usuarios):
+        for widget in self.marco.winfo_children():
+            widget.destroy()
+        for user in usuarios:
+            fila = crear_fila(self.marco)
+            fila.pack(fill="x", pady=2, padx=5)
+            mostrar_fila(fila, user)
+
+    def yview(self, *args):
+        self.canvas.yview(*args)
+
+
+def crear_lista(nombre, canvas):
+    if nombre == "virtual":
+        return ListaVirtual(canvas, ALTO_FILA, crear_fila, mostrar_fila,
+                            clave=lambda u: u.nombre,
+                            firma=lambda u: (vista_previa(u.ultimo_mensaje), u.totalMsjNuevos))
+    return ListaCompleta(canvas)
+
+
+def cronometrar(raiz, accion, repeticiones):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        accion()
+        raiz.update_idletasks()
+    return (time.perf_counter() - inicio) / repeticiones * 1000
+
+
+def medir(raiz, nombre, total, repeticiones):
+    canvas = tk.Canvas(raiz, width=430, height=590)
+    canvas.pack(fill="both", expand=True)
+    raiz.update()
+    lista = crear_lista(nombre, canvas)
+    usuarios = [UsuariosOP(f"usuario_{n:05d}", "Disponible", "#128C7E", 0) for n in range(total)]
+
+    inicial = cronometrar(raiz, lambda: lista.set_elementos(usuarios), 1)
+
+    def llega_mensaje():
+        usuarios[0].totalMsjNuevos += 1
+        usuarios[0].ultimo_mensaje = f"mensaje {usuarios[0].totalMsjNuevos}"
+        lista.set_elementos(usuarios)
+    mensaje = cronometrar(raiz, llega_mensaje, repeticiones)
+
+    desplazamiento = cronometrar(raiz, lambda: lista.yview("moveto", 0.5), 1)
+    widgets = len(canvas.winfo_children()) if nombre == "virtual" else len(lista.marco.winfo_children())
+    canvas.destroy()
+    return inicial, mensaje, desplazamiento, widgets
+
+
+def main():
+    totales = [int(n) for n in sys.argv[1].split(",")] if len(sys.argv) > 1 else [10, 1000, 10000]
+    repeticiones = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    try:
+        raiz = tk.Tk()
+    except tk.TclError as e:
+        print(f"Se necesita una pantalla para medir Tk (probar con xvfb-run): {e}")
+        sys.exit(1)
+    raiz.geometry("450x650")
+
+    print("=" * 60)
+    print(f"BENCHMARK LISTA DE USUARIOS - {repeticiones} mensajes por medición")
+    print("=" * 60)
+    for total in totales:
+        print(f"  {total:,} usuarios")
+        for nombre in ("completa", "virtual"):
+            inicial, mensaje, desplazamiento, widgets = medir(raiz, nombre, total, repeticiones)
+            print(f"    {nombre:<9} inicial {inicial:9,.1f} ms  mensaje {mensaje:9,.1f} ms  "
+                  f"desplazar {desplazamiento:7,.1f} ms  {widgets:6,} tarjetas")
+    print("=" * 60)
+    raiz.destroy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark del agrupamiento de paquetes en tramas LOTE
+
+Envía ráfagas de mensajes chicos a un ServidorTCP local, con y sin
+coalescedor, y mide mensajes/s hasta que el receptor los tiene todos, CPU
+del proceso (emisor + receptor) por mensaje, tramas (conexiones + cifrados)
+por mensaje y bytes en la red. Entre ráfagas hay una pausa fija de 10 ms.
+
+Uso:
+    python chatTCP/benchmarks/bench_lotes.py [mensajes] [rafaga] [espera_ms]
+"""
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.ComponenteReceptor.IReceptor import IReceptor
+from src.PaqueteDTO.PaqueteDTO import PaqueteDTO
+from src.Red.Cifrado.seguridad import GestorSeguridad, SUITE_AESGCM
+from src.Red.Emisor.ClienteTCP import ClienteTCP
+from src.Red.Emisor.ColaEnvios import ColaEnvios
+from src.Red.Emisor.Emisor import Emisor
+from src.Red.Emisor.NumeradorSecuencias import NumeradorSecuencias
+from src.Red.Receptor.ColaRecibos import ColaRecibos
+from src.Red.Receptor.Receptor import Receptor
+from src.Red.Receptor.ServidorTCP import ServidorTCP
+
+
+class Contador(IReceptor):
+    def __init__(self, total):
+        self.total = total
+        self.recibidos = 0
+        self.listo = threading.Event()
+        self._lock = threading.Lock()
+
+    def recibir_cambio(self, paquete):
+        with self._lock:
+            self.recibidos += 1
+            if self.recibidos >= self.total:
+                self.listo.set()
+
+
+class ClienteMedido(ClienteTCP):
+    """ClienteTCP que cuenta las tramas y los bytes que envía"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tramas = 0
+        self.bytes = 0
+
+    def _cifrar_mensaje_dual(self, json_str, *args):
+        trama, modo = super()._cifrar_mensaje_dual(json_str, *args)
+        self.tramas += 1
+        self.bytes += len(trama)
+        return trama, modo
+
+
+def medir(seguridad, mensajes, rafaga, espera_lote):
+    contador = Contador(mensajes)
+    cola_recibos = ColaRecibos()
+    receptor = Receptor()
+    receptor.set_cola(cola_recibos)
+    receptor.set_receptor(contador)
+    cola_recibos.agregar_observador(receptor)
+    servidor = ServidorTCP(cola_recibos, seguridad, puerto=0, host="127.0.0.1", backlog=128)
+    servidor.iniciar()
+    puerto = servidor.get_puerto()
+
+    cola_envios = ColaEnvios(espera_lote=espera_lote)
+    cliente = ClienteMedido(cola_envios, seguridad, seguridad.public_key, suite=SUITE_AESGCM)
+    cola_envios.agregar_observador(cliente)
+    emisor = Emisor(cola_envios, NumeradorSecuencias())
+
+    inicio = time.perf_counter()
+    cpu = time.process_time()
+    for n in range(mensajes):
+        emisor.enviar_cambio(PaqueteDTO("MENSAJE", {"mensaje": f"hola {n}", "remitente": "ana"}, origen="ana",
+                                        destino="TODOS", host="127.0.0.1", puerto_destino=puerto))
+        if (n + 1) % rafaga == 0:
+            # Pausa entre ráfagas (alguien que escribe y se detiene)
+            time.sleep(0.01)
+    if cola_envios.coalescedor is not None:
+        cola_envios.coalescedor.vaciar()
+    contador.listo.wait(30)
+    segundos = time.perf_counter() - inicio
+    cpu = time.process_time() - cpu
+    servidor.detener()
+    return mensajes / segundos, cpu / mensajes * 1e6, cliente.tramas / mensajes, cliente.bytes / mensajes
+
+
+def main():
+    mensajes = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rafaga = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    espera_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 5.0
+    seguridad = GestorSeguridad()
+
+    print("=" * 60)
+    print(f"BENCHMARK LOTES - {mensajes} mensajes en ráfagas de {rafaga}")
+    print("=" * 60)
+    for nombre, espera in (("sin agrupar", 0.0), (f"lotes {espera_ms:g} ms", espera_ms / 1000)):
+        por_segundo, cpu_us, tramas, bytes_ = medir(seguridad, mensajes, rafaga, espera)
+        print(f"  {nombre:<14} {por_segundo:8,.0f} msg/s  {cpu_us:7,.0f} µs CPU/msg  "
+              f"{tramas:6.3f} tramas/msg  {bytes_:6,.0f} bytes/msg")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
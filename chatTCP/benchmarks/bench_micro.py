@@ -0,0 +1,215 @@
+"""
+Microbenchmarks de las piezas del camino caliente
+
+Casos (cada uno con sus parámetros):
+    seguridad.cifrar / seguridad.desifrar   tamaño del mensaje en bytes
+    paquete.to_json / paquete.from_json     tamaño del contenido en bytes
+    cola_envios / cola_recibos              tamaño del contenido (encolar + desencolar)
+    event_bus.notificar                     servicios suscritos al evento
+
+Cada caso se calibra (como timeit.autorange) para que una muestra dure al
+menos --muestra segundos; se toman --repeticiones muestras y se informa la
+mediana y la desviación por operación, con el recolector de basura apagado.
+
+--guardar escribe los resultados como línea base (por defecto base_micro.json
+junto a este archivo) y --comparar la contrasta: un caso cuya mediana empeora
+más que --umbral (y más que dos desviaciones) se marca como regresión y el
+código de salida es 1. La base
+del repositorio se tomó en una sola máquina; para comparar en otra hay que
+generar primero la propia con --guardar.
+
+Uso:
+    python chatTCP/benchmarks/bench_micro.py [--solo cola] [--guardar [ruta]] [--comparar [ruta]]
+"""
+import argparse
+import base64
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from chatTCP.src.Bus.EventBus import EventBus
+from chatTCP.src.Bus.ServicioDTO import ServicioDTO
+from chatTCP.src.PaqueteDTO.PaqueteDTO import PaqueteDTO
+from src.Red.Cifrado.seguridad import GestorSeguridad
+from src.Red.Emisor.ColaEnvios import ColaEnvios
+from src.Red.Receptor.ColaRecibos import ColaRecibos
+
+BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "base_micro.json")
+TAMANIOS = [64, 1024, 16384, 262144]
+SUSCRIPTORES = [1, 10, 100, 1000]
+
+
+class EmisorNulo:
+    """Emisor que no manda nada: se mide solo el reparto del EventBus"""
+
+    def __init__(self):
+        self.enviados = 0
+
+    def enviar_cambio(self, paquete):
+        self.enviados += 1
+
+
+def _paquete(tamanio, seguridad):
+    return PaqueteDTO("MENSAJE", {"mensaje": "x" * tamanio, "remitente": "bench"}, origen="bench", destino="TODOS",
+                      host="127.0.0.1", puerto_origen=5000, puerto_destino=5555,
+                      llave_publica_origen=seguridad.obtener_publica_bytes(), seq=1, id_mensaje="bench-1", sesion="s")
+
+
+def casos(seguridad):
+    """
+    Genera (nombre, parámetro, función) para cada caso
+
+    La preparación (mensajes, tramas cifradas, suscriptores) se hace antes de
+    devolver la función, así que no entra en la medición.
+    """
+    for tamanio in TAMANIOS:
+        mensaje = "x" * tamanio
+        yield "seguridad.cifrar", tamanio, lambda m=mensaje: seguridad.cifrar(m, seguridad.public_key)
+        trama = seguridad.cifrar(mensaje, seguridad.public_key)
+        yield "seguridad.desifrar", tamanio, lambda t=trama: seguridad.desifrar(t)
+
+    for tamanio in TAMANIOS:
+        paquete = _paquete(tamanio, seguridad)
+        texto = paquete.to_json()
+        yield "paquete.to_json", tamanio, paquete.to_json
+        yield "paquete.from_json", tamanio, lambda t=texto: PaqueteDTO.from_json(t)
+
+    for tamanio in TAMANIOS:
+        paquete = _paquete(tamanio, seguridad)
+        envios = ColaEnvios()
+        yield "cola_envios", tamanio, lambda c=envios, p=paquete: (c.encolar(p), c.desencolar())
+        recibos = ColaRecibos()
+        texto = paquete.to_json()
+        yield "cola_recibos", tamanio, lambda c=recibos, t=texto: (c.encolar(t), c.desencolar())
+
+    for total in SUSCRIPTORES:
+        bus = EventBus()
+        bus.set_emisor(EmisorNulo())
+        for n in range(total):
+            llave = base64.b64encode(n.to_bytes(4, "big")).decode()
+            bus.registrar_servicio("MENSAJE", ServicioDTO(puerto=6000 + n, host="127.0.0.1", llave_publica=llave))
+        paquete = PaqueteDTO("MENSAJE", {"mensaje": "hola"}, origen="bench", host="127.0.0.1", puerto_origen=5000)
+        yield "event_bus.notificar", total, lambda b=bus, p=paquete: b.notificar_servicios(p)
+
+
+def medir(funcion, repeticiones, muestra):
+    """
+    Returns:
+        (mediana, desviación) en segundos por operación
+    """
+    vueltas = 1
+    while True:
+        inicio = time.perf_counter()
+        for _ in range(vueltas):
+            funcion()
+        if time.perf_counter() - inicio >= muestra:
+            break
+        vueltas *= 2
+
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        for _ in range(vueltas):
+            funcion()
+        tiempos.append((time.perf_counter() - inicio) / vueltas)
+    return statistics.median(tiempos), statistics.stdev(tiempos) if len(tiempos) > 1 else 0.0
+
+
+def formatear(segundos):
+    for unidad, escala in (("s", 1), ("ms", 1e-3), ("µs", 1e-6)):
+        if segundos >= escala:
+            return f"{segundos / escala:8.2f} {unidad:<2}"
+    return f"{segundos / 1e-9:8.1f} ns"
+
+
+def comparar(base, resultados, umbral):
+    """
+    Contrasta los resultados con una línea base
+
+    Args:
+        base: Dict clave → {"mediana_s", "desviacion_s"} de la línea base
+        resultados: Dict con el mismo formato de esta ejecución
+        umbral: Empeoramiento relativo de la mediana que cuenta como regresión
+            (además tiene que superar dos desviaciones, para no marcar ruido)
+
+    Returns:
+        Lista de claves con regresión
+    """
+    regresiones = []
+    for clave, actual in resultados.items():
+        anterior = base.get(clave)
+        if anterior is None:
+            print(f"  {clave:<32} sin línea base")
+            continue
+        cambio = actual["mediana_s"] / anterior["mediana_s"] - 1
+        diferencia = abs(actual["mediana_s"] - anterior["mediana_s"])
+        significativo = diferencia > 2 * max(actual["desviacion_s"], anterior["desviacion_s"])
+        marca = ""
+        if significativo and cambio > umbral:
+            marca = "  REGRESIÓN"
+            regresiones.append(clave)
+        elif significativo and cambio < -umbral:
+            marca = "  mejora"
+        print(f"  {clave:<32} {formatear(anterior['mediana_s'])} → {formatear(actual['mediana_s'])} {cambio:+8.1%}{marca}")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks de cifrado, codec, colas y EventBus")
+    parser.add_argument("--solo", help="Solo los casos cuyo nombre contiene este texto")
+    parser.add_argument("--repeticiones", type=int, default=7, help="Muestras por caso")
+    parser.add_argument("--muestra", type=float, default=0.05, help="Duración mínima de una muestra en segundos")
+    parser.add_argument("--guardar", nargs="?", const=BASE, help="Guarda los resultados como línea base")
+    parser.add_argument("--comparar", nargs="?", const=BASE, help="Compara contra una línea base")
+    parser.add_argument("--umbral", type=float, default=0.10, help="Empeoramiento relativo que cuenta como regresión")
+    args = parser.parse_args()
+
+    seguridad = GestorSeguridad()
+    print("=" * 60)
+    print(f"MICROBENCHMARKS - Python {platform.python_version()}, {args.repeticiones} muestras de {args.muestra}s")
+    print("=" * 60)
+    resultados = {}
+    gc_activo = gc.isenabled()
+    gc.disable()
+    try:
+        for nombre, parametro, funcion in casos(seguridad):
+            if args.solo and args.solo not in nombre:
+                continue
+            mediana, desviacion = medir(funcion, args.repeticiones, args.muestra)
+            clave = f"{nombre}[{parametro}]"
+            resultados[clave] = {"mediana_s": mediana, "desviacion_s": desviacion}
+            print(f"  {clave:<32} {formatear(mediana)} ± {formatear(desviacion).strip()}")
+    finally:
+        if gc_activo:
+            gc.enable()
+
+    regresiones = []
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+        print("=" * 60)
+        print(f"COMPARACIÓN CONTRA {os.path.basename(args.comparar)} ({base.get('fecha', '?')}, "
+              f"Python {base.get('python', '?')})")
+        print("=" * 60)
+        regresiones = comparar(base["resultados"], resultados, args.umbral)
+
+    if args.guardar:
+        with open(args.guardar, "w", encoding="utf-8") as f:
+            json.dump({"fecha": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+                       "plataforma": platform.platform(), "resultados": resultados}, f, indent=2, ensure_ascii=False)
+        print(f"  línea base guardada en {args.guardar}")
+    print("=" * 60)
+    if regresiones:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark de registro de usuarios con WAL y group commit
+
+Mide registros/s con varios hilos registrando a la vez para distintos
+tamaños máximos de lote (tamanio_lote=1 equivale a un fsync por registro).
+
+Uso:
+    python chatTCP/benchmarks/bench_registro_wal.py [registros] [hilos]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.Datos.EscritorWAL import EscritorWAL
+
+
+def medir(total, hilos, tamanio_lote):
+    with tempfile.TemporaryDirectory() as directorio:
+        estado = {}
+        escritor = EscritorWAL(
+            os.path.join(directorio, "usuarios.json.wal"),
+            os.path.join(directorio, "usuarios.json"),
+            obtener_estado=lambda: dict(estado),
+            tamanio_lote=tamanio_lote,
+        )
+        por_hilo = total // hilos
+
+        def registrar(n):
+            for i in range(por_hilo):
+                clave = f"usuario_{n}_{i}"
+                estado[clave] = "hash"
+                escritor.escribir(clave, "hash")
+
+        trabajadores = [threading.Thread(target=registrar, args=(n,)) for n in range(hilos)]
+        inicio = time.perf_counter()
+        for t in trabajadores: t.start()
+        for t in trabajadores: t.join()
+        transcurrido = time.perf_counter() - inicio
+        escritor.cerrar()
+        return por_hilo * hilos / transcurrido
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 4000
+    hilos = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+
+    print("=" * 60)
+    print(f"BENCHMARK REGISTRO CON WAL - {total} registros, {hilos} hilos")
+    print("=" * 60)
+    for tamanio_lote in (1, 4, 16, 64, 256):
+        print(f"  tamanio_lote={tamanio_lote:<4} {medir(total, hilos, tamanio_lote):12,.0f} registros/s")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
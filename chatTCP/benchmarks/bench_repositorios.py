@@ -0,0 +1,80 @@
+"""
+Benchmark de los backends de usuarios (IRepositorioUsuarios)
+
+Para cada backend y tamaño mide:
+  - carga masiva (agregar_lote)
+  - reapertura (tiempo en reconstruir el estado desde disco)
+  - búsquedas aleatorias (obtener) por segundo, mitad existentes y mitad no
+
+Uso:
+    python chatTCP/benchmarks/bench_repositorios.py [tamaños] [búsquedas] [backends]
+    python chatTCP/benchmarks/bench_repositorios.py 1000,100000 50000 json,sqlite
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.Datos.RepositorioJSON import RepositorioJSON
+from src.Datos.RepositorioMemoria import RepositorioMemoria
+from src.Datos.RepositorioSQLite import RepositorioSQLite
+from src.Datos.RepositorioShards import RepositorioShards
+
+BACKENDS = {
+    "memoria": lambda d: RepositorioMemoria(),
+    "json": lambda d: RepositorioJSON(os.path.join(d, "usuarios.json")),
+    "sqlite": lambda d: RepositorioSQLite(os.path.join(d, "usuarios.db")),
+    "shards": lambda d: RepositorioShards(os.path.join(d, "shards"), total_shards=16),
+}
+
+# Hash de ejemplo con el mismo largo que un sha256 en hexadecimal
+HASH = "0" * 64
+
+
+def medir(nombre, crear, total, busquedas):
+    with tempfile.TemporaryDirectory() as directorio:
+        repo = crear(directorio)
+        inicio = time.perf_counter()
+        repo.agregar_lote((f"usuario_{i}", HASH) for i in range(total))
+        carga = time.perf_counter() - inicio
+
+        reapertura = None
+        if nombre != "memoria":
+            repo.cerrar()
+            inicio = time.perf_counter()
+            repo = crear(directorio)
+            reapertura = time.perf_counter() - inicio
+
+        azar = random.Random(42)
+        claves = [f"usuario_{azar.randrange(total * 2)}" for _ in range(busquedas)]
+        inicio = time.perf_counter()
+        for clave in claves:
+            repo.obtener(clave)
+        por_segundo = busquedas / (time.perf_counter() - inicio)
+        repo.cerrar()
+
+    texto_reapertura = f"{reapertura:8.3f}s" if reapertura is not None else "       -"
+    print(f"  {nombre:<8} {total:>9,}  carga {carga:8.3f}s  reapertura {texto_reapertura}  "
+          f"obtener {por_segundo:12,.0f}/s")
+
+
+def main():
+    tamanios = [int(t) for t in sys.argv[1].split(",")] if len(sys.argv) > 1 else [1_000, 100_000, 1_000_000]
+    busquedas = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    backends = sys.argv[3].split(",") if len(sys.argv) > 3 else list(BACKENDS)
+
+    print("=" * 60)
+    print(f"BENCHMARK REPOSITORIOS DE USUARIOS - {busquedas} búsquedas")
+    print("=" * 60)
+    for total in tamanios:
+        for nombre in backends:
+            medir(nombre, BACKENDS[nombre], total, busquedas)
+        print("-" * 60)
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Benchmark del modo pre-fork (SO_REUSEPORT): paquetes/s según el número de workers
+
+Cada worker es un proceso con su propio pipeline de recepción (ServidorTCP →
+ColaRecibos → Receptor) escuchando el mismo puerto. Varios procesos cliente
+reenvían una trama híbrida (RSA+Fernet) ya cifrada, una conexión por
+paquete como hace ClienteTCP, así que el costo medido es el del servidor:
+aceptar, descifrar y deserializar.
+
+Uso:
+    python chatTCP/benchmarks/bench_reuseport.py [workers_max] [segundos] [clientes]
+"""
+import base64
+import multiprocessing
+import os
+import socket
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.ComponenteReceptor.IReceptor import IReceptor
+from src.PaqueteDTO.PaqueteDTO import PaqueteDTO
+from src.Red.Cifrado.EjecutorCifrado import MODO_HIBRIDO, etiquetar_trama
+from src.Red.Cifrado.seguridad import GestorSeguridad
+from src.Red.Receptor.ColaRecibos import ColaRecibos
+from src.Red.Receptor.Receptor import Receptor
+from src.Red.Receptor.ServidorTCP import ServidorTCP
+
+
+class ReceptorConteo(IReceptor):
+    """Cuenta los paquetes que llegan completos al final del pipeline"""
+
+    def __init__(self, contador):
+        self._contador = contador
+
+    def recibir_cambio(self, paquete: PaqueteDTO) -> None:
+        with self._contador.get_lock():
+            self._contador.value += 1
+
+
+def worker(puerto, ruta_llave, contador, listo, detener):
+    seguridad = GestorSeguridad()
+    seguridad.cargar_privada_desde_archivo(ruta_llave)
+
+    cola = ColaRecibos()
+    receptor = Receptor()
+    receptor.set_cola(cola)
+    receptor.set_receptor(ReceptorConteo(contador))
+    cola.agregar_observador(receptor)
+
+    servidor = ServidorTCP(cola, seguridad, puerto=puerto, host="127.0.0.1", reuse_port=True, backlog=128)
+    servidor.iniciar()
+    listo.set()
+    detener.wait()
+    servidor.detener()
+
+
+def cliente(puerto, trama, hasta):
+    while time.time() < hasta:
+        try:
+            with socket.create_connection(("127.0.0.1", puerto), timeout=5) as s:
+                s.sendall(trama)
+        except OSError:
+            time.sleep(0.01)
+
+
+def medir(workers, clientes, segundos, ruta_llave, trama):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        puerto = s.getsockname()[1]
+
+    contador = multiprocessing.Value('l', 0)
+    detener = multiprocessing.Event()
+    listos = [multiprocessing.Event() for _ in range(workers)]
+    procesos = [multiprocessing.Process(target=worker, args=(puerto, ruta_llave, contador, listo, detener))
+                for listo in listos]
+    for p in procesos: p.start()
+    for listo in listos: listo.wait(30)
+
+    hasta = time.time() + segundos
+    emisores = [multiprocessing.Process(target=cliente, args=(puerto, trama, hasta)) for _ in range(clientes)]
+    inicio = time.perf_counter()
+    for e in emisores: e.start()
+    for e in emisores: e.join()
+    # Dar tiempo a que terminen los paquetes ya aceptados
+    time.sleep(0.5)
+    transcurrido = time.perf_counter() - inicio
+
+    detener.set()
+    for p in procesos: p.join(10)
+    return contador.value / transcurrido
+
+
+def main():
+    if not hasattr(socket, "SO_REUSEPORT"):
+        print("SO_REUSEPORT no está disponible en esta plataforma")
+        return
+
+    nucleos = os.cpu_count() or 1
+    workers_max = int(sys.argv[1]) if len(sys.argv) > 1 else nucleos
+    segundos = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    clientes = int(sys.argv[3]) if len(sys.argv) > 3 else max(2, nucleos)
+
+    seguridad = GestorSeguridad()
+    paquete = PaqueteDTO("MENSAJE", {"mensaje": "hola " * 20, "remitente": "bench"}, origen="bench", destino="TODOS")
+    cuerpo = base64.b64encode(seguridad.cifrar(paquete.to_json(), seguridad.public_key)).decode()
+    trama = (etiquetar_trama(MODO_HIBRIDO, cuerpo) + "\n").encode()
+
+    print("=" * 60)
+    print(f"BENCHMARK SO_REUSEPORT - {nucleos} núcleos, {clientes} clientes, {segundos}s por medición")
+    print("=" * 60)
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta_llave = os.path.join(directorio, "servidor_private.pem")
+        seguridad.guardar_privada(ruta_llave)
+
+        base = None
+        workers = 1
+        while workers <= workers_max:
+            por_segundo = medir(workers, clientes, segundos, ruta_llave, trama)
+            base = base or por_segundo
+            print(f"  workers={workers:<3} {por_segundo:10,.0f} paquetes/s  (x{por_segundo / base:.2f})")
+            workers *= 2
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
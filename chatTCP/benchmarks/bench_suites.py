@@ -0,0 +1,71 @@
+"""
+Benchmark de las suites de cifrado híbrido (FERNET, AESGCM, CHACHA20)
+
+Para cada suite y tamaño de mensaje mide µs por mensaje al cifrar y al
+descifrar la trama completa (incluye la operación RSA), MB/s del ciclo
+completo y los bytes que viajan por la red (trama base64 con etiqueta).
+
+Uso:
+    python chatTCP/benchmarks/bench_suites.py [tamaños] [segundos]
+    (tamaños separados por coma, por defecto 100,1000,65536,1048576)
+"""
+import base64
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.Red.Cifrado.EjecutorCifrado import MODO_POR_SUITE, descifrar_trama, etiquetar_trama
+from src.Red.Cifrado.seguridad import GestorSeguridad, SUITES
+
+
+def trama(seguridad, suite, mensaje):
+    cuerpo = base64.b64encode(seguridad.cifrar(mensaje, seguridad.public_key, suite)).decode('utf-8')
+    return etiquetar_trama(MODO_POR_SUITE[suite], cuerpo)
+
+
+def medir(seguridad, suite, tamanio, segundos):
+    mensaje = "x" * tamanio
+    ejemplo = trama(seguridad, suite, mensaje)
+    assert descifrar_trama(seguridad, ejemplo)[0] == mensaje
+
+    repeticiones = 0
+    t_cifrar = t_descifrar = 0.0
+    limite = time.perf_counter() + segundos
+    while time.perf_counter() < limite:
+        inicio = time.perf_counter()
+        t = trama(seguridad, suite, mensaje)
+        medio = time.perf_counter()
+        descifrar_trama(seguridad, t)
+        t_cifrar += medio - inicio
+        t_descifrar += time.perf_counter() - medio
+        repeticiones += 1
+
+    return {
+        "cifrar_us": t_cifrar / repeticiones * 1e6,
+        "descifrar_us": t_descifrar / repeticiones * 1e6,
+        "mb_s": tamanio * repeticiones / (t_cifrar + t_descifrar) / 1e6,
+        "bytes_red": len(ejemplo) + 1,  # + salto de línea
+    }
+
+
+def main():
+    tamanios = [int(t) for t in sys.argv[1].split(",")] if len(sys.argv) > 1 else [100, 1000, 65536, 1048576]
+    segundos = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    seguridad = GestorSeguridad()
+
+    print("=" * 60)
+    print(f"BENCHMARK SUITES DE CIFRADO - {segundos:.1f} s por caso")
+    print("=" * 60)
+    for tamanio in tamanios:
+        print(f"  mensaje de {tamanio:,} bytes")
+        for suite in reversed(SUITES):
+            r = medir(seguridad, suite, tamanio, segundos)
+            print(f"    {suite:<9} cifrar {r['cifrar_us']:10,.1f} µs  descifrar {r['descifrar_us']:10,.1f} µs  "
+                  f"{r['mb_s']:8,.1f} MB/s  {r['bytes_red']:>10,} bytes en red")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
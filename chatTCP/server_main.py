@@ -1,7 +1,14 @@
+import base64
+import binascii
 import sys
 import os
 import time
 import logging
+import argparse
+import multiprocessing
+import signal
+import socket
+import threading
 
 # --- Configuración de rutas ---
 current_dir = os.path.dirname(os.path.abspath(__file__)) 
@@ -13,23 +20,63 @@ from chatTCP.src.Bus.EventBus import EventBus
 from chatTCP.src.Bus.ServicioDTO import ServicioDTO
 from chatTCP.src.ComponenteReceptor.IReceptor import IReceptor
 from chatTCP.src.Red.EnsambladorRed import EnsambladorRed, ConfigRed
-from chatTCP.src.Red.Cifrado.seguridad import GestorSeguridad
+from chatTCP.src.Red.Emisor.DestinoEnvio import DestinoEnvio
+from chatTCP.src.Red.Cifrado.seguridad import GestorSeguridad, SUITE_FERNET
+from chatTCP.src.Red.Cifrado.SesionesX25519 import TAMANIO_ID
+from chatTCP.src.Red.Cifrado.Compresion import negociar_compresion
+from chatTCP.src.Red.Emisor.ConfirmacionesEnvio import ESTADO_FALLIDO
+from chatTCP.src.Red.Metricas import RegistroMetricas
+from chatTCP.src.Red.Trazas import RegistroTrazas
+from chatTCP.src.Red import Bitacora
 from chatTCP.src.Datos.repositorio import repositorioUsuarios
+from chatTCP.src.Datos.AlmacenOffline import AlmacenOffline
+from chatTCP.src.Datos.AlmacenOfflineCompartido import AlmacenOfflineCompartido
+from chatTCP.src.Datos.HistorialMensajes import HistorialMensajes
+from chatTCP.src.Datos.IndiceBusqueda import IndiceBusqueda
+from chatTCP.src.Datos.FabricaRepositorio import cargar_configuracion_datos, crear_repositorio
+from chatTCP.src.Datos.SesionesCompartidas import SesionesCompartidas
+from chatTCP.src.Cluster.ConfigCluster import cargar_configuracion_cluster
+from chatTCP.src.Cluster.CoordinadorCluster import CoordinadorCluster, cargar_llave_cluster
 from chatTCP.src.PaqueteDTO.PaqueteDTO import PaqueteDTO
 
-log_path = os.path.join(current_dir, 'servidor_bitacora.log')
-logging.basicConfig(filename=log_path, level=logging.INFO, format='%(asctime)s - SERVER - %(message)s')
-logging.getLogger('').addHandler(logging.StreamHandler())
+# Paquetes de clientes que debe atender el nodo dueño del usuario
+TIPOS_CLIENTE = ("REGISTRO", "LOGIN", "MENSAJE", "SOLICITAR_USUARIOS", "CONFIRMAR_OFFLINE", "HISTORIAL", "BUSCAR")
+
+def configurar_bitacora(ruta, etiqueta="SERVER", niveles=None, muestreo=None, formato="texto"):
+    # Archivo y consola se escriben desde el hilo de la bitácora, no desde los
+    # hilos que atienden paquetes. Se reemplaza lo que un worker creado con
+    # fork haya heredado del proceso padre.
+    Bitacora.configurar(ruta, etiqueta, niveles=niveles, muestreo=muestreo, formato=formato)
 
 class ReceptorLogicaServidor(IReceptor):
-    def __init__(self, event_bus, ensamblador):
+    def __init__(self, event_bus, ensamblador, almacen_offline=None, historial=None, indice_busqueda=None, usuarios=None, cluster=None, sesiones=None):
         self.event_bus = event_bus
         self.ensamblador = ensamblador
-        self.usuarios_conectados  = {}
+        self.almacen_offline = almacen_offline
+        self.historial = historial
+        self.indice_busqueda = indice_busqueda
+        self.usuarios = usuarios if usuarios is not None else repositorioUsuarios()
+        self.cluster = cluster
+        # Con workers las sesiones viven en un almacén compartido entre procesos
+        self.sesiones_compartidas = sesiones is not None
+        self.usuarios_conectados = sesiones if sesiones is not None else {}
+        self.trazas = RegistroTrazas.obtener_instancia()
+        # id_mensaje -> paquete original de cada MENSAJE reenviado que espera
+        # ACK (None = las entregas no se confirman y no hay que seguirlas)
+        self._entregas_pendientes = None
+        self._lock_entregas = threading.Lock()
 
-    @property
-    def cliente_tcp(self):
-        return self.ensamblador._cliente_tcp
+    def vigilar_entregas(self):
+        """Guarda offline los MENSAJE reenviados a un usuario que terminan sin ACK"""
+        if self.ensamblador.agregar_observador_entregas(self._entrega_resuelta):
+            self._entregas_pendientes = {}
+
+    def _entrega_resuelta(self, id_mensaje, estado, latencia):
+        with self._lock_entregas:
+            paquete = self._entregas_pendientes.pop(id_mensaje, None)
+        if paquete is not None and estado == ESTADO_FALLIDO:
+            logging.warning("Sin ACK de %s para %s: se guarda offline", paquete.destino, id_mensaje)
+            self._guardar_offline(paquete)
 
     @property
     def seguridad(self):
@@ -38,38 +85,93 @@ class ReceptorLogicaServidor(IReceptor):
     def recibir_cambio(self, paquete: PaqueteDTO) -> None:
         try:
             tipo = paquete.tipo
-            logging.info(f"Procesando paquete: {tipo} de {paquete.origen}")
+            logging.info("Procesando paquete: %s de %s", tipo, paquete.origen)
 
-            if tipo == "REGISTRO": self._procesar_registro(paquete)
-            elif tipo == "LOGIN": self._procesar_login(paquete)
-            elif tipo == "MENSAJE": self._procesar_mensaje(paquete)
-            elif tipo == "SOLICITAR_USUARIOS": self._broadcast_lista_usuarios()
+            with self.trazas.tramo(f"servidor.{tipo.lower()}", paquete.traza, origen=paquete.origen):
+                if tipo == "REENVIO": self._procesar_reenvio(paquete)
+                elif tipo == "PRESENCIA": self._procesar_presencia(paquete)
+                elif self._reenviar_a_dueno(paquete): return
+                else: self._procesar(paquete)
 
         except Exception as e:
-            logging.error(f"Error en logica servidor: {e}")
+            logging.error("Error en logica servidor: %s", e)
+
+    def _procesar(self, paquete, difusion=False):
+        tipo = paquete.tipo
+        if tipo == "REGISTRO": self._procesar_registro(paquete)
+        elif tipo == "LOGIN": self._procesar_login(paquete)
+        elif tipo == "MENSAJE": self._procesar_mensaje(paquete, difusion)
+        elif tipo == "SOLICITAR_USUARIOS": self._broadcast_lista_usuarios()
+        elif tipo == "CONFIRMAR_OFFLINE": self._procesar_confirmacion_offline(paquete)
+        elif tipo == "HISTORIAL": self._procesar_historial(paquete)
+        elif tipo == "BUSCAR": self._procesar_busqueda(paquete)
+
+    # --- Cluster ---
+
+    def _reenviar_a_dueno(self, paquete):
+        if self.cluster is None or paquete.tipo not in TIPOS_CLIENTE: return False
+
+        usuario = paquete.contenido.get('usuario') if paquete.tipo in ("REGISTRO", "LOGIN") else paquete.origen
+        if not usuario or self.cluster.es_local(usuario): return False
+
+        dueno = self.cluster.dueno(usuario)
+        logging.info("%s de %s reenviado al nodo %s", paquete.tipo, usuario, dueno)
+        self._enviar_paquete_seguro(self.cluster.servicio_de(dueno), "REENVIO", self.cluster.envolver(paquete), origen=self.cluster.id_nodo, destino=dueno)
+        return True
+
+    def _procesar_reenvio(self, paquete):
+        if self.cluster is None: return
+        abierto = self.cluster.desenvolver(paquete.contenido)
+        if abierto is not None:
+            original, difusion = abierto
+            with self.trazas.tramo(f"servidor.{original.tipo.lower()}", original.traza, origen=original.origen, nodo=paquete.origen):
+                self._procesar(original, difusion=difusion)
+
+    def _procesar_presencia(self, paquete):
+        if self.cluster is None: return
+        datos = self.cluster.actualizar_presencia(paquete.contenido)
+        if datos is None: return
+
+        if datos.get("responder"):
+            self._enviar_paquete_seguro(self.cluster.servicio_de(datos["nodo"]), "PRESENCIA", self.cluster.contenido_presencia(list(self.usuarios_conectados)), origen=self.cluster.id_nodo, destino=datos["nodo"])
+        self._broadcast_lista_usuarios(anunciar=False)
+
+    def anunciar_presencia(self, responder=False):
+        if self.cluster is None: return
+        contenido = self.cluster.contenido_presencia(list(self.usuarios_conectados), responder)
+        for nodo in self.cluster.pares():
+            self._enviar_paquete_seguro(nodo, "PRESENCIA", contenido, origen=self.cluster.id_nodo, destino="CLUSTER")
 
     def _procesar_registro(self, paquete):
         datos = paquete.contenido
         user = datos.get('usuario')
         host_respuesta = datos.get('host_escucha', paquete.host)
 
-        exito = repositorioUsuarios.guardar(user, datos.get('password'))
+        exito = self.usuarios.guardar(user, datos.get('password'))
         tipo_resp = "REGISTRO_OK" if exito else "REGISTRO_FAIL"
         msj = "Usuario creado correctamente" if exito else "El usuario ya existe"
 
-        logging.info(f"Registro {user}: {tipo_resp}")
-        self._enviar_respuesta_directa(host_respuesta, datos['puerto_escucha'], datos['public_key'], tipo_resp, msj)
+        logging.info("Registro %s: %s", user, tipo_resp)
+        suite, sesion = self._cifrado_cliente(datos)
+        self.ensamblador.reiniciar_secuencia(host_respuesta, datos['puerto_escucha'])
+        self._enviar_respuesta_directa(host_respuesta, datos['puerto_escucha'], datos['public_key'], tipo_resp, msj, suite, sesion)
 
     def _procesar_login(self, paquete):
         datos = paquete.contenido
         user = datos['usuario']
         host_respuesta = datos.get('host_escucha', paquete.host)
         
-        logging.info(f"Login {user} desde {host_respuesta}:{datos['puerto_escucha']}")
+        suite, sesion = self._cifrado_cliente(datos)
+        # Puede ser un proceso cliente nuevo en la misma dirección: su receptor espera seq 1
+        self.ensamblador.reiniciar_secuencia(host_respuesta, datos['puerto_escucha'])
+        logging.info("Login %s desde %s:%s (suite %s, x25519 %s)",
+                     user, host_respuesta, datos['puerto_escucha'], suite, sesion is not None)
 
-        if repositorioUsuarios.validar(user, datos['password']):
+        if self.usuarios.validar(user, datos['password']):
             llave = datos['public_key'].encode('utf-8') if isinstance(datos['public_key'], str) else datos['public_key']
-            nuevo_servicio = ServicioDTO(host=host_respuesta, puerto=datos['puerto_escucha'], llave_publica=llave)
+            compresion = negociar_compresion(datos.get('compresion'))
+            nuevo_servicio = ServicioDTO(host=host_respuesta, puerto=datos['puerto_escucha'], llave_publica=llave, suite=suite, sesion_x25519=sesion,
+                                         compresion=compresion)
             
             # Limpiar sesión anterior
             if user in self.usuarios_conectados:
@@ -81,72 +183,362 @@ class ReceptorLogicaServidor(IReceptor):
             self.event_bus.registrar_servicio("MENSAJE", nuevo_servicio)
             self.event_bus.registrar_servicio("LISTA_USUARIOS", nuevo_servicio)
 
-            self._enviar_respuesta_directa(host_respuesta, datos['puerto_escucha'], datos['public_key'], "LOGIN_OK", user)
+            self._enviar_respuesta_directa(host_respuesta, datos['puerto_escucha'], datos['public_key'], "LOGIN_OK",
+                                           {"usuario": user, "suite": suite, "compresion": compresion}, suite, sesion)
             time.sleep(0.2)
             self._broadcast_lista_usuarios()
+            self._entregar_pendientes(user, nuevo_servicio)
         else:
-            self._enviar_respuesta_directa(host_respuesta, datos['puerto_escucha'], datos['public_key'], "ERROR", "Credenciales Incorrectas")
+            self._enviar_respuesta_directa(host_respuesta, datos['puerto_escucha'], datos['public_key'], "ERROR", "Credenciales Incorrectas", suite, sesion)
 
-    def _procesar_mensaje(self, paquete):
+    @staticmethod
+    def _cifrado_cliente(datos):
+        # Suite simétrica: la preferida entre las que anuncia el cliente (los
+        # clientes anteriores no anuncian ninguna y quedan en FERNET).
+        # Sesión X25519: el id que abrió el cliente, si la soporta
+        suite = GestorSeguridad.negociar_suite(datos.get('suites'))
+        sesion = None
+        if datos.get('x25519'):
+            try:
+                sesion = base64.b64decode(datos['x25519'], validate=True)
+            except (binascii.Error, ValueError):
+                pass
+            if sesion is not None and len(sesion) != TAMANIO_ID:
+                sesion = None
+        return suite, sesion
+
+    def _procesar_mensaje(self, paquete, difusion=False):
         destino = paquete.destino
-        subs = self.event_bus.servicios_por_evento.get("MENSAJE", [])
+        subs = self._suscriptores("MENSAJE")
+        self._guardar_historial(paquete)
 
         if destino == "TODOS":
             for s in subs:
                 if s.puerto == paquete.puerto_origen and s.host == paquete.host: continue
                 self._enviar_paquete_seguro(s, "MENSAJE", paquete.contenido, origen=paquete.origen, destino="TODOS")
+            if self.cluster is not None and not difusion:
+                # Cada nodo entrega a sus usuarios y guarda su copia del chat general
+                contenido = self.cluster.envolver(paquete, difusion=True)
+                for nodo in self.cluster.pares():
+                    self._enviar_paquete_seguro(nodo, "REENVIO", contenido, origen=self.cluster.id_nodo, destino="CLUSTER")
+        elif self.cluster is not None and not self.cluster.es_local(destino):
+            dueno = self.cluster.dueno(destino)
+            self._enviar_paquete_seguro(self.cluster.servicio_de(dueno), "REENVIO", self.cluster.envolver(paquete), origen=self.cluster.id_nodo, destino=dueno)
         else:
             dest_serv = self.usuarios_conectados.get(destino)
-            if dest_serv:
-                self._enviar_paquete_seguro(dest_serv, "MENSAJE", paquete.contenido, origen=paquete.origen, destino=destino)
+            entregado = dest_serv is not None and self._enviar_paquete_seguro(dest_serv, "MENSAJE", paquete.contenido, origen=paquete.origen, destino=destino,
+                                                                              original=paquete)
+            if not entregado:
+                self._guardar_offline(paquete)
+
+    def _guardar_historial(self, paquete):
+        contenido = paquete.contenido
+        texto = contenido.get("mensaje", "") if isinstance(contenido, dict) else str(contenido)
+        fecha = time.time()
+
+        id_mensaje = None
+        if self.historial is not None:
+            id_mensaje = self.historial.guardar(paquete.origen, paquete.destino, texto, fecha)
+        if self.indice_busqueda is not None:
+            self.indice_busqueda.indexar(paquete.origen, paquete.destino, texto, fecha, id_mensaje)
+
+    def _procesar_historial(self, paquete):
+        servicio = self.usuarios_conectados.get(paquete.origen)
+        if self.historial is None or servicio is None: return
+
+        datos = paquete.contenido
+        con = datos.get("con", "TODOS")
+        mensajes, cursor = self.historial.consultar(paquete.origen, con, cursor=datos.get("cursor"), limite=datos.get("limite", 50))
+        # "pedido" repite el cursor de la consulta para que el cliente empareje la respuesta
+        respuesta = {"con": con, "mensajes": mensajes, "cursor": cursor, "pedido": datos.get("cursor")}
+        self._enviar_paquete_seguro(servicio, "HISTORIAL", respuesta, origen="SERVIDOR", destino=paquete.origen)
+
+    def _procesar_busqueda(self, paquete):
+        servicio = self.usuarios_conectados.get(paquete.origen)
+        if self.indice_busqueda is None or servicio is None: return
+
+        datos = paquete.contenido
+        pagina = datos.get("pagina", 0)
+        resultados, hay_mas = self.indice_busqueda.buscar(paquete.origen, datos.get("texto", ""), pagina=pagina, limite=datos.get("limite", 20))
+        respuesta = {"texto": datos.get("texto", ""), "pagina": pagina, "resultados": resultados, "hay_mas": hay_mas}
+        self._enviar_paquete_seguro(servicio, "BUSCAR", respuesta, origen="SERVIDOR", destino=paquete.origen)
+
+    def _guardar_offline(self, paquete):
+        if self.almacen_offline is None or not self.usuarios.existe(paquete.destino):
+            return
+        id_offline = self.almacen_offline.encolar(paquete.destino, {"origen": paquete.origen, "contenido": paquete.contenido})
+        logging.info("Mensaje para %s guardado offline (id %s)", paquete.destino, id_offline)
+
+    def _entregar_pendientes(self, user, servicio):
+        if self.almacen_offline is None: return
+        pendientes = self.almacen_offline.pendientes(user)
+        if not pendientes: return
 
-    def _broadcast_lista_usuarios(self):
-        subs = self.event_bus.servicios_por_evento.get("LISTA_USUARIOS", [])
+        logging.info("Entregando %d mensajes offline a %s", len(pendientes), user)
+        for id_offline, mensaje in pendientes:
+            contenido = dict(mensaje["contenido"]) if isinstance(mensaje["contenido"], dict) else {"mensaje": mensaje["contenido"]}
+            contenido["id_offline"] = id_offline
+            if not self._enviar_paquete_seguro(servicio, "MENSAJE", contenido, origen=mensaje["origen"], destino=user):
+                # El resto se reintenta en el siguiente login
+                break
+
+    def _procesar_confirmacion_offline(self, paquete):
+        if self.almacen_offline is None: return
+        hasta = paquete.contenido.get("hasta", 0)
+        liberados = self.almacen_offline.confirmar(paquete.origen, hasta)
+        logging.info("%s confirmó mensajes offline hasta %s (%d liberados)", paquete.origen, hasta, liberados)
+
+    def _broadcast_lista_usuarios(self, anunciar=True):
+        subs = self._suscriptores("LISTA_USUARIOS")
         nombres = list(self.usuarios_conectados.keys())
+        if self.cluster is not None:
+            if anunciar: self.anunciar_presencia()
+            nombres += [u for u in self.cluster.usuarios_remotos() if u not in self.usuarios_conectados]
         for s in subs:
             self._enviar_paquete_seguro(s, "LISTA_USUARIOS", nombres, origen="SERVIDOR", destino="TODOS")
 
-    def _enviar_respuesta_directa(self, host, puerto, public_key_pem, tipo, contenido):
+    def _suscriptores(self, evento):
+        # El EventBus de un worker solo conoce los logins que atendió él mismo
+        if self.sesiones_compartidas:
+            return list(self.usuarios_conectados.values())
+        return self.event_bus.servicios_por_evento.get(evento, [])
+
+    def _enviar_respuesta_directa(self, host, puerto, public_key_pem, tipo, contenido, suite=SUITE_FERNET, sesion=None):
         try:
             llave = self.seguridad.importar_publica(public_key_pem.encode('utf-8'))
-            self.cliente_tcp.llave_destino = llave
             paquete = PaqueteDTO(tipo, contenido, origen="SERVIDOR", destino="CLIENTE", host=host, puerto_destino=puerto)
-            self.ensamblador.obtener_emisor().enviar_cambio(paquete)
+            # Cada envío lleva los parámetros de su destino: los hilos no se esperan entre sí
+            self.ensamblador.obtener_emisor().enviar_a(paquete, DestinoEnvio(llave, suite, sesion))
         except Exception as e:
-            logging.error(f"Error respondiendo directo: {e}")
+            logging.error("Error respondiendo directo: %s", e)
 
-    def _enviar_paquete_seguro(self, servicio, tipo, contenido, origen, destino):
+    def _enviar_paquete_seguro(self, servicio, tipo, contenido, origen, destino, original=None):
+        """
+        Args:
+            original: Paquete que se reenvía; si termina sin ACK se guarda offline
+        """
+        id_mensaje = None
         try:
             llave = self.seguridad.importar_publica(servicio.llave_publica)
-            self.cliente_tcp.llave_destino = llave
             paquete = PaqueteDTO(tipo, contenido, origen=origen, destino=destino, host=servicio.host, puerto_destino=servicio.puerto)
-            self.ensamblador.obtener_emisor().enviar_cambio(paquete)
+            emisor = self.ensamblador.obtener_emisor()
+            if original is not None and self._entregas_pendientes is not None:
+                # Se anota antes de enviar: el ACK puede resolverse antes de que enviar_a retorne
+                id_mensaje = emisor.numerar(paquete).id_mensaje
+                with self._lock_entregas:
+                    self._entregas_pendientes[id_mensaje] = original
+            enviado = emisor.enviar_a(paquete, DestinoEnvio(llave, servicio.suite, servicio.sesion_x25519, servicio.compresion))
         except Exception as e:
-            logging.error(f"Error enviando seguro: {e}")
+            logging.error("Error enviando seguro: %s", e)
+            enviado = False
+        if not enviado and id_mensaje is not None:
+            # Quien llama ya lo guarda offline
+            with self._lock_entregas:
+                self._entregas_pendientes.pop(id_mensaje, None)
+        return enviado
 
 class ServidorBusApp:
-    def iniciar(self):
+    def iniciar(self, puerto=5555, id_nodo=None, archivo_cluster=None, dir_datos=None, ruta_pem=None, worker=None, cifrado="en_linea",
+                metricas_puerto=None, metricas_archivo=None, trazas_archivo=None, trazas_muestreo=1.0):
         print("=== SERVIDOR INICIADO ===")
         self.ensamblador = EnsambladorRed.obtener_instancia()
         self.event_bus = EventBus()
         self.seguridad = GestorSeguridad()
-        
-        with open(os.path.join(current_dir, "server_public.pem"), "wb") as f:
-            f.write(self.seguridad.obtener_publica_bytes())
+
+        config_cluster = None
+        datos_propios = dir_datos is not None or id_nodo is not None
+        if id_nodo is not None:
+            # Modo cluster: llave compartida, puerto del nodo y datos propios
+            config_cluster = cargar_configuracion_cluster(archivo_cluster or "config_cluster.properties")
+            cargar_llave_cluster(self.seguridad, config_cluster.llave_privada)
+            puerto = config_cluster.nodos[id_nodo][1]
+            dir_datos = dir_datos or os.path.join(current_dir, "datos", id_nodo)
+        dir_datos = dir_datos or os.path.join(current_dir, "datos")
+
+        if worker is not None:
+            # Modo workers: el proceso padre ya creó la llave y publicó el .pem
+            cargar_llave_cluster(self.seguridad, os.path.join(dir_datos, ARCHIVO_LLAVE_WORKERS))
+        else:
+            with open(ruta_pem or os.path.join(current_dir, "server_public.pem"), "wb") as f:
+                f.write(self.seguridad.obtener_publicas_pem())
 
         self.ensamblador._gestor_seguridad = self.seguridad
-        config = ConfigRed(host_escucha="0.0.0.0", puerto_escucha=5555, host_destino="localhost", puerto_destino=5555, llave_publica_destino=self.seguridad.public_key)
+        config = ConfigRed(host_escucha="0.0.0.0", puerto_escucha=puerto, host_destino="localhost", puerto_destino=puerto, llave_publica_destino=self.seguridad.public_key,
+                           reuse_port=worker is not None, backlog=128 if worker is not None else 5, cifrado_modo=cifrado,
+                           reordenar=worker is None)
+
+        config_datos = cargar_configuracion_datos()
+        if datos_propios:
+            # Cuentas junto al resto de los datos (en cluster, cada nodo guarda
+            # solo las de los usuarios que le pertenecen)
+            config_datos.ruta_json = os.path.join(dir_datos, os.path.basename(config_datos.ruta_json))
+            config_datos.ruta_sqlite = os.path.join(dir_datos, os.path.basename(config_datos.ruta_sqlite))
+            config_datos.ruta_shards = os.path.join(dir_datos, os.path.basename(config_datos.ruta_shards))
 
-        self.receptor = ReceptorLogicaServidor(self.event_bus, self.ensamblador)
+        self.sesiones = None
+        if worker is None:
+            self.almacen_offline = AlmacenOffline(os.path.join(dir_datos, "offline"))
+            self.indice_busqueda = IndiceBusqueda(os.path.join(dir_datos, "busqueda.db"))
+        else:
+            # Todo lo que ven varios procesos tiene que vivir en SQLite: las
+            # cuentas, las sesiones, los mensajes offline y el índice (sin
+            # transacciones largas)
+            if config_datos.backend != "sqlite":
+                logging.warning("Backend de usuarios '%s' no es compartible entre workers, se usa sqlite", config_datos.backend)
+                config_datos.backend = "sqlite"
+            self.sesiones = SesionesCompartidas(os.path.join(dir_datos, ARCHIVO_SESIONES))
+            self.almacen_offline = AlmacenOfflineCompartido(os.path.join(dir_datos, ARCHIVO_OFFLINE))
+            self.indice_busqueda = IndiceBusqueda(os.path.join(dir_datos, "busqueda.db"), tamanio_lote=1)
+        self.historial = HistorialMensajes(os.path.join(dir_datos, "historial.db"))
+        self.usuarios = repositorioUsuarios(crear_repositorio(config_datos))
+
+        self.cluster = CoordinadorCluster(id_nodo, config_cluster, self.seguridad, self.event_bus) if config_cluster else None
+        self.receptor = ReceptorLogicaServidor(self.event_bus, self.ensamblador, self.almacen_offline, self.historial, self.indice_busqueda, self.usuarios, self.cluster, self.sesiones)
         self.ensamblador.ensamblar(self.receptor, config)
+        self.receptor.vigilar_entregas()
         self.event_bus.set_emisor(self.ensamblador.obtener_emisor())
         self.event_bus.set_llave_publica_propia(self.seguridad.obtener_publica_bytes())
 
+        if self.cluster is not None:
+            logging.info("Nodo %s del cluster escuchando en el puerto %s", id_nodo, puerto)
+            self.receptor.anunciar_presencia(responder=True)
+        if worker is not None:
+            logging.info("Worker %s (pid %s) escuchando en el puerto %s", worker, os.getpid(), puerto)
+
+        metricas = RegistroMetricas.obtener_instancia()
+        if metricas_puerto is not None:
+            # Con workers cada uno publica sus métricas en metricas_puerto + índice
+            metricas.servir_http(metricas_puerto + (worker or 0))
+        if metricas_archivo:
+            metricas_archivo = metricas_archivo if worker is None else f"{metricas_archivo}.w{worker}"
+            metricas.volcar_con_senal(metricas_archivo)
+        trazas = RegistroTrazas.obtener_instancia()
+        if trazas_archivo:
+            trazas_archivo = trazas_archivo if worker is None else f"{trazas_archivo}.w{worker}"
+            trazas.activar(trazas_muestreo)
+
         try:
             while True: time.sleep(1)
         except KeyboardInterrupt:
+            logging.info("Métricas de descifrado: %s", self.ensamblador.obtener_metricas_cifrado())
+            if metricas_archivo:
+                metricas.volcar(metricas_archivo)
+            if trazas_archivo:
+                trazas.volcar(trazas_archivo, proceso="servidor" if worker is None else f"servidor w{worker}")
             self.ensamblador.detener()
+            self.indice_busqueda.cerrar()
+            self.usuarios.cerrar()
+            if self.sesiones is not None: self.sesiones.cerrar()
+            if isinstance(self.almacen_offline, AlmacenOfflineCompartido): self.almacen_offline.cerrar()
+
+ARCHIVO_LLAVE_WORKERS = "servidor_private.pem"
+ARCHIVO_SESIONES = "sesiones.db"
+ARCHIVO_OFFLINE = "offline.db"
+
+def _ejecutar_worker(indice, puerto, dir_datos, bitacora, cifrado, metricas_puerto=None, metricas_archivo=None,
+                     trazas_archivo=None, trazas_muestreo=1.0, opciones_bitacora=None):
+    configurar_bitacora(bitacora, f"SERVER w{indice}", **(opciones_bitacora or {}))
+    try:
+        ServidorBusApp().iniciar(puerto=puerto, dir_datos=dir_datos, worker=indice, cifrado=cifrado,
+                                 metricas_puerto=metricas_puerto, metricas_archivo=metricas_archivo,
+                                 trazas_archivo=trazas_archivo, trazas_muestreo=trazas_muestreo)
+    finally:
+        # Un proceso creado con fork termina sin pasar por atexit
+        Bitacora.detener()
+
+def iniciar_workers(total, puerto, dir_datos=None, ruta_pem=None, bitacora=None, cifrado="en_linea",
+                    metricas_puerto=None, metricas_archivo=None, trazas_archivo=None, trazas_muestreo=1.0,
+                    opciones_bitacora=None):
+    """
+    Modo pre-fork: `total` procesos escuchan el mismo puerto con SO_REUSEPORT
+
+    El kernel reparte las conexiones entrantes entre los workers, así que el
+    descifrado y el procesamiento de paquetes usan varios núcleos. Todos los
+    workers descifran con la misma llave y comparten sesiones y cuentas en
+    SQLite; cada paquete puede caer en cualquier worker.
+    """
+    if not hasattr(socket, "SO_REUSEPORT"):
+        raise OSError("El modo --workers necesita SO_REUSEPORT (Linux/BSD)")
+    if cifrado == "procesos":
+        raise ValueError("Con workers el descifrado va en_linea o en hilos: los workers ya reparten los núcleos")
+
+    dir_datos = dir_datos or os.path.join(current_dir, "datos")
+    os.makedirs(dir_datos, exist_ok=True)
+    seguridad = GestorSeguridad()
+    cargar_llave_cluster(seguridad, os.path.join(dir_datos, ARCHIVO_LLAVE_WORKERS))
+    with open(ruta_pem or os.path.join(current_dir, "server_public.pem"), "wb") as f:
+        f.write(seguridad.obtener_publicas_pem())
+
+    # Las sesiones de una ejecución anterior ya no son válidas
+    sesiones = SesionesCompartidas(os.path.join(dir_datos, ARCHIVO_SESIONES))
+    sesiones.limpiar()
+    sesiones.cerrar()
+
+    procesos = [multiprocessing.Process(target=_ejecutar_worker, args=(i, puerto, dir_datos, bitacora, cifrado, metricas_puerto, metricas_archivo,
+                                                                       trazas_archivo, trazas_muestreo, opciones_bitacora),
+                                        name=f"worker-{i}")
+                for i in range(total)]
+    for proceso in procesos: proceso.start()
+    logging.info("%s workers iniciados en el puerto %s", total, puerto)
+
+    def _al_terminar(signum, frame):
+        # SIGTERM solo llega al padre: se pide a cada worker que cierre ordenadamente
+        for proceso in procesos:
+            if proceso.is_alive(): os.kill(proceso.pid, signal.SIGINT)
+    signal.signal(signal.SIGTERM, _al_terminar)
+    if metricas_archivo and hasattr(signal, "SIGUSR1"):
+        def _al_volcar(signum, frame):
+            # Cada worker escribe sus métricas en <archivo>.w<índice>
+            for proceso in procesos:
+                if proceso.is_alive(): os.kill(proceso.pid, signal.SIGUSR1)
+        signal.signal(signal.SIGUSR1, _al_volcar)
+
+    try:
+        for proceso in procesos: proceso.join()
+    except KeyboardInterrupt:
+        # Ctrl+C llega a todo el grupo de procesos: cada worker cierra lo suyo
+        for proceso in procesos: proceso.join(timeout=5)
 
 if __name__ == "__main__":
-    app = ServidorBusApp()
-    app.iniciar()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Servidor de chatTCP")
+    parser.add_argument("--puerto", type=int, default=5555, help="Puerto de escucha (sin cluster)")
+    parser.add_argument("--nodo", help="Id del nodo para el modo cluster")
+    parser.add_argument("--cluster", help="Archivo de configuración del cluster (por defecto config_cluster.properties)")
+    parser.add_argument("--workers", type=int, default=0, help="Procesos que comparten el puerto con SO_REUSEPORT")
+    parser.add_argument("--cifrado", choices=("en_linea", "hilos", "procesos"),
+                        help="Dónde se descifran los paquetes recibidos (por defecto procesos si hay varios núcleos; "
+                             "en_linea con --workers)")
+    parser.add_argument("--datos", help="Carpeta de datos del servidor")
+    parser.add_argument("--pem", help="Ruta donde publicar la llave pública del servidor")
+    parser.add_argument("--bitacora", default=os.path.join(current_dir, 'servidor_bitacora.log'), help="Archivo de bitácora")
+    parser.add_argument("--metricas-puerto", type=int, help="Publica las métricas (Prometheus) en http://127.0.0.1:<puerto>/metrics")
+    parser.add_argument("--metricas-archivo", help="Archivo donde se vuelcan las métricas al recibir SIGUSR1")
+    parser.add_argument("--trazas", help="Activa las trazas por paquete y las escribe al cerrar en este archivo (JSON de Chrome)")
+    parser.add_argument("--trazas-muestreo", type=float, default=1.0, help="Fracción de los paquetes nuevos que se trazan")
+    parser.add_argument("--log-niveles", help="Niveles por módulo, p. ej. chatTCP.src.Red=WARNING,chatTCP.src.Bus=DEBUG")
+    parser.add_argument("--log-muestreo", help="Escribe uno de cada N mensajes INFO/DEBUG, p. ej. chatTCP.src.Red=100")
+    parser.add_argument("--log-formato", choices=Bitacora.FORMATOS, default="texto", help="Formato de la bitácora")
+    args = parser.parse_args()
+    if args.workers and args.nodo:
+        parser.error("--workers y --nodo no se pueden combinar")
+    if args.workers and args.cifrado == "procesos":
+        # Cada worker levantaría su propio pool: workers × núcleos procesos de descifrado
+        parser.error("--workers y --cifrado procesos no se pueden combinar")
+    if args.cifrado is None:
+        args.cifrado = "procesos" if not args.workers and (os.cpu_count() or 1) > 1 else "en_linea"
+
+    try:
+        opciones_bitacora = {"niveles": Bitacora.leer_niveles(args.log_niveles),
+                             "muestreo": Bitacora.leer_muestreo(args.log_muestreo), "formato": args.log_formato}
+    except ValueError as e:
+        parser.error(str(e))
+    configurar_bitacora(args.bitacora, f"SERVER {args.nodo}" if args.nodo else "SERVER", **opciones_bitacora)
+    if args.workers:
+        iniciar_workers(args.workers, args.puerto, args.datos, args.pem, args.bitacora, args.cifrado,
+                        args.metricas_puerto, args.metricas_archivo, args.trazas, args.trazas_muestreo,
+                        opciones_bitacora)
+    else:
+        app = ServidorBusApp()
+        app.iniciar(puerto=args.puerto, id_nodo=args.nodo, archivo_cluster=args.cluster, dir_datos=args.datos, ruta_pem=args.pem, cifrado=args.cifrado,
+                    metricas_puerto=args.metricas_puerto, metricas_archivo=args.metricas_archivo,
+                    trazas_archivo=args.trazas, trazas_muestreo=args.trazas_muestreo)
@@ -1,5 +1,11 @@
+import copy
+
 from chatTCP.src.Bus.ServicioDTO import ServicioDTO
 from chatTCP.src.PaqueteDTO.PaqueteDTO import PaqueteDTO
+from chatTCP.src.Red.Metricas import contador, histograma
+
+EVENTOS = contador("chattcp_bus_eventos_total", "Eventos repartidos por el EventBus", ("tipo",))
+DIFUSION = histograma("chattcp_bus_difusion_servicios", "Servicios notificados por evento", resolucion=1)
 
 class EventBus:
     def __init__(self):
@@ -77,15 +83,24 @@ class EventBus:
     # ----------------------------------------
     def notificar_servicios(self, paquete: PaqueteDTO):
         lista = self.servicios_por_evento.get(paquete.tipo)
+        EVENTOS.inc(tipo=paquete.tipo)
         if not lista:
+            DIFUSION.observar(0)
             return
 
+        notificados = 0
         for servicio in lista:
             # Evitar mandar a sí mismo
             if servicio.host == paquete.host and servicio.puerto == paquete.puerto_origen:
                 continue
 
-            paquete.host = servicio.host
-            paquete.puerto_destino = servicio.puerto
+            # Una copia por servicio: el emisor numera, traza y registra cada
+            # envío con su propio destino
+            copia = copy.copy(paquete)
+            copia.host = servicio.host
+            copia.puerto_destino = servicio.puerto
+            copia.seq = copia.sesion = copia.id_mensaje = None
 
-            self.emisor.enviar_cambio(paquete)
\ No newline at end of file
+            self.emisor.enviar_cambio(copia)
+            notificados += 1
+        DIFUSION.observar(notificados)
\ No newline at end of file
@@ -32,7 +32,7 @@ class PublicadorEventos(IReceptor):
         self._puerto = puerto
         self._logger = logging.getLogger(__name__)
 
-        self._logger.info(f"PublicadorEventos inicializado en {host}:{puerto}")
+        self._logger.info("PublicadorEventos inicializado en %s:%s", host, puerto)
 
     def recibir_cambio(self, paquete: 'PaqueteDTO') -> None:
         """
@@ -45,12 +45,12 @@ class PublicadorEventos(IReceptor):
             self._logger.warning("Paquete None recibido, ignorando")
             return
 
-        self._logger.info(f"Publicando evento en EventBus: {paquete}")
+        self._logger.info("Publicando evento en EventBus: %s", paquete)
 
         try:
             self._event_bus.publicar_evento(paquete)
         except Exception as e:
-            self._logger.error(f"Error al publicar evento: {e}")
+            self._logger.error("Error al publicar evento: %s", e)
             raise
 
     def get_host(self) -> str:
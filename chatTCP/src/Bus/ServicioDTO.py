@@ -4,15 +4,21 @@ DTO para representar un servicio de red (endpoint)
 from dataclasses import dataclass
 from typing import Optional
 
+from ..Red.Cifrado.seguridad import SUITE_FERNET
+
 
 @dataclass
 class ServicioDTO:
     """
-    Representa un endpoint de red con host, puerto y llave pública RSA
+    Representa un endpoint de red con host, puerto, llave pública RSA y el
+    cifrado negociado con él (suite simétrica, sesión X25519 y compresión)
     """
     host: str
     puerto: int
     llave_publica: Optional[bytes] = None  # Llave pública RSA en formato PEM
+    suite: str = SUITE_FERNET  # Suite simétrica para los paquetes que se le envían
+    sesion_x25519: Optional[bytes] = None  # Id de su sesión X25519 (None = híbrido con RSA)
+    compresion: Optional[str] = None  # Compresión antes de cifrar ("zlib", "lzma" o None)
 
     def __str__(self) -> str:
         """
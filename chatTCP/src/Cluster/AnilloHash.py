@@ -0,0 +1,96 @@
+"""
+Anillo de hash consistente para repartir usuarios entre nodos
+"""
+import bisect
+import hashlib
+from typing import Dict, Iterable, List, Tuple
+
+
+class AnilloHash:
+    """
+    Hash consistente con nodos virtuales
+
+    Cada nodo ocupa `replicas` puntos del anillo; un usuario pertenece al
+    primer punto a partir de su propio hash. Al agregar o quitar un nodo solo
+    cambian de dueño los usuarios de los tramos afectados (~1/N del total).
+    """
+
+    def __init__(self, nodos: Iterable[str] = (), replicas: int = 64):
+        """
+        Args:
+            nodos: Identificadores de los nodos iniciales
+            replicas: Puntos virtuales por nodo (más puntos = reparto más parejo)
+        """
+        self._replicas = replicas
+        self._puntos: List[int] = []
+        self._duenos: Dict[int, str] = {}
+        for nodo in nodos:
+            self.agregar_nodo(nodo)
+
+    @staticmethod
+    def _hash(clave: str) -> int:
+        return int.from_bytes(hashlib.md5(clave.encode('utf-8')).digest()[:8], 'big')
+
+    def agregar_nodo(self, nodo: str) -> None:
+        """
+        Agrega un nodo al anillo
+
+        Args:
+            nodo: Identificador del nodo
+        """
+        for i in range(self._replicas):
+            punto = self._hash(f"{nodo}#{i}")
+            if punto in self._duenos:
+                continue
+            bisect.insort(self._puntos, punto)
+            self._duenos[punto] = nodo
+
+    def eliminar_nodo(self, nodo: str) -> None:
+        """
+        Quita un nodo del anillo
+
+        Args:
+            nodo: Identificador del nodo
+        """
+        self._puntos = [p for p in self._puntos if self._duenos[p] != nodo]
+        self._duenos = {p: n for p, n in self._duenos.items() if n != nodo}
+
+    def nodo_para(self, clave: str) -> str:
+        """
+        Obtiene el nodo dueño de una clave
+
+        Args:
+            clave: Nombre de usuario
+
+        Returns:
+            Identificador del nodo
+
+        Raises:
+            LookupError: Si el anillo está vacío
+        """
+        if not self._puntos:
+            raise LookupError("El anillo no tiene nodos")
+        indice = bisect.bisect(self._puntos, self._hash(clave)) % len(self._puntos)
+        return self._duenos[self._puntos[indice]]
+
+    def nodos(self) -> List[str]:
+        """
+        Returns:
+            Identificadores de los nodos del anillo (ordenados)
+        """
+        return sorted(set(self._duenos.values()))
+
+    def reparto(self, claves: Iterable[str]) -> Dict[str, int]:
+        """
+        Cuenta cuántas claves le tocan a cada nodo (diagnóstico del balanceo)
+
+        Args:
+            claves: Claves a repartir
+
+        Returns:
+            Diccionario nodo → número de claves
+        """
+        conteo: Dict[str, int] = {nodo: 0 for nodo in self.nodos()}
+        for clave in claves:
+            conteo[self.nodo_para(clave)] += 1
+        return conteo
@@ -0,0 +1,70 @@
+"""
+Configuración del modo cluster (config_cluster.properties)
+"""
+import os
+from pathlib import Path
+from typing import Dict, Tuple
+
+# Raíz del proyecto chatTCP/
+RAIZ_PROYECTO = Path(__file__).resolve().parent.parent.parent
+
+
+class ConfigCluster:
+    """Configuración de los nodos del cluster"""
+    def __init__(
+        self,
+        nodos: Dict[str, Tuple[str, int]],
+        llave_privada: str = "cluster_private.pem",
+        replicas: int = 64
+    ):
+        self.nodos = nodos  # id → (host, puerto)
+        self.llave_privada = llave_privada
+        self.replicas = replicas
+
+
+def cargar_configuracion_cluster(archivo_config: str = "config_cluster.properties") -> ConfigCluster:
+    """
+    Carga la configuración desde un archivo .properties
+
+    Formato:
+        nodo.<id>=host:puerto
+        llave.privada=cluster_private.pem
+        replicas=64
+
+    Args:
+        archivo_config: Ruta al archivo de configuración (relativa a config/)
+
+    Returns:
+        ConfigCluster con la configuración cargada
+
+    Raises:
+        FileNotFoundError: Si el archivo no existe
+        ValueError: Si no hay nodos definidos
+    """
+    if not os.path.isabs(archivo_config):
+        archivo_config = RAIZ_PROYECTO / "config" / archivo_config
+
+    if not os.path.exists(archivo_config):
+        raise FileNotFoundError(f"Archivo de configuración no encontrado: {archivo_config}")
+
+    props = {}
+    with open(archivo_config, 'r', encoding='utf-8') as f:
+        for linea in f:
+            linea = linea.strip()
+            if linea and not linea.startswith('#') and '=' in linea:
+                key, value = linea.split('=', 1)
+                props[key.strip()] = value.strip()
+
+    nodos = {}
+    for key, value in props.items():
+        if key.startswith("nodo."):
+            host, puerto = value.rsplit(':', 1)
+            nodos[key[len("nodo."):]] = (host, int(puerto))
+    if not nodos:
+        raise ValueError(f"No hay nodos definidos en {archivo_config}")
+
+    llave = props.get('llave.privada', 'cluster_private.pem')
+    if not os.path.isabs(llave):
+        llave = str(RAIZ_PROYECTO / llave)
+
+    return ConfigCluster(nodos=nodos, llave_privada=llave, replicas=int(props.get('replicas', '64')))
@@ -0,0 +1,269 @@
+"""
+Coordinador del cluster: ubicación de usuarios, presencia y reenvío entre nodos
+"""
+import hashlib
+import hmac
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from cryptography.hazmat.primitives import serialization
+
+from ..Bus.EventBus import EventBus
+from ..Bus.ServicioDTO import ServicioDTO
+from ..PaqueteDTO.PaqueteDTO import PaqueteDTO
+from ..Red.Cifrado.seguridad import GestorSeguridad, SUITES
+from ..Red.Cifrado.Compresion import COMPRESIONES
+from .AnilloHash import AnilloHash
+from .ConfigCluster import ConfigCluster
+
+EVENTOS_CLUSTER = ("PRESENCIA", "REENVIO")
+# Segundos que vale un mensaje firmado (incluye la diferencia de relojes entre nodos)
+VIGENCIA_FIRMA = 60.0
+
+
+def cargar_llave_cluster(seguridad: GestorSeguridad, ruta: str) -> None:
+    """
+    Hace que el gestor use la llave compartida del cluster
+
+    Todos los nodos descifran con la misma llave privada, así que un cliente
+    puede conectarse a cualquiera con el mismo server_public.pem. Si el
+    archivo no existe, el primer nodo guarda la suya (O_EXCL evita que dos
+    nodos que arrancan a la vez escriban llaves distintas).
+
+    Args:
+        seguridad: Gestor de seguridad del nodo
+        ruta: Archivo PEM de la llave privada del cluster
+    """
+    if not os.path.exists(ruta):
+        pem = seguridad.private_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption()
+        )
+        try:
+            descriptor = os.open(ruta, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with os.fdopen(descriptor, 'wb') as f:
+                f.write(pem)
+            return
+        except FileExistsError:
+            pass
+
+    if not seguridad.cargar_privada_desde_archivo(ruta):
+        raise ValueError(f"No se pudo cargar la llave del cluster: {ruta}")
+
+
+class CoordinadorCluster:
+    """
+    Estado de cluster de un nodo
+
+    - Ubicación: cada usuario pertenece al nodo que indica el anillo de hash
+      consistente. Ese nodo guarda su cuenta, su sesión y su cola offline.
+    - Presencia: cada nodo anuncia (PRESENCIA) sus usuarios conectados a los
+      demás, que los suman a la lista de usuarios que muestran.
+    - Reenvío: un paquete que llega a un nodo que no es el dueño viaja
+      envuelto en un REENVIO hasta el nodo correcto.
+
+    Los nodos se registran en el EventBus como suscriptores de PRESENCIA y
+    REENVIO. Los mensajes entre nodos van firmados con HMAC usando un secreto
+    derivado de la llave privada del cluster, que los clientes no conocen.
+    La firma cubre también `ts` y un contador `n` del nodo: se rechazan los
+    mensajes con más de VIGENCIA_FIRMA segundos y los repetidos dentro de
+    ese plazo.
+    """
+
+    def __init__(self, id_nodo: str, config: ConfigCluster, seguridad: GestorSeguridad, event_bus: EventBus):
+        """
+        Args:
+            id_nodo: Identificador de este nodo (debe estar en la configuración)
+            config: Configuración del cluster
+            seguridad: Gestor con la llave del cluster ya cargada
+            event_bus: Bus donde se registran los demás nodos
+
+        Raises:
+            ValueError: Si el nodo no está en la configuración
+        """
+        if id_nodo not in config.nodos:
+            raise ValueError(f"El nodo {id_nodo} no está en la configuración del cluster")
+
+        self.id_nodo = id_nodo
+        self.event_bus = event_bus
+        self.anillo = AnilloHash(config.nodos, replicas=config.replicas)
+        self._lock = threading.Lock()
+        self._presencia: Dict[str, Set[str]] = {}
+        self._logger = logging.getLogger(__name__)
+        # Empieza en el reloj en ns: un nodo reiniciado no repite contadores
+        self._contador = itertools.count(time.time_ns())
+        # (nodo, n) aceptados dentro de la vigencia, y su orden de llegada para purgarlos
+        self._lock_firmas = threading.Lock()
+        self._vistos: Set[Tuple[str, int]] = set()
+        self._orden_vistos: deque = deque()
+
+        llave_privada = seguridad.private_key.private_bytes(
+            encoding=serialization.Encoding.DER,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption()
+        )
+        self._secreto = hashlib.sha256(b"chatTCP-cluster" + llave_privada).digest()
+
+        llave_publica = seguridad.obtener_publica_bytes()
+        self.nodos: Dict[str, ServicioDTO] = {
+            # Todos los nodos corren la misma versión: se usan la suite AEAD y la compresión preferidas
+            nodo: ServicioDTO(host=host, puerto=puerto, llave_publica=llave_publica, suite=SUITES[0],
+                              compresion=COMPRESIONES[0])
+            for nodo, (host, puerto) in config.nodos.items()
+        }
+        for nodo, servicio in self.nodos.items():
+            if nodo == id_nodo:
+                continue
+            for evento in EVENTOS_CLUSTER:
+                self.event_bus.registrar_servicio(evento, servicio)
+
+    # ---------------------------------------------------------------
+    # Ubicación
+    # ---------------------------------------------------------------
+
+    def dueno(self, usuario: str) -> str:
+        """
+        Returns:
+            Id del nodo dueño del usuario
+        """
+        return self.anillo.nodo_para(usuario)
+
+    def es_local(self, usuario: str) -> bool:
+        """
+        Returns:
+            True si el usuario pertenece a este nodo
+        """
+        return self.dueno(usuario) == self.id_nodo
+
+    def servicio_de(self, nodo: str) -> ServicioDTO:
+        """
+        Returns:
+            Endpoint del nodo indicado
+        """
+        return self.nodos[nodo]
+
+    def pares(self) -> List[ServicioDTO]:
+        """
+        Returns:
+            Endpoints de los demás nodos (suscriptores de REENVIO en el bus)
+        """
+        return list(self.event_bus.servicios_por_evento.get("REENVIO", []))
+
+    # ---------------------------------------------------------------
+    # Mensajes entre nodos
+    # ---------------------------------------------------------------
+
+    def envolver(self, paquete: PaqueteDTO, difusion: bool = False) -> Dict[str, Any]:
+        """
+        Arma el contenido de un REENVIO para otro nodo
+
+        Args:
+            paquete: Paquete original tal como llegó del cliente
+            difusion: True si es la copia de un mensaje general que el nodo
+                dueño del remitente reparte a los demás (no se vuelve a repartir)
+
+        Returns:
+            Contenido firmado
+        """
+        return self._firmar({"nodo": self.id_nodo, "paquete": paquete.to_json(), "difusion": difusion})
+
+    def desenvolver(self, contenido: Any) -> Optional[Tuple[PaqueteDTO, bool]]:
+        """
+        Valida y abre un REENVIO
+
+        Args:
+            contenido: Contenido del paquete REENVIO
+
+        Returns:
+            Tupla (paquete original, difusion), o None si la firma no es válida
+        """
+        if not self._verificar(contenido):
+            self._logger.warning("REENVIO con firma inválida descartado")
+            return None
+        return PaqueteDTO.from_json(contenido["paquete"]), bool(contenido.get("difusion"))
+
+    def contenido_presencia(self, usuarios: List[str], responder: bool = False) -> Dict[str, Any]:
+        """
+        Arma el anuncio de presencia de este nodo
+
+        Args:
+            usuarios: Usuarios conectados a este nodo
+            responder: Pide a los demás que contesten con su propia presencia
+
+        Returns:
+            Contenido firmado
+        """
+        return self._firmar({"nodo": self.id_nodo, "usuarios": sorted(usuarios), "responder": responder})
+
+    def actualizar_presencia(self, contenido: Any) -> Optional[Dict[str, Any]]:
+        """
+        Registra el anuncio de presencia de otro nodo
+
+        Args:
+            contenido: Contenido del paquete PRESENCIA
+
+        Returns:
+            El contenido validado, o None si la firma no es válida
+        """
+        if not self._verificar(contenido) or contenido["nodo"] == self.id_nodo:
+            return None
+        with self._lock:
+            self._presencia[contenido["nodo"]] = set(contenido["usuarios"])
+        return contenido
+
+    def usuarios_remotos(self) -> List[str]:
+        """
+        Returns:
+            Usuarios conectados en los demás nodos
+        """
+        with self._lock:
+            return [u for usuarios in self._presencia.values() for u in usuarios]
+
+    def _firmar(self, datos: Dict[str, Any]) -> Dict[str, Any]:
+        datos = dict(datos, ts=time.time(), n=next(self._contador))
+        datos["firma"] = self._calcular_firma(datos)
+        return datos
+
+    def _verificar(self, contenido: Any) -> bool:
+        if not isinstance(contenido, dict) or "firma" not in contenido:
+            return False
+        datos = {k: v for k, v in contenido.items() if k != "firma"}
+        if not hmac.compare_digest(str(contenido["firma"]), self._calcular_firma(datos)):
+            return False
+        return self._registrar_unico(datos.get("nodo"), datos.get("ts"), datos.get("n"))
+
+    def _registrar_unico(self, nodo: Any, ts: Any, n: Any) -> bool:
+        """
+        Acepta cada (nodo, n) una sola vez y solo dentro de la vigencia
+
+        Returns:
+            False si el mensaje está vencido, repetido o no trae ts/n
+        """
+        if not isinstance(ts, (int, float)) or not isinstance(n, int):
+            return False
+        ahora = time.time()
+        if abs(ahora - ts) > VIGENCIA_FIRMA:
+            self._logger.warning("Mensaje de cluster de %s vencido descartado (%.1f s)", nodo, ahora - ts)
+            return False
+        clave = (nodo, n)
+        with self._lock_firmas:
+            # Lo que sale de aquí ya está vencido: si se repite lo rechaza el ts
+            while self._orden_vistos and self._orden_vistos[0][0] < ahora - VIGENCIA_FIRMA:
+                self._vistos.discard(self._orden_vistos.popleft()[1])
+            if clave in self._vistos:
+                self._logger.warning("Mensaje de cluster de %s repetido descartado (n=%s)", nodo, n)
+                return False
+            self._vistos.add(clave)
+            self._orden_vistos.append((ts, clave))
+        return True
+
+    def _calcular_firma(self, datos: Dict[str, Any]) -> str:
+        cuerpo = json.dumps(datos, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        return hmac.new(self._secreto, cuerpo, hashlib.sha256).hexdigest()
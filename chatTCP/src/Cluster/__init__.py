@@ -0,0 +1 @@
+"""Modo cluster: varios nodos servidor que se reparten los usuarios"""
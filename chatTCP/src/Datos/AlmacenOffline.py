@@ -0,0 +1,299 @@
+"""
+Almacén de mensajes offline (store-and-forward)
+Guarda en disco los mensajes dirigidos a usuarios desconectados y los
+entrega en bloque cuando el destinatario vuelve a iniciar sesión
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+# (id, offset, tamanio) de cada mensaje pendiente dentro del archivo del usuario
+EntradaIndice = Tuple[int, int, int]
+
+
+class AlmacenOffline:
+    """
+    Colas de mensajes por destinatario, append-only y respaldadas por un índice
+
+    Cada usuario tiene su propio archivo de mensajes (una línea JSON por
+    mensaje). En memoria se mantiene un índice con el offset de cada mensaje
+    pendiente, de modo que la entrega lee todo el bloque pendiente de una sola
+    vez. Las confirmaciones (ACK) marcan mensajes como entregados y el archivo
+    se compacta cuando la parte confirmada es mayor que la pendiente.
+    """
+
+    ARCHIVO_INDICE = "indice.json"
+    MIN_BYTES_COMPACTAR = 64 * 1024
+
+    def __init__(self,
+                 directorio: str,
+                 max_mensajes_por_usuario: int = 1000,
+                 max_bytes_total: int = 50 * 1024 * 1024,
+                 sincronizar: bool = True):
+        """
+        Inicializa el almacén y reconstruye el índice desde disco
+
+        Args:
+            directorio: Carpeta donde se guardan las colas
+            max_mensajes_por_usuario: Límite de mensajes pendientes por destinatario
+            max_bytes_total: Límite de bytes pendientes entre todas las colas
+            sincronizar: Si es True hace fsync después de cada escritura
+        """
+        self._directorio = directorio
+        self._max_mensajes = max_mensajes_por_usuario
+        self._max_bytes = max_bytes_total
+        self._sincronizar = sincronizar
+        self._lock = threading.Lock()
+        self._logger = logging.getLogger(__name__)
+
+        self._pendientes: Dict[str, Deque[EntradaIndice]] = {}
+        self._confirmado: Dict[str, int] = {}
+        self._ultimo_id: Dict[str, int] = {}
+        self._bytes_pendientes = 0
+
+        os.makedirs(self._directorio, exist_ok=True)
+        self._cargar()
+
+    # ---------------------------------------------------------------
+    # API pública
+    # ---------------------------------------------------------------
+
+    def encolar(self, usuario: str, mensaje: Dict[str, Any]) -> int:
+        """
+        Agrega un mensaje a la cola del usuario
+
+        Args:
+            usuario: Destinatario del mensaje
+            mensaje: Datos serializables del mensaje
+
+        Returns:
+            Id asignado al mensaje dentro de la cola del usuario
+        """
+        with self._lock:
+            nuevo_id = self._ultimo_id.get(usuario, 0) + 1
+            linea = (json.dumps({"id": nuevo_id, "mensaje": mensaje}, ensure_ascii=False) + "\n").encode('utf-8')
+
+            with open(self._ruta_cola(usuario), "ab") as f:
+                offset = f.tell()
+                f.write(linea)
+                f.flush()
+                if self._sincronizar:
+                    os.fsync(f.fileno())
+
+            self._ultimo_id[usuario] = nuevo_id
+            self._pendientes.setdefault(usuario, deque()).append((nuevo_id, offset, len(linea)))
+            self._bytes_pendientes += len(linea)
+
+            if usuario not in self._confirmado:
+                # Registrar la cola en el índice para poder reconstruirla al reiniciar
+                self._confirmado[usuario] = 0
+                self._guardar_indice()
+
+            self._aplicar_retencion(usuario)
+            return nuevo_id
+
+    def pendientes(self, usuario: str) -> List[Tuple[int, Dict[str, Any]]]:
+        """
+        Obtiene todos los mensajes pendientes de un usuario en orden
+
+        Args:
+            usuario: Destinatario
+
+        Returns:
+            Lista de tuplas (id, mensaje)
+        """
+        with self._lock:
+            cola = self._pendientes.get(usuario)
+            if not cola:
+                return []
+
+            inicio = cola[0][1]
+            fin = cola[-1][1] + cola[-1][2]
+            with open(self._ruta_cola(usuario), "rb") as f:
+                f.seek(inicio)
+                bloque = f.read(fin - inicio)
+
+        resultado = []
+        for linea in bloque.splitlines():
+            if not linea:
+                continue
+            registro = json.loads(linea)
+            resultado.append((registro["id"], registro["mensaje"]))
+        return resultado
+
+    def confirmar(self, usuario: str, hasta_id: int) -> int:
+        """
+        Confirma (ACK acumulativo) la entrega de los mensajes hasta un id
+
+        Args:
+            usuario: Destinatario que confirma
+            hasta_id: Último id entregado
+
+        Returns:
+            Número de mensajes liberados
+        """
+        with self._lock:
+            liberados = self._liberar(usuario, hasta_id)
+            if liberados:
+                self._guardar_indice()
+                self._compactar_si_conviene(usuario)
+            return liberados
+
+    def total_pendientes(self, usuario: Optional[str] = None) -> int:
+        """
+        Cuenta los mensajes pendientes
+
+        Args:
+            usuario: Si se indica, solo cuenta los de ese usuario
+
+        Returns:
+            Número de mensajes pendientes
+        """
+        with self._lock:
+            if usuario is not None:
+                return len(self._pendientes.get(usuario, ()))
+            return sum(len(c) for c in self._pendientes.values())
+
+    def bytes_pendientes(self) -> int:
+        """
+        Obtiene el total de bytes pendientes entre todas las colas
+
+        Returns:
+            Bytes pendientes
+        """
+        return self._bytes_pendientes
+
+    # ---------------------------------------------------------------
+    # Internos
+    # ---------------------------------------------------------------
+
+    def _ruta_cola(self, usuario: str) -> str:
+        # El nombre de usuario no se usa directamente como nombre de archivo
+        nombre = hashlib.sha1(usuario.encode('utf-8')).hexdigest()[:20]
+        return os.path.join(self._directorio, f"{nombre}.log")
+
+    def _liberar(self, usuario: str, hasta_id: int) -> int:
+        cola = self._pendientes.get(usuario)
+        liberados = 0
+        while cola and cola[0][0] <= hasta_id:
+            _, _, tamanio = cola.popleft()
+            self._bytes_pendientes -= tamanio
+            liberados += 1
+
+        if hasta_id > self._confirmado.get(usuario, 0):
+            self._confirmado[usuario] = min(hasta_id, self._ultimo_id.get(usuario, 0))
+        return liberados
+
+    def _aplicar_retencion(self, usuario: str) -> None:
+        afectados = set()
+        descartados = 0
+        cola = self._pendientes[usuario]
+        if len(cola) > self._max_mensajes:
+            exceso = len(cola) - self._max_mensajes
+            descartados += self._liberar(usuario, cola[exceso - 1][0])
+            afectados.add(usuario)
+
+        # Límite global: descartar lo más antiguo de la cola más grande
+        while self._bytes_pendientes > self._max_bytes:
+            mayor = max(self._pendientes, key=lambda u: len(self._pendientes[u]))
+            cola_mayor = self._pendientes[mayor]
+            if not cola_mayor:
+                break
+            descartados += self._liberar(mayor, cola_mayor[0][0])
+            afectados.add(mayor)
+
+        if descartados:
+            self._logger.warning("Retención: %s mensajes offline descartados", descartados)
+            self._guardar_indice()
+            for afectado in afectados:
+                self._compactar_si_conviene(afectado)
+
+    def _compactar_si_conviene(self, usuario: str) -> None:
+        ruta = self._ruta_cola(usuario)
+        cola = self._pendientes.get(usuario)
+
+        if not cola:
+            # Todo confirmado: el archivo se vacía sin reescribirlo
+            with open(ruta, "wb"):
+                pass
+            self._pendientes.pop(usuario, None)
+            return
+
+        desperdicio = cola[0][1]
+        if desperdicio < self.MIN_BYTES_COMPACTAR or desperdicio < os.path.getsize(ruta) // 2:
+            return
+
+        with open(ruta, "rb") as f:
+            f.seek(desperdicio)
+            bloque = f.read()
+
+        temporal = ruta + ".tmp"
+        with open(temporal, "wb") as f:
+            f.write(bloque)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, ruta)
+
+        self._pendientes[usuario] = deque((i, off - desperdicio, tam) for i, off, tam in cola)
+        self._logger.info("Cola offline de %s compactada (%s bytes liberados)", usuario, desperdicio)
+
+    def _guardar_indice(self) -> None:
+        datos = {
+            usuario: {"archivo": os.path.basename(self._ruta_cola(usuario)), "confirmado": confirmado}
+            for usuario, confirmado in self._confirmado.items()
+        }
+        ruta = os.path.join(self._directorio, self.ARCHIVO_INDICE)
+        temporal = ruta + ".tmp"
+        with open(temporal, "w", encoding='utf-8') as f:
+            json.dump(datos, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, ruta)
+
+    def _cargar(self) -> None:
+        ruta_indice = os.path.join(self._directorio, self.ARCHIVO_INDICE)
+        usuarios = {}
+        if os.path.exists(ruta_indice):
+            try:
+                with open(ruta_indice, "r", encoding='utf-8') as f:
+                    usuarios = json.load(f)
+            except json.JSONDecodeError as e:
+                self._logger.error("Índice offline corrupto, se reconstruye sin confirmaciones: %s", e)
+
+        for usuario, estado in usuarios.items():
+            self._confirmado[usuario] = estado.get("confirmado", 0)
+            ruta = self._ruta_cola(usuario)
+            if os.path.exists(ruta):
+                self._reconstruir_cola(usuario, ruta)
+
+    def _reconstruir_cola(self, usuario: str, ruta: str) -> None:
+        confirmado = self._confirmado.get(usuario, 0)
+        cola: Deque[EntradaIndice] = deque()
+        offset = 0
+        ultimo = confirmado
+
+        with open(ruta, "rb") as f:
+            for linea in f:
+                try:
+                    id_mensaje = json.loads(linea)["id"]
+                except (json.JSONDecodeError, KeyError):
+                    # Escritura incompleta al final del archivo: se descarta
+                    self._logger.warning("Línea corrupta en cola offline de %s, truncando", usuario)
+                    break
+                ultimo = max(ultimo, id_mensaje)
+                if id_mensaje > confirmado:
+                    cola.append((id_mensaje, offset, len(linea)))
+                    self._bytes_pendientes += len(linea)
+                offset += len(linea)
+
+        if offset < os.path.getsize(ruta):
+            with open(ruta, "r+b") as f:
+                f.truncate(offset)
+
+        self._ultimo_id[usuario] = ultimo
+        if cola:
+            self._pendientes[usuario] = cola
@@ -0,0 +1,141 @@
+"""
+Almacén de mensajes offline compartido entre procesos
+Misma interfaz que AlmacenOffline, pero respaldado por un archivo SQLite
+para que todos los workers del servidor encolen y entreguen sobre las
+mismas colas
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class AlmacenOfflineCompartido:
+    """
+    Colas de mensajes por destinatario guardadas en SQLite
+
+    Un mensaje puede encolarlo un worker y entregarlo otro (el que atiende
+    el LOGIN del destinatario). Los ids son monótonos por usuario aunque la
+    cola se vacíe, igual que en AlmacenOffline, para que los ACK
+    acumulativos de los clientes sigan valiendo.
+    """
+
+    def __init__(self, ruta_db: str, max_mensajes_por_usuario: int = 1000, timeout: float = 10.0):
+        """
+        Abre (o crea) el almacén
+
+        Args:
+            ruta_db: Archivo SQLite compartido por todos los workers
+            max_mensajes_por_usuario: Límite de mensajes pendientes por destinatario
+            timeout: Segundos que se espera si otro proceso tiene la base bloqueada
+        """
+        if os.path.dirname(ruta_db):
+            os.makedirs(os.path.dirname(ruta_db), exist_ok=True)
+        self._max_mensajes = max_mensajes_por_usuario
+        self._lock = threading.Lock()
+        self._logger = logging.getLogger(__name__)
+        # isolation_level=None: las transacciones se abren a mano con BEGIN IMMEDIATE
+        self._conexion = sqlite3.connect(ruta_db, timeout=timeout, check_same_thread=False, isolation_level=None)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA synchronous=NORMAL")
+        self._conexion.execute("""
+            CREATE TABLE IF NOT EXISTS offline (
+                usuario TEXT NOT NULL,
+                id INTEGER NOT NULL,
+                mensaje TEXT NOT NULL,
+                PRIMARY KEY (usuario, id)
+            ) WITHOUT ROWID
+        """)
+        self._conexion.execute("""
+            CREATE TABLE IF NOT EXISTS offline_ultimo (
+                usuario TEXT PRIMARY KEY,
+                ultimo_id INTEGER NOT NULL
+            ) WITHOUT ROWID
+        """)
+
+    def encolar(self, usuario: str, mensaje: Dict[str, Any]) -> int:
+        """
+        Agrega un mensaje a la cola del usuario
+
+        Args:
+            usuario: Destinatario del mensaje
+            mensaje: Datos serializables del mensaje
+
+        Returns:
+            Id asignado al mensaje dentro de la cola del usuario
+        """
+        texto = json.dumps(mensaje, ensure_ascii=False)
+        with self._lock:
+            # BEGIN IMMEDIATE: dos workers no pueden tomar el mismo id
+            self._conexion.execute("BEGIN IMMEDIATE")
+            try:
+                fila = self._conexion.execute("SELECT ultimo_id FROM offline_ultimo WHERE usuario = ?", (usuario,)).fetchone()
+                nuevo_id = (fila[0] if fila else 0) + 1
+                self._conexion.execute("INSERT OR REPLACE INTO offline_ultimo (usuario, ultimo_id) VALUES (?, ?)", (usuario, nuevo_id))
+                self._conexion.execute("INSERT INTO offline (usuario, id, mensaje) VALUES (?, ?, ?)", (usuario, nuevo_id, texto))
+                descartados = self._conexion.execute(
+                    "DELETE FROM offline WHERE usuario = ? AND id <= ?", (usuario, nuevo_id - self._max_mensajes)
+                ).rowcount
+                self._conexion.execute("COMMIT")
+            except BaseException:
+                self._conexion.execute("ROLLBACK")
+                raise
+        if descartados:
+            self._logger.warning("Retención: %s mensajes offline de %s descartados", descartados, usuario)
+        return nuevo_id
+
+    def pendientes(self, usuario: str) -> List[Tuple[int, Dict[str, Any]]]:
+        """
+        Obtiene todos los mensajes pendientes de un usuario en orden
+
+        Args:
+            usuario: Destinatario
+
+        Returns:
+            Lista de tuplas (id, mensaje)
+        """
+        with self._lock:
+            filas = self._conexion.execute(
+                "SELECT id, mensaje FROM offline WHERE usuario = ? ORDER BY id", (usuario,)
+            ).fetchall()
+        return [(id_mensaje, json.loads(mensaje)) for id_mensaje, mensaje in filas]
+
+    def confirmar(self, usuario: str, hasta_id: int) -> int:
+        """
+        Confirma (ACK acumulativo) la entrega de los mensajes hasta un id
+
+        Args:
+            usuario: Destinatario que confirma
+            hasta_id: Último id entregado
+
+        Returns:
+            Número de mensajes liberados
+        """
+        with self._lock:
+            return self._conexion.execute(
+                "DELETE FROM offline WHERE usuario = ? AND id <= ?", (usuario, hasta_id)
+            ).rowcount
+
+    def total_pendientes(self, usuario: Optional[str] = None) -> int:
+        """
+        Cuenta los mensajes pendientes
+
+        Args:
+            usuario: Si se indica, solo cuenta los de ese usuario
+
+        Returns:
+            Número de mensajes pendientes
+        """
+        with self._lock:
+            if usuario is not None:
+                return self._conexion.execute("SELECT COUNT(*) FROM offline WHERE usuario = ?", (usuario,)).fetchone()[0]
+            return self._conexion.execute("SELECT COUNT(*) FROM offline").fetchone()[0]
+
+    def cerrar(self) -> None:
+        """
+        Cierra la conexión con la base compartida
+        """
+        with self._lock:
+            self._conexion.close()
@@ -0,0 +1,231 @@
+"""
+Escritor con write-ahead log (WAL) y group commit
+Las escrituras se agregan a un log, se sincronizan a disco por lotes y se
+compactan periódicamente en un snapshot atómico
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+class _Solicitud:
+    """Registro pendiente de escribir junto con su señal de confirmación"""
+    __slots__ = ("registro", "evento", "error")
+
+    def __init__(self, registro: Dict[str, Any]):
+        self.registro = registro
+        self.evento = threading.Event()
+        self.error: Optional[Exception] = None
+
+
+class EscritorWAL:
+    """
+    Group commit sobre un archivo WAL de líneas JSON
+
+    Los hilos que llaman a escribir() quedan bloqueados hasta que su registro
+    está en disco. Un único hilo escritor junta todas las solicitudes que
+    llegan mientras se hace el fsync anterior (hasta `tamanio_lote`) y las
+    confirma con un solo fsync, de modo que el costo de sincronizar se reparte
+    entre todo el lote.
+
+    Cada `umbral_compactacion` registros el estado completo se guarda como
+    snapshot (archivo temporal + fsync + os.replace) y el WAL se vacía.
+    """
+
+    def __init__(self,
+                 ruta_wal: str,
+                 ruta_snapshot: str,
+                 obtener_estado: Optional[Callable[[], Dict[str, Any]]] = None,
+                 tamanio_lote: int = 256,
+                 espera_lote: float = 0.001,
+                 umbral_compactacion: int = 1000):
+        """
+        Inicializa el escritor (el hilo arranca con la primera escritura)
+
+        Args:
+            ruta_wal: Archivo del write-ahead log
+            ruta_snapshot: Archivo del snapshot compactado
+            obtener_estado: Función que devuelve una copia del estado a compactar
+            tamanio_lote: Máximo de registros por fsync
+            espera_lote: Segundos que se espera a más registros antes de sincronizar
+            umbral_compactacion: Registros en el WAL que disparan una compactación
+        """
+        self._ruta_wal = ruta_wal
+        self._ruta_snapshot = ruta_snapshot
+        self._obtener_estado = obtener_estado
+        self._tamanio_lote = max(1, tamanio_lote)
+        self._espera_lote = espera_lote
+        self._umbral_compactacion = umbral_compactacion
+
+        self._cola: 'queue.Queue[Optional[_Solicitud]]' = queue.Queue()
+        self._hilo: Optional[threading.Thread] = None
+        self._lock_hilo = threading.Lock()
+        self._lock_archivo = threading.Lock()
+        self._archivo = None
+        self._en_wal = 0
+        self._logger = logging.getLogger(__name__)
+
+    # ---------------------------------------------------------------
+    # API pública
+    # ---------------------------------------------------------------
+
+    def cargar(self) -> Dict[str, Any]:
+        """
+        Reconstruye el estado: snapshot + registros del WAL
+
+        Returns:
+            Diccionario usuario → valor
+
+        Note:
+            Un snapshot corrupto no se trata como vacío en silencio: se registra
+            el error y se aparta con sufijo .corrupto para no sobrescribirlo.
+        """
+        estado: Dict[str, Any] = {}
+        if os.path.exists(self._ruta_snapshot):
+            try:
+                with open(self._ruta_snapshot, "r", encoding='utf-8') as f:
+                    estado = json.load(f)
+            except json.JSONDecodeError as e:
+                apartado = self._ruta_snapshot + ".corrupto"
+                os.replace(self._ruta_snapshot, apartado)
+                self._logger.error("Snapshot corrupto (%s), movido a %s", e, apartado)
+
+        self._en_wal = 0
+        if os.path.exists(self._ruta_wal):
+            with open(self._ruta_wal, "rb") as f:
+                for linea in f:
+                    try:
+                        registro = json.loads(linea)
+                    except json.JSONDecodeError:
+                        # Última línea a medio escribir por una caída: se ignora
+                        self._logger.warning("Registro incompleto al final del WAL, ignorado")
+                        break
+                    estado[registro["clave"]] = registro["valor"]
+                    self._en_wal += 1
+        return estado
+
+    def escribir(self, clave: str, valor: Any) -> None:
+        """
+        Agrega un registro al WAL y espera a que esté sincronizado en disco
+
+        Args:
+            clave: Clave del registro
+            valor: Valor serializable
+
+        Raises:
+            OSError: Si falla la escritura o el fsync del lote
+        """
+        self._asegurar_hilo()
+        solicitud = _Solicitud({"clave": clave, "valor": valor})
+        self._cola.put(solicitud)
+        solicitud.evento.wait()
+        if solicitud.error is not None:
+            raise solicitud.error
+
+    def compactar(self) -> None:
+        """
+        Fuerza una compactación desde el hilo llamador (p. ej. al apagar)
+        """
+        with self._lock_archivo:
+            self._compactar()
+
+    def cerrar(self) -> None:
+        """
+        Termina el hilo escritor después de confirmar lo pendiente
+        """
+        with self._lock_hilo:
+            hilo = self._hilo
+            self._hilo = None
+        if hilo is not None:
+            self._cola.put(None)
+            hilo.join()
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
+
+    # ---------------------------------------------------------------
+    # Hilo escritor
+    # ---------------------------------------------------------------
+
+    def _asegurar_hilo(self) -> None:
+        if self._hilo is not None:
+            return
+        with self._lock_hilo:
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._bucle, name="EscritorWAL", daemon=True)
+                self._hilo.start()
+
+    def _bucle(self) -> None:
+        detener = False
+        while not detener:
+            primero = self._cola.get()
+            if primero is None:
+                break
+
+            lote: List[_Solicitud] = [primero]
+            limite = time.monotonic() + self._espera_lote
+            while len(lote) < self._tamanio_lote:
+                restante = limite - time.monotonic()
+                try:
+                    siguiente = self._cola.get(timeout=restante) if restante > 0 else self._cola.get_nowait()
+                except queue.Empty:
+                    break
+                if siguiente is None:
+                    detener = True
+                    break
+                lote.append(siguiente)
+
+            self._confirmar_lote(lote)
+
+    def _confirmar_lote(self, lote: List[_Solicitud]) -> None:
+        with self._lock_archivo:
+            self._escribir_lote(lote)
+
+    def _escribir_lote(self, lote: List[_Solicitud]) -> None:
+        try:
+            if self._archivo is None:
+                self._archivo = open(self._ruta_wal, "ab")
+            datos = b"".join(
+                (json.dumps(s.registro, ensure_ascii=False) + "\n").encode('utf-8') for s in lote
+            )
+            self._archivo.write(datos)
+            self._archivo.flush()
+            os.fsync(self._archivo.fileno())
+            self._en_wal += len(lote)
+        except OSError as e:
+            self._logger.error("Error escribiendo lote en WAL: %s", e)
+            for solicitud in lote:
+                solicitud.error = e
+
+        for solicitud in lote:
+            solicitud.evento.set()
+
+        if self._obtener_estado is not None and self._en_wal >= self._umbral_compactacion:
+            try:
+                self._compactar()
+            except OSError as e:
+                self._logger.error("Error compactando WAL: %s", e)
+
+    def _compactar(self) -> None:
+        if self._obtener_estado is None:
+            return
+        estado = self._obtener_estado()
+
+        temporal = self._ruta_snapshot + ".tmp"
+        with open(temporal, "w", encoding='utf-8') as f:
+            json.dump(estado, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, self._ruta_snapshot)
+
+        # El snapshot ya contiene todo lo del WAL: se puede vaciar
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
+        open(self._ruta_wal, "wb").close()
+        self._en_wal = 0
+        self._logger.info("WAL compactado en %s (%d registros)", self._ruta_snapshot, len(estado))
@@ -0,0 +1,96 @@
+"""
+Fábrica de backends de usuarios a partir de config_datos.properties
+"""
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+from .IRepositorioUsuarios import IRepositorioUsuarios
+from .RepositorioJSON import RepositorioJSON
+from .RepositorioMemoria import RepositorioMemoria
+from .RepositorioSQLite import RepositorioSQLite
+from .RepositorioShards import RepositorioShards
+
+# Raíz del proyecto chatTCP/: las rutas relativas no dependen del directorio actual
+RAIZ_PROYECTO = Path(__file__).resolve().parent.parent.parent
+
+
+class ConfigDatos:
+    """Configuración de la capa de Datos"""
+    def __init__(
+        self,
+        backend: str = "json",
+        ruta_json: str = "usuarios.json",
+        ruta_sqlite: str = "datos/usuarios.db",
+        ruta_shards: str = "datos/usuarios_shards",
+        total_shards: int = 16
+    ):
+        self.backend = backend
+        self.ruta_json = ruta_json
+        self.ruta_sqlite = ruta_sqlite
+        self.ruta_shards = ruta_shards
+        self.total_shards = total_shards
+
+
+def cargar_configuracion_datos(archivo_config: str = "config_datos.properties") -> ConfigDatos:
+    """
+    Carga la configuración desde un archivo .properties
+
+    Args:
+        archivo_config: Ruta al archivo de configuración (relativa a config/)
+
+    Returns:
+        ConfigDatos con la configuración cargada (valores por defecto si no existe)
+    """
+    if not os.path.isabs(archivo_config):
+        archivo_config = RAIZ_PROYECTO / "config" / archivo_config
+
+    props: Dict[str, str] = {}
+    if os.path.exists(archivo_config):
+        with open(archivo_config, 'r', encoding='utf-8') as f:
+            for linea in f:
+                linea = linea.strip()
+                if linea and not linea.startswith('#') and '=' in linea:
+                    key, value = linea.split('=', 1)
+                    props[key.strip()] = value.strip()
+
+    return ConfigDatos(
+        backend=props.get('usuarios.backend', 'json').lower(),
+        ruta_json=props.get('usuarios.json.ruta', 'usuarios.json'),
+        ruta_sqlite=props.get('usuarios.sqlite.ruta', 'datos/usuarios.db'),
+        ruta_shards=props.get('usuarios.shards.ruta', 'datos/usuarios_shards'),
+        total_shards=int(props.get('usuarios.shards.total', '16'))
+    )
+
+
+def _resolver(ruta: str) -> str:
+    return ruta if os.path.isabs(ruta) else str(RAIZ_PROYECTO / ruta)
+
+
+def crear_repositorio(config: Optional[ConfigDatos] = None) -> IRepositorioUsuarios:
+    """
+    Crea el backend de usuarios indicado en la configuración
+
+    Args:
+        config: Configuración a usar (por defecto, config_datos.properties)
+
+    Returns:
+        Backend que implementa IRepositorioUsuarios
+
+    Raises:
+        ValueError: Si el backend configurado no existe
+    """
+    config = config or cargar_configuracion_datos()
+
+    if config.backend == "memoria":
+        return RepositorioMemoria()
+    if config.backend == "json":
+        ruta = _resolver(config.ruta_json)
+        if os.path.dirname(ruta):
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        return RepositorioJSON(ruta)
+    if config.backend == "sqlite":
+        return RepositorioSQLite(_resolver(config.ruta_sqlite))
+    if config.backend == "shards":
+        return RepositorioShards(_resolver(config.ruta_shards), config.total_shards)
+    raise ValueError(f"Backend de usuarios desconocido: {config.backend}")
@@ -0,0 +1,167 @@
+"""
+Historial de mensajes del servidor
+Persiste los mensajes en SQLite y permite consultarlos por páginas
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from chatTCP.src.ModeloChatTCP.DTOs.MensajeDTO import MensajeDTO
+
+CONVERSACION_GENERAL = "TODOS"
+
+
+def clave_conversacion(usuario_a: str, usuario_b: str) -> str:
+    """
+    Obtiene la clave de conversación entre dos participantes
+
+    Args:
+        usuario_a: Uno de los participantes
+        usuario_b: El otro participante o "TODOS" para el chat general
+
+    Returns:
+        Clave única e independiente del orden de los participantes
+    """
+    if usuario_a == CONVERSACION_GENERAL or usuario_b == CONVERSACION_GENERAL:
+        return CONVERSACION_GENERAL
+    return "|".join(sorted((usuario_a, usuario_b)))
+
+
+class HistorialMensajes:
+    """
+    Almacén de historial con índice por conversación y fecha
+
+    Las páginas se recorren de la más reciente a la más antigua con un cursor
+    [fecha, id] (keyset pagination), así que cada consulta es una búsqueda en
+    el índice sin importar cuántos mensajes tenga la conversación.
+    """
+
+    MAX_LIMITE = 200
+
+    def __init__(self, ruta_db: str):
+        """
+        Abre (o crea) la base de datos del historial
+
+        Args:
+            ruta_db: Ruta del archivo SQLite (":memory:" para pruebas)
+        """
+        self._lock = threading.Lock()
+        self._logger = logging.getLogger(__name__)
+        if ruta_db != ":memory:" and os.path.dirname(ruta_db):
+            os.makedirs(os.path.dirname(ruta_db), exist_ok=True)
+        self._conexion = sqlite3.connect(ruta_db, check_same_thread=False)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA synchronous=NORMAL")
+        self._conexion.executescript("""
+            CREATE TABLE IF NOT EXISTS mensajes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                conversacion TEXT NOT NULL,
+                remitente TEXT NOT NULL,
+                destino TEXT NOT NULL,
+                texto TEXT NOT NULL,
+                fecha REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_mensajes_conversacion_fecha
+                ON mensajes (conversacion, fecha);
+        """)
+        self._conexion.commit()
+
+    def guardar(self, remitente: str, destino: str, texto: str, fecha: Optional[float] = None) -> int:
+        """
+        Guarda un mensaje en el historial
+
+        Args:
+            remitente: Usuario que envía
+            destino: Usuario destino o "TODOS"
+            texto: Contenido del mensaje
+            fecha: Timestamp UNIX (por defecto, ahora)
+
+        Returns:
+            Id del mensaje guardado
+        """
+        fecha = time.time() if fecha is None else fecha
+        with self._lock:
+            cursor = self._conexion.execute(
+                "INSERT INTO mensajes (conversacion, remitente, destino, texto, fecha) VALUES (?, ?, ?, ?, ?)",
+                (clave_conversacion(remitente, destino), remitente, destino, texto, fecha)
+            )
+            self._conexion.commit()
+            return cursor.lastrowid
+
+    def consultar(self,
+                  usuario: str,
+                  con: str,
+                  cursor: Optional[List[Any]] = None,
+                  limite: int = 50,
+                  desde: Optional[float] = None) -> Tuple[List[Dict[str, Any]], Optional[List[Any]]]:
+        """
+        Obtiene una página del historial de una conversación
+
+        Args:
+            usuario: Usuario que consulta
+            con: Otro participante o "TODOS"
+            cursor: Cursor devuelto por la página anterior (None = más recientes)
+            limite: Máximo de mensajes por página
+            desde: Timestamp mínimo opcional del rango
+
+        Returns:
+            Tupla (mensajes en orden cronológico, cursor de la página anterior o None)
+        """
+        limite = max(1, min(int(limite), self.MAX_LIMITE))
+        condiciones = ["conversacion = ?"]
+        parametros: List[Any] = [clave_conversacion(usuario, con)]
+
+        if cursor:
+            fecha_cursor, id_cursor = cursor
+            condiciones.append("(fecha < ? OR (fecha = ? AND id < ?))")
+            parametros += [fecha_cursor, fecha_cursor, id_cursor]
+        if desde is not None:
+            condiciones.append("fecha >= ?")
+            parametros.append(desde)
+
+        consulta = (
+            "SELECT id, remitente, destino, texto, fecha FROM mensajes "
+            f"WHERE {' AND '.join(condiciones)} "
+            "ORDER BY fecha DESC, id DESC LIMIT ?"
+        )
+        parametros.append(limite + 1)
+
+        with self._lock:
+            filas = self._conexion.execute(consulta, parametros).fetchall()
+
+        hay_mas = len(filas) > limite
+        filas = filas[:limite]
+        siguiente = [filas[-1][4], filas[-1][0]] if hay_mas else None
+
+        mensajes = [self._a_dict(fila) for fila in reversed(filas)]
+        return mensajes, siguiente
+
+    def total(self) -> int:
+        """
+        Cuenta los mensajes guardados
+
+        Returns:
+            Número total de mensajes
+        """
+        with self._lock:
+            return self._conexion.execute("SELECT COUNT(*) FROM mensajes").fetchone()[0]
+
+    def cerrar(self) -> None:
+        """
+        Cierra la conexión con la base de datos
+        """
+        with self._lock:
+            self._conexion.close()
+
+    @staticmethod
+    def _a_dict(fila) -> Dict[str, Any]:
+        id_mensaje, remitente, destino, texto, fecha = fila
+        datos = MensajeDTO(nombreUsuario=remitente, contenidoMensaje=texto,
+                           fechaHora=datetime.fromtimestamp(fecha)).to_dict()
+        datos["id"] = id_mensaje
+        datos["destino"] = destino
+        return datos
@@ -0,0 +1,80 @@
+"""
+Interfaz para los backends de almacenamiento de usuarios
+"""
+from abc import ABC, abstractmethod
+from typing import Iterable, Optional, Tuple
+
+
+class IRepositorioUsuarios(ABC):
+    """
+    Interfaz que define el contrato para guardar usuarios y sus hashes de contraseña
+
+    Los backends no conocen contraseñas en claro: reciben el hash ya calculado.
+    """
+
+    @abstractmethod
+    def agregar(self, usuario: str, password_hash: str) -> bool:
+        """
+        Agrega un usuario si no existe
+
+        Args:
+            usuario: Nombre del usuario
+            password_hash: Hash de la contraseña
+
+        Returns:
+            True si se agregó, False si el usuario ya existía
+        """
+        pass
+
+    @abstractmethod
+    def obtener(self, usuario: str) -> Optional[str]:
+        """
+        Obtiene el hash de contraseña de un usuario
+
+        Args:
+            usuario: Nombre del usuario
+
+        Returns:
+            Hash guardado o None si el usuario no existe
+        """
+        pass
+
+    @abstractmethod
+    def total(self) -> int:
+        """
+        Cuenta los usuarios guardados
+
+        Returns:
+            Número de usuarios
+        """
+        pass
+
+    def existe(self, usuario: str) -> bool:
+        """
+        Verifica si un usuario existe
+
+        Args:
+            usuario: Nombre del usuario
+
+        Returns:
+            True si el usuario existe
+        """
+        return self.obtener(usuario) is not None
+
+    def agregar_lote(self, usuarios: Iterable[Tuple[str, str]]) -> int:
+        """
+        Agrega muchos usuarios de una vez (carga inicial o migración)
+
+        Args:
+            usuarios: Pares (usuario, password_hash)
+
+        Returns:
+            Número de usuarios agregados
+        """
+        return sum(1 for usuario, password_hash in usuarios if self.agregar(usuario, password_hash))
+
+    def cerrar(self) -> None:
+        """
+        Libera recursos y confirma en disco lo pendiente
+        """
+        pass
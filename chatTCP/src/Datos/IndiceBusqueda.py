@@ -0,0 +1,201 @@
+"""
+Índice de búsqueda de texto completo sobre los mensajes del chat
+Usa un índice invertido de SQLite FTS5 construido de forma incremental
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from chatTCP.src.ModeloChatTCP.DTOs.MensajeDTO import MensajeDTO
+
+
+class IndiceBusqueda:
+    """
+    Índice invertido (FTS5) con resultados ordenados por relevancia (BM25)
+
+    Los mensajes se indexan a medida que pasan por el servidor. Las
+    inserciones se agrupan en transacciones de hasta `tamanio_lote` mensajes
+    para no pagar un commit por mensaje; un temporizador confirma lo pendiente
+    a los `intervalo_commit` segundos aunque no lleguen más mensajes. Las
+    búsquedas usan la misma conexión, así que ven también lo que aún no se ha
+    confirmado.
+    """
+
+    MAX_LIMITE = 100
+
+    def __init__(self, ruta_db: str, tamanio_lote: int = 256, intervalo_commit: float = 1.0):
+        """
+        Abre (o crea) el índice
+
+        Args:
+            ruta_db: Ruta del archivo SQLite (":memory:" para pruebas)
+            tamanio_lote: Mensajes por transacción
+            intervalo_commit: Segundos máximos sin confirmar inserciones pendientes
+        """
+        self._lock = threading.Lock()
+        self._logger = logging.getLogger(__name__)
+        self._tamanio_lote = tamanio_lote
+        self._intervalo_commit = intervalo_commit
+        self._pendientes = 0
+        self._ultimo_commit = time.monotonic()
+        # Confirma lo pendiente si el servidor queda sin mensajes antes de llenar el lote
+        self._timer: Optional[threading.Timer] = None
+
+        if ruta_db != ":memory:" and os.path.dirname(ruta_db):
+            os.makedirs(os.path.dirname(ruta_db), exist_ok=True)
+        self._conexion = sqlite3.connect(ruta_db, check_same_thread=False)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA synchronous=NORMAL")
+        self._conexion.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS mensajes_fts USING fts5(
+                texto,
+                remitente UNINDEXED,
+                destino UNINDEXED,
+                fecha UNINDEXED,
+                tokenize = 'unicode61 remove_diacritics 2'
+            )
+        """)
+        self._conexion.commit()
+
+    def indexar(self, remitente: str, destino: str, texto: str,
+                fecha: Optional[float] = None, id_mensaje: Optional[int] = None) -> None:
+        """
+        Agrega un mensaje al índice
+
+        Args:
+            remitente: Usuario que envía
+            destino: Usuario destino o "TODOS"
+            texto: Contenido del mensaje
+            fecha: Timestamp UNIX (por defecto, ahora)
+            id_mensaje: Id del mensaje en el historial, si existe
+        """
+        fecha = time.time() if fecha is None else fecha
+        with self._lock:
+            self._conexion.execute(
+                "INSERT INTO mensajes_fts (rowid, texto, remitente, destino, fecha) VALUES (?, ?, ?, ?, ?)",
+                (id_mensaje, texto, remitente, destino, fecha)
+            )
+            self._pendientes += 1
+            ahora = time.monotonic()
+            if (self._pendientes >= self._tamanio_lote
+                    or ahora - self._ultimo_commit >= self._intervalo_commit):
+                self._commit()
+            elif self._timer is None:
+                espera = max(0.0, self._ultimo_commit + self._intervalo_commit - ahora)
+                self._timer = threading.Timer(espera, self._vencer)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def indexar_lote(self, mensajes: List[Tuple[str, str, str, float]]) -> None:
+        """
+        Agrega muchos mensajes en una sola transacción (carga inicial)
+
+        Args:
+            mensajes: Tuplas (remitente, destino, texto, fecha)
+        """
+        with self._lock:
+            self._conexion.executemany(
+                "INSERT INTO mensajes_fts (texto, remitente, destino, fecha) VALUES (?, ?, ?, ?)",
+                ((texto, remitente, destino, fecha) for remitente, destino, texto, fecha in mensajes)
+            )
+            self._commit()
+
+    def buscar(self, usuario: str, texto: str, pagina: int = 0,
+               limite: int = 20) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Busca mensajes visibles para un usuario, ordenados por relevancia
+
+        Args:
+            usuario: Usuario que busca (solo ve el chat general y sus conversaciones)
+            texto: Términos a buscar (todos deben aparecer; el último admite prefijo)
+            pagina: Número de página (desde 0)
+            limite: Resultados por página
+
+        Returns:
+            Tupla (resultados, hay_mas)
+        """
+        consulta_fts = self._a_consulta_fts(texto)
+        if not consulta_fts:
+            return [], False
+
+        limite = max(1, min(int(limite), self.MAX_LIMITE))
+        pagina = max(0, int(pagina))
+
+        with self._lock:
+            filas = self._conexion.execute(
+                "SELECT rowid, remitente, destino, texto, fecha, "
+                "snippet(mensajes_fts, 0, '[', ']', '...', 12) "
+                "FROM mensajes_fts "
+                "WHERE mensajes_fts MATCH ? AND (destino = 'TODOS' OR remitente = ? OR destino = ?) "
+                "ORDER BY rank LIMIT ? OFFSET ?",
+                (consulta_fts, usuario, usuario, limite + 1, pagina * limite)
+            ).fetchall()
+
+        hay_mas = len(filas) > limite
+        return [self._a_dict(fila) for fila in filas[:limite]], hay_mas
+
+    def confirmar(self) -> None:
+        """
+        Confirma en disco las inserciones pendientes
+        """
+        with self._lock:
+            self._commit()
+
+    def total(self) -> int:
+        """
+        Cuenta los mensajes indexados
+
+        Returns:
+            Número de mensajes en el índice
+        """
+        with self._lock:
+            return self._conexion.execute("SELECT COUNT(*) FROM mensajes_fts").fetchone()[0]
+
+    def cerrar(self) -> None:
+        """
+        Confirma lo pendiente y cierra el índice
+        """
+        with self._lock:
+            self._commit()
+            self._conexion.close()
+
+    def _vencer(self) -> None:
+        with self._lock:
+            self._timer = None
+            # Si ya se cerró, cerrar() confirmó todo y no queda nada pendiente
+            if self._pendientes:
+                self._commit()
+
+    def _commit(self) -> None:
+        # Con self._lock tomado
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._conexion.commit()
+        self._pendientes = 0
+        self._ultimo_commit = time.monotonic()
+
+    @staticmethod
+    def _a_consulta_fts(texto: str) -> str:
+        # Cada término se pasa entre comillas para que el usuario no pueda
+        # inyectar operadores de FTS5; el último término busca por prefijo
+        terminos = [t.replace('"', '""') for t in (texto or "").split()]
+        if not terminos:
+            return ""
+        partes = [f'"{t}"' for t in terminos]
+        partes[-1] += "*"
+        return " ".join(partes)
+
+    @staticmethod
+    def _a_dict(fila) -> Dict[str, Any]:
+        id_mensaje, remitente, destino, texto, fecha, fragmento = fila
+        datos = MensajeDTO(nombreUsuario=remitente, contenidoMensaje=texto,
+                           fechaHora=datetime.fromtimestamp(fecha)).to_dict()
+        datos["id"] = id_mensaje
+        datos["destino"] = destino
+        datos["fragmento"] = fragmento
+        return datos
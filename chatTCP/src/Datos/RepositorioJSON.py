@@ -0,0 +1,69 @@
+"""
+Backend de usuarios en un archivo JSON con write-ahead log
+"""
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+from .EscritorWAL import EscritorWAL
+from .IRepositorioUsuarios import IRepositorioUsuarios
+
+
+class RepositorioJSON(IRepositorioUsuarios):
+    """
+    Usuarios en memoria respaldados por un snapshot JSON ({usuario: hash}) y
+    un WAL con group commit (ver EscritorWAL)
+    """
+
+    def __init__(self, ruta: str, tamanio_lote: int = 256, umbral_compactacion: int = 1000):
+        """
+        Carga el snapshot y el WAL
+
+        Args:
+            ruta: Archivo JSON del snapshot (el WAL es ruta + ".wal")
+            tamanio_lote: Máximo de registros por fsync
+            umbral_compactacion: Registros en el WAL que disparan una compactación
+        """
+        self._lock = threading.Lock()
+        self._escritor = EscritorWAL(ruta + ".wal", ruta, obtener_estado=self._copiar,
+                                     tamanio_lote=tamanio_lote, umbral_compactacion=umbral_compactacion)
+        self._usuarios: Dict[str, str] = self._escritor.cargar()
+
+    def agregar(self, usuario: str, password_hash: str) -> bool:
+        with self._lock:
+            # Reservar el nombre antes de escribir para rechazar duplicados concurrentes
+            if usuario in self._usuarios:
+                return False
+            self._usuarios[usuario] = password_hash
+
+        try:
+            self._escritor.escribir(usuario, password_hash)
+        except OSError:
+            with self._lock:
+                self._usuarios.pop(usuario, None)
+            raise
+        return True
+
+    def agregar_lote(self, usuarios: Iterable[Tuple[str, str]]) -> int:
+        agregados = 0
+        with self._lock:
+            for usuario, password_hash in usuarios:
+                if usuario not in self._usuarios:
+                    self._usuarios[usuario] = password_hash
+                    agregados += 1
+        # Una carga masiva va directo al snapshot en lugar de pasar por el WAL
+        self._escritor.compactar()
+        return agregados
+
+    def obtener(self, usuario: str) -> Optional[str]:
+        return self._usuarios.get(usuario)
+
+    def total(self) -> int:
+        return len(self._usuarios)
+
+    def cerrar(self) -> None:
+        self._escritor.cerrar()
+        self._escritor.compactar()
+
+    def _copiar(self) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._usuarios)
@@ -0,0 +1,30 @@
+"""
+Backend de usuarios en memoria (pruebas y nodos sin persistencia)
+"""
+import threading
+from typing import Dict, Optional
+
+from .IRepositorioUsuarios import IRepositorioUsuarios
+
+
+class RepositorioMemoria(IRepositorioUsuarios):
+    """
+    Guarda los usuarios en un diccionario; se pierden al cerrar el proceso
+    """
+
+    def __init__(self):
+        self._usuarios: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def agregar(self, usuario: str, password_hash: str) -> bool:
+        with self._lock:
+            if usuario in self._usuarios:
+                return False
+            self._usuarios[usuario] = password_hash
+            return True
+
+    def obtener(self, usuario: str) -> Optional[str]:
+        return self._usuarios.get(usuario)
+
+    def total(self) -> int:
+        return len(self._usuarios)
@@ -0,0 +1,61 @@
+"""
+Backend de usuarios en SQLite
+"""
+import os
+import sqlite3
+import threading
+from typing import Iterable, Optional, Tuple
+
+from .IRepositorioUsuarios import IRepositorioUsuarios
+
+
+class RepositorioSQLite(IRepositorioUsuarios):
+    """
+    Tabla usuarios(usuario PRIMARY KEY, hash) sin rowid, en modo WAL de SQLite
+    """
+
+    def __init__(self, ruta: str):
+        """
+        Abre (o crea) la base de datos
+
+        Args:
+            ruta: Archivo SQLite (":memory:" para pruebas)
+        """
+        if ruta != ":memory:" and os.path.dirname(ruta):
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA synchronous=NORMAL")
+        self._conexion.execute(
+            "CREATE TABLE IF NOT EXISTS usuarios (usuario TEXT PRIMARY KEY, hash TEXT NOT NULL) WITHOUT ROWID"
+        )
+        self._conexion.commit()
+
+    def agregar(self, usuario: str, password_hash: str) -> bool:
+        with self._lock:
+            cursor = self._conexion.execute(
+                "INSERT OR IGNORE INTO usuarios (usuario, hash) VALUES (?, ?)", (usuario, password_hash)
+            )
+            self._conexion.commit()
+            return cursor.rowcount == 1
+
+    def agregar_lote(self, usuarios: Iterable[Tuple[str, str]]) -> int:
+        with self._lock:
+            antes = self._conexion.total_changes
+            self._conexion.executemany("INSERT OR IGNORE INTO usuarios (usuario, hash) VALUES (?, ?)", usuarios)
+            self._conexion.commit()
+            return self._conexion.total_changes - antes
+
+    def obtener(self, usuario: str) -> Optional[str]:
+        with self._lock:
+            fila = self._conexion.execute("SELECT hash FROM usuarios WHERE usuario = ?", (usuario,)).fetchone()
+        return fila[0] if fila else None
+
+    def total(self) -> int:
+        with self._lock:
+            return self._conexion.execute("SELECT COUNT(*) FROM usuarios").fetchone()[0]
+
+    def cerrar(self) -> None:
+        with self._lock:
+            self._conexion.close()
@@ -0,0 +1,55 @@
+"""
+Backend de usuarios repartido en varios archivos (shards)
+"""
+import os
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .IRepositorioUsuarios import IRepositorioUsuarios
+from .RepositorioJSON import RepositorioJSON
+
+
+class RepositorioShards(IRepositorioUsuarios):
+    """
+    Reparte los usuarios entre N repositorios JSON según crc32(usuario) % N
+
+    Cada shard tiene su propio snapshot, WAL y lock, así que las compactaciones
+    reescriben solo 1/N de los usuarios y los registros concurrentes de
+    usuarios en shards distintos no compiten entre sí.
+    """
+
+    def __init__(self, directorio: str, total_shards: int = 16):
+        """
+        Abre (o crea) los shards
+
+        Args:
+            directorio: Carpeta donde se guardan los archivos de cada shard
+            total_shards: Número de shards (no debe cambiar una vez creados)
+        """
+        os.makedirs(directorio, exist_ok=True)
+        self._shards: List[RepositorioJSON] = [
+            RepositorioJSON(os.path.join(directorio, f"shard_{i:03d}.json")) for i in range(total_shards)
+        ]
+
+    def _shard(self, usuario: str) -> RepositorioJSON:
+        return self._shards[zlib.crc32(usuario.encode('utf-8')) % len(self._shards)]
+
+    def agregar(self, usuario: str, password_hash: str) -> bool:
+        return self._shard(usuario).agregar(usuario, password_hash)
+
+    def agregar_lote(self, usuarios: Iterable[Tuple[str, str]]) -> int:
+        por_shard: Dict[int, List[Tuple[str, str]]] = {}
+        for usuario, password_hash in usuarios:
+            indice = zlib.crc32(usuario.encode('utf-8')) % len(self._shards)
+            por_shard.setdefault(indice, []).append((usuario, password_hash))
+        return sum(self._shards[i].agregar_lote(lote) for i, lote in por_shard.items())
+
+    def obtener(self, usuario: str) -> Optional[str]:
+        return self._shard(usuario).obtener(usuario)
+
+    def total(self) -> int:
+        return sum(shard.total() for shard in self._shards)
+
+    def cerrar(self) -> None:
+        for shard in self._shards:
+            shard.cerrar()
@@ -0,0 +1,120 @@
+"""
+Sesiones de usuarios conectados compartidas entre procesos
+Permite que varios workers del servidor vean los mismos usuarios conectados
+"""
+import os
+import sqlite3
+import threading
+from collections.abc import MutableMapping
+from typing import Iterator
+
+from chatTCP.src.Bus.ServicioDTO import ServicioDTO
+
+
+class SesionesCompartidas(MutableMapping):
+    """
+    Diccionario usuario → ServicioDTO guardado en un archivo SQLite
+
+    Se comporta como el diccionario `usuarios_conectados` del servidor, pero
+    cada lectura y escritura va a la base compartida, así que un LOGIN
+    atendido por un worker es visible de inmediato para los demás.
+    """
+
+    # En el orden de los campos de ServicioDTO
+    _COLUMNAS = "host, puerto, llave_publica, suite, sesion_x25519, compresion"
+
+    def __init__(self, ruta_db: str, timeout: float = 10.0):
+        """
+        Abre (o crea) el almacén de sesiones
+
+        Args:
+            ruta_db: Archivo SQLite compartido por todos los workers
+            timeout: Segundos que se espera si otro proceso tiene la base bloqueada
+        """
+        if os.path.dirname(ruta_db):
+            os.makedirs(os.path.dirname(ruta_db), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(ruta_db, timeout=timeout, check_same_thread=False)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA synchronous=NORMAL")
+        self._conexion.execute("""
+            CREATE TABLE IF NOT EXISTS sesiones (
+                usuario TEXT PRIMARY KEY,
+                host TEXT NOT NULL,
+                puerto INTEGER NOT NULL,
+                llave_publica BLOB,
+                suite TEXT NOT NULL DEFAULT 'FERNET',
+                sesion_x25519 BLOB,
+                compresion TEXT
+            ) WITHOUT ROWID
+        """)
+        # Bases creadas antes de negociar el cifrado por sesión
+        columnas = [fila[1] for fila in self._conexion.execute("PRAGMA table_info(sesiones)")]
+        if "suite" not in columnas:
+            self._conexion.execute("ALTER TABLE sesiones ADD COLUMN suite TEXT NOT NULL DEFAULT 'FERNET'")
+        if "sesion_x25519" not in columnas:
+            self._conexion.execute("ALTER TABLE sesiones ADD COLUMN sesion_x25519 BLOB")
+        if "compresion" not in columnas:
+            self._conexion.execute("ALTER TABLE sesiones ADD COLUMN compresion TEXT")
+        self._conexion.commit()
+
+    def __getitem__(self, usuario: str) -> ServicioDTO:
+        with self._lock:
+            fila = self._conexion.execute(
+                f"SELECT {self._COLUMNAS} FROM sesiones WHERE usuario = ?", (usuario,)
+            ).fetchone()
+        if fila is None:
+            raise KeyError(usuario)
+        return ServicioDTO(*fila)
+
+    def __setitem__(self, usuario: str, servicio: ServicioDTO) -> None:
+        with self._lock:
+            self._conexion.execute(
+                f"INSERT OR REPLACE INTO sesiones (usuario, {self._COLUMNAS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (usuario, servicio.host, servicio.puerto, servicio.llave_publica, servicio.suite, servicio.sesion_x25519,
+                 servicio.compresion)
+            )
+            self._conexion.commit()
+
+    def __delitem__(self, usuario: str) -> None:
+        with self._lock:
+            cursor = self._conexion.execute("DELETE FROM sesiones WHERE usuario = ?", (usuario,))
+            self._conexion.commit()
+        if cursor.rowcount == 0:
+            raise KeyError(usuario)
+
+    def __contains__(self, usuario: object) -> bool:
+        with self._lock:
+            return self._conexion.execute(
+                "SELECT 1 FROM sesiones WHERE usuario = ?", (usuario,)
+            ).fetchone() is not None
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            nombres = [fila[0] for fila in self._conexion.execute("SELECT usuario FROM sesiones")]
+        return iter(nombres)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conexion.execute("SELECT COUNT(*) FROM sesiones").fetchone()[0]
+
+    def values(self):
+        # Una sola consulta en lugar de una por usuario
+        with self._lock:
+            filas = self._conexion.execute(f"SELECT {self._COLUMNAS} FROM sesiones").fetchall()
+        return [ServicioDTO(*fila) for fila in filas]
+
+    def limpiar(self) -> None:
+        """
+        Borra todas las sesiones (al arrancar el servidor ya no queda nadie conectado)
+        """
+        with self._lock:
+            self._conexion.execute("DELETE FROM sesiones")
+            self._conexion.commit()
+
+    def cerrar(self) -> None:
+        """
+        Cierra la conexión con la base compartida
+        """
+        with self._lock:
+            self._conexion.close()
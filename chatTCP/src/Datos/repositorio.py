@@ -1,43 +1,37 @@
-import json
-import os
-import threading
-from ..Red.Cifrado.seguridad import GestorSeguridad
+import hmac
+from typing import Optional
 
-ARCHIVO = "usuarios.json"
-lock_usuarios = threading.Lock()
+from .FabricaRepositorio import crear_repositorio
+from .IRepositorioUsuarios import IRepositorioUsuarios
+from ..Red.Cifrado.seguridad import GestorSeguridad
 
 
 class repositorioUsuarios:
-    @staticmethod
-    def guardar(usuario, password_raw):
-        with lock_usuarios:
-            datos = {}
-            if os.path.exists(ARCHIVO):
-                try:
-                    with open(ARCHIVO, "r") as f:
-                        datos = json.load(f)
-                except json.JSONDecodeError:
-                    datos = {}
-            # validar duplicado
-            if usuario in datos: return False
-
-            # hashear y guardar :0
-            phash = GestorSeguridad().hash_password(password_raw)
-            datos[usuario] = phash
-
-            with open(ARCHIVO, "w") as f:
-                json.dump(datos, f)
-            return True
-
-    @staticmethod
-    def validar(usuario, password_raw):
-        with lock_usuarios:
-            if not os.path.exists(ARCHIVO): return False
-            try:
-                with open(ARCHIVO, "r") as f:
-                    datos = json.load(f)
-            except:
-                return False
-
-            phash = GestorSeguridad().hash_password(password_raw)
-            return datos.get(usuario) == phash
+    """
+    Registro y validación de usuarios sobre un backend intercambiable
+
+    Calcula los hashes de contraseña y delega el almacenamiento en una
+    implementación de IRepositorioUsuarios (memoria, JSON, SQLite o shards).
+    """
+
+    def __init__(self, backend: Optional[IRepositorioUsuarios] = None):
+        """
+        Args:
+            backend: Backend a usar (por defecto, el de config_datos.properties)
+        """
+        self.backend = backend if backend is not None else crear_repositorio()
+
+    def guardar(self, usuario, password_raw):
+        return self.backend.agregar(usuario, GestorSeguridad.hash_password(password_raw))
+
+    def validar(self, usuario, password_raw):
+        guardado = self.backend.obtener(usuario)
+        phash = GestorSeguridad.hash_password(password_raw)
+        return guardado is not None and hmac.compare_digest(guardado, phash)
+
+    def existe(self, usuario):
+        return self.backend.existe(usuario)
+
+    def cerrar(self):
+        """Confirma lo pendiente en el backend y libera sus recursos"""
+        self.backend.cerrar()
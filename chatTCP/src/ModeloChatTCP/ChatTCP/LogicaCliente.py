@@ -1,3 +1,4 @@
+import base64
 import threading
 import time
 import os
@@ -14,148 +15,38 @@ if chat_root not in sys.path:
 from src.PaqueteDTO.PaqueteDTO import PaqueteDTO
 from src.Red.EnsambladorRed import EnsambladorRed, ConfigRed
 from src.ComponenteReceptor.IReceptor import IReceptor
-from src.Red.Cifrado.seguridad import GestorSeguridad
+from src.Red.Cifrado.seguridad import GestorSeguridad, SUITES, SUITE_FERNET
+from src.Red.Cifrado.Compresion import COMPRESIONES
 
 class ReceptorCliente(IReceptor):
     def __init__(self):
         self.callback = None
+        self.confirmador_offline = None
+        self.confirmador_suite = None
+        self.confirmador_compresion = None
 
     def set_callback(self, funcion):
         self.callback = funcion
 
-    def recibir_cambio(self, paquete: PaqueteDTO) -> None:
-        if self.callback:
-            try:
-                self.callback(paquete)
-            except Exception as e:
-                print(f"[ReceptorCliente] Error en callback de UI: {e}")
-        else:
-            print(f"[ReceptorCliente] Paquete recibido sin callback: {paquete.tipo}")
-
+    def set_confirmador_offline(self, funcion):
+        self.confirmador_offline = funcion
 
-class LogicaCliente:
-    def __init__(self):
-        self.ensamblador = EnsambladorRed.obtener_instancia()
-        self.gestor_seguridad = GestorSeguridad()
+    def set_confirmador_suite(self, funcion):
+        self.confirmador_suite = funcion
 
-        self.host_servidor = "127.0.0.1"
-        self.puerto_servidor = 5555
-
-        llave_servidor = self._cargar_llave_servidor()
-        
-        if not llave_servidor:
-            print("[ERROR CRÍTICO] No se pudo cargar la llave del servidor.")
-            self.emisor = None 
-            return 
-
-        # Escuchar en 127.0.0.1 para evitar WinError 10061
-        config = ConfigRed(
-            host_escucha="127.0.0.1", 
-            puerto_escucha=0,       
-            host_destino=self.host_servidor,
-            puerto_destino=self.puerto_servidor,
-            llave_publica_destino=llave_servidor
-        )
-
-        self.receptor_interno = ReceptorCliente()
-
-        try:
-            print("[LogicaCliente] Ensamblando red...")
-            self.emisor = self.ensamblador.ensamblar(self.receptor_interno, config)
-            time.sleep(1.0) 
-
-            if self.ensamblador._servidor:
-                self.mi_puerto = self.ensamblador._servidor.get_puerto()
-                self.mi_host = "127.0.0.1"
-                print(f"[LogicaCliente] LISTO. Escuchando en {self.mi_host}:{self.mi_puerto}")
-            else:
-                raise Exception("El servidor interno no se inició")
-
-        except Exception as e:
-            print(f"[LogicaCliente] ERROR al ensamblar red: {e}")
-            self.emisor = None
-            self.mi_puerto = 0
-            self.mi_host = "127.0.0.1"
-
-        self.usuario_actual = None
-
-    def set_callback(self, funcion):
-        self.receptor_interno.set_callback(funcion)
-
-    def registrar(self, usuario, password):
-        if not self._validar_conexion(): return
-
-        public_key_pem = self.ensamblador.obtener_llave_publica().decode('utf-8')
-
-        contenido = {
-            "usuario": usuario,
-            "password": password,
-            "puerto_escucha": self.mi_puerto,
-            "host_escucha": self.mi_host,
-            "public_key": public_key_pem
-        }
-        self._enviar_paquete("REGISTRO", contenido)
-
-    def login(self, usuario, password):
-        if not self._validar_conexion(): return
-
-        self.usuario_actual = usuario
-        public_key_pem = self.ensamblador.obtener_llave_publica().decode('utf-8')
-
-        contenido = {
-            "usuario": usuario,
-            "password": password,
-            "puerto_escucha": self.mi_puerto,
-            "host_escucha": self.mi_host,
-            "public_key": public_key_pem,
-        }
-        self._enviar_paquete("LOGIN", contenido)
-
-    def enviar_mensaje(self, mensaje, destino="TODOS"):
-        if not self._validar_conexion(): return
-
-        contenido = {
-            "mensaje": mensaje,
-            "remitente": self.usuario_actual
-        }
-        self._enviar_paquete("MENSAJE", contenido, destino=destino)
-
-    def obtener_usuarios(self):
-        if not self._validar_conexion(): return
-        print("Solicitando lista de usuarios...")
-        self._enviar_paquete("SOLICITAR_USUARIOS", {})
-
-    def _enviar_paquete(self, tipo, contenido, destino="SERVIDOR"):
-        paquete = PaqueteDTO(
-            tipo=tipo,
-            contenido=contenido,
-            origen=self.usuario_actual if self.usuario_actual else "ANONIMO",
-import threading
-import time
-import os
-import sys
-import socket # Added for socket operations
-
-# --- CONFIGURACIÓN DE RUTAS ROBUSTA ---
-current_dir = os.path.dirname(os.path.abspath(__file__))
-# Subir hasta encontrar la carpeta chatTCP
-chat_root = os.path.abspath(os.path.join(current_dir, '..', '..', '..'))
-if chat_root not in sys.path:
-    sys.path.insert(0, chat_root)
-
-from src.PaqueteDTO.PaqueteDTO import PaqueteDTO
-from src.Red.EnsambladorRed import EnsambladorRed, ConfigRed
-from src.ComponenteReceptor.IReceptor import IReceptor
-from src.Red.Cifrado.seguridad import GestorSeguridad
-
-class ReceptorCliente(IReceptor):
-    def __init__(self):
-        self.callback = None
-
-    def set_callback(self, funcion):
-        self.callback = funcion
+    def set_confirmador_compresion(self, funcion):
+        self.confirmador_compresion = funcion
 
     def recibir_cambio(self, paquete: PaqueteDTO) -> None:
+        # LOGIN_OK confirma la suite y la compresión de la sesión; la UI sigue
+        # recibiendo solo el usuario
+        if paquete.tipo == "LOGIN_OK" and isinstance(paquete.contenido, dict):
+            if self.confirmador_suite:
+                self.confirmador_suite(paquete.contenido.get("suite"))
+            if self.confirmador_compresion:
+                self.confirmador_compresion(paquete.contenido.get("compresion"))
+            paquete.contenido = paquete.contenido.get("usuario")
+
         if self.callback:
             try:
                 self.callback(paquete)
@@ -164,15 +55,25 @@ class ReceptorCliente(IReceptor):
         else:
             print(f"[ReceptorCliente] Paquete recibido sin callback: {paquete.tipo}")
 
+        # Mensajes entregados desde el almacén offline del servidor
+        if paquete.tipo == "MENSAJE" and isinstance(paquete.contenido, dict) and "id_offline" in paquete.contenido:
+            if self.confirmador_offline:
+                self.confirmador_offline(paquete.contenido["id_offline"])
+
 
 class LogicaCliente:
-    def __init__(self):
-        self.ensamblador = EnsambladorRed.obtener_instancia()
+    def __init__(self, ensamblador=None, host_servidor="127.0.0.1", puerto_servidor=5555, ruta_pem=None):
+        # Sin ensamblador se usa el singleton (la GUI); varios clientes en un
+        # proceso pasan cada uno EnsambladorRed.crear_independiente()
+        self.ensamblador = ensamblador or EnsambladorRed.obtener_instancia()
         self.gestor_seguridad = GestorSeguridad()
 
-        self.host_servidor = "127.0.0.1"
-        self.puerto_servidor = 5555
+        self.host_servidor = host_servidor
+        self.puerto_servidor = puerto_servidor
 
+        self.ruta_pem = ruta_pem or os.path.join(chat_root, "server_public.pem")
+        self._pem_servidor = b""
+        self.sesion_x25519 = None
         llave_servidor = self._cargar_llave_servidor()
         
         if not llave_servidor:
@@ -186,16 +87,35 @@ class LogicaCliente:
             puerto_escucha=0,       
             host_destino=self.host_servidor,
             puerto_destino=self.puerto_servidor,
-            llave_publica_destino=llave_servidor
+            llave_publica_destino=llave_servidor,
+            # Hasta que el servidor confirme otra suite en LOGIN_OK se envía
+            # con FERNET, que entiende cualquier servidor
+            suite_cifrado=SUITE_FERNET,
+            # Un solo destino (el servidor): las ráfagas pueden viajar en un LOTE
+            espera_lote=0.005,
+            # Igual que la suite: sin comprimir hasta que LOGIN_OK confirme una
+            compresion=None
         )
 
         self.receptor_interno = ReceptorCliente()
+        self.receptor_interno.set_confirmador_offline(self.confirmar_offline)
+        self.receptor_interno.set_confirmador_suite(self.usar_suite)
+        self.receptor_interno.set_confirmador_compresion(self.usar_compresion)
+        self._lock_confirmacion = threading.Lock()
+        self._confirmar_hasta = 0
+        self._timer_confirmacion = None
 
         try:
             print("[LogicaCliente] Ensamblando red...")
             self.emisor = self.ensamblador.ensamblar(self.receptor_interno, config)
             time.sleep(1.0) 
 
+            # Sesión X25519 si el servidor publica su llave: los paquetes ya no
+            # necesitan una operación RSA (si no, se sigue con el híbrido)
+            id_sesion = self.ensamblador.establecer_sesion_x25519(self._pem_servidor)
+            if id_sesion is not None:
+                self.sesion_x25519 = base64.b64encode(id_sesion).decode('utf-8')
+
             if self.ensamblador._servidor:
                 self.mi_puerto = self.ensamblador._servidor.get_puerto()
                 self.mi_host = "127.0.0.1"
@@ -214,6 +134,14 @@ class LogicaCliente:
     def set_callback(self, funcion):
         self.receptor_interno.set_callback(funcion)
 
+    def set_callback_entregas(self, funcion):
+        """funcion(id_mensaje, estado, latencia): estado es "confirmado", "sin_confirmacion" o "fallido" """
+        self.ensamblador.agregar_observador_entregas(funcion)
+
+    def metricas_entregas(self):
+        """ACKs, retransmisiones e histograma de latencia de confirmación de los mensajes enviados"""
+        return self.ensamblador.obtener_metricas_entregas()
+
     def registrar(self, usuario, password):
         if not self._validar_conexion(): return
 
@@ -224,7 +152,9 @@ class LogicaCliente:
             "password": password,
             "puerto_escucha": self.mi_puerto,
             "host_escucha": self.mi_host,
-            "public_key": public_key_pem
+            "public_key": public_key_pem,
+            "suites": list(SUITES),
+            "x25519": self.sesion_x25519
         }
         self._enviar_paquete("REGISTRO", contenido)
 
@@ -240,23 +170,67 @@ class LogicaCliente:
             "puerto_escucha": self.mi_puerto,
             "host_escucha": self.mi_host,
             "public_key": public_key_pem,
+            "suites": list(SUITES),
+            "x25519": self.sesion_x25519,
+            "compresion": list(COMPRESIONES),
         }
         self._enviar_paquete("LOGIN", contenido)
 
     def enviar_mensaje(self, mensaje, destino="TODOS"):
-        if not self._validar_conexion(): return
+        """Envía un mensaje y retorna su id_mensaje (el que llega al callback de entregas)"""
+        if not self._validar_conexion(): return None
 
         contenido = {
             "mensaje": mensaje,
             "remitente": self.usuario_actual
         }
-        self._enviar_paquete("MENSAJE", contenido, destino=destino)
+        return self._enviar_paquete("MENSAJE", contenido, destino=destino).id_mensaje
+
+    def usar_suite(self, suite):
+        """Cambia a la suite que el servidor confirmó en LOGIN_OK (si la soportamos)"""
+        if suite in SUITES:
+            self.ensamblador.establecer_suite(suite)
+
+    def usar_compresion(self, compresion):
+        """Comprime con el algoritmo que el servidor confirmó en LOGIN_OK (si lo soportamos)"""
+        if compresion in COMPRESIONES:
+            self.ensamblador.establecer_compresion(compresion)
+
+    def confirmar_offline(self, id_offline):
+        """Agrupa las confirmaciones de mensajes offline en un solo ACK acumulativo"""
+        with self._lock_confirmacion:
+            self._confirmar_hasta = max(self._confirmar_hasta, id_offline)
+            if self._timer_confirmacion is None:
+                self._timer_confirmacion = threading.Timer(0.2, self._enviar_confirmacion_offline)
+                self._timer_confirmacion.daemon = True
+                self._timer_confirmacion.start()
+
+    def _enviar_confirmacion_offline(self):
+        with self._lock_confirmacion:
+            hasta = self._confirmar_hasta
+            self._timer_confirmacion = None
+        if self.emisor is None: return
+        self._enviar_paquete("CONFIRMAR_OFFLINE", {"hasta": hasta})
+
+    def solicitar_historial(self, con="TODOS", cursor=None, limite=50):
+        """Pide al servidor una página del historial (la respuesta llega como paquete HISTORIAL)"""
+        if not self._validar_conexion(): return
+        self._enviar_paquete("HISTORIAL", {"con": con, "cursor": cursor, "limite": limite})
+
+    def buscar_mensajes(self, texto, pagina=0, limite=20):
+        """Busca en los mensajes guardados (la respuesta llega como paquete BUSCAR)"""
+        if not self._validar_conexion(): return
+        self._enviar_paquete("BUSCAR", {"texto": texto, "pagina": pagina, "limite": limite})
 
     def obtener_usuarios(self):
         if not self._validar_conexion(): return
         print("Solicitando lista de usuarios...")
         self._enviar_paquete("SOLICITAR_USUARIOS", {})
 
+    def detener(self):
+        """Envía lo pendiente y cierra el servidor de escucha del cliente"""
+        self.ensamblador.detener()
+
     def _enviar_paquete(self, tipo, contenido, destino="SERVIDOR"):
         paquete = PaqueteDTO(
             tipo=tipo,
@@ -267,6 +241,7 @@ class LogicaCliente:
             puerto_destino=self.puerto_servidor
         )
         self.emisor.enviar_cambio(paquete)
+        return paquete
 
     def verificar_estado_servidor(self):
         """Intenta conectar al servidor para verificar si está activo"""
@@ -292,11 +267,12 @@ class LogicaCliente:
         return True
 
     def _cargar_llave_servidor(self):
-        ruta_pem = os.path.join(chat_root, "server_public.pem")
+        ruta_pem = self.ruta_pem
         if os.path.exists(ruta_pem):
             try:
                 with open(ruta_pem, "rb") as f:
-                    return self.gestor_seguridad.importar_publica(f.read())
+                    self._pem_servidor = f.read()
+                return self.gestor_seguridad.importar_publica(self._pem_servidor)
             except Exception as e:
                 print(f"[LogicaCliente] Error leyendo llave: {e}")
                 return None
@@ -304,4 +280,22 @@ class LogicaCliente:
             print(f"[LogicaCliente] NO SE ENCONTRÓ {ruta_pem}.")
             return None
 
-gestor_cliente = LogicaCliente()
\ No newline at end of file
+_gestor_cliente = None
+_lock_gestor = threading.Lock()
+
+
+def obtener_gestor_cliente():
+    """
+    LogicaCliente compartido por las ventanas de la GUI
+
+    Se crea al primer uso: importar este módulo no genera llaves ni abre el
+    puerto de escucha (la CLI y el modo carga arman sus propios clientes).
+
+    Returns:
+        La misma instancia de LogicaCliente en todo el proceso
+    """
+    global _gestor_cliente
+    with _lock_gestor:
+        if _gestor_cliente is None:
+            _gestor_cliente = LogicaCliente()
+        return _gestor_cliente
\ No newline at end of file
@@ -40,3 +40,20 @@ class MensajeDTO:
             "fechaHora": self.fechaHora.isoformat(),
             "usuario": str(self.usuario) if self.usuario else None
         }
+
+    @staticmethod
+    def from_dict(datos: dict) -> 'MensajeDTO':
+        """
+        Reconstruye un mensaje desde el diccionario generado por to_dict().
+
+        Args:
+            datos: dict con los datos del mensaje
+
+        Returns:
+            MensajeDTO (el usuario completo no viaja, queda en None)
+        """
+        return MensajeDTO(
+            nombreUsuario=datos["nombreUsuario"],
+            contenidoMensaje=datos["contenidoMensaje"],
+            fechaHora=datetime.fromisoformat(datos["fechaHora"])
+        )
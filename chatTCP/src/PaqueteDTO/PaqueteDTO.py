@@ -3,7 +3,7 @@ PaqueteDTO: Clase que representa información enviada por red en formato JSON
 Compatible con arquitectura EventBus
 """
 import json
-from typing import Any, Optional
+from typing import Any, Dict, Optional
 
 
 class PaqueteDTO:
@@ -21,7 +21,11 @@ class PaqueteDTO:
             host: Optional[str] = None,
             puerto_origen: Optional[int] = None,
             puerto_destino: Optional[int] = None,
-            llave_publica_origen: Optional[bytes] = None
+            llave_publica_origen: Optional[bytes] = None,
+            seq: Optional[int] = None,
+            id_mensaje: Optional[str] = None,
+            sesion: Optional[str] = None,
+            traza: Optional[Dict[str, Any]] = None
     ):
         """
         Inicializa un paquete de red
@@ -35,6 +39,12 @@ class PaqueteDTO:
             puerto_origen: Puerto de origen
             puerto_destino: Puerto de destino
             llave_publica_origen: Llave pública RSA del origen (en bytes)
+            seq: Número de secuencia del emisor hacia este destino (desde 1)
+            id_mensaje: Identificador único del paquete
+            sesion: Identificador de la sesión del emisor (sus seq son
+                monótonos dentro de ella)
+            traza: Contexto de traza (id y marcas de tiempo en µs) si el
+                paquete se está trazando
         """
         self.tipo = tipo
         self.contenido = contenido
@@ -44,12 +54,17 @@ class PaqueteDTO:
         self.puerto_origen = puerto_origen
         self.puerto_destino = puerto_destino
         self.llave_publica_origen = llave_publica_origen
+        self.seq = seq
+        self.id_mensaje = id_mensaje
+        self.sesion = sesion
+        self.traza = traza
 
     def to_json(self) -> str:
         """
         Serializa el paquete a formato JSON
 
-        Nota: llave_publica_origen se codifica en base64 para serialización JSON
+        Nota: llave_publica_origen se codifica en base64 para serialización JSON;
+        seq, id_mensaje, sesion y traza se omiten si no están asignados
 
         Returns:
             String JSON representando el paquete
@@ -60,6 +75,9 @@ class PaqueteDTO:
         # Convertir llave pública a base64 si existe
         if data.get('llave_publica_origen'):
             data['llave_publica_origen'] = base64.b64encode(data['llave_publica_origen']).decode('utf-8')
+        for campo in ('seq', 'id_mensaje', 'sesion', 'traza'):
+            if data[campo] is None:
+                del data[campo]
 
         return json.dumps(data, ensure_ascii=False)
 
@@ -92,7 +110,11 @@ class PaqueteDTO:
             host=data.get('host'),
             puerto_origen=data.get('puerto_origen'),
             puerto_destino=data.get('puerto_destino'),
-            llave_publica_origen=llave_publica
+            llave_publica_origen=llave_publica,
+            seq=data.get('seq'),
+            id_mensaje=data.get('id_mensaje'),
+            sesion=data.get('sesion'),
+            traza=data.get('traza')
         )
 
     def __str__(self) -> str:
@@ -0,0 +1,101 @@
+"""
+Cola de eventos para la interfaz
+Los hilos de red solo encolan; el mainloop de Tk vacía la cola en lotes
+con un `after` periódico y redibuja una vez por lote
+"""
+import logging
+from collections import deque
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ColaEventosUI:
+    """
+    Lleva eventos de cualquier hilo al hilo de Tk
+
+    `procesar` se llama en el hilo de Tk para cada evento y devuelve True si
+    el evento cambió algo que hay que redibujar; `redibujar` se llama una
+    sola vez al final de cada lote que tuvo cambios
+    """
+
+    def __init__(self, raiz, procesar: Callable[[Any], bool], redibujar: Callable[[], None],
+                 intervalo_ms: int = 30, max_lote: int = 500):
+        """
+        Args:
+            raiz: Widget de Tk que agenda los `after`
+            procesar: fn(evento) -> bool, corre en el hilo de Tk
+            redibujar: fn() que actualiza la pantalla tras un lote con cambios
+            intervalo_ms: Cada cuánto se vacía la cola
+            max_lote: Máximo de eventos por vuelta (el resto espera a la
+                siguiente para no congelar la ventana)
+        """
+        self.raiz = raiz
+        self._procesar = procesar
+        self._redibujar = redibujar
+        self.intervalo_ms = intervalo_ms
+        self.max_lote = max_lote
+
+        # deque.append / popleft son atómicos: no hace falta lock para encolar
+        self._eventos = deque()
+        self._tarea: Optional[str] = None
+        self.metricas = {"eventos": 0, "lotes": 0, "redibujados": 0, "errores": 0}
+
+    def publicar(self, evento: Any):
+        """Encola un evento; seguro desde cualquier hilo"""
+        self._eventos.append(evento)
+
+    def pendientes(self) -> int:
+        return len(self._eventos)
+
+    def iniciar(self):
+        """Empieza a vaciar la cola periódicamente (llamar desde el hilo de Tk)"""
+        if self._tarea is None:
+            self._tarea = self.raiz.after(self.intervalo_ms, self._vuelta)
+
+    def detener(self):
+        if self._tarea is not None:
+            self.raiz.after_cancel(self._tarea)
+            self._tarea = None
+
+    def _vuelta(self):
+        try:
+            self.drenar()
+        finally:
+            self._tarea = self.raiz.after(self.intervalo_ms, self._vuelta)
+
+    def drenar(self) -> int:
+        """
+        Procesa hasta `max_lote` eventos y redibuja una vez si hubo cambios
+
+        Returns:
+            Número de eventos procesados
+        """
+        procesados = 0
+        cambios = False
+        errores = 0
+        while procesados < self.max_lote:
+            try:
+                evento = self._eventos.popleft()
+            except IndexError:
+                break
+            procesados += 1
+            try:
+                cambios = bool(self._procesar(evento)) or cambios
+            except Exception:
+                errores += 1
+                logger.exception("Error procesando evento de la interfaz")
+
+        if cambios:
+            try:
+                self._redibujar()
+            except Exception:
+                errores += 1
+                logger.exception("Error redibujando la interfaz")
+
+        if procesados:
+            self.metricas["eventos"] += procesados
+            self.metricas["lotes"] += 1
+            self.metricas["redibujados"] += int(cambios)
+            self.metricas["errores"] += errores
+        return procesados
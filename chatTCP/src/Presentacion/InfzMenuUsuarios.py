@@ -7,140 +7,55 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 root_dir = os.path.dirname(os.path.dirname(current_dir))
 sys.path.insert(0, root_dir)
 
-from chatTCP.src.Presentacion.ObjetosPresentacion.UsuarioOP import UsuariosOP
+from chatTCP.src.Presentacion.ObjetosPresentacion.IndiceUsuariosOP import IndiceUsuariosOP
+from chatTCP.src.Presentacion.Observadores.INotificadorNuevoMensaje import INotificadorNuevoMensaje
 from chatTCP.src.Presentacion.chatindividual import VentanaChat
-from chatTCP.src.ModeloChatTCP.ChatTCP.LogicaCliente import gestor_cliente
+from chatTCP.src.Presentacion.ListaVirtual import ListaVirtual
+from chatTCP.src.Presentacion.ColaEventosUI import ColaEventosUI
+from chatTCP.src.ModeloChatTCP.ChatTCP.LogicaCliente import obtener_gestor_cliente
 
-class MenuPrincipal(tk.Tk):
-    def __init__(self, usuario_actual):
-        super().__init__()
-        self.usuario_actual = usuario_actual
-        self.title(f"ChatTCP - {usuario_actual}")
-        self.geometry("450x650")
-        self.configure(bg="#f0f2f5")
-
-        self.chats_abiertos = {}
-        self.usuarios_op = []
-
-        gestor_cliente.set_callback(self.procesar_paquete_red)
-        self._init_ui()
-        self.after(1000, gestor_cliente.obtener_usuarios)
-
-    def _init_ui(self):
-        header = tk.Frame(self, bg="#008069", height=60)
-        header.pack(fill="x")
-        tk.Label(header, text="Usuarios en Línea", bg="#008069", fg="white", font=("Arial", 14, "bold")).place(relx=0.5, rely=0.5, anchor="center")
-        
-        tk.Button(header, text="⟳", command=gestor_cliente.obtener_usuarios, bg="#006d59", fg="white", bd=0).place(relx=0.9, rely=0.5, anchor="center")
-
-        self.canvas = tk.Canvas(self, bg="#f0f2f5", highlightthickness=0)
-        self.scrollbar = tk.Scrollbar(self, orient="vertical", command=self.canvas.yview)
-        self.scrollable_frame = tk.Frame(self.canvas, bg="#f0f2f5")
-
-        self.scrollable_frame.bind("<Configure>", lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all")))
-        self.canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw", width=430)
-        self.canvas.configure(yscrollcommand=self.scrollbar.set)
-
-        self.canvas.pack(side="left", fill="both", expand=True, padx=5, pady=5)
-        self.scrollbar.pack(side="right", fill="y")
+ALTO_FILA = 64
+LARGO_VISTA_PREVIA = 25
 
-    def renderizar_lista(self):
-        for widget in self.scrollable_frame.winfo_children():
-            widget.destroy()
 
-        if not self.usuarios_op:
-            tk.Label(self.scrollable_frame, text="Sin usuarios conectados", bg="#f0f2f5").pack(pady=20)
-            return
+def vista_previa(texto):
+    return texto[:LARGO_VISTA_PREVIA] + "..." if len(texto) > LARGO_VISTA_PREVIA else texto
 
-        for user in self.usuarios_op:
-            if user.nombre == self.usuario_actual: continue
 
-            card = tk.Frame(self.scrollable_frame, bg="white", padx=10, pady=10)
-            card.pack(fill="x", pady=2, padx=5)
-            card.bind("<Button-1>", lambda e, u=user: self.abrir_chat(u))
-            
-            # Avatar
-            tk.Label(card, text=user.nombre[0].upper(), bg="#128C7E", fg="white", width=4, height=2, font=("Arial", 10, "bold")).pack(side="left", padx=(0, 10))
-            
-            # Info
-            info = tk.Frame(card, bg="white")
-            info.pack(side="left", fill="x", expand=True)
-            tk.Label(info, text=user.nombre, font=("Arial", 11, "bold"), bg="white", anchor="w").pack(fill="x")
-            
-            msg_preview = user.ultimo_mensaje[:25] + "..." if len(user.ultimo_mensaje) > 25 else user.ultimo_mensaje
-            tk.Label(info, text=msg_preview, font=("Arial", 9), fg="#666", bg="white", anchor="w").pack(fill="x")
+class FilaUsuario(tk.Frame):
+    """Tarjeta de un usuario; se reutiliza para otro usuario al desplazarse"""
 
-            if user.totalMsjNuevos > 0:
-                tk.Label(card, text=str(user.totalMsjNuevos), bg="#25D366", fg="white", font=("Arial", 8, "bold"), width=3).pack(side="right")
+    def __init__(self, parent, al_abrir):
+        super().__init__(parent, bg="white", padx=10, pady=10)
+        self.usuario = None
+        self.avatar = tk.Label(self, bg="#128C7E", fg="white", width=4, height=2, font=("Arial", 10, "bold"))
+        self.avatar.pack(side="left", padx=(0, 10))
 
-            # Bind children
-            for child in info.winfo_children():
-                child.bind("<Button-1>", lambda e, u=user: self.abrir_chat(u))
+        self.contador = tk.Label(self, bg="#25D366", fg="white", font=("Arial", 8, "bold"), width=3)
 
-    def abrir_chat(self, usuario_op):
-        usuario_op.totalMsjNuevos = 0
-        self.renderizar_lista()
-
-        if usuario_op.nombre in self.chats_abiertos:
-            try:
-                self.chats_abiertos[usuario_op.nombre].lift()
-                return
-            except tk.TclError:
-                del self.chats_abiertos[usuario_op.nombre]
-
-        ventana = VentanaChat(self, usuario_op, gestor_cliente)
-        self.chats_abiertos[usuario_op.nombre] = ventana
-
-    def procesar_paquete_red(self, paquete):
-        print(f"[Menu] Recibido: {paquete.tipo}")
-        
-        if paquete.tipo == "LISTA_USUARIOS":
-            nombres = paquete.contenido
-            nuevos_ops = []
-            mapa_actual = {u.nombre: u for u in self.usuarios_op}
-            
-            for nombre in nombres:
-                if nombre == "Usuarios conectados...": continue
-                if nombre in mapa_actual:
-                    nuevos_ops.append(mapa_actual[nombre])
-                else:
-                    nuevos_ops.append(UsuariosOP(nombre, "Disponible", "#128C7E", 0))
-            
-            self.usuarios_op = nuevos_ops
-            self.after(0, self.renderizar_lista)
+        info = tk.Frame(self, bg="white")
+        info.pack(side="left", fill="x", expand=True)
+        self.nombre = tk.Label(info, font=("Arial", 11, "bold"), bg="white", anchor="w")
+        self.nombre.pack(fill="x")
+        self.mensaje = tk.Label(info, font=("Arial", 9), fg="#666", bg="white", anchor="w")
+        self.mensaje.pack(fill="x")
 
-        elif paquete.tipo == "MENSAJE":
-            remitente = paquete.origen
-            contenido = paquete.contenido.get("mensaje", "")
-            
-            if remitente in self.chats_abiertos:
-                try:
-                    self.chats_abiertos[remitente].mostrar_mensaje(remitente, contenido)
-                    return
-                except tk.TclError:
-                    del self.chats_abiertos[remitente]
-
-            encontrado = False
-            for u in self.usuarios_op:
-                if u.nombre == remitente:
-                    u.totalMsjNuevos += 1
-                    u.ultimo_mensaje = contenido
-                    encontrado = True
-                    break
-import tkinter as tk
-from tkinter import messagebox
-import sys
-import os
+        for widget in (self, info, self.nombre, self.mensaje):
+            widget.bind("<Button-1>", lambda e: al_abrir(self.usuario))
 
-current_dir = os.path.dirname(os.path.abspath(__file__))
-root_dir = os.path.dirname(os.path.dirname(current_dir))
-sys.path.insert(0, root_dir)
+    def mostrar(self, user):
+        self.usuario = user
+        self.avatar.config(text=user.nombre[0].upper())
+        self.nombre.config(text=user.nombre)
+        self.mensaje.config(text=vista_previa(user.ultimo_mensaje))
+        if user.totalMsjNuevos > 0:
+            self.contador.config(text=str(user.totalMsjNuevos))
+            self.contador.pack(side="right")
+        else:
+            self.contador.pack_forget()
 
-from chatTCP.src.Presentacion.ObjetosPresentacion.UsuarioOP import UsuariosOP
-from chatTCP.src.Presentacion.chatindividual import VentanaChat
-from chatTCP.src.ModeloChatTCP.ChatTCP.LogicaCliente import gestor_cliente
 
-class MenuPrincipal(tk.Tk):
+class MenuPrincipal(tk.Tk, INotificadorNuevoMensaje):
     def __init__(self, usuario_actual):
         super().__init__()
         self.usuario_actual = usuario_actual
@@ -149,66 +64,51 @@ class MenuPrincipal(tk.Tk):
         self.configure(bg="#f0f2f5")
 
         self.chats_abiertos = {}
-        self.usuarios_op = []
-
-        gestor_cliente.set_callback(self.procesar_paquete_red)
+        self.usuarios = IndiceUsuariosOP()
+        self.usuarios.agregar_observador(self)
+        self._pedir_usuarios = False
+        # Qué redibujar al final del lote: la lista entera o solo las filas
+        self._lista_cambiada = False
+        self._filas_cambiadas = False
+        # Mensajes para chats abiertos, se insertan de a lote en cada ventana
+        self._pendientes_chat = {}
+
+        # Los paquetes llegan en el hilo de red; Tk solo se toca desde el mainloop
+        self.eventos = ColaEventosUI(self, self._aplicar_paquete, self._redibujar)
+        obtener_gestor_cliente().set_callback(self.procesar_paquete_red)
         self._init_ui()
-        self.after(1000, gestor_cliente.obtener_usuarios)
+        self.eventos.iniciar()
+        self.after(1000, obtener_gestor_cliente().obtener_usuarios)
 
     def _init_ui(self):
         header = tk.Frame(self, bg="#008069", height=60)
         header.pack(fill="x")
         tk.Label(header, text="Usuarios en Línea", bg="#008069", fg="white", font=("Arial", 14, "bold")).place(relx=0.5, rely=0.5, anchor="center")
         
-        tk.Button(header, text="⟳", command=gestor_cliente.obtener_usuarios, bg="#006d59", fg="white", bd=0).place(relx=0.9, rely=0.5, anchor="center")
+        tk.Button(header, text="⟳", command=obtener_gestor_cliente().obtener_usuarios, bg="#006d59", fg="white", bd=0).place(relx=0.9, rely=0.5, anchor="center")
 
         self.canvas = tk.Canvas(self, bg="#f0f2f5", highlightthickness=0)
-        self.scrollbar = tk.Scrollbar(self, orient="vertical", command=self.canvas.yview)
-        self.scrollable_frame = tk.Frame(self.canvas, bg="#f0f2f5")
-
-        self.scrollable_frame.bind("<Configure>", lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all")))
-        self.canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw", width=430)
+        self.lista = ListaVirtual(self.canvas, ALTO_FILA,
+                                  crear_fila=lambda parent: FilaUsuario(parent, self.abrir_chat),
+                                  mostrar_fila=FilaUsuario.mostrar,
+                                  clave=lambda u: u.nombre,
+                                  firma=lambda u: (vista_previa(u.ultimo_mensaje), u.totalMsjNuevos))
+        self.scrollbar = tk.Scrollbar(self, orient="vertical", command=self.lista.yview)
         self.canvas.configure(yscrollcommand=self.scrollbar.set)
+        self.sin_usuarios = self.canvas.create_text(215, 30, text="Sin usuarios conectados", state="hidden")
 
         self.canvas.pack(side="left", fill="both", expand=True, padx=5, pady=5)
         self.scrollbar.pack(side="right", fill="y")
 
     def renderizar_lista(self):
-        for widget in self.scrollable_frame.winfo_children():
-            widget.destroy()
-
-        if not self.usuarios_op:
-            tk.Label(self.scrollable_frame, text="Sin usuarios conectados", bg="#f0f2f5").pack(pady=20)
-            return
-
-        for user in self.usuarios_op:
-            if user.nombre == self.usuario_actual: continue
-
-            card = tk.Frame(self.scrollable_frame, bg="white", padx=10, pady=10)
-            card.pack(fill="x", pady=2, padx=5)
-            card.bind("<Button-1>", lambda e, u=user: self.abrir_chat(u))
-            
-            # Avatar
-            tk.Label(card, text=user.nombre[0].upper(), bg="#128C7E", fg="white", width=4, height=2, font=("Arial", 10, "bold")).pack(side="left", padx=(0, 10))
-            
-            # Info
-            info = tk.Frame(card, bg="white")
-            info.pack(side="left", fill="x", expand=True)
-            tk.Label(info, text=user.nombre, font=("Arial", 11, "bold"), bg="white", anchor="w").pack(fill="x")
-            
-            msg_preview = user.ultimo_mensaje[:25] + "..." if len(user.ultimo_mensaje) > 25 else user.ultimo_mensaje
-            tk.Label(info, text=msg_preview, font=("Arial", 9), fg="#666", bg="white", anchor="w").pack(fill="x")
-
-            if user.totalMsjNuevos > 0:
-                tk.Label(card, text=str(user.totalMsjNuevos), bg="#25D366", fg="white", font=("Arial", 8, "bold"), width=3).pack(side="right")
-
-            # Bind children
-            for child in info.winfo_children():
-                child.bind("<Button-1>", lambda e, u=user: self.abrir_chat(u))
+        visibles = [u for u in self.usuarios.lista() if u.nombre != self.usuario_actual]
+        self.canvas.itemconfigure(self.sin_usuarios, state="hidden" if visibles else "normal")
+        self.lista.set_elementos(visibles)
 
     def abrir_chat(self, usuario_op):
-        usuario_op.totalMsjNuevos = 0
-        self.renderizar_lista()
+        self.usuarios.marcar_leido(usuario_op.nombre)
+        self.lista.refrescar()
+        self._filas_cambiadas = False
 
         if usuario_op.nombre in self.chats_abiertos:
             try:
@@ -217,50 +117,72 @@ class MenuPrincipal(tk.Tk):
             except tk.TclError:
                 del self.chats_abiertos[usuario_op.nombre]
 
-        ventana = VentanaChat(self, usuario_op, gestor_cliente)
+        ventana = VentanaChat(self, usuario_op, obtener_gestor_cliente())
         self.chats_abiertos[usuario_op.nombre] = ventana
 
     def procesar_paquete_red(self, paquete):
         print(f"[Menu] Recibido: {paquete.tipo}")
-        
+        self.eventos.publicar(paquete)
+
+    def _aplicar_paquete(self, paquete):
         if paquete.tipo == "LISTA_USUARIOS":
-            nombres = paquete.contenido
-            nuevos_ops = []
-            mapa_actual = {u.nombre: u for u in self.usuarios_op}
-            
-            for nombre in nombres:
-                if nombre == "Usuarios conectados...": continue
-                if nombre in mapa_actual:
-                    nuevos_ops.append(mapa_actual[nombre])
-                else:
-                    nuevos_ops.append(UsuariosOP(nombre, "Disponible", "#128C7E", 0))
-            
-            self.usuarios_op = nuevos_ops
-            self.after(0, self.renderizar_lista)
+            self.usuarios.sincronizar(n for n in paquete.contenido if n != "Usuarios conectados...")
+            return self._lista_cambiada
 
         elif paquete.tipo == "MENSAJE":
             remitente = paquete.origen
             contenido = paquete.contenido.get("mensaje", "")
             
             if remitente in self.chats_abiertos:
+                if self.chats_abiertos[remitente].winfo_exists():
+                    self._pendientes_chat.setdefault(remitente, []).append((remitente, contenido, False, None))
+                    return True
+                del self.chats_abiertos[remitente]
+
+            if self.usuarios.registrar_mensaje(remitente, contenido) is None:
+                self._pedir_usuarios = True
+            return True
+
+        elif paquete.tipo == "HISTORIAL":
+            datos = paquete.contenido
+            ventana = self.chats_abiertos.get(datos.get("con"))
+            if ventana is not None:
                 try:
-                    self.chats_abiertos[remitente].mostrar_mensaje(remitente, contenido)
-                    return
+                    ventana.mostrar_historial(datos.get("mensajes", []), datos.get("cursor"), datos.get("pedido"))
                 except tk.TclError:
-                    del self.chats_abiertos[remitente]
-
-            encontrado = False
-            for u in self.usuarios_op:
-                if u.nombre == remitente:
-                    u.totalMsjNuevos += 1
-                    u.ultimo_mensaje = contenido
-                    encontrado = True
-                    break
-            
-            if not encontrado:
-                gestor_cliente.obtener_usuarios()
-            
-            self.after(0, self.renderizar_lista)
+                    del self.chats_abiertos[datos.get("con")]
+
+        return False
+
+    def _redibujar(self):
+        pendientes, self._pendientes_chat = self._pendientes_chat, {}
+        for remitente, mensajes in pendientes.items():
+            try:
+                self.chats_abiertos[remitente].mostrar_mensajes(mensajes)
+            except (KeyError, tk.TclError):
+                self.chats_abiertos.pop(remitente, None)
+
+        # Una ráfaga de mensajes de desconocidos pide la lista una sola vez
+        if self._pedir_usuarios:
+            self._pedir_usuarios = False
+            obtener_gestor_cliente().obtener_usuarios()
+
+        if self._lista_cambiada:
+            self.renderizar_lista()
+        elif self._filas_cambiadas:
+            self.lista.refrescar()
+        self._lista_cambiada = self._filas_cambiadas = False
+
+        no_leidos = self.usuarios.total_no_leidos
+        self.title(f"ChatTCP - {self.usuario_actual}" + (f" ({no_leidos})" if no_leidos else ""))
+
+    # ========== Métodos de INotificadorNuevoMensaje ==========
+
+    def actualizar(self, usuario_op):
+        self._filas_cambiadas = True
+
+    def lista_cambiada(self, agregados, quitados):
+        self._lista_cambiada = True
 
 if __name__ == "__main__":
     usuario = sys.argv[1] if len(sys.argv) > 1 else "TestUser"
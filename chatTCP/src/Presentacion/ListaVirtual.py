@@ -0,0 +1,166 @@
+"""
+Lista virtualizada sobre un Canvas de Tk
+Solo existen widgets para las filas visibles (más un margen); al cambiar los
+datos o al desplazarse se comparan las filas por clave y solo se crean,
+actualizan o esconden las que cambiaron
+"""
+from typing import Any, Callable, Dict, Hashable, List, Sequence, Tuple
+
+
+def rango_visible(arriba: float, alto_vista: float, alto_fila: int, total: int, margen: int = 2) -> Tuple[int, int]:
+    """
+    Calcula qué filas se ven en la vista
+
+    Args:
+        arriba: Coordenada y del canvas en el borde superior de la vista
+        alto_vista: Alto de la vista en píxeles
+        alto_fila: Alto fijo de cada fila
+        total: Número de filas de la lista
+        margen: Filas extra por arriba y por abajo (desplazamiento suave)
+
+    Returns:
+        (primera, última) como rango semiabierto [primera, última)
+    """
+    primera = max(0, int(arriba // alto_fila) - margen)
+    ultima = min(total, int((arriba + alto_vista) // alto_fila) + 1 + margen)
+    return primera, max(primera, ultima)
+
+
+def planificar(mostradas: Dict[Hashable, Tuple[int, Any]],
+               deseadas: Sequence[Tuple[Hashable, Any]], primera: int):
+    """
+    Compara las filas que hay en pantalla con las que deberían verse
+
+    Args:
+        mostradas: clave -> (índice, firma) de las filas que tienen widget
+        deseadas: (clave, firma) de las filas visibles, en orden
+        primera: Índice de la primera fila deseada
+
+    Returns:
+        Tupla (nuevas, movidas, cambiadas, quitadas): índices de filas sin
+        widget, índices de filas que cambiaron de posición, índices de filas
+        cuya firma cambió y claves que ya no se ven
+    """
+    nuevas, movidas, cambiadas = [], [], []
+    vistas = set()
+    for desplazamiento, (clave, firma) in enumerate(deseadas):
+        indice = primera + desplazamiento
+        vistas.add(clave)
+        anterior = mostradas.get(clave)
+        if anterior is None:
+            nuevas.append(indice)
+            continue
+        if anterior[0] != indice:
+            movidas.append(indice)
+        if anterior[1] != firma:
+            cambiadas.append(indice)
+    quitadas = [clave for clave in mostradas if clave not in vistas]
+    return nuevas, movidas, cambiadas, quitadas
+
+
+class ListaVirtual:
+    """
+    Dibuja una lista larga en un Canvas reciclando un puñado de widgets
+
+    Cada elemento se identifica por una clave y una firma (lo que se
+    muestra); una fila se vuelve a configurar solo si su firma cambió
+    """
+
+    def __init__(self, canvas, alto_fila: int, crear_fila: Callable[[Any], Any],
+                 mostrar_fila: Callable[[Any, Any], None], clave: Callable[[Any], Hashable],
+                 firma: Callable[[Any], Any], margen: int = 2):
+        """
+        Args:
+            canvas: tk.Canvas donde se dibuja la lista
+            alto_fila: Alto fijo de cada fila en píxeles
+            crear_fila: fn(canvas) -> widget nuevo de fila
+            mostrar_fila: fn(widget, elemento) que configura la fila
+            clave: fn(elemento) -> clave única del elemento
+            firma: fn(elemento) -> valor comparable con lo que se muestra
+            margen: Filas extra que se mantienen fuera de la vista
+        """
+        self.canvas = canvas
+        self.alto_fila = alto_fila
+        self._crear_fila = crear_fila
+        self._mostrar_fila = mostrar_fila
+        self._clave = clave
+        self._firma = firma
+        self.margen = margen
+
+        self._elementos: List[Any] = []
+        # clave -> (índice, firma, widget, id de ventana en el canvas)
+        self._filas: Dict[Hashable, Tuple[int, Any, Any, int]] = {}
+        self._libres: List[Tuple[Any, int]] = []
+        self._ancho = 0
+        self.metricas = {"creadas": 0, "actualizadas": 0, "movidas": 0, "recicladas": 0}
+
+        canvas.bind("<Configure>", lambda e: self.refrescar(), add="+")
+
+    def set_elementos(self, elementos: Sequence[Any]):
+        """
+        Reemplaza los datos y redibuja solo lo que cambió
+
+        Args:
+            elementos: Elementos en el orden en que se muestran
+        """
+        self._elementos = list(elementos)
+        ancho = self.canvas.winfo_width()
+        self.canvas.configure(scrollregion=(0, 0, ancho, len(self._elementos) * self.alto_fila))
+        self.refrescar()
+
+    def yview(self, *args):
+        """Desplaza la vista (comando del Scrollbar) y dibuja las filas que aparecen"""
+        self.canvas.yview(*args)
+        self.refrescar()
+
+    def refrescar(self):
+        """Ajusta los widgets a las filas visibles y a su contenido actual"""
+        primera, ultima = rango_visible(self.canvas.canvasy(0), self.canvas.winfo_height(),
+                                        self.alto_fila, len(self._elementos), self.margen)
+        visibles = self._elementos[primera:ultima]
+        deseadas = [(self._clave(e), self._firma(e)) for e in visibles]
+        mostradas = {clave: (fila[0], fila[1]) for clave, fila in self._filas.items()}
+        nuevas, movidas, cambiadas, quitadas = planificar(mostradas, deseadas, primera)
+
+        for clave in quitadas:
+            _, _, widget, ventana = self._filas.pop(clave)
+            self.canvas.itemconfigure(ventana, state="hidden")
+            self._libres.append((widget, ventana))
+
+        ancho = self.canvas.winfo_width()
+        if ancho != self._ancho:
+            self._ancho = ancho
+            for _, _, _, ventana in self._filas.values():
+                self.canvas.itemconfigure(ventana, width=ancho)
+        for indice in movidas:
+            clave, firma = deseadas[indice - primera]
+            _, anterior, widget, ventana = self._filas[clave]
+            self.canvas.coords(ventana, 0, indice * self.alto_fila)
+            self._filas[clave] = (indice, anterior, widget, ventana)
+            self.metricas["movidas"] += 1
+
+        for indice in cambiadas:
+            clave, firma = deseadas[indice - primera]
+            _, _, widget, ventana = self._filas[clave]
+            self._mostrar_fila(widget, self._elementos[indice])
+            self._filas[clave] = (indice, firma, widget, ventana)
+            self.metricas["actualizadas"] += 1
+
+        for indice in nuevas:
+            clave, firma = deseadas[indice - primera]
+            if self._libres:
+                widget, ventana = self._libres.pop()
+                self.canvas.coords(ventana, 0, indice * self.alto_fila)
+                self.canvas.itemconfigure(ventana, state="normal", width=ancho)
+                self.metricas["recicladas"] += 1
+            else:
+                widget = self._crear_fila(self.canvas)
+                ventana = self.canvas.create_window(0, indice * self.alto_fila, window=widget, anchor="nw",
+                                                    width=ancho, height=self.alto_fila)
+                self.metricas["creadas"] += 1
+            self._mostrar_fila(widget, self._elementos[indice])
+            self._filas[clave] = (indice, firma, widget, ventana)
+
+    def widgets(self) -> int:
+        """Cantidad de widgets de fila que existen (visibles y reciclables)"""
+        return len(self._filas) + len(self._libres)
@@ -2,28 +2,47 @@
 SE CONECTA CON LA CARPETA MODELOCHATTCP
 AQUI VA LA LOGICA DE VALIDACIONES, REGLAS DE NEGOCIO, ETC
 """
-from chatTCP.src.ModeloChatTCP.ChatTCP.LogicaCliente import gestor_cliente
+from chatTCP.src.ModeloChatTCP.ChatTCP.LogicaCliente import obtener_gestor_cliente
 from chatTCP.src.Presentacion.Observadores.IPublicadorNuevoMensaje import IPublicadorNuevoMensaje
 from chatTCP.src.Presentacion.Observadores.INotificadorNuevoMensaje import INotificadorNuevoMensaje
 from chatTCP.src.Presentacion.ObjetosPresentacion.UsuarioOP import UsuariosOP
+from chatTCP.src.Presentacion.ObjetosPresentacion.IndiceUsuariosOP import IndiceUsuariosOP
 
 class ModeloChatTCP(IPublicadorNuevoMensaje):
 
     def __init__(self, chatTCP):
         # Guardamos el componente real que ejecuta la lógica de red
         self.logicaChatTCP = chatTCP
-        # Lista de observadores para el patrón Observer
-        self._observadores = []
+        # Usuarios conectados por nombre; también lleva los observadores
+        self.usuarios = IndiceUsuariosOP()
 
     def iniciar_sesion(self, nombre_usuario, contrasena):
-       gestor_cliente.login(nombre_usuario, contrasena)
+       obtener_gestor_cliente().login(nombre_usuario, contrasena)
 
     def registrar_usuario(self, nombre_usuario, contrasena):
-        gestor_cliente.registrar(nombre_usuario, contrasena)
+        obtener_gestor_cliente().registrar(nombre_usuario, contrasena)
 
     def enviar_mensaje(self, mensaje,destinatario):
-        gestor_cliente.enviar_mensaje(mensaje, destinatario)
+        obtener_gestor_cliente().enviar_mensaje(mensaje, destinatario)
 
+    def actualizar_usuarios(self, nombres):
+        """
+        Aplica la lista de conectados que mandó el servidor.
+        Los observadores reciben solo los usuarios agregados y quitados.
+
+        Args:
+            nombres: Nombres de los usuarios conectados
+        """
+        return self.usuarios.sincronizar(nombres)
+
+    def recibir_mensaje(self, remitente, texto):
+        """
+        Anota un mensaje sin leer y notifica solo a ese usuario.
+
+        Returns:
+            UsuarioOP del remitente, o None si no está en la lista
+        """
+        return self.usuarios.registrar_mensaje(remitente, texto)
 
 
     def mostrar_chat(self, usuarioOP):
@@ -45,9 +64,8 @@ class ModeloChatTCP(IPublicadorNuevoMensaje):
         Args:
             observador: Objeto que implementa INotificadorNuevoMensaje
         """
-        if observador not in self._observadores:
-            self._observadores.append(observador)
-            print(f"[Modelo] Observador agregado. Total: {len(self._observadores)}")
+        self.usuarios.agregar_observador(observador)
+        print("[Modelo] Observador agregado")
 
     def remover_observador(self, observador: INotificadorNuevoMensaje):
         """
@@ -56,9 +74,8 @@ class ModeloChatTCP(IPublicadorNuevoMensaje):
         Args:
             observador: Objeto que implementa INotificadorNuevoMensaje
         """
-        if observador in self._observadores:
-            self._observadores.remove(observador)
-            print(f"[Modelo] Observador removido. Total: {len(self._observadores)}")
+        self.usuarios.remover_observador(observador)
+        print("[Modelo] Observador removido")
 
     def notificar(self, usuario_op: UsuariosOP):
         """
@@ -68,8 +85,7 @@ class ModeloChatTCP(IPublicadorNuevoMensaje):
         Args:
             usuario_op: UsuarioOP con información actualizada
         """
-        print(f"[Modelo] Notificando a {len(self._observadores)} observadores sobre cambio en {usuario_op.nombre}")
-        for observador in self._observadores:
-            observador.actualizar(usuario_op)
+        print(f"[Modelo] Notificando cambio en {usuario_op.nombre}")
+        self.usuarios.notificar(usuario_op)
 
 #Metodo de enviar msj se pasal el usuarioLogin y se pasa el UsuarioObjPresentacion
\ No newline at end of file
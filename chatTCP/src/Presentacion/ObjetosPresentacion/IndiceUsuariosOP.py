@@ -0,0 +1,117 @@
+"""
+Índice de los usuarios de la presentación
+Guarda los UsuarioOP por nombre (búsqueda O(1) del remitente de cada
+mensaje) junto con el total de mensajes sin leer, y avisa a los
+observadores solo de lo que cambió
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from chatTCP.src.Presentacion.ObjetosPresentacion.UsuarioOP import UsuariosOP
+from chatTCP.src.Presentacion.Observadores.INotificadorNuevoMensaje import INotificadorNuevoMensaje
+from chatTCP.src.Presentacion.Observadores.IPublicadorNuevoMensaje import IPublicadorNuevoMensaje
+
+COLOR_USUARIO = "#128C7E"
+ESTADO_INICIAL = "Disponible"
+
+
+class IndiceUsuariosOP(IPublicadorNuevoMensaje):
+    """
+    Usuarios conectados en el orden que manda el servidor, indexados por nombre
+    """
+
+    def __init__(self):
+        self._por_nombre: Dict[str, UsuariosOP] = {}
+        self._orden: List[UsuariosOP] = []
+        self._observadores: List[INotificadorNuevoMensaje] = []
+        self.total_no_leidos = 0
+
+    def __len__(self):
+        return len(self._orden)
+
+    def __contains__(self, nombre):
+        return nombre in self._por_nombre
+
+    def __iter__(self):
+        return iter(self._orden)
+
+    def obtener(self, nombre: str) -> Optional[UsuariosOP]:
+        return self._por_nombre.get(nombre)
+
+    def lista(self) -> List[UsuariosOP]:
+        """Usuarios en orden (la lista es interna: no modificarla)"""
+        return self._orden
+
+    def sincronizar(self, nombres: Iterable[str]) -> Tuple[List[UsuariosOP], List[UsuariosOP]]:
+        """
+        Aplica una nueva lista de conectados conservando los objetos existentes
+
+        Args:
+            nombres: Nombres conectados, en orden
+
+        Returns:
+            Tupla (agregados, quitados)
+        """
+        anteriores = self._por_nombre
+        nuevos: Dict[str, UsuariosOP] = {}
+        orden: List[UsuariosOP] = []
+        agregados: List[UsuariosOP] = []
+        for nombre in nombres:
+            if nombre in nuevos:
+                continue
+            usuario_op = anteriores.get(nombre)
+            if usuario_op is None:
+                usuario_op = UsuariosOP(nombre, ESTADO_INICIAL, COLOR_USUARIO, 0)
+                agregados.append(usuario_op)
+            nuevos[nombre] = usuario_op
+            orden.append(usuario_op)
+
+        quitados = [u for nombre, u in anteriores.items() if nombre not in nuevos]
+        self.total_no_leidos -= sum(u.totalMsjNuevos for u in quitados)
+        cambio_orden = len(orden) != len(self._orden) or any(a is not b for a, b in zip(orden, self._orden))
+        self._por_nombre = nuevos
+        self._orden = orden
+
+        if agregados or quitados or cambio_orden:
+            for observador in list(self._observadores):
+                observador.lista_cambiada(agregados, quitados)
+        return agregados, quitados
+
+    def registrar_mensaje(self, nombre: str, texto: str) -> Optional[UsuariosOP]:
+        """
+        Anota un mensaje sin leer de `nombre`
+
+        Returns:
+            El UsuarioOP actualizado, o None si el remitente no está en la lista
+        """
+        usuario_op = self._por_nombre.get(nombre)
+        if usuario_op is None:
+            return None
+        usuario_op.totalMsjNuevos += 1
+        usuario_op.ultimo_mensaje = texto
+        self.total_no_leidos += 1
+        self.notificar(usuario_op)
+        return usuario_op
+
+    def marcar_leido(self, nombre: str) -> Optional[UsuariosOP]:
+        """Pone en cero los mensajes sin leer de `nombre`"""
+        usuario_op = self._por_nombre.get(nombre)
+        if usuario_op is None or usuario_op.totalMsjNuevos == 0:
+            return usuario_op
+        self.total_no_leidos -= usuario_op.totalMsjNuevos
+        usuario_op.totalMsjNuevos = 0
+        self.notificar(usuario_op)
+        return usuario_op
+
+    # ========== Métodos de IPublicadorNuevoMensaje ==========
+
+    def agregar_observador(self, observador: INotificadorNuevoMensaje):
+        if observador not in self._observadores:
+            self._observadores.append(observador)
+
+    def remover_observador(self, observador: INotificadorNuevoMensaje):
+        if observador in self._observadores:
+            self._observadores.remove(observador)
+
+    def notificar(self, usuario_op: UsuariosOP):
+        for observador in list(self._observadores):
+            observador.actualizar(usuario_op)
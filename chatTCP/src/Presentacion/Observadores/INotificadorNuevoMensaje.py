@@ -18,3 +18,15 @@ class INotificadorNuevoMensaje(ABC):
                        color, total de mensajes nuevos)
         """
         pass
+
+    def lista_cambiada(self, agregados, quitados):
+        """
+        Método llamado cuando cambia quién está conectado.
+        Solo llegan las diferencias; los usuarios que siguen conectados
+        conservan su objeto y sus mensajes sin leer.
+
+        Args:
+            agregados: Lista de UsuarioOP que se conectaron
+            quitados: Lista de UsuarioOP que se desconectaron
+        """
+        pass
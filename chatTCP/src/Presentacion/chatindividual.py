@@ -1,7 +1,88 @@
 import tkinter as tk
 from tkinter import scrolledtext, ttk
+from collections import Counter, deque
 import datetime
 
+MAX_MENSAJES = 500
+PAGINA_HISTORIAL = 50
+# Si el servidor no contesta una página en este tiempo se puede volver a pedir
+ESPERA_HISTORIAL_MS = 5000
+# Valor de _pedido_historial cuando no se espera ninguna página
+_SIN_PEDIDO = object()
+
+
+def lineas_de(texto):
+    # Encabezado + texto + línea en blanco
+    return texto.count("\n") + 3
+
+
+def quitar_repetidos(filas, en_vivo, desde):
+    """
+    Quita de la primera página del historial los mensajes que ya se
+    mostraron en vivo
+
+    Solo puede estar repetido un mensaje guardado desde que se abrió la
+    ventana, y cada mensaje en vivo tapa a una sola fila: un "ok" viejo
+    sigue apareciendo aunque se haya escrito otro "ok" después.
+
+    Args:
+        filas: (usuario, texto, es_mio, fecha) en orden cronológico, con
+            "Yo" como usuario de los mensajes propios
+        en_vivo: (usuario, texto) mostrados en vivo desde que se abrió
+        desde: Fecha en que se pidió la página
+
+    Returns:
+        Las filas que faltan mostrar, en el mismo orden
+    """
+    pendientes = Counter(en_vivo)
+    resultado = []
+    for fila in reversed(filas):
+        clave = fila[:2]
+        if fila[3] >= desde and pendientes[clave]:
+            pendientes[clave] -= 1
+            continue
+        resultado.append(fila)
+    resultado.reverse()
+    return resultado
+
+
+class BufferMensajes:
+    """
+    Anillo con el alto (en líneas) de cada mensaje dibujado, del más viejo
+    al más nuevo; dice cuántas líneas recortar para no pasar de `maximo`
+    """
+
+    def __init__(self, maximo=MAX_MENSAJES):
+        self.maximo = maximo
+        self._lineas = deque()
+        # Se recortaron mensajes nuevos para hacer lugar a historial viejo
+        self.recortado_abajo = False
+
+    def __len__(self):
+        return len(self._lineas)
+
+    def agregar(self, lineas):
+        """Mensajes al final; devuelve las líneas a borrar del principio"""
+        self._lineas.extend(lineas)
+        sobrantes = 0
+        while len(self._lineas) > self.maximo:
+            sobrantes += self._lineas.popleft()
+        return sobrantes
+
+    def anteponer(self, lineas):
+        """Mensajes viejos al principio; devuelve las líneas a borrar del final"""
+        self._lineas.extendleft(reversed(lineas))
+        sobrantes = 0
+        while len(self._lineas) > self.maximo:
+            sobrantes += self._lineas.pop()
+            self.recortado_abajo = True
+        return sobrantes
+
+    def vaciar(self):
+        self._lineas.clear()
+        self.recortado_abajo = False
+
+
 class VentanaChat(tk.Toplevel):
     def __init__(self, parent, usuario_destino, logica_cliente):
         super().__init__(parent)
@@ -9,42 +90,155 @@ class VentanaChat(tk.Toplevel):
         self.logica_cliente = logica_cliente
         self.title(f"Chat con {usuario_destino.nombre}")
         self.geometry("500x450")
-        
+
+        self.buffer = BufferMensajes()
+        # Cursor de la página anterior del historial (None = no hay más)
+        self._cursor_historial = None
+        self._pidiendo_historial = False
+        self._espera_historial = None
+        # Cursor de la página que se espera (el servidor lo repite en la respuesta)
+        self._pedido_historial = _SIN_PEDIDO
+        # Mensajes en vivo llegados antes de la primera página (para no repetirlos)
+        self._en_vivo = []
+        self._primera_pagina = True
+        self._abierta_en = datetime.datetime.now()
+
         self.protocol("WM_DELETE_WINDOW", self.cerrar)
         self._configurar_ui()
+        self._pedir_historial(None)
 
     def _configurar_ui(self):
         self.historial = scrolledtext.ScrolledText(self, state='disabled', font=("Arial", 10), wrap=tk.WORD, padx=10, pady=10)
         self.historial.pack(expand=True, fill='both')
         self.historial.tag_config('yo', foreground='#0000FF', justify='right')
         self.historial.tag_config('otro', foreground='#008000', justify='left')
+        self.historial.configure(yscrollcommand=self._al_desplazar)
 
         frame_input = tk.Frame(self, bg="#eee", pady=5, padx=5)
         frame_input.pack(fill='x')
-        
+
         self.entry = ttk.Entry(frame_input, font=("Arial", 11))
         self.entry.pack(side='left', expand=True, fill='x', padx=(0,5))
         self.entry.bind("<Return>", lambda e: self.enviar())
-        
+
         ttk.Button(frame_input, text="Enviar", command=self.enviar).pack(side='right')
 
     def enviar(self):
         texto = self.entry.get().strip()
         if not texto: return
-        
+
         self.logica_cliente.enviar_mensaje(texto, destino=self.usuario_destino.nombre)
         self.mostrar_mensaje("Yo", texto, es_mio=True)
         self.entry.delete(0, tk.END)
 
     def mostrar_mensaje(self, usuario, texto, es_mio=False):
+        self.mostrar_mensajes([(usuario, texto, es_mio, None)])
+
+    def mostrar_mensajes(self, mensajes):
+        """
+        Agrega al final varios mensajes de una vez
+
+        Args:
+            mensajes: Lista de (usuario, texto, es_mio, fecha o None = ahora)
+        """
+        if not mensajes: return
+        if self.buffer.recortado_abajo:
+            # Se está viendo historial viejo: lo nuevo vuelve a cargarse al bajar
+            return
+        if self._primera_pagina and len(self._en_vivo) < PAGINA_HISTORIAL:
+            self._en_vivo.extend((usuario, texto) for usuario, texto, _, _ in mensajes)
+
+        al_final = self.historial.yview()[1] >= 1.0
         self.historial.config(state='normal')
-        tag = 'yo' if es_mio else 'otro'
-        header = f"{usuario} [{datetime.datetime.now().strftime('%H:%M')}]\n"
-        
-        self.historial.insert(tk.END, header, (tag, 'bold'))
-        self.historial.insert(tk.END, texto + "\n\n", tag)
-        self.historial.see(tk.END)
+        for usuario, texto, es_mio, fecha in mensajes:
+            self._insertar(tk.END, usuario, texto, es_mio, fecha)
+        sobrantes = self.buffer.agregar([lineas_de(texto) for _, texto, _, _ in mensajes])
+        if sobrantes:
+            self.historial.delete("1.0", f"{sobrantes + 1}.0")
+        self.historial.config(state='disabled')
+        if al_final:
+            self.historial.see(tk.END)
+
+    def mostrar_historial(self, mensajes, cursor, pedido):
+        """
+        Antepone una página del historial que mandó el servidor
+
+        Las respuestas que no son de la página pedida se descartan: tras
+        ESPERA_HISTORIAL_MS se puede volver a pedir el mismo cursor y llegar
+        la página dos veces.
+
+        Args:
+            mensajes: Dicts de MensajeDTO.to_dict en orden cronológico
+            cursor: Cursor de la página anterior (None si no hay más)
+            pedido: Cursor con el que se pidió esta página
+        """
+        if self._pedido_historial is _SIN_PEDIDO or pedido != self._pedido_historial:
+            return
+        self._pedido_historial = _SIN_PEDIDO
+        self._pidiendo_historial = False
+        if self._espera_historial is not None:
+            self.after_cancel(self._espera_historial)
+            self._espera_historial = None
+        self._cursor_historial = cursor
+        propio = getattr(self.logica_cliente, "usuario_actual", None)
+        filas = []
+        for datos in mensajes:
+            usuario, texto = datos["nombreUsuario"], datos["contenidoMensaje"]
+            fecha = datetime.datetime.fromisoformat(datos["fechaHora"])
+            es_mio = usuario == propio
+            filas.append(("Yo" if es_mio else usuario, texto, es_mio, fecha))
+        if self._primera_pagina:
+            filas = quitar_repetidos(filas, self._en_vivo, self._abierta_en)
+        primera = self._primera_pagina
+        self._primera_pagina = False
+        self._en_vivo.clear()
+        if not filas: return
+
+        self.historial.config(state='normal')
+        # Se inserta de la más nueva a la más vieja, siempre en el inicio
+        for usuario, texto, es_mio, fecha in reversed(filas):
+            self._insertar("1.0", usuario, texto, es_mio, fecha)
+        sobrantes = self.buffer.anteponer([lineas_de(texto) for _, texto, _, _ in filas])
+        if sobrantes:
+            self.historial.delete(f"end-1c - {sobrantes} lines", "end-1c")
         self.historial.config(state='disabled')
+        if primera:
+            self.historial.see(tk.END)
+        else:
+            # Mantener a la vista lo que se estaba leyendo
+            self.historial.see(f"{sum(lineas_de(texto) for _, texto, _, _ in filas) + 1}.0")
+
+    def _insertar(self, indice, usuario, texto, es_mio, fecha):
+        tag = 'yo' if es_mio else 'otro'
+        header = f"{usuario} [{(fecha or datetime.datetime.now()).strftime('%H:%M')}]\n"
+        # Un solo insert por mensaje: al anteponer, el orden se conserva
+        self.historial.insert(indice, header, (tag, 'bold'), texto + "\n\n", tag)
+
+    def _al_desplazar(self, primero, ultimo):
+        self.historial.vbar.set(primero, ultimo)
+        if float(primero) <= 0.0 and self._cursor_historial is not None:
+            self._pedir_historial(self._cursor_historial)
+        elif float(ultimo) >= 1.0 and self.buffer.recortado_abajo:
+            # Volvió al final después de leer historial viejo: recargar lo último
+            self.historial.config(state='normal')
+            self.historial.delete("1.0", tk.END)
+            self.historial.config(state='disabled')
+            self.buffer.vaciar()
+            self._primera_pagina = True
+            self._abierta_en = datetime.datetime.now()
+            self._pedir_historial(None)
+
+    def _pedir_historial(self, cursor):
+        if self._pidiendo_historial: return
+        self._pidiendo_historial = True
+        self._pedido_historial = cursor
+        self._espera_historial = self.after(ESPERA_HISTORIAL_MS, self._historial_sin_respuesta)
+        self.logica_cliente.solicitar_historial(con=self.usuario_destino.nombre, cursor=cursor, limite=PAGINA_HISTORIAL)
+
+    def _historial_sin_respuesta(self):
+        # La respuesta se perdió: el próximo desplazamiento vuelve a pedirla
+        self._espera_historial = None
+        self._pidiendo_historial = False
 
     def cerrar(self):
-        self.destroy()
\ No newline at end of file
+        self.destroy()
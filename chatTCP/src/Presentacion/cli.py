@@ -1,6 +1,52 @@
 """
 Interfaz de línea de comandos para el chat TCP
+
+Modo interactivo (sin Tk): usa LogicaCliente igual que la GUI.
+Modo carga (--load N): N usuarios simulados se registran, inician sesión y
+envían mensajes a una tasa fija para ejercitar el servidor sin pantalla.
+
+Uso:
+    python chatTCP/src/Presentacion/cli.py [--puerto 5555] [--trazas cliente.json]
+    python chatTCP/src/Presentacion/cli.py --load 50 --tasa 2 --duracion 30 [--procesos 4]
 """
+import argparse
+import multiprocessing
+import os
+import queue
+import random
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+chat_root = os.path.dirname(os.path.dirname(current_dir))
+if chat_root not in sys.path:
+    sys.path.insert(0, chat_root)
+
+# Todo se importa desde src. como hace LogicaCliente: con otra raíz Python
+# carga otra copia de los módulos (y de singletons como RegistroTrazas)
+from src.ModeloChatTCP.ChatTCP.LogicaCliente import LogicaCliente
+from src.Red.EnsambladorRed import EnsambladorRed
+from src.Red.Trazas import RegistroTrazas
+
+
+def nuevo_cliente(puerto_servidor=5555, ruta_pem=None):
+    """LogicaCliente con su propio EnsambladorRed (no comparte el singleton de la GUI)"""
+    return LogicaCliente(EnsambladorRed.crear_independiente(), puerto_servidor=puerto_servidor, ruta_pem=ruta_pem)
+
+MARCA_CARGA = "[carga]"
+RESPUESTAS_SESION = ("REGISTRO_OK", "REGISTRO_FAIL", "LOGIN_OK", "ERROR")
+
+AYUDA = """Comandos:
+  <texto>                  mensaje a todos
+  /para <usuario> <texto>  mensaje privado
+  /usuarios                pide la lista de conectados
+  /historial [usuario]     última página del historial (TODOS si se omite)
+  /buscar <texto>          busca en los mensajes guardados
+  /entregas                ACKs y latencias de los mensajes enviados
+  /salir"""
 
 
 class ChatCLI:
@@ -8,23 +54,367 @@ class ChatCLI:
     Clase para manejar la interfaz de usuario por consola
     """
 
-    def __init__(self):
-        pass
+    def __init__(self, logica=None):
+        """
+        Args:
+            logica: LogicaCliente a usar (por defecto uno nuevo hacia el puerto 5555)
+        """
+        self.logica = logica if logica is not None else nuevo_cliente()
+        self._respuestas = queue.Queue()
+        self._lock_consola = threading.Lock()
+        self.logica.set_callback(self._recibir)
 
     def start(self):
         """
         Inicia la interfaz de usuario
         """
-        pass
+        if self.logica.emisor is None:
+            self.display_message("No hay conexión con el servidor (¿existe server_public.pem?)")
+            return
+        if not self._iniciar_sesion():
+            return
+        self.display_message(AYUDA)
+        while True:
+            try:
+                linea = self.get_user_input().strip()
+            except (EOFError, KeyboardInterrupt):
+                break
+            if not linea:
+                continue
+            if linea == "/salir":
+                break
+            self._ejecutar(linea)
+        self.logica.detener()
 
     def display_message(self, message: str):
         """
         Muestra un mensaje en la consola
         """
-        print(f"[Chat] {message}")
+        with self._lock_consola:
+            print(f"[Chat] {message}")
 
     def get_user_input(self, prompt: str = "> ") -> str:
         """
         Obtiene entrada del usuario
         """
         return input(prompt)
+
+    def _iniciar_sesion(self):
+        usuario = self.get_user_input("Usuario: ").strip()
+        password = self.get_user_input("Contraseña: ").strip()
+        if self.get_user_input("¿Registrar usuario nuevo? [s/N]: ").strip().lower() == "s":
+            self.logica.registrar(usuario, password)
+            tipo, contenido = self._esperar_respuesta()
+            self.display_message(f"{tipo}: {contenido}")
+
+        self.logica.login(usuario, password)
+        tipo, contenido = self._esperar_respuesta()
+        if tipo != "LOGIN_OK":
+            self.display_message(f"No se pudo iniciar sesión: {contenido}")
+            return False
+        self.display_message(f"Sesión iniciada como {usuario}")
+        return True
+
+    def _esperar_respuesta(self, timeout=10):
+        try:
+            return self._respuestas.get(timeout=timeout)
+        except queue.Empty:
+            return "ERROR", "El servidor no respondió"
+
+    def _ejecutar(self, linea):
+        comando, _, resto = linea.partition(" ")
+        if comando == "/para":
+            destino, _, texto = resto.partition(" ")
+            if destino and texto:
+                self.logica.enviar_mensaje(texto, destino=destino)
+        elif comando == "/usuarios":
+            self.logica.obtener_usuarios()
+        elif comando == "/historial":
+            self.logica.solicitar_historial(con=resto.strip() or "TODOS")
+        elif comando == "/buscar":
+            self.logica.buscar_mensajes(resto.strip())
+        elif comando == "/entregas":
+            self.display_message(str(self.logica.metricas_entregas()))
+        elif comando.startswith("/"):
+            self.display_message(AYUDA)
+        else:
+            self.logica.enviar_mensaje(linea)
+
+    def _recibir(self, paquete):
+        tipo, contenido = paquete.tipo, paquete.contenido
+        if tipo in RESPUESTAS_SESION:
+            self._respuestas.put((tipo, contenido))
+        elif tipo == "MENSAJE":
+            privado = "" if paquete.destino == "TODOS" else " (privado)"
+            self.display_message(f"{paquete.origen}{privado}: {contenido.get('mensaje', '')}")
+        elif tipo == "LISTA_USUARIOS":
+            self.display_message("Conectados: " + ", ".join(contenido))
+        elif tipo == "HISTORIAL":
+            for datos in contenido.get("mensajes", []):
+                self.display_message(f"[{datos['fechaHora'][11:16]}] {datos['nombreUsuario']}: {datos['contenidoMensaje']}")
+        elif tipo == "BUSCAR":
+            self.display_message(str(contenido))
+        else:
+            self.display_message(f"{tipo}: {contenido}")
+
+
+class UsuarioSimulado:
+    """
+    Cliente completo (LogicaCliente con su propio EnsambladorRed) que manda
+    mensajes marcados con la hora de envío para medir la latencia de entrega
+    """
+
+    def __init__(self, nombre, puerto_servidor, ruta_pem=None):
+        self.nombre = nombre
+        self.logica = nuevo_cliente(puerto_servidor, ruta_pem)
+        self._respuestas = queue.Queue()
+        self._lock = threading.Lock()
+        self.enviados = 0
+        self.fallidos = 0
+        self.recibidos = 0
+        self.latencias_entrega = []
+        self.latencias_ack = []
+        self.estados_ack = {}
+        self.latencia_login = None
+        self.logica.set_callback(self._recibir)
+        self.logica.set_callback_entregas(self._entregado)
+
+    def conectar(self, timeout=15):
+        """Registra (si hace falta) e inicia sesión; lanza RuntimeError si no puede"""
+        if self.logica.emisor is None:
+            raise RuntimeError("sin conexión con el servidor")
+        self.logica.registrar(self.nombre, "clave")
+        self._esperar(("REGISTRO_OK", "REGISTRO_FAIL"), timeout)
+        comienzo = time.monotonic()
+        self.logica.login(self.nombre, "clave")
+        self._esperar(("LOGIN_OK",), timeout)
+        self.latencia_login = time.monotonic() - comienzo
+
+    def _esperar(self, tipos, timeout):
+        limite = time.monotonic() + timeout
+        while time.monotonic() < limite:
+            try:
+                tipo, contenido = self._respuestas.get(timeout=limite - time.monotonic())
+            except queue.Empty:
+                break
+            if tipo in tipos:
+                return
+            if tipo == "ERROR":
+                raise RuntimeError(f"{self.nombre}: {contenido}")
+        raise RuntimeError(f"{self.nombre}: el servidor no respondió {'/'.join(tipos)}")
+
+    def enviar(self, destino):
+        texto = f"{MARCA_CARGA} {time.time():.6f} {self.nombre} {self.enviados}"
+        self.logica.enviar_mensaje(texto, destino=destino)
+        with self._lock:
+            self.enviados += 1
+
+    def _recibir(self, paquete):
+        if paquete.tipo in RESPUESTAS_SESION:
+            self._respuestas.put((paquete.tipo, paquete.contenido))
+        elif paquete.tipo == "MENSAJE":
+            texto = paquete.contenido.get("mensaje", "") if isinstance(paquete.contenido, dict) else ""
+            if texto.startswith(MARCA_CARGA):
+                latencia = time.time() - float(texto.split(" ", 2)[1])
+                with self._lock:
+                    self.recibidos += 1
+                    self.latencias_entrega.append(latencia)
+
+    def _entregado(self, id_mensaje, estado, latencia):
+        with self._lock:
+            self.estados_ack[estado] = self.estados_ack.get(estado, 0) + 1
+            if latencia is not None:
+                self.latencias_ack.append(latencia)
+
+    def resultado(self):
+        with self._lock:
+            return {"enviados": self.enviados, "fallidos": self.fallidos, "recibidos": self.recibidos,
+                    "latencias_entrega": list(self.latencias_entrega),
+                    "latencias_ack": list(self.latencias_ack), "estados_ack": dict(self.estados_ack)}
+
+    def detener(self):
+        self.logica.detener()
+
+
+def _enviar_a_tasa(usuario, nombres, tasa, fin, difusion, azar):
+    """Hilo de un usuario: un mensaje cada 1/tasa segundos hasta `fin`"""
+    otros = [n for n in nombres if n != usuario.nombre]
+    intervalo = 1.0 / tasa
+    siguiente = time.monotonic() + azar.random() * intervalo
+    while siguiente < fin:
+        time.sleep(max(0.0, siguiente - time.monotonic()))
+        destino = "TODOS" if not otros or azar.random() < difusion else azar.choice(otros)
+        try:
+            usuario.enviar(destino)
+        except Exception:
+            usuario.fallidos += 1
+        siguiente += intervalo
+
+
+def _proceso_carga(mis_nombres, nombres, puerto, ruta_pem, tasa, duracion, difusion, listos, inicio, resultados):
+    """
+    Un proceso del modo carga: crea sus usuarios, espera la señal de inicio,
+    envía durante `duracion` segundos y reporta los contadores
+    """
+    # LogicaCliente imprime cada paquete y la red avisa cada reintento; con
+    # cientos de usuarios eso solo ocupa CPU. Los errores vuelven en el resultado
+    sys.stdout = sys.stderr = open(os.devnull, "w")
+    usuarios = []
+    errores = []
+
+    def crear(nombre):
+        usuario = UsuarioSimulado(nombre, puerto, ruta_pem)
+        usuario.conectar()
+        return usuario
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        for futuro in [pool.submit(crear, nombre) for nombre in mis_nombres]:
+            try:
+                usuarios.append(futuro.result())
+            except Exception as e:
+                errores.append(str(e))
+    listos.put([u.latencia_login for u in usuarios])
+    inicio.wait()
+
+    fin = time.monotonic() + duracion
+    azar = random.Random(os.getpid())
+    hilos = [threading.Thread(target=_enviar_a_tasa, args=(u, nombres, tasa, fin, difusion, random.Random(azar.random())),
+                              daemon=True) for u in usuarios]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    # Margen para que lleguen las últimas entregas y ACKs
+    time.sleep(2.0)
+
+    resultado = {"usuarios": len(usuarios), "errores": errores, "enviados": 0, "fallidos": 0, "recibidos": 0,
+                 "latencias_entrega": [], "latencias_ack": [], "estados_ack": {}}
+    for usuario in usuarios:
+        parcial = usuario.resultado()
+        for clave in ("enviados", "fallidos", "recibidos"):
+            resultado[clave] += parcial[clave]
+        resultado["latencias_entrega"] += parcial["latencias_entrega"]
+        resultado["latencias_ack"] += parcial["latencias_ack"]
+        for estado, cuenta in parcial["estados_ack"].items():
+            resultado["estados_ack"][estado] = resultado["estados_ack"].get(estado, 0) + cuenta
+        usuario.detener()
+    resultados.put(resultado)
+
+
+def percentiles_ms(muestras):
+    """p50/p95/p99 en milisegundos de una lista de segundos"""
+    if len(muestras) < 2:
+        valor = muestras[0] * 1000 if muestras else 0.0
+        return {"p50": valor, "p95": valor, "p99": valor}
+    cortes = statistics.quantiles(muestras, n=100)
+    return {"p50": cortes[49] * 1000, "p95": cortes[94] * 1000, "p99": cortes[98] * 1000}
+
+
+def ejecutar_carga(usuarios, tasa, duracion, procesos=1, puerto=5555, difusion=0.1, prefijo="carga",
+                   ruta_pem=None, al_comenzar=None):
+    """
+    Lanza usuarios simulados contra un servidor ya iniciado
+
+    Args:
+        usuarios: Número de usuarios simulados
+        tasa: Mensajes por segundo de cada usuario
+        duracion: Segundos enviando
+        procesos: Procesos entre los que se reparten los usuarios
+        puerto: Puerto del servidor en 127.0.0.1
+        difusion: Fracción de mensajes a TODOS (el resto, privados a otro usuario)
+        prefijo: Prefijo de los nombres de usuario
+        ruta_pem: Llave pública del servidor (por defecto server_public.pem)
+        al_comenzar: Función sin argumentos que se llama con todos los
+            usuarios conectados, justo antes de empezar a enviar
+
+    Returns:
+        Dict con usuarios conectados, enviados, recibidos, estados de ACK,
+        mensajes/s y percentiles de latencia de login, entrega y ACK
+    """
+    nombres = [f"{prefijo}{n:05d}" for n in range(usuarios)]
+    procesos = max(1, min(procesos, usuarios))
+    # spawn: cada proceso arranca limpio, sin hilos ni sockets heredados
+    contexto = multiprocessing.get_context("spawn")
+    listos, resultados, inicio = contexto.Queue(), contexto.Queue(), contexto.Event()
+    hijos = [contexto.Process(target=_proceso_carga,
+                              args=(nombres[i::procesos], nombres, puerto, ruta_pem, tasa, duracion, difusion, listos, inicio, resultados))
+             for i in range(procesos)]
+    for hijo in hijos:
+        hijo.start()
+    logins = [latencia for _ in hijos for latencia in listos.get()]
+
+    if al_comenzar is not None:
+        al_comenzar()
+    comienzo = time.monotonic()
+    inicio.set()
+    parciales = [resultados.get() for _ in hijos]
+    segundos = time.monotonic() - comienzo
+    for hijo in hijos:
+        hijo.join()
+
+    estados = {}
+    for parcial in parciales:
+        for estado, cuenta in parcial["estados_ack"].items():
+            estados[estado] = estados.get(estado, 0) + cuenta
+    enviados = sum(p["enviados"] for p in parciales)
+    recibidos = sum(p["recibidos"] for p in parciales)
+    return {
+        "usuarios": len(logins),
+        "errores": [e for p in parciales for e in p["errores"]],
+        "segundos": segundos,
+        "enviados": enviados,
+        "fallidos": sum(p["fallidos"] for p in parciales),
+        "recibidos": recibidos,
+        "enviados_por_segundo": enviados / duracion if duracion else 0.0,
+        "entregas_por_segundo": recibidos / segundos if segundos else 0.0,
+        "estados_ack": estados,
+        "latencia_login_ms": percentiles_ms(logins),
+        "latencia_entrega_ms": percentiles_ms([l for p in parciales for l in p["latencias_entrega"]]),
+        "latencia_ack_ms": percentiles_ms([l for p in parciales for l in p["latencias_ack"]]),
+    }
+
+
+def imprimir_resultado(resultado):
+    print("=" * 60)
+    print(f"CARGA - {resultado['usuarios']} usuarios conectados")
+    print("=" * 60)
+    print(f"  enviados:  {resultado['enviados']:,} ({resultado['enviados_por_segundo']:,.1f} msg/s, "
+          f"{resultado['fallidos']} fallidos)")
+    print(f"  entregas:  {resultado['recibidos']:,} ({resultado['entregas_por_segundo']:,.1f} msg/s)")
+    print(f"  ACKs:      {resultado['estados_ack']}")
+    for nombre in ("latencia_login_ms", "latencia_entrega_ms", "latencia_ack_ms"):
+        p = resultado[nombre]
+        print(f"  {nombre:<20} p50 {p['p50']:7.1f}  p95 {p['p95']:7.1f}  p99 {p['p99']:7.1f}")
+    for error in resultado["errores"][:5]:
+        print(f"  error: {error}")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cliente de consola de chatTCP")
+    parser.add_argument("--puerto", type=int, default=5555, help="Puerto del servidor en 127.0.0.1")
+    parser.add_argument("--pem", help="Llave pública del servidor (por defecto server_public.pem)")
+    parser.add_argument("--load", type=int, metavar="N", help="Simula N usuarios en lugar del modo interactivo")
+    parser.add_argument("--tasa", type=float, default=1.0, help="Mensajes por segundo de cada usuario simulado")
+    parser.add_argument("--duracion", type=float, default=30.0, help="Segundos de envío en el modo carga")
+    parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1, help="Procesos para los usuarios simulados")
+    parser.add_argument("--difusion", type=float, default=0.1, help="Fracción de mensajes enviados a TODOS")
+    parser.add_argument("--prefijo", default="carga", help="Prefijo de los usuarios simulados")
+    parser.add_argument("--trazas", help="Traza los paquetes del modo interactivo y los escribe al salir (JSON de Chrome)")
+    args = parser.parse_args()
+
+    if args.load:
+        imprimir_resultado(ejecutar_carga(args.load, args.tasa, args.duracion, args.procesos, args.puerto,
+                                          args.difusion, args.prefijo, args.pem))
+        return
+
+    trazas = RegistroTrazas.obtener_instancia()
+    if args.trazas:
+        trazas.activar()
+    ChatCLI(nuevo_cliente(args.puerto, args.pem)).start()
+    if args.trazas:
+        trazas.volcar(args.trazas, proceso="cliente")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,7 +13,7 @@ proyecto_root = os.path.dirname(chat_root)
 sys.path.insert(0, proyecto_root)
 sys.path.insert(0, chat_root)
 
-from src.ModeloChatTCP.ChatTCP.LogicaCliente import gestor_cliente
+from src.ModeloChatTCP.ChatTCP.LogicaCliente import obtener_gestor_cliente
 
 # --- LOGICA DE RESPUESTA DEL SERVIDOR ---
 def manejar_respuesta_login(paquete):
@@ -37,7 +37,7 @@ def abrir_registro(event=None):
 
 def solicitar_login():
     # --- VALIDACIÓN DE CONEXIÓN ---
-    if gestor_cliente.emisor is None:
+    if obtener_gestor_cliente().emisor is None:
         messagebox.showerror(
             "Error de Conexión", 
             "El cliente no está conectado al servidor.\n\n"
@@ -49,7 +49,7 @@ def solicitar_login():
         return
 
     # NUEVA VALIDACIÓN DE SOCKET
-    if not gestor_cliente.verificar_estado_servidor():
+    if not obtener_gestor_cliente().verificar_estado_servidor():
         messagebox.showerror(
             "Error de Conexión",
             "No se puede conectar con el servidor (WinError 10061).\n\n"
@@ -66,9 +66,9 @@ def solicitar_login():
         return
 
     try:
-        gestor_cliente.set_callback(manejar_respuesta_login)
+        obtener_gestor_cliente().set_callback(manejar_respuesta_login)
         print(f"[UI] Enviando solicitud de login para: {nombre}")
-        gestor_cliente.login(nombre, contrasena)
+        obtener_gestor_cliente().login(nombre, contrasena)
     except Exception as e:
         messagebox.showerror("Error de Conexión", f"Excepción al enviar: {e}")
 
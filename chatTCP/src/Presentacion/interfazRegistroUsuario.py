@@ -17,7 +17,7 @@ proyecto_root = os.path.dirname(chat_root)
 sys.path.insert(0, proyecto_root)
 sys.path.insert(0, chat_root)
 
-from src.ModeloChatTCP.ChatTCP.LogicaCliente import gestor_cliente
+from src.ModeloChatTCP.ChatTCP.LogicaCliente import obtener_gestor_cliente
 from src.Presentacion.MVC_ChatTCP.Validaciones import ValidadorUsuario, ValidacionError
 
 # --- LOGICA DE RESPUESTA DEL SERVIDOR ---
@@ -40,7 +40,7 @@ def volver_al_login(event=None):
 
 def solicitar_registro():
     # --- VALIDACIÓN DE CONEXIÓN ---
-    if gestor_cliente.emisor is None:
+    if obtener_gestor_cliente().emisor is None:
         messagebox.showerror(
             "Error de Conexión", 
             "El cliente no está conectado al servidor.\n\n"
@@ -52,7 +52,7 @@ def solicitar_registro():
         return
 
     # NUEVA VALIDACIÓN DE SOCKET
-    if not gestor_cliente.verificar_estado_servidor():
+    if not obtener_gestor_cliente().verificar_estado_servidor():
         messagebox.showerror(
             "Error de Conexión",
             "No se puede conectar con el servidor (WinError 10061).\n\n"
@@ -79,9 +79,9 @@ def solicitar_registro():
         return
 
     try:
-        gestor_cliente.set_callback(manejar_respuesta_registro)
+        obtener_gestor_cliente().set_callback(manejar_respuesta_registro)
         print(f"[UI] Enviando solicitud de registro para: {nombre}")
-        gestor_cliente.registrar(nombre, contrasena)
+        obtener_gestor_cliente().registrar(nombre, contrasena)
     except Exception as e:
         messagebox.showerror("Error de Conexión", f"Excepción al enviar: {e}")
 
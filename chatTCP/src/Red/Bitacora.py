@@ -0,0 +1,247 @@
+"""
+Bitácora asíncrona
+Los módulos registran con logging como siempre; un QueueHandler en el logger
+raíz deja cada registro en una cola y un QueueListener (hilo aparte) lo
+formatea y lo escribe en el archivo y la consola, así que el hilo que atiende
+un paquete no espera al disco ni a la terminal. Permite niveles por módulo,
+muestreo de los mensajes de alto volumen y salida en JSON por líneas.
+
+Los mensajes se registran con argumentos (`logger.info("... %s", paquete)`)
+y no con f-strings: si el nivel está apagado o el muestreo lo descarta no
+se arma nada; si pasa, el texto se arma al encolar (los argumentos pueden
+ser objetos que cambian después, como un paquete que se reenvía).
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Callable, Dict, Optional
+
+FORMATOS = ("texto", "json")
+# Plantillas distintas que se cuentan por regla de muestreo antes de reiniciar
+MAX_PLANTILLAS = 4096
+
+_escucha: Optional[QueueListener] = None
+_pid_escucha: Optional[int] = None
+_lock = threading.Lock()
+
+
+class FiltroMuestreo(logging.Filter):
+    """
+    Deja pasar uno de cada N registros de cada mensaje de los módulos indicados
+
+    Se cuenta por plantilla (el texto antes de aplicar los argumentos), así
+    que mensajes distintos del mismo módulo no se tapan entre sí. WARNING y
+    superiores pasan siempre. El registro que pasa lleva `muestreo` = N.
+    Los contadores no llevan lock: entre hilos puede pasar alguno de más o
+    de menos, nunca se pierde un mensaje de cada plantilla.
+    """
+
+    def __init__(self, reglas: Dict[str, int]):
+        """
+        Args:
+            reglas: Prefijo del nombre del logger → N (1 = sin muestreo); se
+                aplica la regla del prefijo más largo
+        """
+        super().__init__()
+        for prefijo, cada in reglas.items():
+            if cada < 1:
+                raise ValueError(f"El muestreo de {prefijo} debe ser >= 1, no {cada}")
+        self._reglas = sorted(reglas.items(), key=lambda regla: len(regla[0]), reverse=True)
+        self._por_logger: Dict[str, int] = {}
+        self._cuentas: Dict[tuple, int] = {}
+
+    def _cada(self, nombre: str) -> int:
+        cada = self._por_logger.get(nombre)
+        if cada is None:
+            cada = next((c for prefijo, c in self._reglas
+                         if nombre == prefijo or nombre.startswith(prefijo + ".")), 1)
+            self._por_logger[nombre] = cada
+        return cada
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        cada = self._cada(record.name)
+        if cada == 1:
+            return True
+        clave = (record.name, record.msg)
+        if len(self._cuentas) > MAX_PLANTILLAS:
+            self._cuentas.clear()
+        vistos = self._cuentas.get(clave, 0)
+        self._cuentas[clave] = vistos + 1
+        if vistos % cada:
+            return False
+        record.muestreo = cada
+        return True
+
+
+class FormateadorJSON(logging.Formatter):
+    """Un objeto JSON por línea, con la plantilla del mensaje como `evento`"""
+
+    def __init__(self, etiqueta: str):
+        super().__init__()
+        self.etiqueta = etiqueta
+
+    def format(self, record: logging.LogRecord) -> str:
+        datos = {
+            "ts": self.formatTime(record),
+            "nivel": record.levelname,
+            "proceso": self.etiqueta,
+            "modulo": record.name,
+            "hilo": record.threadName,
+            "evento": str(getattr(record, "evento", record.msg)),
+            "mensaje": record.getMessage(),
+        }
+        if getattr(record, "muestreo", None):
+            datos["muestreo"] = record.muestreo
+        if record.exc_info:
+            datos["excepcion"] = self.formatException(record.exc_info)
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+class _ManejadorCola(QueueHandler):
+    """
+    QueueHandler que congela el mensaje al encolar
+
+    prepare() corre después del nivel y de los filtros (muestreo), así que
+    solo se arma el texto de los registros que se van a escribir. Se arma
+    aquí y no en el hilo de la bitácora porque los argumentos pueden
+    cambiar mientras esperan en la cola; la plantilla se guarda en
+    `evento`. A diferencia del QueueHandler estándar no se copia el
+    registro ni se formatea la línea completa: la cola es del mismo proceso.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.args:
+            record.evento = record.msg
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        return record
+
+
+def _formateador(formato: str, etiqueta: str) -> logging.Formatter:
+    if formato == "json":
+        return FormateadorJSON(etiqueta)
+    if formato == "texto":
+        return logging.Formatter(f"%(asctime)s - {etiqueta} - %(message)s")
+    raise ValueError(f"Formato de bitácora desconocido: {formato} (se espera uno de {FORMATOS})")
+
+
+def configurar(ruta: Optional[str] = None, etiqueta: str = "SERVER", nivel: int = logging.INFO,
+               niveles: Optional[Dict[str, int]] = None, muestreo: Optional[Dict[str, int]] = None,
+               formato: str = "texto", consola: bool = True) -> QueueListener:
+    """
+    Reemplaza los handlers del logger raíz por la bitácora asíncrona
+
+    Puede llamarse de nuevo (p. ej. en un worker creado con fork, que hereda
+    la configuración del padre pero no su hilo de escritura).
+
+    Args:
+        ruta: Archivo de la bitácora (None = solo consola)
+        etiqueta: Nombre del proceso que aparece en cada línea
+        nivel: Nivel del logger raíz
+        niveles: Nombre de logger → nivel (vale para el módulo y sus hijos)
+        muestreo: Prefijo de logger → N (se escribe uno de cada N mensajes
+            INFO/DEBUG de cada plantilla)
+        formato: "texto" o "json" (una línea JSON por registro)
+        consola: Si además se escribe en stderr
+
+    Returns:
+        El QueueListener en marcha
+    """
+    global _escucha, _pid_escucha
+    formateador = _formateador(formato, etiqueta)
+    destinos = []
+    if ruta:
+        destinos.append(logging.FileHandler(ruta, encoding="utf-8"))
+    if consola:
+        destinos.append(logging.StreamHandler())
+    for destino in destinos:
+        destino.setFormatter(formateador)
+
+    with _lock:
+        _detener()
+        raiz = logging.getLogger()
+        for handler in raiz.handlers[:]:
+            raiz.removeHandler(handler)
+            handler.close()
+        cola = queue.SimpleQueue()
+        manejador = _ManejadorCola(cola)
+        if muestreo:
+            manejador.addFilter(FiltroMuestreo(muestreo))
+        raiz.addHandler(manejador)
+        raiz.setLevel(nivel)
+        for nombre, nivel_modulo in (niveles or {}).items():
+            logging.getLogger(nombre).setLevel(nivel_modulo)
+
+        _escucha = QueueListener(cola, *destinos, respect_handler_level=True)
+        _escucha.start()
+        _pid_escucha = os.getpid()
+    return _escucha
+
+
+def _detener() -> None:
+    global _escucha, _pid_escucha
+    if _escucha is not None and _pid_escucha == os.getpid():
+        # stop() espera a que se escriba todo lo encolado
+        _escucha.stop()
+        for destino in _escucha.handlers:
+            destino.close()
+    # En un hijo creado con fork el hilo del padre no existe: solo se suelta
+    _escucha = _pid_escucha = None
+
+
+def detener() -> None:
+    """Escribe lo pendiente y detiene la bitácora asíncrona (seguro de llamar varias veces)"""
+    with _lock:
+        _detener()
+
+
+def _leer_pares(texto: Optional[str], convertir: Callable[[str], int]) -> Dict[str, int]:
+    pares = {}
+    for par in (texto or "").split(","):
+        if not par.strip():
+            continue
+        nombre, separador, valor = par.partition("=")
+        if not separador or not nombre.strip():
+            raise ValueError(f"Se esperaba modulo=valor, no '{par}'")
+        pares[nombre.strip()] = convertir(valor.strip())
+    return pares
+
+
+def _nivel(valor: str) -> int:
+    nivel = logging.getLevelName(valor.upper())
+    if not isinstance(nivel, int):
+        raise ValueError(f"Nivel de log desconocido: {valor}")
+    return nivel
+
+
+def leer_niveles(texto: Optional[str]) -> Dict[str, int]:
+    """
+    Args:
+        texto: "modulo=NIVEL,..." (p. ej. "chatTCP.src.Red=WARNING")
+
+    Returns:
+        Dict nombre de logger → nivel
+    """
+    return _leer_pares(texto, _nivel)
+
+
+def leer_muestreo(texto: Optional[str]) -> Dict[str, int]:
+    """
+    Args:
+        texto: "modulo=N,..." (p. ej. "chatTCP.src.Red.Receptor=100")
+
+    Returns:
+        Dict prefijo de logger → N
+    """
+    return _leer_pares(texto, int)
+
+
+atexit.register(detener)
@@ -0,0 +1,108 @@
+"""
+Compresión antes del cifrado
+Los paquetes grandes (lista de usuarios, páginas de historial) se comprimen
+antes de cifrarse; después del cifrado ya no se pueden comprimir
+"""
+import lzma
+import zlib
+from typing import Iterable, Optional
+
+COMPRESION_ZLIB = "zlib"
+COMPRESION_LZMA = "lzma"
+
+# En orden de preferencia: zlib comprime casi igual en JSON y cuesta mucho menos CPU
+COMPRESIONES = (COMPRESION_ZLIB, COMPRESION_LZMA)
+
+# Por debajo de este tamaño el ahorro no paga la CPU
+UMBRAL_COMPRESION = 1024
+
+# Límite al descomprimir (una trama chica no puede inflarse sin control)
+MAX_DESCOMPRIMIDO = 16 * 1024 * 1024
+
+# Paquetes que nunca se comprimen: llevan la contraseña, y comprimir junto a
+# datos que otro puede influir filtra información por el largo (CRIME)
+TIPOS_SIN_COMPRESION = ("LOGIN", "REGISTRO")
+
+# Un JSON nunca empieza con un byte 0: el texto comprimido lleva esta marca
+# y el byte del algoritmo, dentro de la parte cifrada y autenticada
+_MARCA = b"\x00"
+_BYTE_POR_ALGORITMO = {COMPRESION_ZLIB: b"z", COMPRESION_LZMA: b"x"}
+_ALGORITMO_POR_BYTE = {byte: algoritmo for algoritmo, byte in _BYTE_POR_ALGORITMO.items()}
+
+
+def comprimir(texto: str, algoritmo: Optional[str], umbral: int = UMBRAL_COMPRESION) -> bytes:
+    """
+    Prepara el texto de un paquete para cifrarlo
+
+    Args:
+        texto: JSON del paquete
+        algoritmo: COMPRESION_ZLIB, COMPRESION_LZMA o None (sin comprimir)
+        umbral: Bytes a partir de los cuales se comprime
+
+    Returns:
+        El texto en UTF-8, comprimido y marcado si el algoritmo está activo,
+        supera el umbral y el resultado es más chico
+    """
+    datos = texto.encode('utf-8')
+    if algoritmo is None or len(datos) < umbral:
+        return datos
+    if algoritmo == COMPRESION_ZLIB:
+        comprimido = zlib.compress(datos, 6)
+    elif algoritmo == COMPRESION_LZMA:
+        comprimido = lzma.compress(datos, preset=1)
+    else:
+        raise ValueError(f"Compresión desconocida: {algoritmo}")
+    if len(comprimido) + 2 >= len(datos):
+        return datos
+    return _MARCA + _BYTE_POR_ALGORITMO[algoritmo] + comprimido
+
+
+def descomprimir(datos: bytes, maximo: int = MAX_DESCOMPRIMIDO) -> bytes:
+    """
+    Deshace comprimir() sobre el texto ya descifrado
+
+    Args:
+        datos: Texto descifrado (comprimido o no)
+        maximo: Tamaño máximo del resultado
+
+    Returns:
+        Texto en UTF-8 sin comprimir
+
+    Raises:
+        ValueError: Si el algoritmo es desconocido, los datos están
+            corruptos o el resultado supera `maximo`
+    """
+    if datos[:1] != _MARCA:
+        return datos
+    algoritmo = _ALGORITMO_POR_BYTE.get(datos[1:2])
+    try:
+        if algoritmo == COMPRESION_ZLIB:
+            descompresor = zlib.decompressobj()
+            resultado = descompresor.decompress(datos[2:], maximo)
+            completo = descompresor.eof and not descompresor.unconsumed_tail
+        elif algoritmo == COMPRESION_LZMA:
+            descompresor = lzma.LZMADecompressor()
+            resultado = descompresor.decompress(datos[2:], maximo)
+            completo = descompresor.eof
+        else:
+            raise ValueError("Compresión desconocida en la trama")
+    except (zlib.error, lzma.LZMAError) as e:
+        raise ValueError(f"Datos comprimidos inválidos: {e}")
+    if not completo:
+        raise ValueError("Trama comprimida incompleta o demasiado grande")
+    return resultado
+
+
+def negociar_compresion(ofrecidas: Optional[Iterable[str]]) -> Optional[str]:
+    """
+    Elige la compresión para los paquetes que se le envían a un cliente
+
+    Args:
+        ofrecidas: Algoritmos que anunció el cliente (None si es un cliente
+            anterior que no comprime)
+
+    Returns:
+        La preferida entre las que soportan ambos, o None
+    """
+    ofrecidas = set(ofrecidas or ())
+    return next((algoritmo for algoritmo in COMPRESIONES if algoritmo in ofrecidas), None)
@@ -0,0 +1,333 @@
+"""
+Etapa de descifrado del receptor
+Saca el trabajo criptográfico del hilo de la conexión a un pool de hilos o
+de procesos con cola acotada, y mide el tiempo de descifrado por paquete
+"""
+import base64
+import binascii
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from cryptography.hazmat.primitives import serialization
+
+from .seguridad import (GestorSeguridad, SUITE_AESGCM, SUITE_CHACHA20, SUITE_FERNET,
+                        TAMANIO_NONCE, TAMANIO_TAG)
+from .SesionesX25519 import TAMANIO_ID
+from .Compresion import descomprimir
+from ..Metricas import histograma
+
+MODO_HIBRIDO = 'HIBRIDO'
+MODO_RSA = 'RSA'
+MODO_AESGCM = SUITE_AESGCM
+MODO_CHACHA20 = SUITE_CHACHA20
+MODO_X25519 = 'X25519'  # Llaves de sesión acordadas con X25519, sin RSA
+MODO_NINGUNO = 'NINGUNO'
+
+# Modo de trama híbrida que corresponde a cada suite simétrica
+MODO_POR_SUITE = {SUITE_FERNET: MODO_HIBRIDO, SUITE_AESGCM: MODO_AESGCM, SUITE_CHACHA20: MODO_CHACHA20}
+_SUITE_POR_MODO = {modo: suite for suite, modo in MODO_POR_SUITE.items()}
+
+# Etiqueta de modo al inicio de la trama ("H:<base64>"). ':' no pertenece al
+# alfabeto base64, así que una trama sin etiqueta nunca se confunde con una
+# etiquetada.
+ETIQUETAS = {MODO_HIBRIDO: 'H', MODO_RSA: 'R', MODO_AESGCM: 'G', MODO_CHACHA20: 'C', MODO_X25519: 'X'}
+_MODO_POR_ETIQUETA = {etiqueta: modo for modo, etiqueta in ETIQUETAS.items()}
+
+TIEMPO_DESCIFRADO = histograma("chattcp_descifrado_trama_segundos", "Descifrado de una trama recibida (también en el pool)", ("modo",))
+
+# Gestor de cada proceso del pool (se carga una vez en el inicializador)
+_gestor_proceso: Optional[GestorSeguridad] = None
+
+
+def detectar_modo(datos: bytes, bloque_rsa: int) -> str:
+    """
+    Identifica el modo de cifrado por la forma de la trama, sin descifrar
+
+    Una trama RSA pura mide exactamente un bloque RSA; una híbrida tiene un
+    bloque RSA seguido de ':::' y el token simétrico.
+
+    Args:
+        datos: Trama ya decodificada de base64
+        bloque_rsa: Tamaño en bytes de un bloque RSA
+
+    Returns:
+        MODO_HIBRIDO, MODO_RSA o MODO_NINGUNO si la forma no es válida
+    """
+    if len(datos) == bloque_rsa:
+        return MODO_RSA
+    if len(datos) > bloque_rsa + 3 and datos[bloque_rsa:bloque_rsa + 3] == b':::':
+        return MODO_HIBRIDO
+    return MODO_NINGUNO
+
+
+def forma_valida(datos: bytes, bloque_rsa: int, modo: str) -> bool:
+    """
+    Comprueba que una trama tenga la forma del modo que declara su etiqueta
+
+    Args:
+        datos: Trama ya decodificada de base64
+        bloque_rsa: Tamaño en bytes de un bloque RSA
+        modo: Modo declarado
+
+    Returns:
+        True si la forma coincide
+    """
+    if modo in (MODO_AESGCM, MODO_CHACHA20):
+        # Bloque RSA + nonce + tag (el texto puede ser vacío)
+        return len(datos) >= bloque_rsa + TAMANIO_NONCE + TAMANIO_TAG
+    if modo == MODO_X25519:
+        return len(datos) >= TAMANIO_ID + TAMANIO_NONCE + TAMANIO_TAG
+    return detectar_modo(datos, bloque_rsa) == modo
+
+
+def etiquetar_trama(modo: str, trama_b64: str) -> str:
+    """
+    Antepone a una trama base64 la etiqueta de su modo de cifrado
+
+    Args:
+        modo: MODO_HIBRIDO, MODO_RSA, MODO_AESGCM, MODO_CHACHA20 o MODO_X25519
+        trama_b64: Trama cifrada en base64
+
+    Returns:
+        Trama con la forma "<etiqueta>:<base64>"
+    """
+    return f"{ETIQUETAS[modo]}:{trama_b64}"
+
+
+def separar_etiqueta(mensaje: str) -> Tuple[Optional[str], str]:
+    """
+    Separa la etiqueta de modo del cuerpo de la trama
+
+    Args:
+        mensaje: Trama recibida
+
+    Returns:
+        Tupla (modo declarado, cuerpo base64). El modo es None si la trama no
+        trae etiqueta (emisores anteriores) y MODO_NINGUNO si la etiqueta no
+        es conocida.
+    """
+    if mensaje[1:2] != ':':
+        return None, mensaje
+    return _MODO_POR_ETIQUETA.get(mensaje[0], MODO_NINGUNO), mensaje[2:]
+
+
+def descifrar_trama(seguridad: GestorSeguridad, mensaje: str) -> Tuple[Optional[str], str, float]:
+    """
+    Descifra una trama base64 con una sola operación de llave privada
+
+    Si la trama trae etiqueta se usa el modo declarado y solo se comprueba
+    que la forma coincida; si no, el modo se deduce de la forma. El texto
+    descifrado se descomprime si el emisor lo comprimió.
+
+    Args:
+        seguridad: Gestor con la llave privada
+        mensaje: Trama recibida (con o sin etiqueta, sin salto de línea)
+
+    Returns:
+        Tupla (texto o None, modo, segundos de CPU criptográfica)
+    """
+    inicio = time.perf_counter()
+    declarado, cuerpo = separar_etiqueta(mensaje)
+    if declarado == MODO_NINGUNO:
+        return None, MODO_NINGUNO, time.perf_counter() - inicio
+    try:
+        datos = base64.b64decode(cuerpo, validate=True)
+    except (binascii.Error, ValueError):
+        return None, declarado or MODO_NINGUNO, time.perf_counter() - inicio
+
+    bloque = seguridad.tamanio_bloque_rsa()
+    if declarado is None:
+        modo = detectar_modo(datos, bloque)
+    elif forma_valida(datos, bloque, declarado):
+        modo = declarado
+    else:
+        # La etiqueta no coincide con la forma: se rechaza sin tocar la llave
+        return None, declarado, time.perf_counter() - inicio
+    texto = None
+    try:
+        if modo == MODO_X25519:
+            texto = descomprimir(seguridad.descifrar_sesion(datos)).decode('utf-8')
+        elif modo == MODO_RSA:
+            texto = seguridad.descifrar_rsa(datos).decode('utf-8')
+        elif modo == MODO_HIBRIDO:
+            llave = seguridad.descifrar_rsa(datos[:bloque])
+            texto = descomprimir(seguridad.descifrar_simetrico(llave, datos[bloque + 3:], SUITE_FERNET)).decode('utf-8')
+        elif modo in _SUITE_POR_MODO:
+            llave = seguridad.descifrar_rsa(datos[:bloque])
+            texto = descomprimir(seguridad.descifrar_simetrico(llave, datos[bloque:], _SUITE_POR_MODO[modo])).decode('utf-8')
+    except Exception:
+        texto = None
+    return texto, modo, time.perf_counter() - inicio
+
+
+def _inicializar_proceso(llave_privada_pem: bytes) -> None:
+    global _gestor_proceso
+    _gestor_proceso = GestorSeguridad(llave_privada_pem)
+
+
+def _descifrar_en_proceso(mensaje: str) -> Tuple[Optional[str], str, float]:
+    return descifrar_trama(_gestor_proceso, mensaje)
+
+
+class EjecutorCifrado:
+    """
+    Ejecuta el descifrado de tramas en línea, en un pool de hilos o en un
+    pool de procesos
+
+    - "en_linea": en el hilo de la conexión (comportamiento original)
+    - "hilos": ThreadPoolExecutor; útil si OpenSSL libera el GIL
+    - "procesos": ProcessPoolExecutor; cada proceso carga la llave privada
+      una vez y el descifrado usa varios núcleos
+
+    Las tramas de sesión X25519 siempre se descifran en línea: solo cuestan
+    un AES-GCM (y un intercambio X25519 la primera vez).
+
+    La cola es acotada: si hay `max_pendientes` tramas esperando, las nuevas
+    se rechazan en lugar de acumular memoria. El modo viene en la etiqueta de
+    la trama (o se deduce de su forma en tramas sin etiqueta), así que una
+    trama corrupta cuesta como máximo una operación de llave privada y una
+    mal formada ninguna. Los rechazos se cuentan por modo.
+    """
+
+    MODOS = ("en_linea", "hilos", "procesos")
+    MUESTRAS = 1024
+
+    def __init__(self,
+                 seguridad: GestorSeguridad,
+                 modo: str = "en_linea",
+                 trabajadores: Optional[int] = None,
+                 max_pendientes: int = 256,
+                 espera_cola: float = 1.0):
+        """
+        Args:
+            seguridad: Gestor con la llave privada del receptor
+            modo: "en_linea", "hilos" o "procesos"
+            trabajadores: Tamaño del pool (por defecto, núcleos disponibles)
+            max_pendientes: Tramas que pueden esperar en el pool a la vez
+            espera_cola: Segundos que se espera un lugar en la cola antes de rechazar
+
+        Raises:
+            ValueError: Si el modo no existe
+        """
+        if modo not in self.MODOS:
+            raise ValueError(f"Modo de cifrado desconocido: {modo}")
+
+        self.seguridad = seguridad
+        self.modo = modo
+        self._espera_cola = espera_cola
+        self._cupos = threading.BoundedSemaphore(max_pendientes)
+        self._lock = threading.Lock()
+        self._logger = logging.getLogger(__name__)
+        self._pool: Optional[Executor] = None
+
+        trabajadores = trabajadores or os.cpu_count() or 1
+        if modo == "hilos":
+            self._pool = ThreadPoolExecutor(max_workers=trabajadores, thread_name_prefix="Cifrado")
+        elif modo == "procesos":
+            pem = seguridad.private_key.private_bytes(
+                encoding=serialization.Encoding.PEM,
+                format=serialization.PrivateFormat.PKCS8,
+                encryption_algorithm=serialization.NoEncryption()
+            )
+            # spawn: los procesos no heredan hilos ni sockets del servidor
+            self._pool = ProcessPoolExecutor(max_workers=trabajadores,
+                                             mp_context=multiprocessing.get_context("spawn"),
+                                             initializer=_inicializar_proceso, initargs=(pem,))
+
+        self._por_modo: Dict[str, int] = {modo: 0 for modo in ETIQUETAS}
+        self._rechazos: Dict[str, int] = {**{modo: 0 for modo in ETIQUETAS}, MODO_NINGUNO: 0, "COLA_LLENA": 0}
+        self._sin_etiqueta = 0
+        self._tiempo_total = 0.0
+        self._tiempo_max = 0.0
+        self._muestras: Deque[float] = deque(maxlen=self.MUESTRAS)
+
+    def descifrar(self, mensaje: str) -> Tuple[Optional[str], str]:
+        """
+        Descifra una trama (bloquea al hilo llamador hasta tener el resultado)
+
+        Args:
+            mensaje: Trama recibida (base64)
+
+        Returns:
+            Tupla (texto o None, modo usado)
+        """
+        if mensaje[1:2] != ':':
+            with self._lock:
+                self._sin_etiqueta += 1
+        # Las tramas de sesión X25519 no usan la llave privada RSA y sus llaves
+        # viven en este proceso: se descifran en línea
+        if self._pool is None or mensaje.startswith(ETIQUETAS[MODO_X25519] + ':'):
+            texto, modo, segundos = descifrar_trama(self.seguridad, mensaje)
+            return self._registrar(texto, modo, segundos)
+
+        if not self._cupos.acquire(timeout=self._espera_cola):
+            with self._lock:
+                self._rechazos["COLA_LLENA"] += 1
+            self._logger.warning("Cola de descifrado llena, trama rechazada")
+            return None, MODO_NINGUNO
+        try:
+            if self.modo == "procesos":
+                futuro = self._pool.submit(_descifrar_en_proceso, mensaje)
+            else:
+                futuro = self._pool.submit(descifrar_trama, self.seguridad, mensaje)
+            texto, modo, segundos = futuro.result()
+        except Exception as e:
+            self._logger.error("Error en el pool de descifrado: %s", e)
+            texto, modo, segundos = None, MODO_NINGUNO, 0.0
+        finally:
+            self._cupos.release()
+        return self._registrar(texto, modo, segundos)
+
+    def metricas(self) -> Dict[str, Any]:
+        """
+        Obtiene las métricas acumuladas
+
+        Returns:
+            Diccionario con paquetes por modo, rechazos por modo, tramas sin
+            etiqueta y tiempos de descifrado (medio, máximo y percentiles de las últimas muestras, en µs)
+        """
+        with self._lock:
+            paquetes = sum(self._por_modo.values())
+            muestras = sorted(self._muestras)
+            def percentil(p):
+                return muestras[min(len(muestras) - 1, int(len(muestras) * p / 100))] * 1e6 if muestras else 0.0
+            return {
+                "modo": self.modo,
+                "paquetes": paquetes,
+                "por_modo": dict(self._por_modo),
+                "rechazos": dict(self._rechazos),
+                "sin_etiqueta": self._sin_etiqueta,
+                "tiempo_total_s": self._tiempo_total,
+                "tiempo_medio_us": self._tiempo_total / max(1, paquetes + sum(self._rechazos.values())) * 1e6,
+                "tiempo_max_us": self._tiempo_max * 1e6,
+                "p50_us": percentil(50),
+                "p99_us": percentil(99),
+            }
+
+    def cerrar(self) -> None:
+        """
+        Detiene el pool
+        """
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _registrar(self, texto: Optional[str], modo: str, segundos: float) -> Tuple[Optional[str], str]:
+        # Con el pool de procesos las métricas de GestorSeguridad quedan en
+        # cada proceso; el tiempo de la trama completa vuelve con el resultado
+        TIEMPO_DESCIFRADO.observar(segundos, modo=modo)
+        with self._lock:
+            self._tiempo_total += segundos
+            self._tiempo_max = max(self._tiempo_max, segundos)
+            self._muestras.append(segundos)
+            if texto is None:
+                self._rechazos[modo] += 1
+            else:
+                self._por_modo[modo] += 1
+        return texto, modo if texto is not None else MODO_NINGUNO
@@ -0,0 +1,167 @@
+"""
+Sesiones con acuerdo de llaves X25519
+Deriva con HKDF las llaves simétricas de una sesión a partir de un
+intercambio ECDH, para no pagar una operación RSA por mensaje
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric.x25519 import X25519PrivateKey, X25519PublicKey
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+TAMANIO_ID = 32  # La llave pública X25519 del cliente identifica la sesión
+TAMANIO_NONCE = 12
+TAMANIO_TAG = 16
+
+_INFO = b"chatTCP x25519 v1"
+_AAD = {"cliente": b"chatTCP/1/X25519/c2s", "servidor": b"chatTCP/1/X25519/s2c"}
+
+# (llave de entrada, llave de salida, datos asociados de entrada, de salida)
+LlavesSesion = Tuple[AESGCM, AESGCM, bytes, bytes]
+
+
+def derivar_llaves(compartido: bytes, publica_cliente: bytes, publica_servidor: bytes, rol: str) -> LlavesSesion:
+    """
+    Deriva las llaves de ambos sentidos de una sesión
+
+    Args:
+        compartido: Secreto del intercambio X25519
+        publica_cliente: Llave pública X25519 del cliente (32 bytes)
+        publica_servidor: Llave pública X25519 del servidor (32 bytes)
+        rol: "cliente" o "servidor" (quién usa las llaves)
+
+    Returns:
+        Llaves de entrada y salida con sus datos asociados
+    """
+    material = HKDF(
+        algorithm=hashes.SHA256(),
+        length=64,
+        salt=None,
+        info=_INFO + publica_cliente + publica_servidor,
+    ).derive(compartido)
+    cliente_a_servidor, servidor_a_cliente = AESGCM(material[:32]), AESGCM(material[32:])
+    if rol == "cliente":
+        return servidor_a_cliente, cliente_a_servidor, _AAD["servidor"], _AAD["cliente"]
+    return cliente_a_servidor, servidor_a_cliente, _AAD["cliente"], _AAD["servidor"]
+
+
+class TablaSesionesX25519:
+    """
+    Llaves de sesión indexadas por la llave pública X25519 del cliente
+
+    En el servidor las sesiones no se registran: la primera trama de un
+    cliente trae su llave pública y las llaves se derivan con la llave
+    estática del servidor (un intercambio X25519, mucho más barato que un
+    descifrado RSA) y se guardan en un LRU acotado. Como la llave estática se
+    deriva de la llave RSA, cualquier worker o nodo del cluster con la misma
+    llave atiende la sesión sin estado compartido.
+
+    En el cliente la sesión se crea explícitamente con una llave efímera.
+    """
+
+    def __init__(self, llave_estatica: Optional[X25519PrivateKey] = None, capacidad: int = 10000):
+        """
+        Args:
+            llave_estatica: Llave privada X25519 propia (rol servidor); None si
+                solo se abren sesiones de cliente
+            capacidad: Sesiones que se mantienen en memoria
+        """
+        self._llave_estatica = llave_estatica
+        self._publica_estatica = llave_estatica.public_key().public_bytes_raw() if llave_estatica else None
+        self._capacidad = capacidad
+        self._sesiones: 'OrderedDict[bytes, LlavesSesion]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def crear_sesion(self, publica_servidor: X25519PublicKey) -> bytes:
+        """
+        Abre una sesión de cliente contra un servidor
+
+        Args:
+            publica_servidor: Llave pública X25519 publicada por el servidor
+
+        Returns:
+            Id de la sesión (la llave pública efímera del cliente)
+        """
+        efimera = X25519PrivateKey.generate()
+        id_sesion = efimera.public_key().public_bytes_raw()
+        compartido = efimera.exchange(publica_servidor)
+        llaves = derivar_llaves(compartido, id_sesion, publica_servidor.public_bytes_raw(), "cliente")
+        with self._lock:
+            self._guardar(id_sesion, llaves)
+        return id_sesion
+
+    def cifrar(self, id_sesion: bytes, datos: bytes) -> bytes:
+        """
+        Cifra datos hacia el otro extremo de la sesión
+
+        Returns:
+            id_sesion + nonce + datos cifrados con tag
+
+        Raises:
+            KeyError: Si la sesión no existe y no se puede derivar
+        """
+        llaves = self._llaves(id_sesion)
+        if llaves is None:
+            raise KeyError("Sesión X25519 desconocida")
+        nonce = os.urandom(TAMANIO_NONCE)
+        return id_sesion + nonce + llaves[1].encrypt(nonce, datos, llaves[3])
+
+    def descifrar(self, trama: bytes) -> bytes:
+        """
+        Descifra una trama de sesión (lanza excepción si no se autentica)
+
+        Args:
+            trama: id_sesion + nonce + datos cifrados con tag
+        """
+        id_sesion = trama[:TAMANIO_ID]
+        nonce = trama[TAMANIO_ID:TAMANIO_ID + TAMANIO_NONCE]
+        with self._lock:
+            llaves = self._sesiones.get(id_sesion)
+            if llaves is not None:
+                self._sesiones.move_to_end(id_sesion)
+        nueva = llaves is None
+        if nueva:
+            llaves = self._derivar(id_sesion)
+            if llaves is None:
+                raise KeyError("Sesión X25519 desconocida")
+        texto = llaves[0].decrypt(nonce, trama[TAMANIO_ID + TAMANIO_NONCE:], llaves[2])
+        if nueva:
+            # Solo se guardan sesiones que ya autenticaron una trama
+            with self._lock:
+                self._guardar(id_sesion, llaves)
+        return texto
+
+    def __len__(self) -> int:
+        return len(self._sesiones)
+
+    def _llaves(self, id_sesion: bytes) -> Optional[LlavesSesion]:
+        with self._lock:
+            llaves = self._sesiones.get(id_sesion)
+            if llaves is not None:
+                self._sesiones.move_to_end(id_sesion)
+                return llaves
+        llaves = self._derivar(id_sesion)
+        if llaves is not None:
+            with self._lock:
+                self._guardar(id_sesion, llaves)
+        return llaves
+
+    def _derivar(self, id_sesion: bytes) -> Optional[LlavesSesion]:
+        if self._llave_estatica is None or len(id_sesion) != TAMANIO_ID:
+            return None
+        try:
+            compartido = self._llave_estatica.exchange(X25519PublicKey.from_public_bytes(id_sesion))
+        except ValueError:
+            # Punto de orden bajo: el secreto sería todo ceros
+            return None
+        return derivar_llaves(compartido, id_sesion, self._publica_estatica, "servidor")
+
+    def _guardar(self, id_sesion: bytes, llaves: LlavesSesion) -> None:
+        self._sesiones[id_sesion] = llaves
+        self._sesiones.move_to_end(id_sesion)
+        while len(self._sesiones) > self._capacidad:
+            self._sesiones.popitem(last=False)
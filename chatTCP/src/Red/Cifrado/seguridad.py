@@ -1,15 +1,44 @@
 import hashlib
 import os
+import threading
 from cryptography.hazmat.primitives.asymmetric import rsa, padding
+from cryptography.hazmat.primitives.asymmetric.x25519 import X25519PrivateKey, X25519PublicKey
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.primitives import serialization, hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM, ChaCha20Poly1305
 from cryptography.fernet import Fernet
 
+from .SesionesX25519 import TablaSesionesX25519
+from ..Metricas import histograma
+
+# Suites simétricas del cifrado híbrido. FERNET es la original (AES-CBC +
+# HMAC en base64) y se mantiene por compatibilidad; las AEAD producen binario
+# crudo, sin relleno ni timestamp.
+SUITE_FERNET = "FERNET"
+SUITE_AESGCM = "AESGCM"
+SUITE_CHACHA20 = "CHACHA20"
+
+# Orden de preferencia al negociar
+SUITES = (SUITE_AESGCM, SUITE_CHACHA20, SUITE_FERNET)
+
+_AEAD = {SUITE_AESGCM: AESGCM, SUITE_CHACHA20: ChaCha20Poly1305}
+TAMANIO_NONCE = 12
+TAMANIO_TAG = 16
+
+TIEMPO_CIFRADO = histograma("chattcp_cifrado_segundos", "Tiempo de cada operación criptográfica", ("operacion",))
+
 
 class GestorSeguridad:
-    def __init__(self):
-        # Generar claves RSA al iniciar por defecto
-        self.private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    def __init__(self, llave_privada_pem=None):
+        # Generar claves RSA al iniciar por defecto, o usar una llave existente
+        if llave_privada_pem is not None:
+            self.private_key = serialization.load_pem_private_key(llave_privada_pem, password=None)
+        else:
+            self.private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
         self.public_key = self.private_key.public_key()
+        self._llave_x25519 = None
+        self._sesiones_x25519 = None
+        self._lock_x25519 = threading.Lock()
 
     def guardar_privada(self, archivo):
         """Guarda la llave privada en un archivo"""
@@ -30,6 +59,9 @@ class GestorSeguridad:
                     password=None
                 )
                 self.public_key = self.private_key.public_key()
+                # La llave X25519 se deriva de la nueva
+                self._llave_x25519 = None
+                self._sesiones_x25519 = None
             return True
         except Exception as e:
             print(f"Error cargando llave privada: {e}")
@@ -42,6 +74,82 @@ class GestorSeguridad:
             format=serialization.PublicFormat.SubjectPublicKeyInfo
         )
 
+    def obtener_publicas_pem(self):
+        """
+        Exporta la llave pública RSA seguida de la X25519, para publicar en
+        server_public.pem (los lectores anteriores solo leen el primer bloque)
+        """
+        publica_x25519 = self.llave_x25519().public_key().public_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+        return self.obtener_publica_bytes() + publica_x25519
+
+    def llave_x25519(self):
+        """
+        Llave privada X25519 estática, derivada de la llave RSA con HKDF
+
+        Al derivarla de la RSA, todos los procesos que comparten la llave RSA
+        (workers, nodos del cluster, pool de descifrado) tienen la misma.
+        """
+        if self._llave_x25519 is None:
+            der = self.private_key.private_bytes(
+                encoding=serialization.Encoding.DER,
+                format=serialization.PrivateFormat.PKCS8,
+                encryption_algorithm=serialization.NoEncryption()
+            )
+            semilla = HKDF(algorithm=hashes.SHA256(), length=32, salt=None,
+                           info=b"chatTCP x25519 estatica").derive(der)
+            self._llave_x25519 = X25519PrivateKey.from_private_bytes(semilla)
+        return self._llave_x25519
+
+    def sesiones_x25519(self):
+        """Tabla de sesiones X25519 de este gestor (se crea la primera vez)"""
+        if self._sesiones_x25519 is None:
+            with self._lock_x25519:
+                if self._sesiones_x25519 is None:
+                    self._sesiones_x25519 = TablaSesionesX25519(self.llave_x25519())
+        return self._sesiones_x25519
+
+    @staticmethod
+    def importar_publica_x25519(bytes_pem):
+        """
+        Busca la llave pública X25519 en un archivo de llaves del servidor
+
+        Returns:
+            X25519PublicKey, o None si el servidor no publica una (versión anterior)
+        """
+        inicio = b"-----BEGIN PUBLIC KEY-----"
+        for bloque in bytes_pem.split(inicio)[1:]:
+            try:
+                llave = serialization.load_pem_public_key(inicio + bloque)
+            except ValueError:
+                continue
+            if isinstance(llave, X25519PublicKey):
+                return llave
+        return None
+
+    def crear_sesion_x25519(self, publica_servidor):
+        """
+        Abre una sesión X25519 con el servidor (rol cliente)
+
+        Returns:
+            Id de la sesión, que se envía al servidor en LOGIN/REGISTRO
+        """
+        return self.sesiones_x25519().crear_sesion(publica_servidor)
+
+    @TIEMPO_CIFRADO.medir(operacion="cifrar_sesion")
+    def cifrar_sesion(self, mensaje, id_sesion):
+        """Cifra con las llaves de una sesión X25519, sin operación RSA"""
+        if isinstance(mensaje, str):
+            mensaje = mensaje.encode('utf-8')
+        return self.sesiones_x25519().cifrar(id_sesion, mensaje)
+
+    @TIEMPO_CIFRADO.medir(operacion="descifrar_sesion")
+    def descifrar_sesion(self, datos):
+        """Descifra una trama de sesión X25519 (lanza excepción si falla)"""
+        return self.sesiones_x25519().descifrar(datos)
+
     def importar_publica(self, bytes_llave):
         """Importa una llave pública desde bytes"""
         try:
@@ -50,35 +158,40 @@ class GestorSeguridad:
             print(f"Error importando llave: {e}")
             return None
 
-    def cifrar(self, mensaje, llave_publica_destino):
+    @TIEMPO_CIFRADO.medir(operacion="cifrar")
+    def cifrar(self, mensaje, llave_publica_destino, suite=SUITE_FERNET):
         """
         Cifrado Híbrido:
-        1. Genera una llave simétrica (Fernet)
-        2. Cifra el mensaje con Fernet
-        3. Cifra la llave Fernet con RSA
+        1. Genera una llave simétrica (Fernet, AES-GCM o ChaCha20-Poly1305)
+        2. Cifra el mensaje con esa llave
+        3. Cifra la llave simétrica con RSA
+
+        Con FERNET el resultado es LlaveCifrada + b':::' + token; con una
+        suite AEAD es LlaveCifrada + nonce + datos con tag, sin separador.
         """
         try:
-            # 1. Generar llave simétrica efímera
-            key_fernet = Fernet.generate_key()
-            f = Fernet(key_fernet)
-
-            # 2. Cifrar el mensaje real (acepta cualquier tamaño)
             if isinstance(mensaje, str):
                 mensaje_bytes = mensaje.encode('utf-8')
             else:
                 mensaje_bytes = mensaje  # Ya son bytes
 
+            if suite in _AEAD:
+                llave = os.urandom(32)  # 256 bits en ambas suites
+                nonce = os.urandom(TAMANIO_NONCE)
+                datos_cifrados = _AEAD[suite](llave).encrypt(nonce, mensaje_bytes, self._datos_asociados(suite))
+                return self._cifrar_rsa(llave, llave_publica_destino) + nonce + datos_cifrados
+            if suite != SUITE_FERNET:
+                raise ValueError(f"Suite de cifrado desconocida: {suite}")
+
+            # 1. Generar llave simétrica efímera
+            key_fernet = Fernet.generate_key()
+            f = Fernet(key_fernet)
+
+            # 2. Cifrar el mensaje real (acepta cualquier tamaño)
             datos_cifrados = f.encrypt(mensaje_bytes)
 
             # 3. Cifrar la llave simétrica con RSA
-            key_fernet_cifrada = llave_publica_destino.encrypt(
-                key_fernet,
-                padding.OAEP(
-                    mgf=padding.MGF1(algorithm=hashes.SHA256()),
-                    algorithm=hashes.SHA256(),
-                    label=None
-                )
-            )
+            key_fernet_cifrada = self._cifrar_rsa(key_fernet, llave_publica_destino)
 
             # 4. Concatenar: LlaveCifrada + Separador + MensajeCifrado
             return key_fernet_cifrada + b':::' + datos_cifrados
@@ -87,27 +200,91 @@ class GestorSeguridad:
             print(f"Error al cifrar: {e}")
             raise e
 
+    @TIEMPO_CIFRADO.medir(operacion="descifrar_simetrico")
+    def descifrar_simetrico(self, llave, datos, suite):
+        """
+        Descifra la parte simétrica de una trama híbrida (lanza excepción si falla)
+
+        Args:
+            llave: Llave simétrica ya descifrada con RSA
+            datos: Lo que sigue al bloque RSA (sin el ':::' en FERNET)
+            suite: Suite con la que se cifró
+
+        Returns:
+            Texto plano en bytes
+        """
+        if suite == SUITE_FERNET:
+            return Fernet(llave).decrypt(datos)
+        nonce, cifrado = datos[:TAMANIO_NONCE], datos[TAMANIO_NONCE:]
+        return _AEAD[suite](llave).decrypt(nonce, cifrado, self._datos_asociados(suite))
+
+    @staticmethod
+    def negociar_suite(ofrecidas):
+        """
+        Elige la suite de una sesión
+
+        Args:
+            ofrecidas: Suites que anuncia el otro extremo (None si es un
+                cliente anterior que no anuncia ninguna)
+
+        Returns:
+            La suite preferida que ambos soportan; FERNET si no hay otra
+        """
+        for suite in SUITES:
+            if ofrecidas and suite in ofrecidas:
+                return suite
+        return SUITE_FERNET
+
+    @staticmethod
+    def _datos_asociados(suite):
+        # El nombre de la suite se autentica con los datos: una trama no
+        # puede reinterpretarse con otra suite o versión
+        return b"chatTCP/1/" + suite.encode('ascii')
+
+    @staticmethod
+    def _cifrar_rsa(datos, llave_publica_destino):
+        return llave_publica_destino.encrypt(
+            datos,
+            padding.OAEP(
+                mgf=padding.MGF1(algorithm=hashes.SHA256()),
+                algorithm=hashes.SHA256(),
+                label=None
+            )
+        )
+
+    def tamanio_bloque_rsa(self):
+        """Bytes de un bloque cifrado con la llave RSA propia (256 para 2048 bits)"""
+        return self.private_key.key_size // 8
+
+    @TIEMPO_CIFRADO.medir(operacion="descifrar_rsa")
+    def descifrar_rsa(self, datos):
+        """Descifra un bloque RSA-OAEP con la llave privada (lanza excepción si falla)"""
+        return self.private_key.decrypt(
+            datos,
+            padding.OAEP(
+                mgf=padding.MGF1(algorithm=hashes.SHA256()),
+                algorithm=hashes.SHA256(),
+                label=None
+            )
+        )
+
+    @TIEMPO_CIFRADO.medir(operacion="desifrar")
     def desifrar(self, paquete_bytes):
         """Descifrado Híbrido"""
         try:
-            # 1. Separar
-            partes = paquete_bytes.split(b':::', 1)
-            if len(partes) != 2:
+            # 1. Separar: la llave cifrada ocupa exactamente un bloque RSA.
+            # No se busca el primer ':::' porque esos bytes pueden aparecer
+            # dentro del bloque RSA
+            bloque = self.tamanio_bloque_rsa()
+            if paquete_bytes[bloque:bloque + 3] != b':::':
                 # Retornamos None para indicar error limpio
                 return None
 
-            key_fernet_cifrada = partes[0]
-            datos_cifrados = partes[1]
+            key_fernet_cifrada = paquete_bytes[:bloque]
+            datos_cifrados = paquete_bytes[bloque + 3:]
 
             # 2. Descifrar la llave simétrica con RSA Privada
-            key_fernet = self.private_key.decrypt(
-                key_fernet_cifrada,
-                padding.OAEP(
-                    mgf=padding.MGF1(algorithm=hashes.SHA256()),
-                    algorithm=hashes.SHA256(),
-                    label=None
-                )
-            )
+            key_fernet = self.descifrar_rsa(key_fernet_cifrada)
 
             # 3. Descifrar el mensaje real con Fernet
             f = Fernet(key_fernet)
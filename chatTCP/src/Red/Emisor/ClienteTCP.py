@@ -7,13 +7,37 @@ import base64
 import socket
 import json
 import logging
-from typing import TYPE_CHECKING
+import threading
+import time
+from typing import TYPE_CHECKING, Optional
 
 if TYPE_CHECKING:
     from .ColaEnvios import ColaEnvios
+    from .ConfirmacionesEnvio import ConfirmacionesEnvio
+    from chatTCP.src.PaqueteDTO.PaqueteDTO import PaqueteDTO
 
 from ..ObserverEmisor.ObservadorEnvios import ObservadorEnvios
-from ..Cifrado.seguridad import GestorSeguridad
+from ..Cifrado.seguridad import GestorSeguridad, SUITE_FERNET
+from ..Cifrado.EjecutorCifrado import MODO_POR_SUITE, MODO_RSA, MODO_X25519, etiquetar_trama
+from .ConfirmacionesEnvio import TIPOS_CONFIRMADOS
+from .DestinoEnvio import DestinoEnvio
+from .Coalescedor import TIPO_LOTE
+from ..Cifrado.Compresion import TIPOS_SIN_COMPRESION, comprimir
+from ..Metricas import contador, histograma
+from ..Trazas import RegistroTrazas
+
+PAQUETES_ENVIADOS = contador("chattcp_cliente_paquetes_total", "Tramas enviadas por ClienteTCP", ("modo",))
+BYTES_ENVIADOS = contador("chattcp_cliente_bytes_total", "Bytes de tramas cifradas enviados (reintentos incluidos)")
+ERRORES_ENVIO = contador("chattcp_cliente_errores_total", "Envíos fallidos por causa", ("causa",))
+TIEMPO_CONEXION = histograma("chattcp_cliente_conexion_segundos", "Tiempo de connect() hacia el destino")
+
+
+def _causa_error(error: Exception) -> str:
+    if isinstance(error, socket.timeout):
+        return "timeout"
+    if isinstance(error, ConnectionRefusedError):
+        return "rechazada"
+    return "otro"
 
 
 class ClienteTCP(ObservadorEnvios):
@@ -36,7 +60,10 @@ class ClienteTCP(ObservadorEnvios):
                  seguridad: 'GestorSeguridad',
                  llave_destino,
                  host: str = 'localhost',
-                 puerto: int = 5555):
+                 puerto: int = 5555,
+                 suite: str = SUITE_FERNET,
+                 confirmaciones: Optional['ConfirmacionesEnvio'] = None,
+                 compresion: Optional[str] = None):
         """
         Inicializa el cliente TCP con cifrado dual obligatorio
 
@@ -46,6 +73,11 @@ class ClienteTCP(ObservadorEnvios):
             llave_destino: Llave pública del destino (REQUERIDA)
             host: Host por defecto para conexiones
             puerto: Puerto por defecto para conexiones
+            suite: Suite simétrica del cifrado híbrido (FERNET, AESGCM o CHACHA20)
+            confirmaciones: Ventana de ACKs para los paquetes numerados de
+                TIPOS_CONFIRMADOS (None = se envía sin esperar confirmación)
+            compresion: Algoritmo con que se comprimen los paquetes grandes
+                antes de cifrarlos ("zlib", "lzma" o None)
 
         Raises:
             ValueError: Si falta seguridad o llave_destino
@@ -58,9 +90,18 @@ class ClienteTCP(ObservadorEnvios):
         self._cola = cola
         self.seguridad = seguridad
         self.llave_destino = llave_destino
+        self.suite = suite
+        # Id de la sesión X25519 con el destino (None = híbrido con RSA)
+        self.sesion = None
+        self.confirmaciones = confirmaciones
+        # Negociada con el destino, como la suite (quien envía a varios
+        # destinos pasa los de cada uno a enviar())
+        self.compresion = compresion
         self._host = host
         self._puerto = puerto
+        self._estado_hilo = threading.local()
         self._logger = logging.getLogger(__name__)
+        self._trazas = RegistroTrazas.obtener_instancia()
 
     def actualizar(self) -> None:
         """
@@ -69,20 +110,69 @@ class ClienteTCP(ObservadorEnvios):
         """
         json_str = self._cola.desencolar()
         if json_str:
-            try:
-                # Parsear JSON para obtener información de destino
-                data = json.loads(json_str)
-                host = data.get('host', self._host)
-                puerto = data.get('puerto_destino', self._puerto)
+            self._estado_hilo.exito = self._enviar_json(json_str, self._destino_propio())
+
+    def enviar(self, paquete: 'PaqueteDTO', destino: DestinoEnvio) -> bool:
+        """
+        Envía un paquete ya numerado sin pasar por la cola
+
+        Los parámetros de cifrado llegan con el paquete, así que varios hilos
+        pueden enviar a la vez a destinos distintos (el servidor) sin
+        compartir la llave, la suite ni la sesión del cliente.
+
+        Args:
+            paquete: Paquete con host y puerto_destino
+            destino: Llave, suite, sesión X25519 y compresión del destino
+
+        Returns:
+            True si la trama llegó al destino (los MENSAJE quedan esperando
+            su ACK en ConfirmacionesEnvio)
+        """
+        return self._enviar_json(paquete.to_json(), destino)
+
+    def _destino_propio(self) -> DestinoEnvio:
+        # Copia de los parámetros del cliente al empezar el envío
+        return DestinoEnvio(self.llave_destino, self.suite, self.sesion, self.compresion)
 
-                self._logger.info(f"Enviando paquete a {host}:{puerto}")
-                self._enviar_paquete(json_str, host, puerto)
-            except json.JSONDecodeError as e:
-                self._logger.error(f"Error al parsear JSON: {e}")
-            except Exception as e:
-                self._logger.error(f"Error al enviar paquete: {e}")
+    def _enviar_json(self, json_str: str, destino: DestinoEnvio) -> bool:
+        try:
+            # Parsear JSON para obtener información de destino
+            data = json.loads(json_str)
+            host = data.get('host', self._host)
+            puerto = data.get('puerto_destino', self._puerto)
+
+            self._logger.info("Enviando paquete a %s:%s", host, puerto)
+            comprimible = self._comprimible(data)
+            confirmables = self._confirmables(data) if self.confirmaciones is not None else None
+            traza = self._traza(data) if self._trazas.activo else None
+            if traza is not None:
+                json_str = self._marcar_envio(data, traza)
+            if confirmables:
+                self._enviar_confirmable(json_str, confirmables, host, puerto, comprimible, traza, destino)
+            else:
+                self._enviar_paquete(json_str, host, puerto, comprimible, traza, destino)
+            return True
+        except json.JSONDecodeError as e:
+            self._logger.error("Error al parsear JSON: %s", e)
+        except Exception as e:
+            self._logger.error("Error al enviar paquete: %s", e)
+        return False
 
-    def _enviar_paquete(self, json_str: str, host: str, puerto: int) -> None:
+    def ultimo_envio_exitoso(self) -> bool:
+        """
+        Indica si el último envío hecho desde el hilo actual llegó al destino
+
+        El envío es síncrono (Emisor → ColaEnvios → ClienteTCP) y los errores
+        de red se registran sin propagarse, así que quien encoló el paquete
+        consulta aquí el resultado.
+
+        Returns:
+            True si el último envío del hilo actual fue exitoso
+        """
+        return getattr(self._estado_hilo, 'exito', False)
+
+    def _enviar_paquete(self, json_str: str, host: str, puerto: int, comprimible: bool = True,
+                        traza: Optional[dict] = None, destino: Optional[DestinoEnvio] = None) -> None:
         """
         Envía un paquete JSON por TCP con cifrado dual redundante
 
@@ -90,64 +180,172 @@ class ClienteTCP(ObservadorEnvios):
             json_str: String JSON a enviar
             host: Host destino
             puerto: Puerto destino
+            comprimible: Si el paquete puede comprimirse antes de cifrarse
+            traza: Contexto de traza del paquete (None = sin trazar)
+            destino: Parámetros de cifrado (None = los del cliente)
 
         Raises:
             Exception: Si falla tanto cifrado híbrido como RSA
         """
         try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
-                sock.settimeout(5.0)  # Timeout de 5 segundos
-                sock.connect((host, puerto))
-
+            with self._trazas.tramo("cliente.enviar_paquete", traza, destino=f"{host}:{puerto}"):
                 # Cifrar con sistema dual redundante
-                mensaje_final, modo_usado = self._cifrar_mensaje_dual(json_str)
-
-                # Enviar el paquete
-                sock.sendall(mensaje_final.encode('utf-8'))
-
-                self._logger.info(f"Paquete enviado [{modo_usado}] a {host}:{puerto}")
+                with self._trazas.tramo("cliente.cifrar", traza, bytes=len(json_str)):
+                    mensaje_final, modo_usado = self._cifrar_mensaje_dual(json_str, comprimible, destino)
+                with self._trazas.tramo("cliente.conectar_y_enviar", traza, modo=modo_usado):
+                    self._abrir_y_enviar(mensaje_final, host, puerto).close()
+            PAQUETES_ENVIADOS.inc(modo=modo_usado)
+            self._logger.info("Paquete enviado [%s] a %s:%s", modo_usado, host, puerto)
         except socket.timeout:
-            self._logger.error(f"Timeout al conectar a {host}:{puerto}")
+            ERRORES_ENVIO.inc(causa="timeout")
+            self._logger.error("Timeout al conectar a %s:%s", host, puerto)
             raise
         except ConnectionRefusedError:
-            self._logger.error(f"Conexión rechazada por {host}:{puerto}")
+            ERRORES_ENVIO.inc(causa="rechazada")
+            self._logger.error("Conexión rechazada por %s:%s", host, puerto)
             raise
         except Exception as e:
-            self._logger.error(f"Error al enviar paquete a {host}:{puerto}: {e}")
+            ERRORES_ENVIO.inc(causa="otro")
+            self._logger.error("Error al enviar paquete a %s:%s: %s", host, puerto, e)
             raise
 
-    def _cifrar_mensaje_dual(self, json_str: str) -> tuple:
+    @staticmethod
+    def _comprimible(data: dict) -> bool:
+        # Un LOTE no se comprime si lleva un LOGIN/REGISTRO
+        paquetes = data.get('contenido') if data.get('tipo') == TIPO_LOTE else [data]
+        return not any(p.get('tipo') in TIPOS_SIN_COMPRESION for p in paquetes or [])
+
+    @staticmethod
+    def _traza(data: dict) -> Optional[dict]:
+        # Un LOTE sigue la traza del primero de sus paquetes que tenga una
+        paquetes = data.get('contenido') if data.get('tipo') == TIPO_LOTE else [data]
+        return next((p['traza'] for p in paquetes or [] if p.get('traza')), None)
+
+    @staticmethod
+    def _marcar_envio(data: dict, traza: dict) -> str:
+        # `envio` se marca aquí, justo antes de cifrar: el receptor mide desde
+        # ahí hasta la llegada, sin la espera en el coalescedor ni la cola
+        traza["envio"] = time.time() * 1e6
+        return json.dumps(data, ensure_ascii=False)
+
+    @staticmethod
+    def _confirmables(data: dict):
+        """
+        Returns:
+            (sesion, [(seq, id_mensaje), ...]) de los mensajes del paquete (o
+            de cada paquete de un LOTE) que esperan ACK, o None si no hay
+        """
+        paquetes = data.get('contenido') if data.get('tipo') == TIPO_LOTE else [data]
+        mensajes = [p for p in paquetes or [] if p.get('seq') is not None and p.get('tipo') in TIPOS_CONFIRMADOS]
+        if not mensajes:
+            return None
+        return mensajes[0]['sesion'], [(p['seq'], p.get('id_mensaje')) for p in mensajes]
+
+    def _enviar_confirmable(self, json_str: str, confirmables: tuple, host: str, puerto: int,
+                            comprimible: bool = True, traza: Optional[dict] = None,
+                            destino: Optional[DestinoEnvio] = None) -> None:
+        """
+        Envía un paquete que espera ACK: la conexión queda abierta y pasa a
+        ConfirmacionesEnvio, que la vigila y retransmite la trama si hace falta
+
+        Raises:
+            Exception: Si la ventana del destino está llena o el primer envío falla
+        """
+        direccion = (host, puerto)
+        if not self.confirmaciones.reservar(direccion):
+            ERRORES_ENVIO.inc(causa="ventana_llena")
+            raise Exception(f"Ventana de envío llena hacia {host}:{puerto}")
+        try:
+            with self._trazas.tramo("cliente.enviar_paquete", traza, destino=f"{host}:{puerto}", confirmable=True):
+                with self._trazas.tramo("cliente.cifrar", traza, bytes=len(json_str)):
+                    mensaje_final, modo_usado = self._cifrar_mensaje_dual(json_str, comprimible, destino)
+                with self._trazas.tramo("cliente.conectar_y_enviar", traza, modo=modo_usado):
+                    sock = self._abrir_y_enviar(mensaje_final, host, puerto)
+        except Exception as e:
+            self.confirmaciones.liberar(direccion)
+            ERRORES_ENVIO.inc(causa=_causa_error(e))
+            self._logger.error("Error al enviar paquete a %s:%s: %s", host, puerto, e)
+            raise
+        PAQUETES_ENVIADOS.inc(modo=modo_usado)
+        sesion, mensajes = confirmables
+        self.confirmaciones.registrar(direccion, sesion, mensajes, mensaje_final, sock, self._abrir_y_enviar)
+        self._logger.info("Paquete enviado [%s] a %s:%s, esperando ACK de %d mensajes", modo_usado, host, puerto, len(mensajes))
+
+    @staticmethod
+    def _abrir_y_enviar(trama: str, host: str, puerto: int) -> socket.socket:
+        """
+        Abre una conexión y envía una trama ya cifrada
+
+        Returns:
+            La conexión abierta (quien llama la cierra)
+        """
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(5.0)  # Timeout de 5 segundos
+            inicio = time.perf_counter()
+            sock.connect((host, puerto))
+            TIEMPO_CONEXION.observar(time.perf_counter() - inicio)
+            datos = trama.encode('utf-8')
+            sock.sendall(datos)
+            BYTES_ENVIADOS.inc(len(datos))
+        except Exception:
+            sock.close()
+            raise
+        return sock
+
+    def _cifrar_mensaje_dual(self, json_str: str, comprimible: bool = True,
+                             destino: Optional[DestinoEnvio] = None) -> tuple:
         """
         Cifra un mensaje con sistema dual redundante:
-        1. Intenta cifrado HÍBRIDO (RSA + Fernet)
+        0. Si hay sesión X25519 con el destino, usa sus llaves (sin RSA)
+        1. Intenta cifrado HÍBRIDO (RSA + suite simétrica del destino)
         2. Si falla, usa cifrado RSA puro como respaldo
         3. Si ambos fallan, lanza excepción
 
+        En los modos 0 y 1 el texto se comprime antes de cifrar si hay una
+        compresión negociada y supera el umbral (RSA puro nunca comprime).
+
         Args:
             json_str: Mensaje JSON a cifrar
+            comprimible: False para paquetes que no deben comprimirse
+            destino: Llave, suite, sesión y compresión (None = los del cliente)
 
         Returns:
-            tuple: (mensaje_cifrado_con_newline, modo_usado)
+            tuple: (mensaje_cifrado_con_newline, modo_usado); la trama lleva
+            la etiqueta del modo ("X:", "H:", "G:", "C:" o "R:") para que el
+            receptor no tenga que adivinarlo
 
         Raises:
             Exception: Si fallan ambos métodos de cifrado
 
         Proceso de cifrado híbrido (seguridad.py):
-            1. Genera llave Fernet efímera
-            2. Cifra mensaje con Fernet (soporta cualquier tamaño)
-            3. Cifra llave Fernet con RSA-OAEP
-            4. Concatena: key_fernet_cifrada + b':::' + datos_cifrados
-            5. Codifica en base64
+            1. Genera llave simétrica efímera
+            2. Cifra mensaje con la suite (soporta cualquier tamaño)
+            3. Cifra la llave simétrica con RSA-OAEP
+            4. Concatena: llave_cifrada + b':::' + token (FERNET) o
+               llave_cifrada + nonce + datos_con_tag (AEAD)
+            5. Codifica en base64 y antepone la etiqueta del modo
         """
+        destino = destino or self._destino_propio()
+        texto = comprimir(json_str, destino.compresion if comprimible else None)
+        if destino.sesion is not None:
+            try:
+                bytes_cifrados = self.seguridad.cifrar_sesion(texto, destino.sesion)
+                mensaje_b64 = base64.b64encode(bytes_cifrados).decode('utf-8')
+                return (etiquetar_trama(MODO_X25519, mensaje_b64) + '\n', MODO_X25519)
+            except Exception as e_sesion:
+                self._logger.warning("Cifrado de sesión X25519 falló: %s, usando híbrido...", e_sesion)
+
         # INTENTO 1: Cifrado híbrido (preferido)
         try:
-            self._logger.debug("Intentando cifrado híbrido RSA+Fernet...")
-            bytes_cifrados = self.seguridad.cifrar(json_str, self.llave_destino)
+            self._logger.debug("Intentando cifrado híbrido RSA+%s...", destino.suite)
+            bytes_cifrados = self.seguridad.cifrar(texto, destino.llave, destino.suite)
             mensaje_b64 = base64.b64encode(bytes_cifrados).decode('utf-8')
-            return (mensaje_b64 + '\n', 'HIBRIDO')
+            modo = MODO_POR_SUITE[destino.suite]
+            return (etiquetar_trama(modo, mensaje_b64) + '\n', modo)
 
         except Exception as e_hibrido:
-            self._logger.warning(f"Cifrado híbrido falló: {e_hibrido}, intentando RSA puro...")
+            self._logger.warning("Cifrado híbrido falló: %s, intentando RSA puro...", e_hibrido)
 
             # INTENTO 2: Cifrado RSA puro (respaldo)
             try:
@@ -158,7 +356,7 @@ class ClienteTCP(ObservadorEnvios):
                 if len(json_str.encode('utf-8')) > 190:
                     raise ValueError(f"Mensaje muy grande para RSA puro ({len(json_str)} bytes > 190)")
 
-                bytes_cifrados = self.llave_destino.encrypt(
+                bytes_cifrados = destino.llave.encrypt(
                     json_str.encode('utf-8'),
                     padding.OAEP(
                         mgf=padding.MGF1(algorithm=hashes.SHA256()),
@@ -168,7 +366,7 @@ class ClienteTCP(ObservadorEnvios):
                 )
                 mensaje_b64 = base64.b64encode(bytes_cifrados).decode('utf-8')
                 self._logger.info("Usando RSA puro como respaldo")
-                return (mensaje_b64 + '\n', 'RSA')
+                return (etiquetar_trama(MODO_RSA, mensaje_b64) + '\n', MODO_RSA)
 
             except Exception as e_rsa:
                 # Ambos métodos fallaron
@@ -186,4 +384,4 @@ class ClienteTCP(ObservadorEnvios):
         """
         self._host = host
         self._puerto = puerto
-        self._logger.info(f"Host y puerto actualizados: {host}:{puerto}")
+        self._logger.info("Host y puerto actualizados: %s:%s", host, puerto)
@@ -0,0 +1,170 @@
+"""
+Agrupación de paquetes chicos en lotes (al estilo de Nagle)
+Junta los paquetes que van al mismo destino dentro de una ventana corta de
+tiempo/tamaño en una sola trama LOTE: una conexión y un cifrado por lote
+"""
+import json
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from chatTCP.src.PaqueteDTO.PaqueteDTO import PaqueteDTO
+
+TIPO_LOTE = "LOTE"
+_PREFIJO_LOTE = '{"tipo": "' + TIPO_LOTE + '"'
+
+
+class Lote:
+    """
+    Varios paquetes ya serializados que viajan en una sola trama
+
+    Se encola en ColaEnvios como un paquete más (to_json() devuelve la trama
+    armada, sin volver a serializar cada paquete).
+    """
+
+    def __init__(self, host: str, puerto: int, paquetes_json: List[str]):
+        self.tipo = TIPO_LOTE
+        self.host = host
+        self.puerto_destino = puerto
+        self.paquetes_json = paquetes_json
+
+    def to_json(self) -> str:
+        return (f'{_PREFIJO_LOTE}, "contenido": [{", ".join(self.paquetes_json)}], '
+                f'"host": {json.dumps(self.host)}, "puerto_destino": {json.dumps(self.puerto_destino)}}}')
+
+    def __str__(self) -> str:
+        return f"Lote({len(self.paquetes_json)} paquetes a {self.host}:{self.puerto_destino})"
+
+
+def es_lote(json_str: str) -> bool:
+    """Indica si un paquete recibido es un LOTE (sin parsearlo)"""
+    return json_str.startswith(_PREFIJO_LOTE)
+
+
+def separar_lote(json_str: str) -> List[str]:
+    """
+    Separa un LOTE en los paquetes que lo forman
+
+    Args:
+        json_str: Trama LOTE ya descifrada
+
+    Returns:
+        JSON de cada paquete, en el orden en que se enviaron
+    """
+    return [json.dumps(paquete, ensure_ascii=False) for paquete in json.loads(json_str)["contenido"]]
+
+
+class _Pendientes:
+    __slots__ = ("paquetes", "bytes", "timer", "ultimo_envio")
+
+    def __init__(self):
+        self.paquetes: List[str] = []
+        self.bytes = 0
+        self.timer: Optional[threading.Timer] = None
+        self.ultimo_envio = 0.0
+
+
+class Coalescedor:
+    """
+    Ventana de agrupación por destino
+
+    Un paquete que llega cuando el destino no tuvo envíos en los últimos
+    `espera` segundos sale enseguida (un mensaje aislado no paga latencia).
+    Los que llegan dentro de esa ventana se retienen y salen juntos al
+    vencerla o al juntar `max_paquetes` / `max_bytes`.
+
+    Solo sirve si la llave y la suite del ClienteTCP no cambian entre envíos
+    (un cliente que habla con un solo servidor): el lote se cifra al salir,
+    no al encolar cada paquete.
+    """
+
+    def __init__(self, salida: Callable[[object], None], espera: float = 0.005,
+                 max_paquetes: int = 32, max_bytes: int = 16384):
+        """
+        Args:
+            salida: Función que encola un paquete o lote listo para enviar
+            espera: Segundos que se retienen los paquetes de una ráfaga
+            max_paquetes: Paquetes por lote como máximo
+            max_bytes: Bytes de JSON por lote como máximo
+        """
+        self._salida = salida
+        self._espera = espera
+        self._max_paquetes = max_paquetes
+        self._max_bytes = max_bytes
+        self._pendientes: Dict[Tuple[str, int, Optional[str]], _Pendientes] = {}
+        self._lock = threading.Lock()
+        self.metricas = {"paquetes": 0, "tramas": 0, "lotes": 0}
+
+    def agregar(self, paquete: 'PaqueteDTO') -> None:
+        """
+        Agrega un paquete; sale enseguida o queda retenido en la ventana de su destino
+        """
+        # La sesión entra en la llave para que un lote no mezcle épocas de secuencia
+        llave = (paquete.host, paquete.puerto_destino, paquete.sesion)
+        ahora = time.monotonic()
+        listo = None
+        with self._lock:
+            self.metricas["paquetes"] += 1
+            pendientes = self._pendientes.setdefault(llave, _Pendientes())
+            if not pendientes.paquetes and ahora - pendientes.ultimo_envio >= self._espera:
+                pendientes.ultimo_envio = ahora
+                self.metricas["tramas"] += 1
+                listo = paquete
+            else:
+                json_str = paquete.to_json()
+                pendientes.paquetes.append(json_str)
+                pendientes.bytes += len(json_str)
+                if len(pendientes.paquetes) >= self._max_paquetes or pendientes.bytes >= self._max_bytes:
+                    listo = self._armar(llave, pendientes, ahora)
+                elif pendientes.timer is None:
+                    espera = max(0.0, pendientes.ultimo_envio + self._espera - ahora)
+                    pendientes.timer = threading.Timer(espera, self._vencer, args=(llave,))
+                    pendientes.timer.daemon = True
+                    pendientes.timer.start()
+        if listo is not None:
+            self._salida(listo)
+
+    def vaciar(self) -> None:
+        """Envía ya todo lo retenido"""
+        with self._lock:
+            ahora = time.monotonic()
+            listos = [self._armar(llave, p, ahora) for llave, p in self._pendientes.items() if p.paquetes]
+        for listo in listos:
+            self._salida(listo)
+
+    def _vencer(self, llave) -> None:
+        with self._lock:
+            pendientes = self._pendientes.get(llave)
+            pendientes.timer = None
+            if not pendientes.paquetes:
+                return
+            listo = self._armar(llave, pendientes, time.monotonic())
+        self._salida(listo)
+
+    def _armar(self, llave, pendientes: _Pendientes, ahora: float):
+        # Con self._lock tomado
+        if pendientes.timer is not None:
+            pendientes.timer.cancel()
+            pendientes.timer = None
+        paquetes, pendientes.paquetes, pendientes.bytes = pendientes.paquetes, [], 0
+        pendientes.ultimo_envio = ahora
+        self.metricas["tramas"] += 1
+        if len(paquetes) == 1:
+            return _Serializado(paquetes[0])
+        self.metricas["lotes"] += 1
+        return Lote(llave[0], llave[1], paquetes)
+
+
+class _Serializado:
+    """Paquete suelto que ya se serializó al retenerlo"""
+    __slots__ = ("_json",)
+
+    def __init__(self, json_str: str):
+        self._json = json_str
+
+    def to_json(self) -> str:
+        return self._json
+
+    def __str__(self) -> str:
+        return self._json[:80]
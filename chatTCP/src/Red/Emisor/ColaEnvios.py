@@ -11,21 +11,37 @@ if TYPE_CHECKING:
     from chatTCP.src.PaqueteDTO.PaqueteDTO import PaqueteDTO
 
 from ..ObserverEmisor.ObservableEnvios import ObservableEnvios
+from .Coalescedor import Coalescedor
+from ..Metricas import contador, medidor
+
+ENCOLADOS = contador("chattcp_cola_envios_encolados_total", "Paquetes encolados para envío")
+PROFUNDIDAD = medidor("chattcp_cola_envios_profundidad", "Paquetes esperando en ColaEnvios")
 
 
 class ColaEnvios(ObservableEnvios):
     """
     Cola que almacena paquetes para ser enviados por red
     Notifica a observadores cuando hay paquetes disponibles
+
+    Con `espera_lote` > 0 los paquetes pasan antes por un Coalescedor que
+    agrupa las ráfagas al mismo destino en tramas LOTE.
     """
 
-    def __init__(self):
+    def __init__(self, espera_lote: float = 0.0, max_paquetes_lote: int = 32, max_bytes_lote: int = 16384):
         """
         Inicializa la cola de envíos
+
+        Args:
+            espera_lote: Ventana de agrupación en segundos (0 = sin agrupar)
+            max_paquetes_lote: Paquetes por lote como máximo
+            max_bytes_lote: Bytes de JSON por lote como máximo
         """
         self._cola: Queue['PaqueteDTO'] = Queue()
         self._observador: Optional['ObservadorEnvios'] = None
         self._logger = logging.getLogger(__name__)
+        self.coalescedor: Optional[Coalescedor] = None
+        if espera_lote > 0:
+            self.coalescedor = Coalescedor(self._encolar_listo, espera_lote, max_paquetes_lote, max_bytes_lote)
 
     def agregar_observador(self, observador: 'ObservadorEnvios') -> None:
         """
@@ -35,7 +51,7 @@ class ColaEnvios(ObservableEnvios):
             observador: El observador a agregar
         """
         self._observador = observador
-        self._logger.info(f"Observador agregado a ColaEnvios: {observador}")
+        self._logger.info("Observador agregado a ColaEnvios: %s", observador)
 
     def notificar(self) -> None:
         """
@@ -52,8 +68,16 @@ class ColaEnvios(ObservableEnvios):
         Args:
             paquete: El paquete a encolar
         """
+        if self.coalescedor is not None:
+            self.coalescedor.agregar(paquete)
+        else:
+            self._encolar_listo(paquete)
+
+    def _encolar_listo(self, paquete) -> None:
         self._cola.put(paquete)
-        self._logger.info(f"Paquete encolado para envío: {paquete}")
+        ENCOLADOS.inc()
+        PROFUNDIDAD.fijar(self._cola.qsize())
+        self._logger.info("Paquete encolado para envío: %s", paquete)
         self.notificar()
 
     def desencolar(self) -> Optional[str]:
@@ -65,8 +89,9 @@ class ColaEnvios(ObservableEnvios):
         """
         if not self._cola.empty():
             paquete = self._cola.get()
+            PROFUNDIDAD.fijar(self._cola.qsize())
             json_str = self._serializar(paquete)
-            self._logger.debug(f"Paquete desencolado: {json_str}")
+            self._logger.debug("Paquete desencolado: %s", json_str)
             return json_str
         return None
 
@@ -0,0 +1,462 @@
+"""
+Confirmaciones de entrega y retransmisión
+Lleva los paquetes enviados que esperan ACK, los retransmite con backoff
+si no llega y mide la latencia de confirmación
+"""
+import heapq
+import itertools
+import logging
+import selectors
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Tipos de paquete cuya entrega se confirma (el resto no espera ACK)
+TIPOS_CONFIRMADOS = ("MENSAJE",)
+
+ESTADO_CONFIRMADO = "confirmado"
+ESTADO_SIN_CONFIRMACION = "sin_confirmacion"
+ESTADO_FALLIDO = "fallido"
+
+Destino = Tuple[str, int]
+
+
+def linea_confirmacion(seq: int, hasta: int) -> str:
+    """
+    Arma la línea de ACK que el receptor escribe en la misma conexión
+
+    Args:
+        seq: Seq del paquete recibido
+        hasta: Seq más alto tal que todos los anteriores ya se recibieron
+            (ACK acumulativo; 0 si no se sabe)
+    """
+    return f"A:{seq}:{hasta}\n"
+
+
+def leer_confirmacion(linea: str) -> Optional[Tuple[int, int]]:
+    """
+    Interpreta una línea de ACK
+
+    Returns:
+        Tupla (seq, hasta) o None si la línea no es un ACK
+    """
+    partes = linea.strip().split(":")
+    if len(partes) != 3 or partes[0] != "A":
+        return None
+    try:
+        return int(partes[1]), int(partes[2])
+    except ValueError:
+        return None
+
+
+class HistogramaLatencias:
+    """
+    Histograma de latencias con cubetas fijas en escala logarítmica
+
+    Registrar es O(1) y la memoria no crece con el número de muestras; los
+    percentiles se aproximan por el límite superior de la cubeta.
+    """
+
+    LIMITES_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+    def __init__(self):
+        self._cuentas = [0] * (len(self.LIMITES_MS) + 1)
+        self._total = 0
+        self._suma = 0.0
+        self._maximo = 0.0
+        self._lock = threading.Lock()
+
+    def registrar(self, segundos: float) -> None:
+        ms = segundos * 1000
+        indice = next((i for i, limite in enumerate(self.LIMITES_MS) if ms <= limite), len(self.LIMITES_MS))
+        with self._lock:
+            self._cuentas[indice] += 1
+            self._total += 1
+            self._suma += ms
+            self._maximo = max(self._maximo, ms)
+
+    def percentil(self, p: float) -> float:
+        """
+        Args:
+            p: Percentil (0-100)
+
+        Returns:
+            Latencia en ms (límite de la cubeta; el máximo observado para la última)
+        """
+        with self._lock:
+            if not self._total:
+                return 0.0
+            objetivo = self._total * p / 100
+            acumulado = 0
+            for i, cuenta in enumerate(self._cuentas):
+                acumulado += cuenta
+                if cuenta and acumulado >= objetivo:
+                    return float(self.LIMITES_MS[i]) if i < len(self.LIMITES_MS) else self._maximo
+            return self._maximo
+
+    def resumen(self) -> Dict[str, object]:
+        """
+        Returns:
+            Cuentas por cubeta ("<=1ms" ... ">5000ms"), total, media, máximo y p50/p90/p99 en ms
+        """
+        with self._lock:
+            cuentas = {f"<={limite}ms": c for limite, c in zip(self.LIMITES_MS, self._cuentas)}
+            cuentas[f">{self.LIMITES_MS[-1]}ms"] = self._cuentas[-1]
+            total, suma, maximo = self._total, self._suma, self._maximo
+        return {
+            "cuentas": cuentas,
+            "total": total,
+            "media_ms": suma / total if total else 0.0,
+            "max_ms": maximo,
+            "p50_ms": self.percentil(50),
+            "p90_ms": self.percentil(90),
+            "p99_ms": self.percentil(99),
+        }
+
+
+class _EnVuelo:
+    __slots__ = ("destino", "sesion", "seq", "ids", "trama", "reenviar",
+                 "intento", "rto", "primer_envio", "ultimo_envio", "plazo", "sock", "buffer", "terminado")
+
+    def __init__(self, destino, sesion, mensajes, trama, reenviar, rto):
+        self.destino = destino
+        self.sesion = sesion
+        # Una trama (un LOTE) puede llevar varios mensajes: la identifica su seq más alto
+        self.seq = max(seq for seq, _ in mensajes)
+        self.ids = [id_mensaje for _, id_mensaje in mensajes]
+        self.trama = trama
+        self.reenviar = reenviar
+        self.intento = 1
+        self.rto = rto
+        self.primer_envio = self.ultimo_envio = time.monotonic()
+        self.plazo = self.primer_envio + rto
+        self.sock: Optional[socket.socket] = None
+        self.buffer = b""
+        self.terminado = False
+
+
+class ConfirmacionesEnvio:
+    """
+    Ventana de paquetes en vuelo por destino, con ACK y retransmisión
+
+    El ClienteTCP no cierra la conexión de un paquete confirmable: se la pasa
+    a registrar() y un hilo la vigila junto con todas las demás (selectors).
+    El receptor contesta en la misma conexión con "A:<seq>:<hasta>"; el ACK
+    es acumulativo, así que uno solo confirma también los anteriores de la
+    misma sesión cuyo ACK se perdió o aún no llegó.
+
+    Si no llega ACK antes del plazo (RTO estimado por destino como en TCP:
+    srtt + 4·rttvar) se retransmite la misma trama con el plazo duplicado,
+    hasta `intentos` veces; luego el paquete se da por fallido. Si el otro
+    extremo cierra la conexión sin contestar es un receptor anterior sin
+    ACKs: el paquete queda como entregado sin confirmación.
+
+    Cada destino admite `ventana` tramas sin confirmar; reservar() espera
+    a que haya lugar hasta `espera_ventana` segundos. Los contadores y el
+    histograma cuentan mensajes (un LOTE puede llevar varios).
+    """
+
+    def __init__(self, ventana: int = 64, intentos: int = 5, rto_inicial: float = 1.0,
+                 rto_min: float = 0.2, rto_max: float = 8.0, espera_ventana: float = 2.0):
+        """
+        Args:
+            ventana: Tramas sin confirmar por destino
+            intentos: Envíos como máximo de cada paquete (el primero incluido)
+            rto_inicial: Plazo de ACK antes de tener mediciones del destino
+            rto_min: Plazo mínimo de ACK
+            rto_max: Plazo máximo de ACK (tope del backoff)
+            espera_ventana: Segundos que reservar() espera lugar en la ventana
+        """
+        self._ventana = ventana
+        self._intentos = intentos
+        self._rto_inicial = rto_inicial
+        self._rto_min = rto_min
+        self._rto_max = rto_max
+        self._espera_ventana = espera_ventana
+        self._logger = logging.getLogger(__name__)
+
+        self._lock = threading.Lock()
+        self._hay_lugar = threading.Condition(self._lock)
+        self._ocupados: Dict[Destino, int] = {}
+        self._en_vuelo: Dict[Tuple[Destino, str], Dict[int, _EnVuelo]] = {}
+        # destino -> (srtt, rttvar)
+        self._rtt: Dict[Destino, Tuple[float, float]] = {}
+        self._plazos: List[Tuple[float, int, _EnVuelo]] = []
+        self._orden = itertools.count()
+        self._nuevos: List[_EnVuelo] = []
+        self._observadores: List[Callable[[str, str, Optional[float]], None]] = []
+
+        self.histograma = HistogramaLatencias()
+        self._metricas = {"enviados": 0, "confirmados": 0, "sin_confirmacion": 0, "fallidos": 0,
+                          "retransmisiones": 0, "ventana_llena": 0}
+
+        self._selector = selectors.DefaultSelector()
+        self._despertar_r, self._despertar_w = socket.socketpair()
+        self._despertar_r.setblocking(False)
+        self._selector.register(self._despertar_r, selectors.EVENT_READ, None)
+        self._reenvios = ThreadPoolExecutor(max_workers=2, thread_name_prefix="retransmision")
+        self._activo = True
+        self._hilo = threading.Thread(target=self._vigilar, daemon=True, name="confirmaciones")
+        self._hilo.start()
+
+    def agregar_observador(self, funcion: Callable[[str, str, Optional[float]], None]) -> None:
+        """
+        Registra una función que se llama al resolverse cada paquete
+
+        Args:
+            funcion: Recibe (id_mensaje, estado, latencia en segundos o None);
+                estado es "confirmado", "sin_confirmacion" o "fallido"
+        """
+        self._observadores.append(funcion)
+
+    def reservar(self, destino: Destino) -> bool:
+        """
+        Ocupa un lugar en la ventana del destino, esperando si está llena
+
+        Returns:
+            False si no hubo lugar a tiempo
+        """
+        limite = time.monotonic() + self._espera_ventana
+        with self._hay_lugar:
+            while self._ocupados.get(destino, 0) >= self._ventana:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    self._metricas["ventana_llena"] += 1
+                    return False
+                self._hay_lugar.wait(restante)
+            self._ocupados[destino] = self._ocupados.get(destino, 0) + 1
+            return True
+
+    def liberar(self, destino: Destino) -> None:
+        """Devuelve un lugar reservado que no llegó a usarse (el envío falló)"""
+        with self._hay_lugar:
+            self._liberar(destino)
+
+    def registrar(self, destino: Destino, sesion: str, mensajes: List[Tuple[int, str]], trama: str,
+                  sock: socket.socket, reenviar: Callable[[str, str, int], socket.socket]) -> None:
+        """
+        Empieza a esperar el ACK de una trama ya enviada
+
+        Args:
+            destino: (host, puerto) del receptor (con lugar ya reservado)
+            sesion: Sesión del emisor hacia ese destino
+            mensajes: (seq, id_mensaje) de cada mensaje confirmable de la
+                trama; los observadores reciben el id_mensaje
+            trama: Trama cifrada tal como se envió (se retransmite igual)
+            sock: Conexión por la que se envió, todavía abierta
+            reenviar: Función (trama, host, puerto) -> conexión nueva con la
+                trama ya enviada
+        """
+        with self._lock:
+            entrada = _EnVuelo(destino, sesion, mensajes, trama, reenviar, self._rto(destino))
+            entrada.sock = sock
+            self._en_vuelo.setdefault((destino, sesion), {})[entrada.seq] = entrada
+            self._metricas["enviados"] += len(mensajes)
+            self._nuevos.append(entrada)
+        self._despertar()
+
+    def en_vuelo(self, destino: Optional[Destino] = None) -> int:
+        """Tramas sin confirmar (de un destino o de todos)"""
+        with self._lock:
+            if destino is not None:
+                return self._ocupados.get(destino, 0)
+            return sum(self._ocupados.values())
+
+    def metricas(self) -> Dict[str, object]:
+        """
+        Returns:
+            Contadores, paquetes en vuelo e histograma de latencia de ACK
+        """
+        with self._lock:
+            metricas = dict(self._metricas)
+            metricas["en_vuelo"] = sum(self._ocupados.values())
+        metricas["latencia_ack"] = self.histograma.resumen()
+        return metricas
+
+    def cerrar(self) -> None:
+        """Detiene el hilo y cierra las conexiones pendientes"""
+        self._activo = False
+        self._despertar()
+        self._hilo.join(timeout=2)
+        self._reenvios.shutdown(wait=False, cancel_futures=True)
+        for llave in list(self._selector.get_map().values()):
+            try:
+                llave.fileobj.close()
+            except OSError:
+                pass
+        self._selector.close()
+        self._despertar_w.close()
+
+    # --- Hilo de vigilancia ---
+
+    def _vigilar(self) -> None:
+        while self._activo:
+            with self._lock:
+                nuevos, self._nuevos = self._nuevos, []
+                proximo = self._plazos[0][0] if self._plazos else None
+            for entrada in nuevos:
+                self._vigilar_entrada(entrada)
+            espera = None if proximo is None else max(0.0, proximo - time.monotonic())
+            for llave, _ in self._selector.select(espera if not nuevos else 0):
+                if llave.data is None:
+                    try:
+                        self._despertar_r.recv(4096)
+                    except BlockingIOError:
+                        pass
+                else:
+                    self._leer(llave.data)
+            self._vencer_plazos()
+
+    def _vigilar_entrada(self, entrada: _EnVuelo) -> None:
+        with self._lock:
+            if entrada.terminado:
+                self._cerrar_sock(entrada)
+                return
+            heapq.heappush(self._plazos, (entrada.plazo, next(self._orden), entrada))
+        if entrada.sock is not None:
+            entrada.sock.setblocking(False)
+            self._selector.register(entrada.sock, selectors.EVENT_READ, entrada)
+
+    def _leer(self, entrada: _EnVuelo) -> None:
+        sock = entrada.sock
+        if sock is None:
+            # Ya resuelta por el ACK acumulativo de otra entrada del mismo select()
+            return
+        try:
+            datos = sock.recv(64)
+        except BlockingIOError:
+            return
+        except OSError:
+            datos = b""
+        if not datos:
+            # Conexión cerrada sin ACK: receptor sin confirmaciones
+            self._cerrar_sock(entrada)
+            self._resolver([entrada], ESTADO_SIN_CONFIRMACION)
+            return
+        entrada.buffer += datos
+        if b"\n" not in entrada.buffer:
+            return
+        ack = leer_confirmacion(entrada.buffer.split(b"\n", 1)[0].decode("utf-8", "replace"))
+        self._cerrar_sock(entrada)
+        if ack is None:
+            self._resolver([entrada], ESTADO_SIN_CONFIRMACION)
+            return
+        seq, hasta = ack
+        with self._lock:
+            pendientes = self._en_vuelo.get((entrada.destino, entrada.sesion), {})
+            confirmados = [e for s, e in pendientes.items() if s == seq or s <= hasta]
+        for otra in confirmados:
+            if otra is not entrada:
+                self._cerrar_sock(otra)
+        self._resolver(confirmados, ESTADO_CONFIRMADO)
+
+    def _vencer_plazos(self) -> None:
+        ahora = time.monotonic()
+        vencidos = []
+        with self._lock:
+            while self._plazos and self._plazos[0][0] <= ahora:
+                plazo, _, entrada = heapq.heappop(self._plazos)
+                if not entrada.terminado and plazo == entrada.plazo:
+                    vencidos.append(entrada)
+        for entrada in vencidos:
+            self._cerrar_sock(entrada)
+            if entrada.intento >= self._intentos:
+                self._logger.warning("Sin ACK de %s para seq %s tras %s intentos", entrada.destino, entrada.seq, entrada.intento)
+                self._resolver([entrada], ESTADO_FALLIDO)
+                continue
+            entrada.intento += 1
+            entrada.rto = min(entrada.rto * 2, self._rto_max)
+            with self._lock:
+                self._metricas["retransmisiones"] += 1
+            self._reenvios.submit(self._retransmitir, entrada)
+
+    def _retransmitir(self, entrada: _EnVuelo) -> None:
+        try:
+            sock = entrada.reenviar(entrada.trama, *entrada.destino)
+        except Exception as e:
+            self._logger.warning("Retransmisión a %s falló: %s", entrada.destino, e)
+            sock = None
+        entrada.ultimo_envio = time.monotonic()
+        entrada.plazo = entrada.ultimo_envio + entrada.rto
+        entrada.sock = sock
+        entrada.buffer = b""
+        with self._lock:
+            self._nuevos.append(entrada)
+        self._despertar()
+
+    def _resolver(self, entradas: List[_EnVuelo], estado: str) -> None:
+        ahora = time.monotonic()
+        resueltas = []
+        with self._hay_lugar:
+            for entrada in entradas:
+                if entrada.terminado:
+                    continue
+                entrada.terminado = True
+                resueltas.append(entrada)
+                pendientes = self._en_vuelo.get((entrada.destino, entrada.sesion))
+                if pendientes is not None:
+                    pendientes.pop(entrada.seq, None)
+                    if not pendientes:
+                        del self._en_vuelo[(entrada.destino, entrada.sesion)]
+                self._liberar(entrada.destino)
+                self._metricas[{ESTADO_CONFIRMADO: "confirmados", ESTADO_SIN_CONFIRMACION: "sin_confirmacion",
+                                ESTADO_FALLIDO: "fallidos"}[estado]] += len(entrada.ids)
+                if estado == ESTADO_CONFIRMADO and entrada.intento == 1:
+                    # Karn: solo los paquetes sin retransmitir miden el RTT
+                    self._medir_rtt(entrada.destino, ahora - entrada.ultimo_envio)
+
+        for entrada in resueltas:
+            latencia = ahora - entrada.primer_envio if estado == ESTADO_CONFIRMADO else None
+            for id_mensaje in entrada.ids:
+                if latencia is not None:
+                    self.histograma.registrar(latencia)
+                for funcion in self._observadores:
+                    try:
+                        funcion(id_mensaje, estado, latencia)
+                    except Exception as e:
+                        self._logger.error("Error en observador de confirmaciones: %s", e)
+
+    # --- Auxiliares (con self._lock tomado salvo _cerrar_sock y _despertar) ---
+
+    def _liberar(self, destino: Destino) -> None:
+        restantes = self._ocupados.get(destino, 0) - 1
+        if restantes > 0:
+            self._ocupados[destino] = restantes
+        else:
+            self._ocupados.pop(destino, None)
+        self._hay_lugar.notify()
+
+    def _rto(self, destino: Destino) -> float:
+        if destino not in self._rtt:
+            return self._rto_inicial
+        srtt, rttvar = self._rtt[destino]
+        return min(self._rto_max, max(self._rto_min, srtt + 4 * rttvar))
+
+    def _medir_rtt(self, destino: Destino, muestra: float) -> None:
+        if destino not in self._rtt:
+            self._rtt[destino] = (muestra, muestra / 2)
+            return
+        srtt, rttvar = self._rtt[destino]
+        rttvar = 0.75 * rttvar + 0.25 * abs(srtt - muestra)
+        self._rtt[destino] = (0.875 * srtt + 0.125 * muestra, rttvar)
+
+    def _cerrar_sock(self, entrada: _EnVuelo) -> None:
+        sock, entrada.sock = entrada.sock, None
+        if sock is None:
+            return
+        try:
+            self._selector.unregister(sock)
+        except (KeyError, ValueError):
+            pass
+        try:
+            sock.close()
+        except OSError:
+            pass
+
+    def _despertar(self) -> None:
+        try:
+            self._despertar_w.send(b"\0")
+        except OSError:
+            pass
@@ -0,0 +1,26 @@
+"""
+Parámetros de cifrado de un envío
+Permiten que varios hilos envíen por el mismo ClienteTCP a destinos con
+llaves, suites y compresión distintas sin tocar el estado del cliente
+"""
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from ..Cifrado.seguridad import SUITE_FERNET
+
+
+@dataclass(frozen=True)
+class DestinoEnvio:
+    """
+    Cómo se cifra un paquete para su destino
+
+    Attributes:
+        llave: Llave pública RSA del destino (objeto, no PEM)
+        suite: Suite simétrica del cifrado híbrido
+        sesion: Id de la sesión X25519 con el destino (None = híbrido con RSA)
+        compresion: Compresión antes de cifrar ("zlib", "lzma" o None)
+    """
+    llave: Any
+    suite: str = SUITE_FERNET
+    sesion: Optional[bytes] = None
+    compresion: Optional[str] = None
@@ -3,13 +3,17 @@ Emisor principal para envío de paquetes
 Implementa interfaz IEmisor
 """
 import logging
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
 if TYPE_CHECKING:
+    from .ClienteTCP import ClienteTCP
     from .ColaEnvios import ColaEnvios
+    from .DestinoEnvio import DestinoEnvio
+    from .NumeradorSecuencias import NumeradorSecuencias
     from chatTCP.src.PaqueteDTO.PaqueteDTO import PaqueteDTO
 
 from ...ComponenteEmisor.IEmisor import IEmisor
+from ..Trazas import RegistroTrazas
 
 
 class Emisor(IEmisor):
@@ -17,20 +21,29 @@ class Emisor(IEmisor):
     Componente emisor que envía paquetes a través de la cola de envíos
     """
 
-    def __init__(self, cola: 'ColaEnvios'):
+    def __init__(self, cola: 'ColaEnvios', numerador: Optional['NumeradorSecuencias'] = None,
+                 cliente: Optional['ClienteTCP'] = None):
         """
         Inicializa el emisor
 
         Args:
             cola: Cola de envíos donde se encolarán los paquetes
+            numerador: Asigna sesion/seq/id_mensaje a cada paquete (None = sin numerar)
+            cliente: ClienteTCP para los envíos directos de enviar_a()
         """
         self._cola = cola
+        self._numerador = numerador
+        self._cliente = cliente
         self._logger = logging.getLogger(__name__)
+        self._trazas = RegistroTrazas.obtener_instancia()
 
     def enviar_cambio(self, paquete: 'PaqueteDTO') -> None:
         """
         Envía un paquete a través de la red
 
+        Si las trazas están activas el paquete recibe su contexto de traza
+        (o continúa la del paquete que se está atendiendo en este hilo)
+
         Args:
             paquete: El paquete a enviar
 
@@ -41,8 +54,57 @@ class Emisor(IEmisor):
             self._logger.error("Intento de enviar paquete None")
             raise ValueError("El paquete no puede ser None")
 
-        self._logger.info(f"Enviando paquete: {paquete}")
-        self._cola.encolar(paquete)
+        if paquete.traza is None and self._trazas.activo:
+            paquete.traza = self._trazas.contexto_envio()
+        with self._trazas.tramo("emisor.enviar_cambio", paquete.traza, tipo=paquete.tipo, destino=paquete.destino):
+            if self._numerador is not None:
+                self._numerador.numerar(paquete)
+            self._logger.info("Enviando paquete: %s", paquete)
+            self._cola.encolar(paquete)
+
+    def numerar(self, paquete: 'PaqueteDTO') -> 'PaqueteDTO':
+        """
+        Asigna sesion/seq/id_mensaje sin enviar el paquete, para conocer su
+        id_mensaje antes de que llegue el ACK (enviar_a conserva la numeración
+        si el destino no cambia)
+
+        Args:
+            paquete: El paquete a numerar
+
+        Returns:
+            El mismo paquete
+        """
+        if self._numerador is not None:
+            self._numerador.numerar(paquete)
+        return paquete
+
+    def enviar_a(self, paquete: 'PaqueteDTO', destino: 'DestinoEnvio') -> bool:
+        """
+        Envía un paquete con los parámetros de cifrado de su destino, sin
+        pasar por la cola (el envío ocurre en el hilo que llama)
+
+        Args:
+            paquete: El paquete a enviar
+            destino: Llave, suite, sesión X25519 y compresión del destino
+
+        Returns:
+            True si este paquete llegó al destino
+
+        Raises:
+            ValueError: Si el paquete es None o el emisor no tiene ClienteTCP
+        """
+        if paquete is None:
+            raise ValueError("El paquete no puede ser None")
+        if self._cliente is None:
+            raise ValueError("El emisor no tiene ClienteTCP para envíos directos")
+
+        if paquete.traza is None and self._trazas.activo:
+            paquete.traza = self._trazas.contexto_envio()
+        with self._trazas.tramo("emisor.enviar_a", paquete.traza, tipo=paquete.tipo, destino=paquete.destino):
+            if self._numerador is not None:
+                self._numerador.numerar(paquete)
+            self._logger.info("Enviando paquete: %s", paquete)
+            return self._cliente.enviar(paquete, destino)
 
     def get_cola(self) -> 'ColaEnvios':
         """
@@ -0,0 +1,83 @@
+"""
+Numeración de paquetes salientes
+Asigna a cada paquete un número de secuencia por destino y un id único
+dentro de la sesión del emisor
+"""
+import itertools
+import threading
+import uuid
+import weakref
+from typing import Dict, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from chatTCP.src.PaqueteDTO.PaqueteDTO import PaqueteDTO
+
+
+class NumeradorSecuencias:
+    """
+    Secuencias monótonas por destino (host, puerto) dentro de una sesión
+
+    Cada emisor abre una sesión con un id aleatorio al crearse; el receptor
+    usa (sesion, seq) para descartar duplicados y reordenar, de modo que
+    varios hilos pueden enviar a la vez sin perder el orden de llegada a la
+    aplicación. El orden que cuenta es el de numeración: numerar() se llama
+    al encolar el paquete.
+
+    reiniciar() abre una época nueva para un destino (p. ej. cuando un
+    cliente vuelve a iniciar sesión desde la misma dirección): la sesión que
+    ve el receptor pasa a ser "<sesion>.<época>" y la secuencia vuelve a 1.
+    """
+
+    def __init__(self, sesion: str = None):
+        """
+        Args:
+            sesion: Id de sesión (por defecto uno aleatorio)
+        """
+        self.sesion = sesion or uuid.uuid4().hex[:16]
+        # destino -> (época, último seq)
+        self._por_destino: Dict[Tuple[str, int], Tuple[int, int]] = {}
+        self._ids = itertools.count(1)
+        # paquete -> destino para el que se numeró (sin retener el paquete)
+        self._numerados: 'weakref.WeakKeyDictionary[PaqueteDTO, Tuple[str, int]]' = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def numerar(self, paquete: 'PaqueteDTO') -> 'PaqueteDTO':
+        """
+        Asigna sesion, seq e id_mensaje si el paquete aún no los tiene
+
+        Un paquete ya numerado para el mismo destino (p. ej. una
+        retransmisión) conserva los suyos; si se reutiliza hacia otro destino
+        (el EventBus cambia host/puerto y lo vuelve a enviar) se numera de
+        nuevo, porque cada destino lleva su propia secuencia.
+
+        Args:
+            paquete: Paquete a enviar
+
+        Returns:
+            El mismo paquete
+        """
+        destino = (paquete.host, paquete.puerto_destino)
+        with self._lock:
+            if paquete.seq is not None and self._numerados.get(paquete, destino) == destino:
+                return paquete
+            self._numerados[paquete] = destino
+            epoca, seq = self._por_destino.get(destino, (0, 0))
+            seq += 1
+            self._por_destino[destino] = (epoca, seq)
+            paquete.id_mensaje = f"{self.sesion}-{next(self._ids)}"
+        paquete.sesion = f"{self.sesion}.{epoca}" if epoca else self.sesion
+        paquete.seq = seq
+        return paquete
+
+    def reiniciar(self, host: str, puerto: int) -> None:
+        """
+        Reinicia la secuencia hacia un destino en una época nueva
+
+        Args:
+            host: Host del destino
+            puerto: Puerto del destino
+        """
+        with self._lock:
+            epoca, seq = self._por_destino.get((host, puerto), (0, 0))
+            if seq:
+                self._por_destino[(host, puerto)] = (epoca + 1, 0)
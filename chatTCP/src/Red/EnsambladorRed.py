@@ -9,10 +9,13 @@ from ..ComponenteEmisor.IEmisor import IEmisor
 from .Emisor.ColaEnvios import ColaEnvios
 from .Emisor.ClienteTCP import ClienteTCP
 from .Emisor.Emisor import Emisor
+from .Emisor.NumeradorSecuencias import NumeradorSecuencias
+from .Emisor.ConfirmacionesEnvio import ConfirmacionesEnvio
 from .Receptor.ColaRecibos import ColaRecibos
 from .Receptor.ServidorTCP import ServidorTCP
 from .Receptor.Receptor import Receptor
-from .Cifrado.seguridad import GestorSeguridad
+from .Cifrado.seguridad import GestorSeguridad, SUITE_FERNET
+from .Cifrado.EjecutorCifrado import EjecutorCifrado
 
 
 class ConfigRed:
@@ -23,13 +26,45 @@ class ConfigRed:
         puerto_escucha: int = 5555,
         host_destino: str = 'localhost',
         puerto_destino: int = 5555,
-        llave_publica_destino: Optional[bytes] = None
+        llave_publica_destino: Optional[bytes] = None,
+        reuse_port: bool = False,
+        backlog: int = 5,
+        cifrado_modo: str = "en_linea",
+        cifrado_trabajadores: Optional[int] = None,
+        cifrado_max_pendientes: int = 256,
+        suite_cifrado: str = SUITE_FERNET,
+        reordenar: bool = True,
+        espera_reorden: float = 0.5,
+        confirmar_entregas: bool = True,
+        ventana_envio: int = 64,
+        espera_lote: float = 0.0,
+        compresion: Optional[str] = None
     ):
         self.host_escucha = host_escucha
         self.puerto_escucha = puerto_escucha
         self.host_destino = host_destino
         self.puerto_destino = puerto_destino
         self.llave_publica_destino = llave_publica_destino
+        self.reuse_port = reuse_port
+        self.backlog = backlog
+        self.cifrado_modo = cifrado_modo
+        self.cifrado_trabajadores = cifrado_trabajadores
+        self.cifrado_max_pendientes = cifrado_max_pendientes
+        self.suite_cifrado = suite_cifrado
+        # Con workers cada proceso ve solo parte de la secuencia de un
+        # cliente: reordenar=False deja solo el filtro de duplicados
+        self.reordenar = reordenar
+        self.espera_reorden = espera_reorden
+        # ACK y retransmisión de los MENSAJE, con hasta ventana_envio sin
+        # confirmar por destino
+        self.confirmar_entregas = confirmar_entregas
+        self.ventana_envio = ventana_envio
+        # Agrupa ráfagas al mismo destino en tramas LOTE (0 = desactivado).
+        # Solo para emisores con un único destino: el lote se cifra con la
+        # llave que tenga el ClienteTCP al salir, no al encolar
+        self.espera_lote = espera_lote
+        # Compresión antes de cifrar hacia el destino ("zlib", "lzma" o None)
+        self.compresion = compresion
 
 
 class EnsambladorRed:
@@ -62,17 +97,32 @@ class EnsambladorRed:
             cls._instancia = cls()
         return cls._instancia
 
+    @classmethod
+    def crear_independiente(cls) -> 'EnsambladorRed':
+        """
+        Crea un ensamblador aparte del singleton, para tener varios clientes
+        en un mismo proceso (p. ej. los usuarios simulados de la CLI)
+        """
+        instancia = object.__new__(cls)
+        instancia._inicializar()
+        return instancia
+
     def __init__(self):
         """Inicialización del singleton (solo se ejecuta una vez)"""
         if EnsambladorRed._inicializado:
             return
+        self._inicializar()
+        EnsambladorRed._inicializado = True
 
+    def _inicializar(self):
         self._emisor: Optional[IEmisor] = None
         self._servidor: Optional[ServidorTCP] = None
         self._gestor_seguridad: Optional[GestorSeguridad] = None
         self._cliente_tcp: Optional[ClienteTCP] = None
-
-        EnsambladorRed._inicializado = True
+        self._numerador: Optional[NumeradorSecuencias] = None
+        self._receptor: Optional[Receptor] = None
+        self._confirmaciones: Optional[ConfirmacionesEnvio] = None
+        self._cola_envios: Optional[ColaEnvios] = None
 
     def ensamblar(
         self,
@@ -92,45 +142,65 @@ class EnsambladorRed:
         # Si ya fue ensamblado, detener componentes previos
         if self._servidor is not None:
             self._servidor.detener()
+        if self._confirmaciones is not None:
+            self._confirmaciones.cerrar()
+            self._confirmaciones = None
 
         # 1. Crear gestor de seguridad SOLO si no existe
         if self._gestor_seguridad is None:
             self._gestor_seguridad = GestorSeguridad()
 
         # 2. Ensamblar sistema de EMISIÓN
-        cola_envios = ColaEnvios()
+        cola_envios = ColaEnvios(espera_lote=config.espera_lote)
+        self._cola_envios = cola_envios
 
         # Si no hay llave pública destino, usar la propia (para testing/loopback)
         llave_destino = config.llave_publica_destino
         if llave_destino is None:
             llave_destino = self._gestor_seguridad.obtener_publica_bytes()
 
+        if config.confirmar_entregas:
+            self._confirmaciones = ConfirmacionesEnvio(ventana=config.ventana_envio)
+
         self._cliente_tcp = ClienteTCP(
             cola=cola_envios,
             seguridad=self._gestor_seguridad,
             llave_destino=llave_destino,
             host=config.host_destino,
-            puerto=config.puerto_destino
+            puerto=config.puerto_destino,
+            suite=config.suite_cifrado,
+            confirmaciones=self._confirmaciones,
+            compresion=config.compresion
         )
 
         cola_envios.agregar_observador(self._cliente_tcp)
 
-        self._emisor = Emisor(cola_envios)
+        self._numerador = NumeradorSecuencias()
+        self._emisor = Emisor(cola_envios, self._numerador, self._cliente_tcp)
 
         # 3. Ensamblar sistema de RECEPCIÓN
         cola_recibos = ColaRecibos()
 
-        receptor_observador = Receptor()
-        receptor_observador.set_cola(cola_recibos)
-        receptor_observador.set_receptor(receptor)
+        self._receptor = Receptor(reordenar=config.reordenar, espera_reorden=config.espera_reorden)
+        self._receptor.set_cola(cola_recibos)
+        self._receptor.set_receptor(receptor)
 
-        cola_recibos.agregar_observador(receptor_observador)
+        cola_recibos.agregar_observador(self._receptor)
 
         self._servidor = ServidorTCP(
             cola=cola_recibos,
             seguridad=self._gestor_seguridad,
             puerto=config.puerto_escucha,
-            host=config.host_escucha
+            host=config.host_escucha,
+            reuse_port=config.reuse_port,
+            backlog=config.backlog,
+            ejecutor=EjecutorCifrado(
+                self._gestor_seguridad,
+                modo=config.cifrado_modo,
+                trabajadores=config.cifrado_trabajadores,
+                max_pendientes=config.cifrado_max_pendientes
+            ),
+            confirmador=self._receptor.confirmacion
         )
 
         # 4. Iniciar servidor
@@ -148,15 +218,94 @@ class EnsambladorRed:
             return None
         return self._gestor_seguridad.obtener_publica_bytes()
 
+    def establecer_sesion_x25519(self, bytes_pem_destino: bytes) -> Optional[bytes]:
+        """
+        Abre una sesión X25519 con el destino si este publica una llave X25519
+
+        Args:
+            bytes_pem_destino: Archivo de llaves publicado por el destino
+
+        Returns:
+            Id de la sesión (para enviarlo en LOGIN/REGISTRO) o None si el
+            destino no soporta X25519 y se sigue usando RSA
+        """
+        publica = GestorSeguridad.importar_publica_x25519(bytes_pem_destino)
+        if publica is None or self._cliente_tcp is None:
+            return None
+        id_sesion = self._gestor_seguridad.crear_sesion_x25519(publica)
+        self._cliente_tcp.sesion = id_sesion
+        return id_sesion
+
+    def establecer_suite(self, suite: str) -> None:
+        """
+        Cambia la suite simétrica con la que se cifra hacia el destino
+
+        Args:
+            suite: Suite negociada con el destino (FERNET, AESGCM o CHACHA20)
+        """
+        if self._cliente_tcp is not None:
+            self._cliente_tcp.suite = suite
+
+    def establecer_compresion(self, compresion: Optional[str]) -> None:
+        """
+        Cambia la compresión que se aplica antes de cifrar hacia el destino
+
+        Args:
+            compresion: Algoritmo negociado con el destino ("zlib", "lzma" o None)
+        """
+        if self._cliente_tcp is not None:
+            self._cliente_tcp.compresion = compresion
+
+    def reiniciar_secuencia(self, host: str, puerto: int) -> None:
+        """Empieza una secuencia nueva hacia un destino (p. ej. un cliente que vuelve a conectarse)"""
+        if self._numerador is not None:
+            self._numerador.reiniciar(host, puerto)
+
+    def obtener_metricas_secuencia(self) -> Optional[dict]:
+        """Retorna los contadores de duplicados/reordenados del receptor (si existe)"""
+        if self._receptor is None:
+            return None
+        return self._receptor.metricas_secuencia()
+
+    def agregar_observador_entregas(self, funcion) -> bool:
+        """
+        Registra una función que recibe (id_mensaje, estado, latencia) al
+        confirmarse, fallar o quedar sin confirmación cada MENSAJE enviado
+
+        Returns:
+            True si se registró (False si las entregas no se confirman)
+        """
+        if self._confirmaciones is None:
+            return False
+        self._confirmaciones.agregar_observador(funcion)
+        return True
+
+    def obtener_metricas_entregas(self) -> Optional[dict]:
+        """Retorna ACKs, retransmisiones e histograma de latencia de ACK (si están activos)"""
+        if self._confirmaciones is None:
+            return None
+        return self._confirmaciones.metricas()
+
+    def obtener_metricas_cifrado(self) -> Optional[dict]:
+        """Retorna las métricas de descifrado del servidor (si existe)"""
+        if self._servidor is None:
+            return None
+        return self._servidor.metricas_cifrado()
+
     def detener(self):
-        """Detiene el servidor TCP"""
+        """Envía lo que quede agrupado y detiene el servidor TCP y la espera de ACKs"""
+        if self._cola_envios is not None and self._cola_envios.coalescedor is not None:
+            self._cola_envios.coalescedor.vaciar()
         if self._servidor is not None:
             self._servidor.detener()
+        if self._confirmaciones is not None:
+            self._confirmaciones.cerrar()
+            self._confirmaciones = None
 
     @classmethod
     def resetear(cls):
         """Resetea el singleton (útil para testing)"""
-        if cls._instancia is not None and cls._instancia._servidor is not None:
-            cls._instancia._servidor.detener()
+        if cls._instancia is not None:
+            cls._instancia.detener()
         cls._instancia = None
         cls._inicializado = False
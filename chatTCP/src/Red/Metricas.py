@@ -0,0 +1,359 @@
+"""
+Registro de métricas del proceso
+Contadores, medidores e histogramas (estilo HDR) con etiquetas, exportables
+en el formato de texto de Prometheus por HTTP local o a un archivo
+"""
+import logging
+import math
+import os
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional, Tuple
+
+TIPO_CONTENIDO = "text/plain; version=0.0.4; charset=utf-8"
+# Subcubetas por potencia de dos: 2**3 = 8, error relativo de a lo sumo 12.5%
+BITS_SUBCUBETA = 3
+
+_logger = logging.getLogger(__name__)
+
+
+def _numero(valor: float) -> str:
+    if valor == math.inf:
+        return "+Inf"
+    if float(valor).is_integer():
+        return str(int(valor))
+    return repr(float(valor))
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Familia:
+    """
+    Métrica con nombre, ayuda y etiquetas; cada combinación de valores de
+    etiquetas es una serie distinta
+    """
+
+    tipo = ""
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Iterable[str] = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas: Tuple[str, ...] = tuple(etiquetas)
+        self._series: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _clave(self, etiquetas: Dict[str, object]) -> Tuple[str, ...]:
+        try:
+            if len(etiquetas) == len(self.etiquetas):
+                return tuple(str(etiquetas[e]) for e in self.etiquetas)
+        except KeyError:
+            pass
+        raise ValueError(f"{self.nombre} espera las etiquetas {self.etiquetas}, no {tuple(etiquetas)}")
+
+    def _texto_etiquetas(self, clave: Tuple[str, ...], extra: Optional[Tuple[str, str]] = None) -> str:
+        pares = [f'{e}="{_escapar(v)}"' for e, v in zip(self.etiquetas, clave)]
+        if extra is not None:
+            pares.append(f'{extra[0]}="{extra[1]}"')
+        return "{" + ",".join(pares) + "}" if pares else ""
+
+    def exportar(self) -> List[str]:
+        lineas = [f"# HELP {self.nombre} {_escapar(self.ayuda)}", f"# TYPE {self.nombre} {self.tipo}"]
+        with self._lock:
+            series = sorted((clave, self._copiar(valor)) for clave, valor in self._series.items())
+        for clave, valor in series:
+            lineas.extend(self._exportar_serie(clave, valor))
+        return lineas
+
+    def _copiar(self, valor):
+        return valor
+
+    def _exportar_serie(self, clave, valor) -> List[str]:
+        return [f"{self.nombre}{self._texto_etiquetas(clave)} {_numero(valor)}"]
+
+
+class Contador(_Familia):
+    """Valor que solo crece (paquetes, bytes, errores)"""
+
+    tipo = "counter"
+
+    def inc(self, valor: float = 1, **etiquetas) -> None:
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._series[clave] = self._series.get(clave, 0) + valor
+
+    def valor(self, **etiquetas) -> float:
+        with self._lock:
+            return self._series.get(self._clave(etiquetas), 0)
+
+
+class Medidor(_Familia):
+    """Valor que sube y baja (profundidad de una cola, conexiones abiertas)"""
+
+    tipo = "gauge"
+
+    def fijar(self, valor: float, **etiquetas) -> None:
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._series[clave] = valor
+
+    def inc(self, valor: float = 1, **etiquetas) -> None:
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._series[clave] = self._series.get(clave, 0) + valor
+
+    def dec(self, valor: float = 1, **etiquetas) -> None:
+        self.inc(-valor, **etiquetas)
+
+    def valor(self, **etiquetas) -> float:
+        with self._lock:
+            return self._series.get(self._clave(etiquetas), 0)
+
+
+class _SerieHistograma:
+    __slots__ = ("cuentas", "total", "suma", "maximo")
+
+    def __init__(self):
+        # límite superior (exclusivo, en unidades) -> cuenta
+        self.cuentas: Dict[int, int] = {}
+        self.total = 0
+        self.suma = 0.0
+        self.maximo = 0.0
+
+
+class Histograma(_Familia):
+    """
+    Distribución de valores con cubetas logarítmico-lineales (como HdrHistogram)
+
+    Cada potencia de dos de `resolucion` se divide en 2**BITS_SUBCUBETA
+    subcubetas, así que registrar es O(1), la memoria crece con el rango de
+    valores (no con las muestras) y los percentiles tienen un error relativo
+    acotado. Al exportar se agrupa en una cubeta por potencia de dos.
+    """
+
+    tipo = "histogram"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Iterable[str] = (), resolucion: float = 1e-6):
+        """
+        Args:
+            nombre: Nombre de la métrica
+            ayuda: Descripción
+            etiquetas: Nombres de las etiquetas
+            resolucion: Valor de la unidad más chica que se distingue (1 µs
+                para segundos; 1 para cantidades enteras)
+        """
+        super().__init__(nombre, ayuda, etiquetas)
+        self.resolucion = resolucion
+
+    @staticmethod
+    def _limite(unidades: int) -> int:
+        if unidades < (1 << BITS_SUBCUBETA):
+            return unidades + 1
+        corrimiento = unidades.bit_length() - 1 - BITS_SUBCUBETA
+        return ((unidades >> corrimiento) + 1) << corrimiento
+
+    def observar(self, valor: float, **etiquetas) -> None:
+        clave = self._clave(etiquetas)
+        limite = self._limite(max(0, int(valor / self.resolucion)))
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = _SerieHistograma()
+            serie.cuentas[limite] = serie.cuentas.get(limite, 0) + 1
+            serie.total += 1
+            serie.suma += valor
+            if valor > serie.maximo:
+                serie.maximo = valor
+
+    @contextmanager
+    def medir(self, **etiquetas):
+        """Observa los segundos que tarda el bloque `with` (o la función, usado como decorador)"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, **etiquetas)
+
+    def percentil(self, p: float, **etiquetas) -> float:
+        """
+        Args:
+            p: Percentil (0-100)
+
+        Returns:
+            Límite superior de la cubeta del percentil (el máximo observado
+            si es menor), 0 si no hay muestras
+        """
+        with self._lock:
+            serie = self._series.get(self._clave(etiquetas))
+            if serie is None or not serie.total:
+                return 0.0
+            objetivo = serie.total * p / 100
+            acumulado = 0
+            for limite in sorted(serie.cuentas):
+                acumulado += serie.cuentas[limite]
+                if acumulado >= objetivo:
+                    return min(limite * self.resolucion, serie.maximo)
+            return serie.maximo
+
+    def resumen(self, **etiquetas) -> Dict[str, float]:
+        """
+        Returns:
+            total, suma, media, máximo y p50/p90/p99 de la serie
+        """
+        with self._lock:
+            serie = self._series.get(self._clave(etiquetas)) or _SerieHistograma()
+            total, suma, maximo = serie.total, serie.suma, serie.maximo
+        return {"total": total, "suma": suma, "media": suma / total if total else 0.0, "max": maximo,
+                "p50": self.percentil(50, **etiquetas), "p90": self.percentil(90, **etiquetas),
+                "p99": self.percentil(99, **etiquetas)}
+
+    def _copiar(self, serie):
+        copia = _SerieHistograma()
+        copia.cuentas = dict(serie.cuentas)
+        copia.total, copia.suma, copia.maximo = serie.total, serie.suma, serie.maximo
+        return copia
+
+    def _exportar_serie(self, clave, serie) -> List[str]:
+        lineas = []
+        acumulado = 0
+        cuentas = sorted(serie.cuentas.items())
+        i = 0
+        potencia = 1
+        while i < len(cuentas):
+            while i < len(cuentas) and cuentas[i][0] <= potencia:
+                acumulado += cuentas[i][1]
+                i += 1
+            lineas.append(f"{self.nombre}_bucket{self._texto_etiquetas(clave, ('le', _numero(potencia * self.resolucion)))} {acumulado}")
+            potencia <<= 1
+        lineas.append(f"{self.nombre}_bucket{self._texto_etiquetas(clave, ('le', '+Inf'))} {serie.total}")
+        lineas.append(f"{self.nombre}_sum{self._texto_etiquetas(clave)} {_numero(serie.suma)}")
+        lineas.append(f"{self.nombre}_count{self._texto_etiquetas(clave)} {serie.total}")
+        return lineas
+
+
+class RegistroMetricas:
+    """
+    Métricas del proceso (Singleton); los módulos de la red registran las
+    suyas al importarse
+    """
+
+    _instancia = None
+    _lock_instancia = threading.Lock()
+
+    def __init__(self):
+        self._familias: Dict[str, _Familia] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def obtener_instancia(cls) -> 'RegistroMetricas':
+        if cls._instancia is None:
+            with cls._lock_instancia:
+                if cls._instancia is None:
+                    cls._instancia = cls()
+        return cls._instancia
+
+    def _registrar(self, clase, nombre, ayuda, etiquetas, **opciones):
+        with self._lock:
+            familia = self._familias.get(nombre)
+            if familia is None:
+                familia = self._familias[nombre] = clase(nombre, ayuda, etiquetas, **opciones)
+            elif type(familia) is not clase or familia.etiquetas != tuple(etiquetas):
+                raise ValueError(f"La métrica {nombre} ya existe con otro tipo o etiquetas")
+            return familia
+
+    def contador(self, nombre: str, ayuda: str, etiquetas: Iterable[str] = ()) -> Contador:
+        return self._registrar(Contador, nombre, ayuda, etiquetas)
+
+    def medidor(self, nombre: str, ayuda: str, etiquetas: Iterable[str] = ()) -> Medidor:
+        return self._registrar(Medidor, nombre, ayuda, etiquetas)
+
+    def histograma(self, nombre: str, ayuda: str, etiquetas: Iterable[str] = (), resolucion: float = 1e-6) -> Histograma:
+        return self._registrar(Histograma, nombre, ayuda, etiquetas, resolucion=resolucion)
+
+    def obtener(self, nombre: str) -> Optional[_Familia]:
+        return self._familias.get(nombre)
+
+    def exportar(self) -> str:
+        """
+        Returns:
+            Todas las métricas en el formato de texto de Prometheus
+        """
+        with self._lock:
+            familias = sorted(self._familias.items())
+        lineas = []
+        for _, familia in familias:
+            lineas.extend(familia.exportar())
+        return "\n".join(lineas) + "\n"
+
+    def volcar(self, ruta: str) -> None:
+        """Escribe exportar() en `ruta` (se reemplaza de una vez, sin archivos a medias)"""
+        temporal = f"{ruta}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            f.write(self.exportar())
+        os.replace(temporal, ruta)
+
+    def volcar_con_senal(self, ruta: str, senal: Optional[int] = None) -> None:
+        """
+        Vuelca las métricas en `ruta` cada vez que llega `senal` (SIGUSR1 por
+        defecto); debe llamarse desde el hilo principal
+
+        Raises:
+            OSError: Si la plataforma no tiene esa señal
+        """
+        senal = senal if senal is not None else getattr(signal, "SIGUSR1", None)
+        if senal is None:
+            raise OSError("SIGUSR1 no está disponible en esta plataforma")
+
+        def _al_recibir(signum, frame):
+            try:
+                self.volcar(ruta)
+            except OSError as e:
+                _logger.error("No se pudieron volcar las métricas en %s: %s", ruta, e)
+
+        signal.signal(senal, _al_recibir)
+
+    def servir_http(self, puerto: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """
+        Publica las métricas en http://host:puerto/metrics en un hilo aparte
+
+        Returns:
+            El servidor HTTP (shutdown() lo detiene)
+        """
+        registro = self
+
+        class _Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                cuerpo = registro.exportar().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", TIPO_CONTENIDO)
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, formato, *args):
+                pass
+
+        servidor = ThreadingHTTPServer((host, puerto), _Manejador)
+        servidor.daemon_threads = True
+        threading.Thread(target=servidor.serve_forever, name="metricas-http", daemon=True).start()
+        _logger.info("Métricas en http://%s:%s/metrics", host, servidor.server_address[1])
+        return servidor
+
+
+def contador(nombre: str, ayuda: str, etiquetas: Iterable[str] = ()) -> Contador:
+    return RegistroMetricas.obtener_instancia().contador(nombre, ayuda, etiquetas)
+
+
+def medidor(nombre: str, ayuda: str, etiquetas: Iterable[str] = ()) -> Medidor:
+    return RegistroMetricas.obtener_instancia().medidor(nombre, ayuda, etiquetas)
+
+
+def histograma(nombre: str, ayuda: str, etiquetas: Iterable[str] = (), resolucion: float = 1e-6) -> Histograma:
+    return RegistroMetricas.obtener_instancia().histograma(nombre, ayuda, etiquetas, resolucion)
@@ -12,9 +12,14 @@ if TYPE_CHECKING:
     from src.PaqueteDTO.PaqueteDTO import PaqueteDTO
 
 from ..ObserverReceptor.ObservableRecibos import ObservableRecibos
+from ..Emisor.Coalescedor import es_lote, separar_lote
+from ..Metricas import contador, medidor
 # CAMBIO: Corregido el import para que sea consistente
 from src.PaqueteDTO.PaqueteDTO import PaqueteDTO
 
+ENCOLADOS = contador("chattcp_cola_recibos_encolados_total", "Paquetes recibidos encolados (los de un LOTE, uno por uno)")
+PROFUNDIDAD = medidor("chattcp_cola_recibos_profundidad", "Paquetes esperando en ColaRecibos")
+
 
 class ColaRecibos(ObservableRecibos):
     """
@@ -39,29 +44,44 @@ class ColaRecibos(ObservableRecibos):
         """
         if observador not in self._observadores:
             self._observadores.append(observador)
-            self._logger.info(f"Observador agregado a ColaRecibos: {observador}")
+            self._logger.info("Observador agregado a ColaRecibos: %s", observador)
 
     def notificar(self) -> None:
         """
         Notifica a todos los observadores que hay paquetes recibidos
         """
-        self._logger.debug(f"Notificando {len(self._observadores)} observadores")
+        self._logger.debug("Notificando %d observadores", len(self._observadores))
         for observador in self._observadores:
             try:
                 observador.actualizar()
             except Exception as e:
-                self._logger.error(f"Error al notificar observador {observador}: {e}")
+                self._logger.error("Error al notificar observador %s: %s", observador, e)
 
     def encolar(self, json_str: str) -> None:
         """
         Agrega un paquete JSON a la cola y notifica a los observadores
 
+        Un LOTE se separa en sus paquetes, que se encolan uno por uno en
+        el orden en que se enviaron.
+
         Args:
             json_str: String JSON del paquete recibido
         """
-        self._cola.put(json_str)
-        self._logger.info(f"Paquete recibido encolado: {json_str[:100]}...")
-        self.notificar()
+        if es_lote(json_str):
+            try:
+                paquetes = separar_lote(json_str)
+            except (ValueError, KeyError, TypeError) as e:
+                self._logger.error("LOTE malformado descartado: %s", e)
+                return
+            self._logger.info("LOTE recibido con %d paquetes", len(paquetes))
+        else:
+            paquetes = [json_str]
+        for paquete in paquetes:
+            self._cola.put(paquete)
+            ENCOLADOS.inc()
+            PROFUNDIDAD.fijar(self._cola.qsize())
+            self._logger.info("Paquete recibido encolado: %.100s...", paquete)
+            self.notificar()
 
     def desencolar(self) -> Optional['PaqueteDTO']:
         """
@@ -72,8 +92,9 @@ class ColaRecibos(ObservableRecibos):
         """
         if not self._cola.empty():
             json_str = self._cola.get()
+            PROFUNDIDAD.fijar(self._cola.qsize())
             paquete = self._deserializar(json_str)
-            self._logger.debug(f"Paquete desencolado: {paquete}")
+            self._logger.debug("Paquete desencolado: %s", paquete)
             return paquete
         return None
 
@@ -93,7 +114,7 @@ class ColaRecibos(ObservableRecibos):
         try:
             return PaqueteDTO.from_json(json_str)
         except Exception as e:
-            self._logger.error(f"Error al deserializar paquete: {e}")
+            self._logger.error("Error al deserializar paquete: %s", e)
             raise ValueError(f"No se pudo deserializar el paquete: {e}")
 
     def esta_vacia(self) -> bool:
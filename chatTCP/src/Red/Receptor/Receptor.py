@@ -2,28 +2,74 @@
 Receptor principal para procesamiento de paquetes recibidos
 Implementa patrón Observer
 """
+import json
 import logging
-from typing import TYPE_CHECKING, Optional
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Iterable, Optional
 
 if TYPE_CHECKING:
     from .ColaRecibos import ColaRecibos
     from ...ComponenteReceptor.IReceptor import IReceptor
 
 from ..ObserverReceptor.ObservadorRecibos import ObservadorRecibos
+from .VentanaRecepcion import VentanaRecepcion
+from ..Emisor.ConfirmacionesEnvio import TIPOS_CONFIRMADOS, linea_confirmacion
+from ..Emisor.Coalescedor import TIPO_LOTE
+from ..Trazas import RegistroTrazas
+
+
+class _EstadoSesion:
+    """Ventana de una sesión emisora con su lock y su timer de huecos"""
+    __slots__ = ("ventana", "lock", "timer")
+
+    def __init__(self, ventana: VentanaRecepcion):
+        self.ventana = ventana
+        self.lock = threading.Lock()
+        self.timer: Optional[threading.Timer] = None
 
 
 class Receptor(ObservadorRecibos):
     """
     Componente receptor que procesa paquetes recibidos de la cola
+
+    Los paquetes numerados (sesion + seq) pasan por una VentanaRecepcion
+    por sesión emisora: se descartan duplicados y, si `reordenar` está
+    activo, se entregan en orden de envío. Los paquetes de una misma sesión
+    se entregan de a uno (lock por sesión); los de sesiones distintas, en
+    paralelo. Los paquetes sin numerar se entregan tal cual.
+
+    Con más de MAX_SESIONES se retira la ventana usada hace más tiempo, pero
+    de la sesión retirada se recuerda su tope (un entero): si vuelve, su
+    ventana empieza después de él y no se pueden repetir paquetes viejos.
+    Los topes también se acotan: pasadas MAX_TOPES_RETIRADOS se olvida el de
+    la sesión retirada hace más tiempo.
     """
 
-    def __init__(self):
+    MAX_SESIONES = 4096
+    MAX_TOPES_RETIRADOS = 65536
+
+    def __init__(self, reordenar: bool = True, espera_reorden: float = 0.5):
         """
         Inicializa el receptor
+
+        Args:
+            reordenar: Si se reordenan los paquetes de cada sesión (si no,
+                solo se descartan duplicados)
+            espera_reorden: Segundos que se espera un paquete faltante antes
+                de saltar el hueco
         """
         self._cola: Optional['ColaRecibos'] = None
         self._receptor: Optional['IReceptor'] = None
         self._logger = logging.getLogger(__name__)
+        self._reordenar = reordenar
+        self._espera_reorden = espera_reorden
+        self._sesiones: 'OrderedDict[str, _EstadoSesion]' = OrderedDict()
+        self._lock_sesiones = threading.Lock()
+        self._metricas_retiradas: Dict[str, int] = {}
+        # Sesión retirada → seq más alto entregado o saltado
+        self._topes_retirados: 'OrderedDict[str, int]' = OrderedDict()
+        self._trazas = RegistroTrazas.obtener_instancia()
 
     def set_cola(self, cola: 'ColaRecibos') -> None:
         """
@@ -33,7 +79,7 @@ class Receptor(ObservadorRecibos):
             cola: Cola de recibos
         """
         self._cola = cola
-        self._logger.info(f"Cola de recibos establecida en Receptor")
+        self._logger.info("Cola de recibos establecida en Receptor")
 
     def set_receptor(self, receptor: 'IReceptor') -> None:
         """
@@ -43,7 +89,7 @@ class Receptor(ObservadorRecibos):
             receptor: Objeto que implementa IReceptor para procesar paquetes
         """
         self._receptor = receptor
-        self._logger.info(f"Receptor establecido: {receptor}")
+        self._logger.info("Receptor establecido: %s", receptor)
 
     def actualizar(self) -> None:
         """
@@ -55,12 +101,113 @@ class Receptor(ObservadorRecibos):
             return
 
         paquete = self._cola.desencolar()
-        if paquete:
+        if not paquete:
+            return
+        if paquete.traza is None and self._trazas.activo:
+            # Traza iniciada por el ServidorTCP al recibir (mismo hilo)
+            paquete.traza = self._trazas.contexto_actual()
+        with self._trazas.tramo("receptor.actualizar", paquete.traza, tipo=paquete.tipo, seq=paquete.seq):
+            if paquete.seq is None or paquete.sesion is None:
+                self._entregar((paquete,))
+                return
+
+            estado = self._estado(paquete.sesion)
+            with estado.lock:
+                listos = estado.ventana.recibir(paquete)
+                self._entregar(listos)
+                self._programar_vencimiento(paquete.sesion, estado)
+
+    def confirmacion(self, json_str: str) -> Optional[str]:
+        """
+        Arma el ACK de un paquete ya encolado (el ServidorTCP lo escribe en
+        la misma conexión)
+
+        Args:
+            json_str: Paquete recibido (un LOTE se confirma con el seq más
+                alto de sus mensajes)
+
+        Returns:
+            Línea de ACK, o None si el paquete no se confirma (sin numerar o
+            de un tipo que no espera ACK)
+        """
+        try:
+            data = json.loads(json_str)
+        except json.JSONDecodeError:
+            return None
+        paquetes = data.get('contenido') if data.get('tipo') == TIPO_LOTE else [data]
+        mensajes = [p for p in paquetes or [] if isinstance(p, dict) and p.get('seq') is not None
+                    and p.get('sesion') is not None and p.get('tipo') in TIPOS_CONFIRMADOS]
+        if not mensajes:
+            return None
+        seq, sesion = max(p['seq'] for p in mensajes), mensajes[0]['sesion']
+        with self._lock_sesiones:
+            estado = self._sesiones.get(sesion)
+        if estado is None:
+            return linea_confirmacion(seq, 0)
+        with estado.lock:
+            return linea_confirmacion(seq, estado.ventana.confirmado())
+
+    def metricas_secuencia(self) -> Dict[str, int]:
+        """
+        Obtiene los contadores de la ventana de recepción de todas las sesiones
+
+        Returns:
+            Diccionario con entregados, duplicados, reordenados, tardios,
+            saltados y el número de sesiones activas
+        """
+        with self._lock_sesiones:
+            estados = list(self._sesiones.values())
+            totales = dict(self._metricas_retiradas)
+        for estado in estados:
+            for clave, valor in estado.ventana.metricas.items():
+                totales[clave] = totales.get(clave, 0) + valor
+        totales["sesiones"] = len(estados)
+        return totales
+
+    def _entregar(self, paquetes: Iterable) -> None:
+        for paquete in paquetes:
             try:
-                self._logger.info(f"Procesando paquete recibido: {paquete}")
-                self._receptor.recibir_cambio(paquete)
+                self._logger.info("Procesando paquete recibido: %s", paquete)
+                # Cada paquete entregado (también los liberados de la ventana)
+                # deja su propia traza como contexto de lo que envíe el receptor
+                with self._trazas.tramo("receptor.entregar", paquete.traza, tipo=paquete.tipo):
+                    self._receptor.recibir_cambio(paquete)
             except Exception as e:
-                self._logger.error(f"Error al procesar paquete: {e}")
+                self._logger.error("Error al procesar paquete: %s", e)
+
+    def _estado(self, sesion: str) -> _EstadoSesion:
+        with self._lock_sesiones:
+            estado = self._sesiones.get(sesion)
+            if estado is None:
+                inicio = self._topes_retirados.pop(sesion, 0) + 1
+                estado = _EstadoSesion(VentanaRecepcion(self._reordenar, espera_max=self._espera_reorden, inicio=inicio))
+                self._sesiones[sesion] = estado
+                if len(self._sesiones) > self.MAX_SESIONES:
+                    sesion_retirada, retirado = self._sesiones.popitem(last=False)
+                    self._topes_retirados[sesion_retirada] = retirado.ventana.tope()
+                    if len(self._topes_retirados) > self.MAX_TOPES_RETIRADOS:
+                        self._topes_retirados.popitem(last=False)
+                    for clave, valor in retirado.ventana.metricas.items():
+                        self._metricas_retiradas[clave] = self._metricas_retiradas.get(clave, 0) + valor
+            else:
+                self._sesiones.move_to_end(sesion)
+            return estado
+
+    def _programar_vencimiento(self, sesion: str, estado: _EstadoSesion) -> None:
+        # Llamado con estado.lock tomado
+        if estado.timer is None and estado.ventana.hay_pendientes():
+            estado.timer = threading.Timer(self._espera_reorden, self._liberar_vencidos, args=(sesion, estado))
+            estado.timer.daemon = True
+            estado.timer.start()
+
+    def _liberar_vencidos(self, sesion: str, estado: _EstadoSesion) -> None:
+        with estado.lock:
+            estado.timer = None
+            listos = estado.ventana.vencidos()
+            if listos:
+                self._logger.warning("Hueco en la secuencia de %s: se entregan %d paquetes sin esperar más", sesion, len(listos))
+            self._entregar(listos)
+            self._programar_vencimiento(sesion, estado)
 
     def get_cola(self) -> Optional['ColaRecibos']:
         """
@@ -1,15 +1,28 @@
 """
 Servidor TCP para recepción de paquetes
 Escucha conexiones entrantes y encola paquetes recibidos
-Descifrado dual con respaldo automático: Híbrido (RSA+Fernet) → RSA fallback
+Descifrado Híbrido (RSA+Fernet) o RSA puro según la forma de la trama,
+delegado a un EjecutorCifrado (en línea o en un pool)
 """
+import json
 import socket
 import threading
 import logging
-import base64
-from typing import TYPE_CHECKING, Optional
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
 
 from ..Cifrado.seguridad import GestorSeguridad
+from ..Cifrado.EjecutorCifrado import EjecutorCifrado
+from ..Metricas import contador, histograma, medidor
+from ..Trazas import RegistroTrazas
+from ..Emisor.Coalescedor import TIPO_LOTE
+
+CONEXIONES = contador("chattcp_servidor_conexiones_total", "Conexiones aceptadas por ServidorTCP")
+CONEXIONES_ABIERTAS = medidor("chattcp_servidor_conexiones_abiertas", "Conexiones que se están atendiendo")
+PAQUETES_RECIBIDOS = contador("chattcp_servidor_paquetes_total", "Tramas descifradas y encoladas", ("modo",))
+PAQUETES_RECHAZADOS = contador("chattcp_servidor_rechazos_total", "Tramas descartadas (vacia o descifrado)", ("causa",))
+BYTES_RECIBIDOS = contador("chattcp_servidor_bytes_total", "Bytes de tramas cifradas recibidos")
+TIEMPO_PAQUETE = histograma("chattcp_servidor_paquete_segundos", "Desde que llega la trama hasta que termina encolar() (descifrado incluido)")
 
 if TYPE_CHECKING:
     from .ColaRecibos import ColaRecibos
@@ -24,18 +37,40 @@ class ServidorTCP:
                  cola: 'ColaRecibos',
                  seguridad: 'GestorSeguridad',
                  puerto: int = 5555,
-                 host: str = '0.0.0.0'):
+                 host: str = '0.0.0.0',
+                 reuse_port: bool = False,
+                 backlog: int = 5,
+                 ejecutor: Optional[EjecutorCifrado] = None,
+                 confirmador: Optional[Callable[[str], Optional[str]]] = None):
+        """
+        Args:
+            cola: Cola donde se encolan los paquetes descifrados
+            seguridad: Gestor de seguridad (REQUERIDO)
+            puerto: Puerto de escucha
+            host: Interfaz de escucha
+            reuse_port: Activa SO_REUSEPORT para que varios procesos escuchen el
+                mismo puerto y el kernel reparta las conexiones entre ellos
+            backlog: Conexiones pendientes que acepta el socket de escucha
+            ejecutor: Etapa de descifrado (por defecto, en el hilo de la conexión)
+            confirmador: Arma el ACK de un paquete ya encolado, que se contesta
+                por la misma conexión (None = no se contesta)
+        """
         if not seguridad:
             raise ValueError("GestorSeguridad es REQUERIDO - sin cifrado no está permitido")
 
         self.seguridad = seguridad
+        self._ejecutor = ejecutor if ejecutor is not None else EjecutorCifrado(seguridad)
         self._cola = cola
+        self._confirmador = confirmador
         self._puerto = puerto
         self._host = host
+        self._reuse_port = reuse_port
+        self._backlog = backlog
         self._socket: Optional[socket.socket] = None
         self._ejecutando = False
         self._thread: Optional[threading.Thread] = None
         self._logger = logging.getLogger(__name__)
+        self._trazas = RegistroTrazas.obtener_instancia()
 
     def iniciar(self) -> None:
         if self._ejecutando:
@@ -45,18 +80,22 @@ class ServidorTCP:
         try:
             self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if self._reuse_port:
+                if not hasattr(socket, "SO_REUSEPORT"):
+                    raise OSError("SO_REUSEPORT no está disponible en esta plataforma")
+                self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
             self._socket.bind((self._host, self._puerto))
             self._puerto = self._socket.getsockname()[1]
-            self._socket.listen(5)
+            self._socket.listen(self._backlog)
             self._ejecutando = True
 
-            self._logger.info(f"Servidor TCP iniciado en {self._host}:{self._puerto}")
+            self._logger.info("Servidor TCP iniciado en %s:%s", self._host, self._puerto)
 
             self._thread = threading.Thread(target=self._aceptar_conexiones, daemon=True)
             self._thread.start()
 
         except Exception as e:
-            self._logger.error(f"Error al iniciar servidor: {e}")
+            self._logger.error("Error al iniciar servidor: %s", e)
             self._ejecutando = False
             raise
 
@@ -68,11 +107,13 @@ class ServidorTCP:
             try:
                 self._socket.close()
             except Exception as e:
-                self._logger.error(f"Error al cerrar socket: {e}")
+                self._logger.error("Error al cerrar socket: %s", e)
 
         if self._thread and self._thread.is_alive():
             self._thread.join(timeout=2)
 
+        self._ejecutor.cerrar()
+
         self._logger.info("Servidor TCP detenido")
 
     def _aceptar_conexiones(self) -> None:
@@ -82,7 +123,8 @@ class ServidorTCP:
                     self._socket.settimeout(1.0)
                     try:
                         cliente_socket, direccion = self._socket.accept()
-                        self._logger.info(f"Conexión aceptada de {direccion}")
+                        CONEXIONES.inc()
+                        self._logger.info("Conexión aceptada de %s", direccion)
 
                         thread_cliente = threading.Thread(
                             target=self._recibir_paquete,
@@ -96,74 +138,109 @@ class ServidorTCP:
 
             except Exception as e:
                 if self._ejecutando:
-                    self._logger.error(f"Error al aceptar conexión: {e}")
+                    self._logger.error("Error al aceptar conexión: %s", e)
 
     def _recibir_paquete(self, cliente_socket: socket.socket) -> None:
+        CONEXIONES_ABIERTAS.inc()
         try:
             buffer = []
+            inicio = inicio_us = None
             while True:
                 chunk = cliente_socket.recv(1024).decode('utf-8')
                 if not chunk:
                     break
+                if inicio is None:
+                    inicio = time.perf_counter()
+                    inicio_us = time.time() * 1e6
                 buffer.append(chunk)
                 if '\n' in chunk:
                     break
 
             mensaje_recibido = ''.join(buffer).strip()
+            BYTES_RECIBIDOS.inc(sum(len(chunk) for chunk in buffer))
 
             if mensaje_recibido:
                 json_str, modo_usado = self._descifrar_mensaje_dual(mensaje_recibido)
 
                 if json_str and "Error" not in json_str:
-                    self._logger.info(f"Paquete recibido [{modo_usado}]: {json_str[:50]}...")
-                    self._cola.encolar(json_str)
+                    self._logger.info("Paquete recibido [%s]: %.50s...", modo_usado, json_str)
+                    traza = None
+                    if self._trazas.activo:
+                        descifrado_us = time.time() * 1e6
+                        traza = self._traza(json_str)
+                        if traza is not None and "envio" in traza:
+                            # Desde que el ClienteTCP empezó a cifrar hasta la llegada:
+                            # cifrado, conexión y red del emisor
+                            self._trazas.registrar("envio_a_llegada", traza, traza["envio"], inicio_us)
+                        elif traza is None:
+                            # El emisor no traza: la traza empieza aquí (con muestreo) y
+                            # el Receptor la toma del contexto del hilo
+                            traza = self._trazas.contexto_envio()
+                    if traza is not None:
+                        self._trazas.registrar("servidor.leer_y_descifrar", traza, inicio_us, descifrado_us,
+                                               modo=modo_usado, bytes=len(mensaje_recibido))
+                    with self._trazas.tramo("servidor.recibir_paquete", traza, modo=modo_usado):
+                        self._cola.encolar(json_str)
+                    PAQUETES_RECIBIDOS.inc(modo=modo_usado)
+                    TIEMPO_PAQUETE.observar(time.perf_counter() - inicio)
+                    self._confirmar(cliente_socket, json_str)
                 else:
+                    PAQUETES_RECHAZADOS.inc(causa="descifrado")
                     self._logger.error("RECHAZO DE PAQUETE: No se pudo descifrar o formato incorrecto")
             else:
+                PAQUETES_RECHAZADOS.inc(causa="vacia")
                 self._logger.warning("Mensaje vacío recibido")
 
         except Exception as e:
-            self._logger.error(f"Error al recibir paquete: {e}")
+            self._logger.error("Error al recibir paquete: %s", e)
         finally:
+            CONEXIONES_ABIERTAS.dec()
             try:
                 cliente_socket.close()
             except Exception as e:
-                self._logger.error(f"Error al cerrar socket del cliente: {e}")
+                self._logger.error("Error al cerrar socket del cliente: %s", e)
 
-    def _descifrar_mensaje_dual(self, mensaje: str) -> tuple:
-  
+    @staticmethod
+    def _traza(json_str: str) -> Optional[Dict[str, Any]]:
+        # Solo se vuelve a leer el JSON si el paquete (o un LOTE) trae traza
+        if '"traza"' not in json_str:
+            return None
         try:
-            self._logger.debug("Intentando descifrado híbrido RSA+Fernet...")
-            bytes_cifrados = base64.b64decode(mensaje)
-            texto_plano = self.seguridad.desifrar(bytes_cifrados)
-            
-            if texto_plano is None:
-                raise Exception("Fallo interno en desifrar()")
-
-            return (texto_plano, 'HIBRIDO')
-
-        except Exception as e_hibrido:
-          
+            data = json.loads(json_str)
+        except json.JSONDecodeError:
+            return None
+        paquetes = data.get('contenido') if data.get('tipo') == TIPO_LOTE else [data]
+        return next((p['traza'] for p in paquetes or [] if isinstance(p, dict) and isinstance(p.get('traza'), dict)), None)
+
+    def _confirmar(self, cliente_socket: socket.socket, json_str: str) -> None:
+        if self._confirmador is None:
+            return
+        linea = self._confirmador(json_str)
+        if linea:
             try:
-                from cryptography.hazmat.primitives.asymmetric import padding
-                from cryptography.hazmat.primitives import hashes
-
-                bytes_cifrados = base64.b64decode(mensaje)
-                texto_plano = self.seguridad.private_key.decrypt(
-                    bytes_cifrados,
-                    padding.OAEP(
-                        mgf=padding.MGF1(algorithm=hashes.SHA256()),
-                        algorithm=hashes.SHA256(),
-                        label=None
-                    )
-                )
-                self._logger.info("Usando RSA puro como respaldo para descifrado")
-                return (texto_plano.decode('utf-8'), 'RSA')
-
-            except Exception as e_rsa:
-                
-                self._logger.error(f"FALLO TOTAL DE DESCIFRADO")
-                return (None, 'NINGUNO')
+                cliente_socket.sendall(linea.encode('utf-8'))
+            except OSError as e:
+                # El emisor no esperaba ACK o ya cerró: no es un error del paquete
+                self._logger.debug("No se pudo enviar ACK: %s", e)
+
+    def _descifrar_mensaje_dual(self, mensaje: str) -> tuple:
+        """
+        Descifra la trama con una sola operación de llave privada
+
+        El modo (HIBRIDO o RSA) viene en la etiqueta de la trama ("H:"/"R:");
+        las tramas sin etiqueta de emisores anteriores se reconocen por su
+        forma. Nunca se prueba un modo y, si falla, el otro.
+
+        Returns:
+            tuple: (texto o None, modo usado)
+        """
+        texto_plano, modo = self._ejecutor.descifrar(mensaje)
+        if texto_plano is None:
+            self._logger.error("FALLO TOTAL DE DESCIFRADO")
+        return (texto_plano, modo)
+
+    def metricas_cifrado(self) -> Dict[str, Any]:
+        return self._ejecutor.metricas()
 
     def esta_ejecutando(self) -> bool:
         return self._ejecutando
@@ -0,0 +1,162 @@
+"""
+Ventana de recepción por emisor
+Descarta duplicados y repeticiones (replay) con una ventana deslizante y
+reordena los paquetes de cada sesión según su número de secuencia
+"""
+import time
+from typing import Dict, List, Optional, Set, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from chatTCP.src.PaqueteDTO.PaqueteDTO import PaqueteDTO
+
+
+class VentanaRecepcion:
+    """
+    Estado de recepción de una sesión emisora
+
+    Con `reordenar=True` los paquetes se entregan en orden de seq: uno que
+    llega adelantado espera en el buffer hasta que llegan los anteriores o
+    hasta que vence `espera_max`, y entonces el hueco se salta. Si el
+    paquete saltado llega después (y sigue dentro de la ventana) se entrega
+    igual, fuera de orden, en lugar de perderlo.
+
+    Con `reordenar=False` (p. ej. workers, donde cada proceso ve solo una
+    parte de la secuencia) solo se descartan duplicados.
+
+    No es thread-safe: el Receptor la usa con un lock por sesión.
+    """
+
+    def __init__(self, reordenar: bool = True, tamanio: int = 1024,
+                 max_pendientes: int = 256, espera_max: float = 0.5, inicio: int = 1):
+        """
+        Args:
+            reordenar: Si se retienen paquetes adelantados para entregarlos en orden
+            tamanio: Seqs hacia atrás que se recuerdan para detectar duplicados
+            max_pendientes: Paquetes adelantados que se retienen como máximo
+            espera_max: Segundos que se espera un paquete faltante
+            inicio: Primer seq que se acepta (los anteriores son duplicados)
+        """
+        self.reordenar = reordenar
+        self._tamanio = tamanio
+        self._max_pendientes = max_pendientes
+        self._espera_max = espera_max
+
+        self._inicio = inicio
+        self._esperado = inicio
+        self._pendientes: Dict[int, Tuple['PaqueteDTO', float]] = {}
+        # Seqs por debajo de _esperado que no se entregaron (saltados) o que
+        # se entregaron fuera de su turno (sin reordenar)
+        self._saltados: Set[int] = set()
+        self._vistos: Set[int] = set()
+        self.metricas: Dict[str, int] = {"entregados": 0, "duplicados": 0, "reordenados": 0,
+                                         "tardios": 0, "saltados": 0}
+
+    def recibir(self, paquete: 'PaqueteDTO', ahora: Optional[float] = None) -> List['PaqueteDTO']:
+        """
+        Registra un paquete recibido
+
+        Args:
+            paquete: Paquete con seq asignado
+            ahora: Instante de llegada (por defecto, time.monotonic())
+
+        Returns:
+            Paquetes listos para entregar, en orden (vacío si es un duplicado
+            o si quedó retenido esperando a los anteriores)
+        """
+        ahora = time.monotonic() if ahora is None else ahora
+        seq = paquete.seq
+        if not self.reordenar:
+            return self._recibir_sin_orden(paquete, seq)
+
+        if seq < self._esperado:
+            if seq in self._saltados:
+                self._saltados.discard(seq)
+                self.metricas["tardios"] += 1
+                self.metricas["entregados"] += 1
+                return [paquete]
+            self.metricas["duplicados"] += 1
+            return []
+        if seq in self._pendientes:
+            self.metricas["duplicados"] += 1
+            return []
+
+        if seq > self._esperado:
+            self._pendientes[seq] = (paquete, ahora)
+            self.metricas["reordenados"] += 1
+            if len(self._pendientes) > self._max_pendientes:
+                return self._saltar_hueco()
+            return []
+
+        listos = [paquete]
+        self._esperado += 1
+        listos += self._vaciar_consecutivos()
+        self.metricas["entregados"] += len(listos)
+        return listos
+
+    def vencidos(self, ahora: Optional[float] = None) -> List['PaqueteDTO']:
+        """
+        Libera los paquetes retenidos cuyo faltante ya esperó demasiado
+
+        Returns:
+            Paquetes listos para entregar, en orden
+        """
+        ahora = time.monotonic() if ahora is None else ahora
+        listos: List['PaqueteDTO'] = []
+        while self._pendientes and ahora - min(t for _, t in self._pendientes.values()) >= self._espera_max:
+            listos += self._saltar_hueco()
+        return listos
+
+    def hay_pendientes(self) -> bool:
+        return bool(self._pendientes)
+
+    def confirmado(self) -> int:
+        """
+        Seq más alto tal que este y todos los anteriores ya se recibieron
+        (para el ACK acumulativo; 0 sin reordenar, donde no se sabe)
+        """
+        if not self.reordenar:
+            return 0
+        if self._saltados:
+            return min(self._saltados) - 1
+        return self._esperado - 1
+
+    def tope(self) -> int:
+        """
+        Seq más alto ya entregado o saltado: todo lo que esté por debajo o
+        sea igual no se vuelve a aceptar si la sesión se retoma con
+        `inicio` = tope() + 1
+        """
+        return self._esperado - 1
+
+    def _recibir_sin_orden(self, paquete: 'PaqueteDTO', seq: int) -> List['PaqueteDTO']:
+        if seq in self._vistos or seq < self._inicio or seq <= self._esperado - self._tamanio:
+            self.metricas["duplicados"] += 1
+            return []
+        self._vistos.add(seq)
+        if seq >= self._esperado:
+            # Aquí _esperado es el seq más alto visto + 1
+            self._esperado = seq + 1
+            limite = self._esperado - self._tamanio
+            self._vistos = {s for s in self._vistos if s > limite}
+        self.metricas["entregados"] += 1
+        return [paquete]
+
+    def _saltar_hueco(self) -> List['PaqueteDTO']:
+        siguiente = min(self._pendientes)
+        saltados = range(self._esperado, siguiente)
+        self._saltados.update(saltados)
+        self.metricas["saltados"] += len(saltados)
+        self._esperado = siguiente
+        listos = self._vaciar_consecutivos()
+        self.metricas["entregados"] += len(listos)
+
+        limite = self._esperado - self._tamanio
+        self._saltados = {s for s in self._saltados if s > limite}
+        return listos
+
+    def _vaciar_consecutivos(self) -> List['PaqueteDTO']:
+        listos = []
+        while self._esperado in self._pendientes:
+            listos.append(self._pendientes.pop(self._esperado)[0])
+            self._esperado += 1
+        return listos
@@ -0,0 +1,193 @@
+"""
+Trazas por paquete
+Un paquete trazado lleva en su sobre (PaqueteDTO.traza) el id de la traza y
+sus marcas de tiempo; cada etapa del envío y la recepción registra un tramo
+con ese id y el registro se exporta en el formato JSON de trazas de Chrome
+(chrome://tracing o https://ui.perfetto.dev)
+"""
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import nullcontext
+from typing import Any, Dict, Iterable, List, Optional
+
+# Eventos que se guardan como máximo; al llenarse se descartan los más viejos
+CAPACIDAD = 200_000
+
+_logger = logging.getLogger(__name__)
+_NULO = nullcontext()
+
+
+def _ahora_us() -> float:
+    # Reloj de pared: los tramos del cliente y del servidor se pueden combinar
+    return time.time() * 1e6
+
+
+class _Tramo:
+    """Tramo en curso; al salir se registra y se restaura el contexto anterior"""
+    __slots__ = ("_registro", "_nombre", "_traza", "_args", "_inicio", "_anterior")
+
+    def __init__(self, registro: 'RegistroTrazas', nombre: str, traza: Dict[str, Any], args: Dict[str, Any]):
+        self._registro = registro
+        self._nombre = nombre
+        self._traza = traza
+        self._args = args
+
+    def __enter__(self) -> Dict[str, Any]:
+        self._anterior = self._registro.contexto_actual()
+        self._registro._local.contexto = self._traza
+        self._inicio = _ahora_us()
+        return self._traza
+
+    def __exit__(self, tipo, valor, tb) -> None:
+        fin = _ahora_us()
+        self._registro._local.contexto = self._anterior
+        if tipo is not None:
+            self._args["error"] = tipo.__name__
+        self._registro.registrar(self._nombre, self._traza, self._inicio, fin, **self._args)
+
+
+class RegistroTrazas:
+    """
+    Tramos registrados por el proceso (Singleton)
+
+    Está apagado por defecto: mientras `activo` sea False, tramo() devuelve un
+    contexto vacío compartido y no se agrega nada a los paquetes. Con
+    `muestreo` < 1 solo se inicia traza en esa fracción de los paquetes
+    nuevos; los que ya traen traza (o se envían mientras se atiende uno
+    trazado) la continúan siempre.
+    """
+
+    _instancia = None
+    _lock_instancia = threading.Lock()
+
+    def __init__(self, capacidad: int = CAPACIDAD):
+        self.activo = False
+        self.muestreo = 1.0
+        self._eventos: deque = deque(maxlen=capacidad)
+        self._local = threading.local()
+
+    @classmethod
+    def obtener_instancia(cls) -> 'RegistroTrazas':
+        if cls._instancia is None:
+            with cls._lock_instancia:
+                if cls._instancia is None:
+                    cls._instancia = cls()
+        return cls._instancia
+
+    def activar(self, muestreo: float = 1.0) -> None:
+        """
+        Args:
+            muestreo: Fracción (0 a 1) de los paquetes nuevos que se trazan
+        """
+        if not 0 <= muestreo <= 1:
+            raise ValueError(f"El muestreo debe estar entre 0 y 1, no {muestreo}")
+        self.muestreo = muestreo
+        self.activo = True
+
+    def desactivar(self) -> None:
+        self.activo = False
+
+    def contexto_actual(self) -> Optional[Dict[str, Any]]:
+        """Traza del tramo abierto en este hilo, o None"""
+        return getattr(self._local, "contexto", None)
+
+    def contexto_envio(self) -> Optional[Dict[str, Any]]:
+        """
+        Contexto para un paquete que sale sin traza
+
+        Returns:
+            Dict con id, inicio (µs desde epoch en que empezó la traza) y
+            envio (µs de este envío; el ClienteTCP la vuelve a marcar
+            justo antes de cifrar), o None si no se traza. Un envío hecho
+            mientras se atiende un paquete trazado (una respuesta, un
+            reenvío) continúa esa traza.
+        """
+        if not self.activo:
+            return None
+        ahora = _ahora_us()
+        actual = self.contexto_actual()
+        if actual is not None:
+            return {"id": actual["id"], "inicio": actual.get("inicio", ahora), "envio": ahora}
+        if self.muestreo < 1 and random.random() >= self.muestreo:
+            return None
+        return {"id": uuid.uuid4().hex[:16], "inicio": ahora, "envio": ahora}
+
+    def tramo(self, nombre: str, traza: Optional[Dict[str, Any]], **args):
+        """
+        Mide un tramo de la traza (usar con `with`)
+
+        Args:
+            nombre: Nombre del tramo (p. ej. "emisor.enviar_cambio")
+            traza: Contexto de traza del paquete; si es None no se mide nada
+            **args: Datos extra que se guardan con el tramo
+
+        Returns:
+            Context manager que entrega la traza y la deja como contexto
+            actual del hilo mientras dura
+        """
+        if traza is None or not self.activo:
+            return _NULO
+        return _Tramo(self, nombre, traza, args)
+
+    def registrar(self, nombre: str, traza: Dict[str, Any], inicio: float, fin: float, **args) -> None:
+        """
+        Registra un tramo ya medido
+
+        Args:
+            inicio, fin: Marcas en µs desde epoch (como las de la traza)
+        """
+        if not self.activo:
+            return
+        args["traza"] = traza.get("id")
+        self._eventos.append({"name": nombre, "cat": "chattcp", "ph": "X", "ts": inicio, "dur": max(fin - inicio, 0.0),
+                              "pid": os.getpid(), "tid": threading.get_ident(), "args": args})
+
+    def eventos(self) -> List[Dict[str, Any]]:
+        return list(self._eventos)
+
+    def limpiar(self) -> None:
+        self._eventos.clear()
+
+    def exportar_chrome(self, proceso: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Args:
+            proceso: Nombre con el que se muestra este proceso en el visor
+
+        Returns:
+            Dict en el formato de trazas de Chrome ({"traceEvents": [...]})
+        """
+        eventos = self.eventos()
+        if proceso:
+            eventos.insert(0, {"name": "process_name", "ph": "M", "pid": os.getpid(), "args": {"name": proceso}})
+        return {"traceEvents": eventos, "displayTimeUnit": "ms"}
+
+    def volcar(self, ruta: str, proceso: Optional[str] = None) -> None:
+        """Escribe exportar_chrome() en `ruta` (se reemplaza de una vez)"""
+        temporal = f"{ruta}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(self.exportar_chrome(proceso), f)
+        os.replace(temporal, ruta)
+        _logger.info("%d tramos de traza escritos en %s", len(self._eventos), ruta)
+
+
+def combinar(rutas: Iterable[str], destino: str) -> None:
+    """
+    Une varios volcados (cliente, servidor, workers) en una sola traza de
+    Chrome; los ids de traza relacionan los tramos de cada proceso
+    """
+    eventos = []
+    for ruta in rutas:
+        with open(ruta, encoding="utf-8") as f:
+            eventos.extend(json.load(f)["traceEvents"])
+    with open(destino, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": eventos, "displayTimeUnit": "ms"}, f)
+
+
+def trazas() -> RegistroTrazas:
+    return RegistroTrazas.obtener_instancia()
@@ -0,0 +1,120 @@
+"""
+Cliente de prueba para levantar servidores reales (server_main.py) en tests
+Escucha respuestas en un puerto propio y envía paquetes cifrados con la
+llave pública del servidor, igual que LogicaCliente
+"""
+import base64
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from chatTCP.src.PaqueteDTO.PaqueteDTO import PaqueteDTO
+from chatTCP.src.Red.Cifrado.EjecutorCifrado import MODO_POR_SUITE, MODO_X25519, descifrar_trama, etiquetar_trama
+from chatTCP.src.Red.Cifrado.seguridad import GestorSeguridad, SUITE_FERNET
+
+
+class ClientePrueba:
+    """
+    Cliente mínimo sin EnsambladorRed (que es singleton), así que un mismo
+    test puede tener varios clientes
+    """
+
+    def __init__(self, nombre, llave_servidor, suites=None, pem_servidor=None):
+        self.nombre = nombre
+        self.suites = suites
+        # Se envía con la suite preferida propia; el servidor acepta todas
+        self.suite = suites[0] if suites else SUITE_FERNET
+        self.modos_recibidos = []
+        self.seguridad = GestorSeguridad()
+        self.llave_servidor = llave_servidor
+        # Con el archivo de llaves del servidor se abre una sesión X25519
+        publica_x25519 = GestorSeguridad.importar_publica_x25519(pem_servidor) if pem_servidor else None
+        self.sesion = self.seguridad.crear_sesion_x25519(publica_x25519) if publica_x25519 else None
+        self.recibidos = queue.Queue()
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.bind(("127.0.0.1", 0))
+        self._socket.listen(16)
+        self.puerto = self._socket.getsockname()[1]
+        threading.Thread(target=self._escuchar, daemon=True).start()
+
+    def _escuchar(self):
+        while True:
+            try:
+                conexion, _ = self._socket.accept()
+            except OSError:
+                return
+            with conexion:
+                datos = b""
+                while not datos.endswith(b"\n"):
+                    parte = conexion.recv(65536)
+                    if not parte:
+                        break
+                    datos += parte
+            texto, modo, _ = descifrar_trama(self.seguridad, datos.decode('utf-8').strip())
+            if texto:
+                self.modos_recibidos.append(modo)
+                self.recibidos.put(PaqueteDTO.from_json(texto))
+
+    def enviar(self, puerto_nodo, tipo, contenido, destino="SERVIDOR"):
+        paquete = PaqueteDTO(tipo, contenido, origen=self.nombre, destino=destino, host="127.0.0.1",
+                             puerto_origen=self.puerto, puerto_destino=puerto_nodo)
+        if self.sesion is not None:
+            cuerpo = base64.b64encode(self.seguridad.cifrar_sesion(paquete.to_json(), self.sesion)).decode()
+            trama = (etiquetar_trama(MODO_X25519, cuerpo) + "\n").encode()
+        else:
+            cuerpo = base64.b64encode(self.seguridad.cifrar(paquete.to_json(), self.llave_servidor, self.suite)).decode()
+            trama = (etiquetar_trama(MODO_POR_SUITE[self.suite], cuerpo) + "\n").encode()
+        with socket.create_connection(("127.0.0.1", puerto_nodo), timeout=5) as s:
+            s.sendall(trama)
+
+    def credenciales(self):
+        datos = {"usuario": self.nombre, "password": "clave", "puerto_escucha": self.puerto,
+                 "host_escucha": "127.0.0.1",
+                 "public_key": self.seguridad.obtener_publica_bytes().decode('utf-8')}
+        if self.suites is not None:
+            datos["suites"] = self.suites
+        if self.sesion is not None:
+            datos["x25519"] = base64.b64encode(self.sesion).decode()
+        return datos
+
+    def esperar(self, tipo, condicion=lambda p: True, timeout=15):
+        limite = time.monotonic() + timeout
+        while time.monotonic() < limite:
+            try:
+                paquete = self.recibidos.get(timeout=limite - time.monotonic())
+            except queue.Empty:
+                break
+            if paquete.tipo == tipo and condicion(paquete):
+                return paquete
+        raise AssertionError(f"{self.nombre} no recibió {tipo}")
+
+    def cerrar(self):
+        self._socket.close()
+
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def esperar_puerto(puerto, timeout=30):
+    """
+    Espera a que un servidor acepte conexiones en el puerto
+
+    Returns:
+        True si el puerto respondió antes del timeout
+    """
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        try:
+            socket.create_connection(("127.0.0.1", puerto), timeout=1).close()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
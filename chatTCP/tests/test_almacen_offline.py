@@ -0,0 +1,95 @@
+"""
+Tests del almacén de mensajes offline
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.Datos.AlmacenOffline import AlmacenOffline
+
+
+class TestAlmacenOffline(unittest.TestCase):
+    """
+    Pruebas de encolado, entrega, confirmación y retención
+    """
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.directorio = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_entrega_en_orden(self):
+        almacen = AlmacenOffline(self.directorio, sincronizar=False)
+        for i in range(5):
+            almacen.encolar("ana", {"origen": "luis", "contenido": {"mensaje": f"hola {i}"}})
+
+        pendientes = almacen.pendientes("ana")
+        self.assertEqual([i for i, _ in pendientes], [1, 2, 3, 4, 5])
+        self.assertEqual(pendientes[0][1]["contenido"]["mensaje"], "hola 0")
+        self.assertEqual(almacen.pendientes("luis"), [])
+
+    def test_confirmacion_acumulativa(self):
+        almacen = AlmacenOffline(self.directorio, sincronizar=False)
+        for i in range(5):
+            almacen.encolar("ana", {"contenido": i})
+
+        self.assertEqual(almacen.confirmar("ana", 3), 3)
+        self.assertEqual([i for i, _ in almacen.pendientes("ana")], [4, 5])
+        self.assertEqual(almacen.confirmar("ana", 3), 0)
+
+    def test_persistencia_entre_reinicios(self):
+        almacen = AlmacenOffline(self.directorio, sincronizar=False)
+        for i in range(4):
+            almacen.encolar("ana", {"contenido": i})
+        almacen.confirmar("ana", 2)
+
+        reabierto = AlmacenOffline(self.directorio, sincronizar=False)
+        self.assertEqual([i for i, _ in reabierto.pendientes("ana")], [3, 4])
+        # Los ids siguen siendo monótonos tras reiniciar
+        self.assertEqual(reabierto.encolar("ana", {"contenido": 9}), 5)
+
+    def test_linea_incompleta_se_descarta(self):
+        almacen = AlmacenOffline(self.directorio, sincronizar=False)
+        almacen.encolar("ana", {"contenido": 1})
+        with open(almacen._ruta_cola("ana"), "ab") as f:
+            f.write(b'{"id": 2, "mens')
+
+        reabierto = AlmacenOffline(self.directorio, sincronizar=False)
+        self.assertEqual([i for i, _ in reabierto.pendientes("ana")], [1])
+        self.assertEqual(reabierto.encolar("ana", {"contenido": 2}), 2)
+
+    def test_retencion_por_usuario(self):
+        almacen = AlmacenOffline(self.directorio, max_mensajes_por_usuario=3, sincronizar=False)
+        for i in range(10):
+            almacen.encolar("ana", {"contenido": i})
+
+        self.assertEqual([i for i, _ in almacen.pendientes("ana")], [8, 9, 10])
+
+    def test_retencion_global_por_bytes(self):
+        almacen = AlmacenOffline(self.directorio, max_bytes_total=2000, sincronizar=False)
+        for i in range(50):
+            almacen.encolar("ana", {"contenido": "x" * 100})
+        almacen.encolar("luis", {"contenido": "y" * 100})
+
+        self.assertLessEqual(almacen.bytes_pendientes(), 2000)
+        self.assertEqual(almacen.total_pendientes("luis"), 1)
+
+    def test_compactacion_libera_disco(self):
+        almacen = AlmacenOffline(self.directorio, sincronizar=False)
+        almacen.MIN_BYTES_COMPACTAR = 0
+        for i in range(100):
+            almacen.encolar("ana", {"contenido": "z" * 50})
+        tamanio_inicial = os.path.getsize(almacen._ruta_cola("ana"))
+
+        almacen.confirmar("ana", 90)
+        self.assertLess(os.path.getsize(almacen._ruta_cola("ana")), tamanio_inicial // 5)
+        self.assertEqual([i for i, _ in almacen.pendientes("ana")], list(range(91, 101)))
+
+
+if __name__ == "__main__":
+    unittest.main()
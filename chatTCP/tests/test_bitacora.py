@@ -0,0 +1,124 @@
+"""
+Tests de la bitácora asíncrona
+"""
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.Red import Bitacora
+from src.Red.Bitacora import FiltroMuestreo
+
+
+class Contado:
+    """Objeto que cuenta cuántas veces se convirtió en texto y desde qué hilo"""
+
+    def __init__(self):
+        self.hilos = []
+
+    def __str__(self):
+        self.hilos.append(threading.current_thread().name)
+        return "contado"
+
+
+def registro(nombre, mensaje, nivel=logging.INFO):
+    return logging.LogRecord(nombre, nivel, __file__, 1, mensaje, (), None)
+
+
+class TestFiltroMuestreo(unittest.TestCase):
+
+    def test_uno_de_cada_n_por_plantilla(self):
+        filtro = FiltroMuestreo({"chat.red": 5, "chat.red.receptor": 2, "chat.bus": 1})
+        pasan = [filtro.filter(registro("chat.red.emisor", "Enviando %s")) for _ in range(10)]
+        self.assertEqual(pasan.count(True), 2)
+        self.assertTrue(filtro.filter(registro("chat.red.emisor", "Otro mensaje %s")))
+
+        self.assertEqual(sum(filtro.filter(registro("chat.red.receptor", "x")) for _ in range(10)), 5)
+        self.assertEqual(sum(filtro.filter(registro("chat.bus", "x")) for _ in range(10)), 10)
+        self.assertEqual(sum(filtro.filter(registro("chat.redes", "x")) for _ in range(10)), 10)
+        self.assertTrue(all(filtro.filter(registro("chat.red.emisor", "Enviando %s", logging.WARNING)) for _ in range(3)))
+
+        with self.assertRaises(ValueError):
+            FiltroMuestreo({"chat": 0})
+
+    def test_leer_opciones(self):
+        self.assertEqual(Bitacora.leer_niveles("chat.red=warning, chat.bus=DEBUG"),
+                         {"chat.red": logging.WARNING, "chat.bus": logging.DEBUG})
+        self.assertEqual(Bitacora.leer_muestreo("chat.red=100"), {"chat.red": 100})
+        self.assertEqual(Bitacora.leer_niveles(None), {})
+        for texto in ("chat.red", "chat.red=RUIDO"):
+            with self.assertRaises(ValueError):
+                Bitacora.leer_niveles(texto)
+
+
+class TestBitacoraAsincrona(unittest.TestCase):
+
+    def setUp(self):
+        raiz = logging.getLogger()
+        handlers, nivel = raiz.handlers[:], raiz.level
+        for handler in handlers:
+            raiz.removeHandler(handler)
+
+        def restaurar():
+            Bitacora.detener()
+            for handler in raiz.handlers[:]:
+                raiz.removeHandler(handler)
+            for handler in handlers:
+                raiz.addHandler(handler)
+            raiz.setLevel(nivel)
+            logging.getLogger("prueba.bitacora.silencio").setLevel(logging.NOTSET)
+        self.addCleanup(restaurar)
+        self.directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directorio.cleanup)
+
+    def test_formato_al_encolar_y_niveles_por_modulo(self):
+        ruta = os.path.join(self.directorio.name, "bitacora.log")
+        Bitacora.configurar(ruta, "PRUEBA", niveles={"prueba.bitacora.silencio": logging.WARNING},
+                            muestreo={"prueba.bitacora.muestreo": 2}, consola=False)
+
+        apagado, encendido, descartado = Contado(), Contado(), Contado()
+        logging.getLogger("prueba.bitacora.silencio.hijo").info("Paquete %s", apagado)
+        logging.getLogger("prueba.bitacora").info("Paquete %s", encendido)
+        muestreado = logging.getLogger("prueba.bitacora.muestreo")
+        muestreado.info("Muestra %s", Contado())
+        muestreado.info("Muestra %s", descartado)
+        destino = {"puerto": 5000}
+        logging.getLogger("prueba.bitacora").info("Destino %s", destino)
+        destino["puerto"] = 6000
+        Bitacora.detener()
+
+        self.assertEqual(apagado.hilos, [])
+        self.assertEqual(descartado.hilos, [])
+        self.assertEqual(encendido.hilos, [threading.current_thread().name])
+        with open(ruta, encoding="utf-8") as f:
+            lineas = f.read().splitlines()
+        self.assertEqual(len(lineas), 3)
+        self.assertTrue(lineas[0].endswith(" - PRUEBA - Paquete contado"))
+        self.assertTrue(lineas[2].endswith(" - PRUEBA - Destino {'puerto': 5000}"))
+
+    def test_json_con_muestreo(self):
+        ruta = os.path.join(self.directorio.name, "bitacora.jsonl")
+        Bitacora.configurar(ruta, "PRUEBA", muestreo={"prueba.bitacora": 3}, formato="json", consola=False)
+        logger = logging.getLogger("prueba.bitacora")
+        for n in range(6):
+            logger.info("Paquete %d", n)
+        try:
+            raise RuntimeError("falla")
+        except RuntimeError:
+            logger.exception("Error al procesar")
+        Bitacora.detener()
+
+        with open(ruta, encoding="utf-8") as f:
+            lineas = [json.loads(linea) for linea in f]
+        self.assertEqual([l["mensaje"] for l in lineas], ["Paquete 0", "Paquete 3", "Error al procesar"])
+        self.assertEqual((lineas[0]["evento"], lineas[0]["muestreo"], lineas[0]["proceso"]), ("Paquete %d", 3, "PRUEBA"))
+        self.assertIn("RuntimeError: falla", lineas[2]["excepcion"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+"""
+Tests del historial acotado de la ventana de chat
+"""
+import os
+import sys
+import tkinter as tk
+import unittest
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.Presentacion.chatindividual import BufferMensajes, VentanaChat, lineas_de, quitar_repetidos
+from src.Presentacion.ObjetosPresentacion.UsuarioOP import UsuariosOP
+
+
+def hay_pantalla():
+    try:
+        tk.Tk().destroy()
+        return True
+    except tk.TclError:
+        return False
+
+
+class LogicaFalsa:
+    usuario_actual = "ana"
+
+    def __init__(self):
+        self.pedidos = []
+
+    def solicitar_historial(self, con="TODOS", cursor=None, limite=50):
+        self.pedidos.append(cursor)
+
+
+class TestBufferMensajes(unittest.TestCase):
+
+    def test_lineas_por_mensaje(self):
+        self.assertEqual(lineas_de("hola"), 3)
+        self.assertEqual(lineas_de("hola\nque tal"), 4)
+
+    def test_recorta_los_mas_viejos(self):
+        buffer = BufferMensajes(maximo=3)
+        self.assertEqual(buffer.agregar([3, 3]), 0)
+        self.assertEqual(buffer.agregar([4, 3, 3]), 6)
+        self.assertEqual(len(buffer), 3)
+        self.assertFalse(buffer.recortado_abajo)
+
+    def test_historial_viejo_recorta_los_nuevos(self):
+        buffer = BufferMensajes(maximo=3)
+        buffer.agregar([3, 3, 5])
+        self.assertEqual(buffer.anteponer([4, 4]), 8)
+        self.assertTrue(buffer.recortado_abajo)
+        buffer.vaciar()
+        self.assertEqual(len(buffer), 0)
+        self.assertFalse(buffer.recortado_abajo)
+
+
+class TestQuitarRepetidos(unittest.TestCase):
+
+    def test_cada_mensaje_en_vivo_tapa_una_fila_reciente(self):
+        apertura = datetime(2025, 3, 1, 9, 0)
+        antes, despues = apertura - timedelta(minutes=5), apertura + timedelta(seconds=2)
+        filas = [("beto", "ok", False, antes), ("Yo", "hola", True, despues),
+                 ("beto", "ok", False, despues), ("beto", "ok", False, despues)]
+        en_vivo = [("Yo", "hola"), ("beto", "ok")]
+
+        # El "ok" viejo se conserva y de los dos recientes solo se quita uno
+        self.assertEqual(quitar_repetidos(filas, en_vivo, apertura),
+                         [("beto", "ok", False, antes), ("beto", "ok", False, despues)])
+        self.assertEqual(quitar_repetidos(filas, [], apertura), filas)
+
+
+@unittest.skipUnless(hay_pantalla(), "Tk necesita una pantalla")
+class TestVentanaChat(unittest.TestCase):
+
+    def setUp(self):
+        self.raiz = tk.Tk()
+        self.addCleanup(self.raiz.destroy)
+        self.logica = LogicaFalsa()
+        self.ventana = VentanaChat(self.raiz, UsuariosOP("beto", "", "#128C7E", 0), self.logica)
+        self.ventana.buffer.maximo = 10
+
+    def texto(self):
+        return self.ventana.historial.get("1.0", "end-1c")
+
+    def test_mensajes_en_vivo_acotados(self):
+        self.ventana.mostrar_mensajes([("beto", f"m{n}", False, None) for n in range(25)])
+        self.assertEqual(len(self.ventana.buffer), 10)
+        self.assertNotIn("m14\n", self.texto())
+        self.assertIn("m15\n", self.texto())
+        self.assertEqual(self.texto().count("\n"), 30)
+
+    def test_pagina_de_historial_se_antepone_sin_repetidos(self):
+        self.assertEqual(self.logica.pedidos, [None])
+        self.ventana.mostrar_mensaje("beto", "en vivo")
+        self.ventana.mostrar_mensaje("Yo", "propio", es_mio=True)
+        fecha = datetime(2025, 3, 1, 9, 0).isoformat()
+        ahora = datetime.now().isoformat()
+        pagina = [{"nombreUsuario": u, "contenidoMensaje": t, "fechaHora": f}
+                  for u, t, f in (("ana", "viejo 1", fecha), ("beto", "viejo 2", fecha),
+                                  ("beto", "en vivo", ahora), ("ana", "propio", ahora))]
+        self.ventana.mostrar_historial(pagina, cursor=[1, 1], pedido=None)
+
+        texto = self.texto()
+        self.assertLess(texto.index("viejo 1"), texto.index("viejo 2"))
+        self.assertLess(texto.index("viejo 2"), texto.index("en vivo"))
+        self.assertEqual(texto.count("en vivo"), 1)
+        self.assertEqual(texto.count("propio"), 1)
+        self.assertTrue(texto.startswith("Yo [09:00]"))
+
+    def test_historial_sin_respuesta_se_puede_volver_a_pedir(self):
+        self.ventana._pedir_historial([1, 1])
+        self.assertEqual(self.logica.pedidos, [None])
+        self.ventana._historial_sin_respuesta()
+        self.ventana._pedir_historial([1, 1])
+        self.assertEqual(self.logica.pedidos, [None, [1, 1]])
+
+    def test_respuesta_repetida_o_ajena_se_descarta(self):
+        pagina = [{"nombreUsuario": "ana", "contenidoMensaje": "viejo", "fechaHora": datetime(2025, 3, 1, 9, 0).isoformat()}]
+        self.ventana.mostrar_historial(pagina, cursor=[5, 5], pedido=None)
+        # Se vence la espera y se vuelve a pedir la misma página: llegan las dos respuestas
+        self.ventana._pedir_historial([5, 5])
+        self.ventana._historial_sin_respuesta()
+        self.ventana._pedir_historial([5, 5])
+        anterior = [{"nombreUsuario": "ana", "contenidoMensaje": "anterior", "fechaHora": datetime(2025, 3, 1, 8, 0).isoformat()}]
+        self.ventana.mostrar_historial([], cursor=None, pedido=[9, 9])
+        self.ventana.mostrar_historial(anterior, cursor=None, pedido=[5, 5])
+        self.ventana.mostrar_historial(anterior, cursor=None, pedido=[5, 5])
+
+        self.assertEqual(self.texto().count("anterior"), 1)
+        self.assertEqual(self.texto().count("viejo"), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+Tests del cliente de consola
+"""
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.ModeloChatTCP.ChatTCP.LogicaCliente import ReceptorCliente
+from src.PaqueteDTO.PaqueteDTO import PaqueteDTO
+from src.Presentacion.cli import ChatCLI, percentiles_ms
+from src.Red.EnsambladorRed import EnsambladorRed
+
+
+class LogicaFalsa:
+    def __init__(self):
+        self.enviados = []
+        self.callback = None
+
+    def set_callback(self, funcion):
+        self.callback = funcion
+
+    def enviar_mensaje(self, mensaje, destino="TODOS"):
+        self.enviados.append(("MENSAJE", mensaje, destino))
+
+    def obtener_usuarios(self):
+        self.enviados.append(("LISTA_USUARIOS",))
+
+    def solicitar_historial(self, con="TODOS", cursor=None, limite=50):
+        self.enviados.append(("HISTORIAL", con))
+
+    def buscar_mensajes(self, texto, pagina=0, limite=20):
+        self.enviados.append(("BUSCAR", texto))
+
+
+class TestChatCLI(unittest.TestCase):
+
+    def setUp(self):
+        self.logica = LogicaFalsa()
+        self.cli = ChatCLI(self.logica)
+        self.cli.display_message = lambda mensaje: None
+
+    def test_comandos(self):
+        for linea in ("hola a todos", "/para beto nos vemos luego", "/para beto", "/usuarios",
+                      "/historial", "/historial beto", "/buscar nos vemos"):
+            self.cli._ejecutar(linea)
+        self.assertEqual(self.logica.enviados, [
+            ("MENSAJE", "hola a todos", "TODOS"),
+            ("MENSAJE", "nos vemos luego", "beto"),
+            ("LISTA_USUARIOS",),
+            ("HISTORIAL", "TODOS"),
+            ("HISTORIAL", "beto"),
+            ("BUSCAR", "nos vemos"),
+        ])
+
+    def test_respuestas_de_sesion_se_esperan(self):
+        self.logica.callback(SimpleNamespace(tipo="LOGIN_OK", contenido="Bienvenido", origen="SERVIDOR", destino="ana"))
+        self.assertEqual(self.cli._esperar_respuesta(timeout=0.1), ("LOGIN_OK", "Bienvenido"))
+        self.assertEqual(self.cli._esperar_respuesta(timeout=0.1)[0], "ERROR")
+
+
+class TestCargaCLI(unittest.TestCase):
+
+    def test_ensambladores_independientes(self):
+        singleton = EnsambladorRed.obtener_instancia()
+        a, b = EnsambladorRed.crear_independiente(), EnsambladorRed.crear_independiente()
+        self.assertIsNot(a, b)
+        self.assertIsNot(a, singleton)
+        self.assertIs(EnsambladorRed.obtener_instancia(), singleton)
+
+    def test_percentiles_ms(self):
+        self.assertEqual(percentiles_ms([]), {"p50": 0.0, "p95": 0.0, "p99": 0.0})
+        p = percentiles_ms([n / 1000 for n in range(1, 101)])
+        self.assertAlmostEqual(p["p50"], 50.5)
+        self.assertLess(p["p95"], p["p99"])
+
+
+class TestReceptorCliente(unittest.TestCase):
+
+    def test_login_ok_confirma_suite_y_compresion(self):
+        receptor, entregados, suites, compresiones = ReceptorCliente(), [], [], []
+        receptor.set_callback(entregados.append)
+        receptor.set_confirmador_suite(suites.append)
+        receptor.set_confirmador_compresion(compresiones.append)
+
+        receptor.recibir_cambio(PaqueteDTO("LOGIN_OK", {"usuario": "ana", "suite": "AESGCM", "compresion": "zlib"}))
+        # Un servidor anterior contesta solo con el usuario: no se cambia nada
+        receptor.recibir_cambio(PaqueteDTO("LOGIN_OK", "ana"))
+
+        self.assertEqual(suites, ["AESGCM"])
+        self.assertEqual(compresiones, ["zlib"])
+        self.assertEqual([p.contenido for p in entregados], ["ana", "ana"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,210 @@
+"""
+Tests del modo cluster: anillo de hash consistente, firma entre nodos y
+una prueba con 3 procesos server_main.py en loopback
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from chatTCP.src.Bus.EventBus import EventBus
+from chatTCP.src.Cluster.AnilloHash import AnilloHash
+from chatTCP.src.Cluster.ConfigCluster import ConfigCluster, cargar_configuracion_cluster
+from chatTCP.src.Cluster.CoordinadorCluster import VIGENCIA_FIRMA, CoordinadorCluster
+from chatTCP.src.PaqueteDTO.PaqueteDTO import PaqueteDTO
+from chatTCP.src.Red.Cifrado.seguridad import GestorSeguridad
+from cliente_prueba import ClientePrueba, esperar_puerto, puerto_libre
+
+SERVER_MAIN = os.path.join(os.path.dirname(__file__), '..', 'server_main.py')
+
+
+class TestAnilloHash(unittest.TestCase):
+    """
+    Reparto y estabilidad del hash consistente
+    """
+
+    def setUp(self):
+        self.claves = [f"usuario_{i}" for i in range(10_000)]
+
+    def test_reparto_balanceado(self):
+        anillo = AnilloHash(["n1", "n2", "n3"], replicas=128)
+        conteo = anillo.reparto(self.claves)
+        for nodo, cantidad in conteo.items():
+            self.assertGreater(cantidad, 10_000 / 3 * 0.7, nodo)
+            self.assertLess(cantidad, 10_000 / 3 * 1.3, nodo)
+
+    def test_agregar_nodo_mueve_pocas_claves(self):
+        anillo = AnilloHash(["n1", "n2", "n3"])
+        antes = {c: anillo.nodo_para(c) for c in self.claves}
+        anillo.agregar_nodo("n4")
+        movidas = [c for c in self.claves if anillo.nodo_para(c) != antes[c]]
+
+        # Solo se mueven claves hacia el nodo nuevo, alrededor de 1/4 del total
+        self.assertTrue(all(anillo.nodo_para(c) == "n4" for c in movidas))
+        self.assertLess(len(movidas), len(self.claves) * 0.4)
+
+        anillo.eliminar_nodo("n4")
+        self.assertEqual({c: anillo.nodo_para(c) for c in self.claves}, antes)
+
+    def test_anillo_vacio(self):
+        with self.assertRaises(LookupError):
+            AnilloHash().nodo_para("ana")
+
+
+class TestCoordinadorCluster(unittest.TestCase):
+    """
+    Firma de los mensajes entre nodos y registro de pares en el EventBus
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.seguridad = GestorSeguridad()
+
+    def setUp(self):
+        self.config = ConfigCluster({"n1": ("localhost", 6001), "n2": ("localhost", 6002)})
+
+    def test_pares_registrados_en_bus(self):
+        bus = EventBus()
+        CoordinadorCluster("n1", self.config, self.seguridad, bus)
+        self.assertEqual([s.puerto for s in bus.servicios_por_evento["REENVIO"]], [6002])
+        self.assertEqual([s.puerto for s in bus.servicios_por_evento["PRESENCIA"]], [6002])
+
+    def test_reenvio_firmado(self):
+        n1 = CoordinadorCluster("n1", self.config, self.seguridad, EventBus())
+        n2 = CoordinadorCluster("n2", self.config, self.seguridad, EventBus())
+        paquete = PaqueteDTO("MENSAJE", {"mensaje": "hola"}, origen="ana", destino="beto")
+
+        abierto, difusion = n2.desenvolver(n1.envolver(paquete))
+        self.assertFalse(difusion)
+        self.assertEqual(abierto.contenido, {"mensaje": "hola"})
+        self.assertEqual(abierto.destino, "beto")
+
+        alterado = n1.envolver(paquete)
+        alterado["paquete"] = alterado["paquete"].replace("hola", "chau")
+        self.assertIsNone(n2.desenvolver(alterado))
+
+    def test_mensajes_repetidos_o_vencidos_rechazados(self):
+        n1 = CoordinadorCluster("n1", self.config, self.seguridad, EventBus())
+        n2 = CoordinadorCluster("n2", self.config, self.seguridad, EventBus())
+        reenvio = n1.envolver(PaqueteDTO("MENSAJE", {"mensaje": "hola"}, origen="ana", destino="beto"))
+        self.assertIsNotNone(n2.desenvolver(reenvio))
+        self.assertIsNone(n2.desenvolver(reenvio))
+
+        presencia = n1.contenido_presencia(["ana"])
+        presencia.update(ts=presencia["ts"] - 2 * VIGENCIA_FIRMA)
+        presencia["firma"] = n1._calcular_firma({k: v for k, v in presencia.items() if k != "firma"})
+        self.assertIsNone(n2.actualizar_presencia(presencia))
+        self.assertIsNotNone(n2.actualizar_presencia(n1.contenido_presencia(["ana"])))
+        self.assertEqual(n2.usuarios_remotos(), ["ana"])
+
+    def test_firma_de_otra_llave_rechazada(self):
+        ajeno = CoordinadorCluster("n1", self.config, GestorSeguridad(), EventBus())
+        n2 = CoordinadorCluster("n2", self.config, self.seguridad, EventBus())
+        self.assertIsNone(n2.actualizar_presencia(ajeno.contenido_presencia(["intruso"])))
+        self.assertEqual(n2.usuarios_remotos(), [])
+
+    def test_configuracion_desde_archivo(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".properties", delete=False) as f:
+            f.write("nodo.a=127.0.0.1:7001\nnodo.b=127.0.0.1:7002\nreplicas=8\n")
+        try:
+            config = cargar_configuracion_cluster(f.name)
+        finally:
+            os.unlink(f.name)
+        self.assertEqual(config.nodos, {"a": ("127.0.0.1", 7001), "b": ("127.0.0.1", 7002)})
+        self.assertEqual(config.replicas, 8)
+
+
+class TestClusterTresNodos(unittest.TestCase):
+    """
+    Levanta 3 nodos server_main.py como procesos separados y verifica
+    registro, login, presencia y enrutamiento de MENSAJE entre nodos
+    """
+
+    NODOS = ("n1", "n2", "n3")
+
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        tmp = cls._tmp.name
+        cls.puertos = {nodo: puerto_libre() for nodo in cls.NODOS}
+
+        ruta_llave = os.path.join(tmp, "cluster_private.pem")
+        llave = GestorSeguridad()
+        llave.guardar_privada(ruta_llave)
+        cls.llave_publica = llave.public_key
+
+        cls.ruta_config = os.path.join(tmp, "cluster.properties")
+        with open(cls.ruta_config, "w", encoding='utf-8') as f:
+            for nodo, puerto in cls.puertos.items():
+                f.write(f"nodo.{nodo}=127.0.0.1:{puerto}\n")
+            f.write(f"llave.privada={ruta_llave}\n")
+
+        cls.procesos = []
+        for nodo in cls.NODOS:
+            cls.procesos.append(subprocess.Popen(
+                [sys.executable, SERVER_MAIN, "--nodo", nodo, "--cluster", cls.ruta_config,
+                 "--datos", os.path.join(tmp, nodo), "--pem", os.path.join(tmp, f"{nodo}.pem"),
+                 "--bitacora", os.path.join(tmp, f"{nodo}.log")],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            ))
+
+        if not all(esperar_puerto(puerto) for puerto in cls.puertos.values()):
+            cls.tearDownClass()
+            raise unittest.SkipTest("Los nodos del cluster no arrancaron")
+
+        anillo = AnilloHash(cls.NODOS)
+        cls.nombre_en = {}
+        for i in range(1000):
+            cls.nombre_en.setdefault(anillo.nodo_para(f"user{i}"), f"user{i}")
+
+    @classmethod
+    def tearDownClass(cls):
+        for proceso in cls.procesos:
+            proceso.terminate()
+        for proceso in cls.procesos:
+            proceso.wait(timeout=10)
+        cls._tmp.cleanup()
+
+    def test_usuarios_en_nodos_distintos_se_comunican(self):
+        ana = ClientePrueba(self.nombre_en["n1"], self.llave_publica)
+        beto = ClientePrueba(self.nombre_en["n2"], self.llave_publica)
+        try:
+            # Registro a través de un nodo que no es el dueño
+            ana.enviar(self.puertos["n3"], "REGISTRO", ana.credenciales())
+            ana.esperar("REGISTRO_OK")
+            beto.enviar(self.puertos["n1"], "REGISTRO", beto.credenciales())
+            beto.esperar("REGISTRO_OK")
+
+            # La cuenta queda solo en el nodo dueño
+            with open(os.path.join(self._tmp.name, "n1", "usuarios.json.wal"), encoding='utf-8') as f:
+                self.assertIn(ana.nombre, f.read())
+            self.assertFalse(os.path.exists(os.path.join(self._tmp.name, "n3", "usuarios.json.wal")))
+
+            ana.enviar(self.puertos["n1"], "LOGIN", ana.credenciales())
+            ana.esperar("LOGIN_OK")
+            beto.enviar(self.puertos["n3"], "LOGIN", beto.credenciales())
+            beto.esperar("LOGIN_OK")
+
+            # Presencia: ana (n1) ve a beto (n2)
+            ana.esperar("LISTA_USUARIOS", lambda p: beto.nombre in p.contenido)
+
+            # Mensaje directo enrutado de n1 al nodo dueño de beto
+            ana.enviar(self.puertos["n1"], "MENSAJE", {"mensaje": "hola beto", "remitente": ana.nombre}, destino=beto.nombre)
+            recibido = beto.esperar("MENSAJE", lambda p: p.contenido.get("mensaje") == "hola beto")
+            self.assertEqual(recibido.origen, ana.nombre)
+
+            # Mensaje general entrando por n3 llega a los usuarios de n1
+            beto.enviar(self.puertos["n3"], "MENSAJE", {"mensaje": "hola a todos", "remitente": beto.nombre}, destino="TODOS")
+            ana.esperar("MENSAJE", lambda p: p.contenido.get("mensaje") == "hola a todos")
+        finally:
+            ana.cerrar()
+            beto.cerrar()
+
+
+if __name__ == '__main__':
+    unittest.main()
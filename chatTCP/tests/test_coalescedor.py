@@ -0,0 +1,131 @@
+"""
+Tests del agrupamiento de paquetes en tramas LOTE
+"""
+import json
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.ComponenteReceptor.IReceptor import IReceptor
+from src.PaqueteDTO.PaqueteDTO import PaqueteDTO
+from src.Red.Cifrado.seguridad import GestorSeguridad, SUITE_AESGCM
+from src.Red.Emisor.ClienteTCP import ClienteTCP
+from src.Red.Emisor.Coalescedor import Coalescedor, Lote, es_lote, separar_lote
+from src.Red.Emisor.ColaEnvios import ColaEnvios
+from src.Red.Emisor.ConfirmacionesEnvio import ConfirmacionesEnvio, ESTADO_CONFIRMADO
+from src.Red.Emisor.Emisor import Emisor
+from src.Red.Emisor.NumeradorSecuencias import NumeradorSecuencias
+from src.Red.Receptor.ColaRecibos import ColaRecibos
+from src.Red.Receptor.Receptor import Receptor
+from src.Red.Receptor.ServidorTCP import ServidorTCP
+
+
+def paquete(n, puerto=5000):
+    return PaqueteDTO("MENSAJE", {"mensaje": f"m{n}"}, origen="ana", destino="TODOS", host="127.0.0.1", puerto_destino=puerto)
+
+
+class ReceptorLista(IReceptor):
+    def __init__(self):
+        self.recibidos = []
+
+    def recibir_cambio(self, paquete):
+        self.recibidos.append(paquete)
+
+
+class TestCoalescedor(unittest.TestCase):
+
+    def setUp(self):
+        self.salidas = []
+        self.lock = threading.Lock()
+
+    def salida(self, listo):
+        with self.lock:
+            self.salidas.append(listo)
+
+    def test_paquete_aislado_sale_enseguida(self):
+        coalescedor = Coalescedor(self.salida, espera=10.0)
+        coalescedor.agregar(paquete(1))
+        self.assertEqual(len(self.salidas), 1)
+        self.assertIsInstance(self.salidas[0], PaqueteDTO)
+
+    def test_rafaga_viaja_en_un_lote(self):
+        coalescedor = Coalescedor(self.salida, espera=0.05)
+        for n in range(6):
+            coalescedor.agregar(paquete(n))
+        self.assertEqual(len(self.salidas), 1)
+        time.sleep(0.2)
+
+        self.assertEqual(len(self.salidas), 2)
+        lote = self.salidas[1]
+        self.assertIsInstance(lote, Lote)
+        contenidos = [json.loads(p)["contenido"]["mensaje"] for p in separar_lote(lote.to_json())]
+        self.assertEqual(contenidos, [f"m{n}" for n in range(1, 6)])
+        self.assertEqual(coalescedor.metricas, {"paquetes": 6, "tramas": 2, "lotes": 1})
+
+    def test_limite_de_paquetes_adelanta_el_envio(self):
+        coalescedor = Coalescedor(self.salida, espera=10.0, max_paquetes=3)
+        for n in range(4):
+            coalescedor.agregar(paquete(n))
+        self.assertEqual(len(self.salidas), 2)
+        self.assertEqual(len(self.salidas[1].paquetes_json), 3)
+
+    def test_destinos_distintos_no_se_mezclan(self):
+        coalescedor = Coalescedor(self.salida, espera=10.0)
+        for n in range(3):
+            coalescedor.agregar(paquete(n, puerto=5000))
+            coalescedor.agregar(paquete(n, puerto=6000))
+        coalescedor.vaciar()
+        lotes = [s for s in self.salidas if isinstance(s, Lote)]
+        self.assertEqual(sorted(l.puerto_destino for l in lotes), [5000, 6000])
+
+    def test_lote_ida_y_vuelta(self):
+        originales = [paquete(n) for n in range(3)]
+        lote = Lote("127.0.0.1", 5000, [p.to_json() for p in originales])
+        self.assertTrue(es_lote(lote.to_json()))
+        self.assertFalse(es_lote(originales[0].to_json()))
+        separados = [PaqueteDTO.from_json(p) for p in separar_lote(lote.to_json())]
+        self.assertEqual([p.contenido for p in separados], [p.contenido for p in originales])
+
+
+class TestLotesPorLaRed(unittest.TestCase):
+
+    def test_lote_se_separa_en_orden_y_se_confirma(self):
+        seguridad = GestorSeguridad()
+        cola_recibos = ColaRecibos()
+        receptor = Receptor()
+        destino = ReceptorLista()
+        receptor.set_cola(cola_recibos)
+        receptor.set_receptor(destino)
+        cola_recibos.agregar_observador(receptor)
+        servidor = ServidorTCP(cola_recibos, seguridad, puerto=0, host="127.0.0.1", confirmador=receptor.confirmacion)
+        servidor.iniciar()
+        self.addCleanup(servidor.detener)
+        puerto = servidor.get_puerto()
+
+        estados = {}
+        confirmaciones = ConfirmacionesEnvio()
+        confirmaciones.agregar_observador(lambda id_mensaje, estado, latencia: estados.__setitem__(id_mensaje, estado))
+        self.addCleanup(confirmaciones.cerrar)
+        cola_envios = ColaEnvios(espera_lote=0.05)
+        cliente = ClienteTCP(cola_envios, seguridad, seguridad.public_key, suite=SUITE_AESGCM, confirmaciones=confirmaciones)
+        cola_envios.agregar_observador(cliente)
+        emisor = Emisor(cola_envios, NumeradorSecuencias())
+
+        for n in range(10):
+            emisor.enviar_cambio(paquete(n, puerto))
+        fin = time.monotonic() + 5
+        while len(estados) < 10 and time.monotonic() < fin:
+            time.sleep(0.01)
+
+        self.assertEqual([p.contenido["mensaje"] for p in destino.recibidos], [f"m{n}" for n in range(10)])
+        self.assertEqual(set(estados.values()), {ESTADO_CONFIRMADO})
+        self.assertEqual(len(estados), 10)
+        self.assertEqual(cola_envios.coalescedor.metricas["tramas"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+"""
+Tests de la cola de eventos de la interfaz
+"""
+import os
+import sys
+import threading
+import tkinter as tk
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.Presentacion.ColaEventosUI import ColaEventosUI
+
+
+def hay_pantalla():
+    try:
+        tk.Tk().destroy()
+        return True
+    except tk.TclError:
+        return False
+
+
+class TestColaEventosUI(unittest.TestCase):
+
+    def setUp(self):
+        self.procesados = []
+        self.redibujados = 0
+
+    def procesar(self, evento):
+        self.procesados.append(evento)
+        return evento != "sin cambios"
+
+    def redibujar(self):
+        self.redibujados += 1
+
+    def test_rafaga_de_varios_hilos_redibuja_una_vez(self):
+        cola = ColaEventosUI(None, self.procesar, self.redibujar)
+        hilos = [threading.Thread(target=lambda h=h: [cola.publicar((h, n)) for n in range(25)]) for h in range(4)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(cola.drenar(), 100)
+        self.assertEqual(self.redibujados, 1)
+        for h in range(4):
+            self.assertEqual([n for hilo, n in self.procesados if hilo == h], list(range(25)))
+
+    def test_lote_acotado_y_sin_cambios_no_redibuja(self):
+        cola = ColaEventosUI(None, self.procesar, self.redibujar, max_lote=3)
+        for _ in range(5):
+            cola.publicar("sin cambios")
+        self.assertEqual(cola.drenar(), 3)
+        self.assertEqual(cola.pendientes(), 2)
+        self.assertEqual(self.redibujados, 0)
+        self.assertEqual(cola.drenar(), 2)
+        self.assertEqual(cola.drenar(), 0)
+        self.assertEqual(cola.metricas["lotes"], 2)
+
+    def test_un_error_no_corta_el_lote(self):
+        def procesar(evento):
+            if evento == 1:
+                raise ValueError("paquete roto")
+            return True
+        cola = ColaEventosUI(None, procesar, self.redibujar)
+        for n in range(3):
+            cola.publicar(n)
+        self.assertEqual(cola.drenar(), 3)
+        self.assertEqual(cola.metricas["errores"], 1)
+        self.assertEqual(self.redibujados, 1)
+
+    @unittest.skipUnless(hay_pantalla(), "Tk necesita una pantalla")
+    def test_el_mainloop_vacia_la_cola(self):
+        raiz = tk.Tk()
+        self.addCleanup(raiz.destroy)
+        cola = ColaEventosUI(raiz, self.procesar, self.redibujar, intervalo_ms=10)
+        cola.iniciar()
+        threading.Thread(target=lambda: [cola.publicar(n) for n in range(100)]).start()
+        raiz.after(300, raiz.quit)
+        raiz.mainloop()
+        cola.detener()
+        self.assertEqual(len(self.procesados), 100)
+        self.assertLessEqual(self.redibujados, cola.metricas["lotes"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+Tests de la compresión antes del cifrado
+"""
+import base64
+import json
+import os
+import sys
+import unittest
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.Red.Cifrado.Compresion import (COMPRESION_LZMA, COMPRESION_ZLIB, UMBRAL_COMPRESION, comprimir,
+                                        descomprimir, negociar_compresion)
+from src.Red.Cifrado.EjecutorCifrado import descifrar_trama, separar_etiqueta
+from src.Red.Cifrado.seguridad import GestorSeguridad, SUITE_AESGCM, SUITE_FERNET
+from src.Red.Emisor.ClienteTCP import ClienteTCP
+from src.Red.Emisor.ColaEnvios import ColaEnvios
+
+
+def lista_usuarios(n):
+    return json.dumps({"tipo": "LISTA_USUARIOS", "contenido": [f"usuario_{i:04d}" for i in range(n)]})
+
+
+class TestCompresion(unittest.TestCase):
+
+    def test_ida_y_vuelta(self):
+        texto = lista_usuarios(500)
+        for algoritmo in (COMPRESION_ZLIB, COMPRESION_LZMA):
+            comprimido = comprimir(texto, algoritmo)
+            self.assertLess(len(comprimido), len(texto) // 3)
+            self.assertEqual(descomprimir(comprimido).decode('utf-8'), texto)
+
+    def test_bajo_el_umbral_o_sin_algoritmo_no_comprime(self):
+        chico = lista_usuarios(2)
+        self.assertLess(len(chico), UMBRAL_COMPRESION)
+        self.assertEqual(comprimir(chico, COMPRESION_ZLIB), chico.encode('utf-8'))
+        self.assertEqual(comprimir(lista_usuarios(500), None), lista_usuarios(500).encode('utf-8'))
+
+    def test_datos_incompresibles_van_sin_comprimir(self):
+        texto = '{"a": 1}'
+        for algoritmo in (COMPRESION_ZLIB, COMPRESION_LZMA):
+            self.assertEqual(comprimir(texto, algoritmo, umbral=1), texto.encode('utf-8'))
+
+    def test_limite_de_descompresion(self):
+        bomba = b"\x00z" + zlib.compress(b"0" * (1 << 20))
+        with self.assertRaises(ValueError):
+            descomprimir(bomba, maximo=1 << 16)
+        with self.assertRaises(ValueError):
+            descomprimir(b"\x00z" + b"basura")
+
+    def test_negociacion(self):
+        self.assertEqual(negociar_compresion(["lzma", "zlib"]), COMPRESION_ZLIB)
+        self.assertEqual(negociar_compresion(["lzma"]), COMPRESION_LZMA)
+        self.assertIsNone(negociar_compresion(None))
+        self.assertIsNone(negociar_compresion(["brotli"]))
+
+
+class TestCompresionEnTramas(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.seguridad = GestorSeguridad()
+
+    def cliente(self, **kwargs):
+        return ClienteTCP(ColaEnvios(), self.seguridad, self.seguridad.public_key, **kwargs)
+
+    def test_trama_comprimida_se_descifra(self):
+        texto = lista_usuarios(500)
+        for suite in (SUITE_AESGCM, SUITE_FERNET):
+            plano, _ = self.cliente(suite=suite)._cifrar_mensaje_dual(texto)
+            comprimido, _ = self.cliente(suite=suite, compresion=COMPRESION_ZLIB)._cifrar_mensaje_dual(texto)
+            self.assertLess(len(comprimido), len(plano) // 3)
+            self.assertEqual(descifrar_trama(self.seguridad, comprimido.strip())[0], texto)
+
+    def test_sesion_x25519_comprimida(self):
+        publica = GestorSeguridad.importar_publica_x25519(self.seguridad.obtener_publicas_pem())
+        cliente = self.cliente(compresion=COMPRESION_LZMA)
+        cliente.seguridad = GestorSeguridad()
+        cliente.sesion = cliente.seguridad.crear_sesion_x25519(publica)
+        texto = lista_usuarios(500)
+        trama, _ = cliente._cifrar_mensaje_dual(texto)
+        self.assertEqual(descifrar_trama(self.seguridad, trama.strip())[0], texto)
+
+    def test_login_nunca_se_comprime(self):
+        cliente = self.cliente(suite=SUITE_AESGCM, compresion=COMPRESION_ZLIB)
+        login = {"tipo": "LOGIN", "contenido": {"password": "x", "relleno": "a" * 4000}}
+        self.assertFalse(cliente._comprimible(login))
+        self.assertFalse(cliente._comprimible({"tipo": "LOTE", "contenido": [{"tipo": "MENSAJE"}, login]}))
+        self.assertTrue(cliente._comprimible({"tipo": "MENSAJE", "contenido": "hola"}))
+
+        trama, _ = cliente._cifrar_mensaje_dual(json.dumps(login), comprimible=False)
+        _, cuerpo = separar_etiqueta(trama.strip())
+        self.assertGreater(len(base64.b64decode(cuerpo)), 4000)
+
+
+if __name__ == '__main__':
+    unittest.main()
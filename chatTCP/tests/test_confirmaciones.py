@@ -0,0 +1,236 @@
+"""
+Tests de confirmaciones de entrega: ACK acumulativo, retransmisión y ventana
+"""
+import os
+import socket
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.ComponenteReceptor.IReceptor import IReceptor
+from src.PaqueteDTO.PaqueteDTO import PaqueteDTO
+from src.Red.Cifrado.seguridad import GestorSeguridad, SUITE_AESGCM, SUITE_CHACHA20
+from src.Red.Emisor.ClienteTCP import ClienteTCP
+from src.Red.Emisor.ColaEnvios import ColaEnvios
+from src.Red.Emisor.ConfirmacionesEnvio import (ConfirmacionesEnvio, HistogramaLatencias, ESTADO_CONFIRMADO,
+                                                ESTADO_FALLIDO, ESTADO_SIN_CONFIRMACION, linea_confirmacion)
+from src.Red.Emisor.DestinoEnvio import DestinoEnvio
+from src.Red.Emisor.Emisor import Emisor
+from src.Red.Emisor.NumeradorSecuencias import NumeradorSecuencias
+from src.Red.Receptor.ColaRecibos import ColaRecibos
+from src.Red.Receptor.Receptor import Receptor
+from src.Red.Receptor.ServidorTCP import ServidorTCP
+
+
+class ReceptorLista(IReceptor):
+    def __init__(self):
+        self.recibidos = []
+
+    def recibir_cambio(self, paquete):
+        self.recibidos.append(paquete)
+
+
+class ServidorCrudo:
+    """
+    Servidor TCP que lee una trama por conexión y contesta según `respuesta`:
+    una función (número de conexión) -> línea, "" para cerrar sin
+    contestar o None para dejar la conexión colgada
+    """
+
+    def __init__(self, respuesta):
+        self.respuesta = respuesta
+        self.conexiones = 0
+        self.colgadas = []
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen(64)
+        self.puerto = self.sock.getsockname()[1]
+        threading.Thread(target=self._aceptar, daemon=True).start()
+
+    def _aceptar(self):
+        while True:
+            try:
+                conexion, _ = self.sock.accept()
+            except OSError:
+                return
+            self.conexiones += 1
+            n = self.conexiones
+            datos = b"x"
+            while datos and b"\n" not in datos:
+                datos = conexion.recv(65536)
+            linea = self.respuesta(n)
+            if linea is None:
+                self.colgadas.append(conexion)
+                continue
+            if linea:
+                conexion.sendall(linea.encode())
+            conexion.close()
+
+    def cerrar(self):
+        self.sock.close()
+        for conexion in self.colgadas:
+            conexion.close()
+
+
+class TestConfirmaciones(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.seguridad = GestorSeguridad()
+
+    def setUp(self):
+        self.estados = {}
+
+    def armar_emisor(self, puerto, **kwargs):
+        confirmaciones = ConfirmacionesEnvio(**kwargs)
+        confirmaciones.agregar_observador(self._anotar)
+        self.addCleanup(confirmaciones.cerrar)
+        cola = ColaEnvios()
+        cliente = ClienteTCP(cola, self.seguridad, self.seguridad.public_key, puerto=puerto,
+                             suite=SUITE_AESGCM, confirmaciones=confirmaciones)
+        cola.agregar_observador(cliente)
+        return Emisor(cola, NumeradorSecuencias(), cliente), cliente, confirmaciones
+
+    def _anotar(self, id_mensaje, estado, latencia):
+        self.estados[id_mensaje] = estado
+
+    def enviar(self, emisor, puerto, tipo="MENSAJE"):
+        paquete = PaqueteDTO(tipo, {"mensaje": "hola"}, host="127.0.0.1", puerto_destino=puerto)
+        emisor.enviar_cambio(paquete)
+        return paquete.id_mensaje
+
+    def esperar(self, condicion, limite=5.0):
+        fin = time.monotonic() + limite
+        while not condicion() and time.monotonic() < fin:
+            time.sleep(0.01)
+        return condicion()
+
+    def test_ack_de_punta_a_punta(self):
+        cola = ColaRecibos()
+        receptor = Receptor()
+        destino = ReceptorLista()
+        receptor.set_cola(cola)
+        receptor.set_receptor(destino)
+        cola.agregar_observador(receptor)
+        servidor = ServidorTCP(cola, self.seguridad, puerto=0, host="127.0.0.1", confirmador=receptor.confirmacion)
+        servidor.iniciar()
+        self.addCleanup(servidor.detener)
+
+        emisor, _, confirmaciones = self.armar_emisor(servidor.get_puerto())
+        ids = [self.enviar(emisor, servidor.get_puerto()) for _ in range(10)]
+        self.enviar(emisor, servidor.get_puerto(), tipo="SOLICITAR_USUARIOS")  # no espera ACK
+
+        self.assertTrue(self.esperar(lambda: len(self.estados) == 10))
+        self.assertEqual({self.estados[i] for i in ids}, {ESTADO_CONFIRMADO})
+        metricas = confirmaciones.metricas()
+        self.assertEqual((metricas["confirmados"], metricas["retransmisiones"], metricas["en_vuelo"]), (10, 0, 0))
+        self.assertEqual(metricas["latencia_ack"]["total"], 10)
+        self.assertTrue(self.esperar(lambda: len(destino.recibidos) == 11))
+
+    def test_retransmite_si_no_llega_ack(self):
+        # La primera conexión queda colgada; la segunda contesta
+        servidor = ServidorCrudo(lambda n: None if n == 1 else linea_confirmacion(1, 1))
+        self.addCleanup(servidor.cerrar)
+        emisor, _, confirmaciones = self.armar_emisor(servidor.puerto, rto_inicial=0.1)
+
+        id_mensaje = self.enviar(emisor, servidor.puerto)
+        self.assertTrue(self.esperar(lambda: id_mensaje in self.estados))
+        self.assertEqual(self.estados[id_mensaje], ESTADO_CONFIRMADO)
+        self.assertEqual(confirmaciones.metricas()["retransmisiones"], 1)
+
+    def test_ack_acumulativo_confirma_anteriores(self):
+        # Solo la tercera conexión contesta, con hasta=3
+        servidor = ServidorCrudo(lambda n: linea_confirmacion(3, 3) if n == 3 else None)
+        self.addCleanup(servidor.cerrar)
+        emisor, _, confirmaciones = self.armar_emisor(servidor.puerto, rto_inicial=5.0)
+
+        ids = [self.enviar(emisor, servidor.puerto) for _ in range(3)]
+        self.assertTrue(self.esperar(lambda: len(self.estados) == 3))
+        self.assertEqual({self.estados[i] for i in ids}, {ESTADO_CONFIRMADO})
+        self.assertEqual(confirmaciones.metricas()["retransmisiones"], 0)
+
+    def test_falla_tras_agotar_intentos(self):
+        servidor = ServidorCrudo(lambda n: None)
+        self.addCleanup(servidor.cerrar)
+        emisor, _, confirmaciones = self.armar_emisor(servidor.puerto, intentos=2, rto_inicial=0.05)
+
+        id_mensaje = self.enviar(emisor, servidor.puerto)
+        self.assertTrue(self.esperar(lambda: id_mensaje in self.estados))
+        self.assertEqual(self.estados[id_mensaje], ESTADO_FALLIDO)
+        self.assertEqual(servidor.conexiones, 2)
+        self.assertEqual(confirmaciones.en_vuelo(), 0)
+
+    def test_receptor_sin_ack_no_retransmite(self):
+        servidor = ServidorCrudo(lambda n: "")
+        self.addCleanup(servidor.cerrar)
+        emisor, _, confirmaciones = self.armar_emisor(servidor.puerto, rto_inicial=0.05)
+
+        id_mensaje = self.enviar(emisor, servidor.puerto)
+        self.assertTrue(self.esperar(lambda: id_mensaje in self.estados))
+        self.assertEqual(self.estados[id_mensaje], ESTADO_SIN_CONFIRMACION)
+        time.sleep(0.2)
+        self.assertEqual(servidor.conexiones, 1)
+
+    def test_ventana_llena(self):
+        servidor = ServidorCrudo(lambda n: None)
+        self.addCleanup(servidor.cerrar)
+        emisor, cliente, confirmaciones = self.armar_emisor(servidor.puerto, ventana=2, espera_ventana=0.1, rto_inicial=5.0)
+
+        for _ in range(2):
+            self.enviar(emisor, servidor.puerto)
+            self.assertTrue(cliente.ultimo_envio_exitoso())
+        self.enviar(emisor, servidor.puerto)
+        self.assertFalse(cliente.ultimo_envio_exitoso())
+        self.assertEqual(confirmaciones.metricas()["ventana_llena"], 1)
+
+    def test_envio_directo_por_destino_sin_bloquear_a_otros(self):
+        lleno = ServidorCrudo(lambda n: None)
+        self.addCleanup(lleno.cerrar)
+        emisor, _, _ = self.armar_emisor(lleno.puerto, ventana=1, espera_ventana=1.0, rto_inicial=5.0)
+        propio = DestinoEnvio(self.seguridad.public_key, SUITE_AESGCM)
+        self.assertTrue(emisor.enviar_a(PaqueteDTO("MENSAJE", {}, host="127.0.0.1", puerto_destino=lleno.puerto), propio))
+
+        # Otro destino con su propia llave y suite
+        seguridad_b = GestorSeguridad()
+        cola, destino = ColaRecibos(), ReceptorLista()
+        receptor = Receptor()
+        receptor.set_cola(cola)
+        receptor.set_receptor(destino)
+        cola.agregar_observador(receptor)
+        servidor = ServidorTCP(cola, seguridad_b, puerto=0, host="127.0.0.1", confirmador=receptor.confirmacion)
+        servidor.iniciar()
+        self.addCleanup(servidor.detener)
+
+        # Un hilo espera la ventana llena del primer destino mientras el otro envía
+        resultados = []
+        hilo = threading.Thread(target=lambda: resultados.append(emisor.enviar_a(
+            PaqueteDTO("MENSAJE", {}, host="127.0.0.1", puerto_destino=lleno.puerto), propio)))
+        hilo.start()
+        inicio = time.monotonic()
+        self.assertTrue(emisor.enviar_a(PaqueteDTO("MENSAJE", {"mensaje": "b"}, host="127.0.0.1", puerto_destino=servidor.get_puerto()),
+                                        DestinoEnvio(seguridad_b.public_key, SUITE_CHACHA20)))
+        self.assertLess(time.monotonic() - inicio, 0.5)
+        hilo.join()
+        self.assertEqual(resultados, [False])
+        self.assertTrue(self.esperar(lambda: [p.contenido for p in destino.recibidos] == [{"mensaje": "b"}]))
+
+
+class TestHistogramaLatencias(unittest.TestCase):
+
+    def test_percentiles_por_cubeta(self):
+        histograma = HistogramaLatencias()
+        for _ in range(90):
+            histograma.registrar(0.003)
+        for _ in range(10):
+            histograma.registrar(0.150)
+        resumen = histograma.resumen()
+        self.assertEqual(resumen["total"], 100)
+        self.assertEqual((resumen["p50_ms"], resumen["p99_ms"]), (5.0, 200.0))
+        self.assertEqual(resumen["cuentas"]["<=5ms"], 90)
+
+
+if __name__ == '__main__':
+    unittest.main()
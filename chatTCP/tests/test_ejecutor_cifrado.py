@@ -0,0 +1,191 @@
+"""
+Tests de la etapa de descifrado del receptor (EjecutorCifrado)
+"""
+import base64
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding
+
+from src.Red.Cifrado.EjecutorCifrado import (EjecutorCifrado, MODO_AESGCM, MODO_CHACHA20, MODO_HIBRIDO,
+                                             MODO_NINGUNO, MODO_POR_SUITE, MODO_RSA, MODO_X25519, etiquetar_trama)
+from src.Red.Emisor.ClienteTCP import ClienteTCP
+from src.Red.Cifrado.seguridad import GestorSeguridad, SUITES, SUITE_AESGCM, SUITE_CHACHA20, SUITE_FERNET
+
+
+def trama_rsa(seguridad, texto):
+    cifrado = seguridad.public_key.encrypt(
+        texto.encode('utf-8'),
+        padding.OAEP(mgf=padding.MGF1(algorithm=hashes.SHA256()), algorithm=hashes.SHA256(), label=None)
+    )
+    return base64.b64encode(cifrado).decode('utf-8')
+
+
+def trama_hibrida(seguridad, texto, suite=SUITE_FERNET):
+    return base64.b64encode(seguridad.cifrar(texto, seguridad.public_key, suite)).decode('utf-8')
+
+
+class TestEjecutorCifrado(unittest.TestCase):
+    """
+    Detección del modo por forma, costo de tramas inválidas y pools
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.seguridad = GestorSeguridad()
+
+    def setUp(self):
+        # Contar operaciones de llave privada
+        self.operaciones = 0
+        original = GestorSeguridad.descifrar_rsa
+
+        def contar(gestor, datos):
+            self.operaciones += 1
+            return original(gestor, datos)
+        self.seguridad.descifrar_rsa = lambda datos: contar(self.seguridad, datos)
+
+    def tearDown(self):
+        del self.seguridad.descifrar_rsa
+
+    def test_modos_detectados_por_forma(self):
+        ejecutor = EjecutorCifrado(self.seguridad)
+        self.assertEqual(ejecutor.descifrar(trama_hibrida(self.seguridad, '{"a": 1}')), ('{"a": 1}', MODO_HIBRIDO))
+        self.assertEqual(ejecutor.descifrar(trama_rsa(self.seguridad, '{"b": 2}')), ('{"b": 2}', MODO_RSA))
+        self.assertEqual(self.operaciones, 2)
+
+        metricas = ejecutor.metricas()
+        self.assertEqual(metricas["por_modo"], {MODO_HIBRIDO: 1, MODO_RSA: 1, MODO_AESGCM: 0, MODO_CHACHA20: 0, MODO_X25519: 0})
+        self.assertGreater(metricas["tiempo_max_us"], 0)
+
+    def test_tramas_invalidas_cuestan_a_lo_sumo_una_operacion(self):
+        ejecutor = EjecutorCifrado(self.seguridad)
+
+        # Forma inválida o base64 roto: ninguna operación de llave privada
+        self.assertEqual(ejecutor.descifrar(base64.b64encode(b"x" * 100).decode()), (None, MODO_NINGUNO))
+        self.assertEqual(ejecutor.descifrar("no es base64!!"), (None, MODO_NINGUNO))
+        self.assertEqual(self.operaciones, 0)
+
+        # Forma híbrida con bloque RSA basura: una sola operación
+        basura = base64.b64encode(os.urandom(256) + b":::" + b"token").decode()
+        self.assertEqual(ejecutor.descifrar(basura), (None, MODO_NINGUNO))
+        self.assertEqual(self.operaciones, 1)
+        self.assertEqual(ejecutor.metricas()["rechazos"][MODO_HIBRIDO], 1)
+
+    def test_tramas_etiquetadas(self):
+        ejecutor = EjecutorCifrado(self.seguridad)
+        hibrida = etiquetar_trama(MODO_HIBRIDO, trama_hibrida(self.seguridad, '{"a": 1}'))
+        rsa = etiquetar_trama(MODO_RSA, trama_rsa(self.seguridad, '{"b": 2}'))
+        self.assertEqual(ejecutor.descifrar(hibrida), ('{"a": 1}', MODO_HIBRIDO))
+        self.assertEqual(ejecutor.descifrar(rsa), ('{"b": 2}', MODO_RSA))
+        self.assertEqual(self.operaciones, 2)
+
+        # Etiqueta que no coincide con la forma o desconocida: sin operaciones
+        self.assertEqual(ejecutor.descifrar("R:" + hibrida[2:]), (None, MODO_NINGUNO))
+        self.assertEqual(ejecutor.descifrar("Z:" + hibrida[2:]), (None, MODO_NINGUNO))
+        self.assertEqual(self.operaciones, 2)
+
+        metricas = ejecutor.metricas()
+        self.assertEqual(metricas["rechazos"][MODO_RSA], 1)
+        self.assertEqual(metricas["rechazos"][MODO_NINGUNO], 1)
+        self.assertEqual(metricas["sin_etiqueta"], 0)
+
+    def test_cliente_etiqueta_el_modo(self):
+        cliente = ClienteTCP(None, self.seguridad, self.seguridad.public_key)
+        trama, modo = cliente._cifrar_mensaje_dual('{"c": 3}')
+        self.assertTrue(trama.startswith("H:"))
+        self.assertEqual(modo, MODO_HIBRIDO)
+        self.assertEqual(EjecutorCifrado(self.seguridad).descifrar(trama.strip()), ('{"c": 3}', MODO_HIBRIDO))
+
+    def test_suites_aead(self):
+        ejecutor = EjecutorCifrado(self.seguridad)
+        for suite in SUITES:
+            modo = MODO_POR_SUITE[suite]
+            trama = etiquetar_trama(modo, trama_hibrida(self.seguridad, '{"s": "ñ"}', suite))
+            self.assertEqual(ejecutor.descifrar(trama), ('{"s": "ñ"}', modo))
+
+        # Una trama AEAD reinterpretada con la otra suite no se autentica
+        gcm = trama_hibrida(self.seguridad, "{}", SUITE_AESGCM)
+        self.assertEqual(ejecutor.descifrar(etiquetar_trama(MODO_CHACHA20, gcm)), (None, MODO_NINGUNO))
+        self.assertEqual(ejecutor.metricas()["rechazos"][MODO_CHACHA20], 1)
+
+        # Más corta que bloque RSA + nonce + tag: rechazada sin operación de llave
+        operaciones = self.operaciones
+        corta = base64.b64encode(base64.b64decode(gcm)[:256 + 20]).decode()
+        self.assertEqual(ejecutor.descifrar(etiquetar_trama(MODO_AESGCM, corta)), (None, MODO_NINGUNO))
+        self.assertEqual(self.operaciones, operaciones)
+
+    def test_aead_sin_relleno_ni_base64_interno(self):
+        texto = "x" * 1000
+        fernet = len(self.seguridad.cifrar(texto, self.seguridad.public_key, SUITE_FERNET))
+        gcm = len(self.seguridad.cifrar(texto, self.seguridad.public_key, SUITE_AESGCM))
+        self.assertEqual(gcm, 256 + 12 + 1000 + 16)
+        self.assertLess(gcm, fernet)
+
+    def test_sesion_x25519_sin_operaciones_rsa(self):
+        servidor = GestorSeguridad(self.seguridad.private_key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()))
+        cliente = GestorSeguridad()
+        publica = GestorSeguridad.importar_publica_x25519(self.seguridad.obtener_publicas_pem())
+        self.assertIsNotNone(publica)
+        # El primer bloque sigue siendo la llave RSA para los lectores anteriores
+        self.assertEqual(cliente.importar_publica(self.seguridad.obtener_publicas_pem()).public_numbers(),
+                         self.seguridad.public_key.public_numbers())
+        self.assertIsNone(GestorSeguridad.importar_publica_x25519(self.seguridad.obtener_publica_bytes()))
+
+        id_sesion = cliente.crear_sesion_x25519(publica)
+        trama = etiquetar_trama(MODO_X25519, base64.b64encode(cliente.cifrar_sesion('{"x": 1}', id_sesion)).decode())
+
+        # Otro proceso con la misma llave RSA deriva la misma sesión
+        for gestor in (self.seguridad, servidor):
+            self.assertEqual(EjecutorCifrado(gestor).descifrar(trama), ('{"x": 1}', MODO_X25519))
+        self.assertEqual(self.operaciones, 0)
+
+        # Respuesta del servidor hacia la sesión del cliente
+        respuesta = base64.b64encode(servidor.cifrar_sesion('{"y": 2}', id_sesion)).decode()
+        self.assertEqual(EjecutorCifrado(cliente).descifrar(etiquetar_trama(MODO_X25519, respuesta)),
+                         ('{"y": 2}', MODO_X25519))
+
+        # Una sesión inventada no se autentica ni queda en la tabla
+        falsa = etiquetar_trama(MODO_X25519, base64.b64encode(os.urandom(32) + os.urandom(40)).decode())
+        total = len(servidor.sesiones_x25519())
+        self.assertEqual(EjecutorCifrado(servidor).descifrar(falsa), (None, MODO_NINGUNO))
+        self.assertEqual(len(servidor.sesiones_x25519()), total)
+
+    def test_negociacion_de_suite(self):
+        self.assertEqual(GestorSeguridad.negociar_suite(None), SUITE_FERNET)
+        self.assertEqual(GestorSeguridad.negociar_suite(["FERNET", "CHACHA20"]), SUITE_CHACHA20)
+        self.assertEqual(GestorSeguridad.negociar_suite(list(SUITES)), SUITE_AESGCM)
+        self.assertEqual(GestorSeguridad.negociar_suite(["OTRA"]), SUITE_FERNET)
+
+    def test_cola_llena_rechaza(self):
+        ejecutor = EjecutorCifrado(self.seguridad, modo="hilos", trabajadores=1, max_pendientes=1, espera_cola=0.01)
+        try:
+            ejecutor._cupos.acquire()
+            self.assertEqual(ejecutor.descifrar(trama_hibrida(self.seguridad, "{}")), (None, MODO_NINGUNO))
+            self.assertEqual(ejecutor.metricas()["rechazos"]["COLA_LLENA"], 1)
+            ejecutor._cupos.release()
+            self.assertEqual(ejecutor.descifrar(trama_hibrida(self.seguridad, "{}")), ("{}", MODO_HIBRIDO))
+        finally:
+            ejecutor.cerrar()
+
+    def test_pool_de_procesos(self):
+        ejecutor = EjecutorCifrado(self.seguridad, modo="procesos", trabajadores=2)
+        try:
+            tramas = [trama_hibrida(self.seguridad, f'{{"n": {i}}}') for i in range(8)]
+            resultados = [ejecutor.descifrar(t) for t in tramas]
+            self.assertEqual([r[0] for r in resultados], [f'{{"n": {i}}}' for i in range(8)])
+            self.assertEqual(ejecutor.metricas()["por_modo"][MODO_HIBRIDO], 8)
+        finally:
+            ejecutor.cerrar()
+
+    def test_modo_desconocido(self):
+        with self.assertRaises(ValueError):
+            EjecutorCifrado(self.seguridad, modo="gpu")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+"""
+Tests del seguimiento de entregas del servidor: un MENSAJE reenviado a un
+usuario que termina sin ACK queda guardado offline
+"""
+import itertools
+import os
+import sys
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from chatTCP.server_main import ReceptorLogicaServidor
+from chatTCP.src.Bus.ServicioDTO import ServicioDTO
+from chatTCP.src.Datos.AlmacenOffline import AlmacenOffline
+from chatTCP.src.PaqueteDTO.PaqueteDTO import PaqueteDTO
+from chatTCP.src.Red.Emisor.ConfirmacionesEnvio import ESTADO_CONFIRMADO, ESTADO_FALLIDO
+
+
+class EmisorFalso:
+    """Numera como NumeradorSecuencias y anota lo que se envía"""
+
+    def __init__(self, exito=True):
+        self.exito = exito
+        self.enviados = []
+        self._ids = itertools.count(1)
+
+    def numerar(self, paquete):
+        if paquete.id_mensaje is None:
+            paquete.id_mensaje = f"s-{next(self._ids)}"
+        return paquete
+
+    def enviar_a(self, paquete, destino):
+        self.numerar(paquete)
+        self.enviados.append(paquete)
+        return self.exito
+
+
+class EnsambladorFalso:
+    def __init__(self, emisor):
+        self.emisor = emisor
+        self.observadores = []
+        self._gestor_seguridad = SimpleNamespace(importar_publica=lambda pem: object())
+
+    def agregar_observador_entregas(self, funcion):
+        self.observadores.append(funcion)
+        return True
+
+    def obtener_emisor(self):
+        return self.emisor
+
+    def resolver(self, id_mensaje, estado):
+        for funcion in self.observadores:
+            funcion(id_mensaje, estado, None)
+
+
+class TestEntregasServidor(unittest.TestCase):
+    """
+    Pruebas del observador de entregas de ReceptorLogicaServidor
+    """
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.almacen = AlmacenOffline(self._tmp.name, sincronizar=False)
+        self.emisor = EmisorFalso()
+        self.ensamblador = EnsambladorFalso(self.emisor)
+        usuarios = SimpleNamespace(existe=lambda usuario: True)
+        self.receptor = ReceptorLogicaServidor(None, self.ensamblador, self.almacen, usuarios=usuarios,
+                                               sesiones={"ana": ServicioDTO("127.0.0.1", 6000, b"pem")})
+        self.receptor.vigilar_entregas()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _reenviar(self, texto):
+        self.receptor._procesar_mensaje(PaqueteDTO("MENSAJE", {"mensaje": texto}, origen="luis", destino="ana"))
+        return self.emisor.enviados[-1].id_mensaje
+
+    def test_mensaje_fallido_queda_offline(self):
+        id_mensaje = self._reenviar("hola")
+        self.assertEqual(self.almacen.pendientes("ana"), [])
+
+        self.ensamblador.resolver(id_mensaje, ESTADO_FALLIDO)
+
+        pendientes = self.almacen.pendientes("ana")
+        self.assertEqual(len(pendientes), 1)
+        self.assertEqual(pendientes[0][1], {"origen": "luis", "contenido": {"mensaje": "hola"}})
+        # Un segundo aviso del mismo id no lo duplica
+        self.ensamblador.resolver(id_mensaje, ESTADO_FALLIDO)
+        self.assertEqual(len(self.almacen.pendientes("ana")), 1)
+
+    def test_mensaje_confirmado_no_se_guarda(self):
+        self.ensamblador.resolver(self._reenviar("hola"), ESTADO_CONFIRMADO)
+        self.assertEqual(self.almacen.pendientes("ana"), [])
+        self.assertEqual(self.receptor._entregas_pendientes, {})
+
+    def test_envio_fallido_se_guarda_una_sola_vez(self):
+        self.emisor.exito = False
+        id_mensaje = self._reenviar("hola")
+        self.ensamblador.resolver(id_mensaje, ESTADO_FALLIDO)
+        self.assertEqual(len(self.almacen.pendientes("ana")), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+"""
+Tests del escritor WAL con group commit
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.Datos.EscritorWAL import EscritorWAL
+
+
+class TestEscritorWAL(unittest.TestCase):
+    """
+    Pruebas de durabilidad, recuperación y compactación
+    """
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.ruta_wal = os.path.join(self._tmp.name, "usuarios.json.wal")
+        self.ruta_snapshot = os.path.join(self._tmp.name, "usuarios.json")
+        self.estado = {}
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _crear(self, **kwargs):
+        return EscritorWAL(self.ruta_wal, self.ruta_snapshot, obtener_estado=lambda: dict(self.estado), **kwargs)
+
+    def test_escrituras_concurrentes_se_recuperan(self):
+        escritor = self._crear(umbral_compactacion=10_000)
+
+        def registrar(inicio):
+            for i in range(inicio, inicio + 50):
+                self.estado[f"u{i}"] = i
+                escritor.escribir(f"u{i}", i)
+
+        hilos = [threading.Thread(target=registrar, args=(n * 50,)) for n in range(8)]
+        for h in hilos: h.start()
+        for h in hilos: h.join()
+        escritor.cerrar()
+
+        recuperado = self._crear().cargar()
+        self.assertEqual(len(recuperado), 400)
+        self.assertEqual(recuperado["u399"], 399)
+
+    def test_compactacion_vacia_wal(self):
+        escritor = self._crear(umbral_compactacion=5)
+        for i in range(12):
+            self.estado[f"u{i}"] = i
+            escritor.escribir(f"u{i}", i)
+        escritor.cerrar()
+
+        with open(self.ruta_snapshot) as f:
+            self.assertGreaterEqual(len(json.load(f)), 10)
+        self.assertEqual(len(self._crear().cargar()), 12)
+
+    def test_linea_incompleta_en_wal(self):
+        escritor = self._crear()
+        escritor.escribir("ana", "h1")
+        escritor.cerrar()
+        with open(self.ruta_wal, "ab") as f:
+            f.write(b'{"clave": "lu')
+
+        self.assertEqual(self._crear().cargar(), {"ana": "h1"})
+
+    def test_snapshot_corrupto_se_aparta(self):
+        with open(self.ruta_snapshot, "w") as f:
+            f.write('{"ana": "h1", "lu')
+
+        with self.assertLogs("src.Datos.EscritorWAL", level="ERROR"):
+            estado = self._crear().cargar()
+        self.assertEqual(estado, {})
+        self.assertTrue(os.path.exists(self.ruta_snapshot + ".corrupto"))
+
+
+if __name__ == "__main__":
+    unittest.main()
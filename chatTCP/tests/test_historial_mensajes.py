@@ -0,0 +1,70 @@
+"""
+Tests del historial de mensajes del servidor
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from chatTCP.src.Datos.HistorialMensajes import HistorialMensajes, clave_conversacion
+from chatTCP.src.ModeloChatTCP.DTOs.MensajeDTO import MensajeDTO
+
+
+class TestHistorialMensajes(unittest.TestCase):
+    """
+    Pruebas de guardado y consultas paginadas
+    """
+
+    def setUp(self):
+        self.historial = HistorialMensajes(":memory:")
+
+    def tearDown(self):
+        self.historial.cerrar()
+
+    def test_clave_independiente_del_orden(self):
+        self.assertEqual(clave_conversacion("ana", "luis"), clave_conversacion("luis", "ana"))
+        self.assertEqual(clave_conversacion("ana", "TODOS"), "TODOS")
+
+    def test_pagina_mas_reciente_en_orden_cronologico(self):
+        for i in range(10):
+            self.historial.guardar("ana", "luis", f"m{i}", fecha=1000.0 + i)
+
+        mensajes, cursor = self.historial.consultar("luis", "ana", limite=3)
+        self.assertEqual([m["contenidoMensaje"] for m in mensajes], ["m7", "m8", "m9"])
+        self.assertIsNotNone(cursor)
+
+    def test_recorrer_todas_las_paginas(self):
+        for i in range(25):
+            self.historial.guardar("ana" if i % 2 else "luis", "luis" if i % 2 else "ana", f"m{i}", fecha=1000.0)
+        self.historial.guardar("ana", "TODOS", "general")
+
+        vistos = []
+        cursor = None
+        while True:
+            mensajes, cursor = self.historial.consultar("ana", "luis", cursor=cursor, limite=10)
+            vistos = [m["contenidoMensaje"] for m in mensajes] + vistos
+            if cursor is None:
+                break
+
+        self.assertEqual(vistos, [f"m{i}" for i in range(25)])
+
+    def test_rango_desde(self):
+        for i in range(5):
+            self.historial.guardar("ana", "TODOS", f"m{i}", fecha=1000.0 + i)
+
+        mensajes, cursor = self.historial.consultar("luis", "TODOS", desde=1003.0)
+        self.assertEqual([m["contenidoMensaje"] for m in mensajes], ["m3", "m4"])
+        self.assertIsNone(cursor)
+
+    def test_formato_mensaje_dto(self):
+        self.historial.guardar("ana", "luis", "hola")
+        mensajes, _ = self.historial.consultar("ana", "luis")
+
+        dto = MensajeDTO.from_dict(mensajes[0])
+        self.assertEqual(dto.nombreUsuario, "ana")
+        self.assertEqual(dto.contenidoMensaje, "hola")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+"""
+Tests del índice de búsqueda de texto completo
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from chatTCP.src.Datos.IndiceBusqueda import IndiceBusqueda
+
+
+class TestIndiceBusqueda(unittest.TestCase):
+    """
+    Pruebas de indexado incremental, ranking, paginación y visibilidad
+    """
+
+    def setUp(self):
+        self.indice = IndiceBusqueda(":memory:", tamanio_lote=2)
+
+    def tearDown(self):
+        self.indice.cerrar()
+
+    def test_busqueda_basica_y_acentos(self):
+        self.indice.indexar("ana", "TODOS", "Mañana hay reunión del proyecto")
+        self.indice.indexar("luis", "TODOS", "Nos vemos en la cafetería")
+
+        resultados, hay_mas = self.indice.buscar("pepe", "reunion")
+        self.assertEqual(len(resultados), 1)
+        self.assertEqual(resultados[0]["nombreUsuario"], "ana")
+        self.assertIn("[", resultados[0]["fragmento"])
+        self.assertFalse(hay_mas)
+
+    def test_prefijo_en_ultimo_termino(self):
+        self.indice.indexar("ana", "TODOS", "seguridad de la red")
+        resultados, _ = self.indice.buscar("pepe", "segur")
+        self.assertEqual(len(resultados), 1)
+
+    def test_ranking_por_relevancia(self):
+        self.indice.indexar("ana", "TODOS", "servidor caído, revisen el log por favor cuando puedan")
+        self.indice.indexar("ana", "TODOS", "servidor servidor servidor")
+
+        resultados, _ = self.indice.buscar("pepe", "servidor")
+        self.assertEqual(resultados[0]["contenidoMensaje"], "servidor servidor servidor")
+
+    def test_solo_conversaciones_propias(self):
+        self.indice.indexar("ana", "luis", "clave secreta")
+        self.indice.indexar("ana", "TODOS", "clave pública")
+
+        self.assertEqual(len(self.indice.buscar("luis", "clave")[0]), 2)
+        self.assertEqual(len(self.indice.buscar("pepe", "clave")[0]), 1)
+
+    def test_paginacion(self):
+        for i in range(7):
+            self.indice.indexar("ana", "TODOS", f"mensaje numero {i}")
+
+        pagina0, hay_mas0 = self.indice.buscar("ana", "mensaje", pagina=0, limite=5)
+        pagina1, hay_mas1 = self.indice.buscar("ana", "mensaje", pagina=1, limite=5)
+        self.assertEqual((len(pagina0), hay_mas0), (5, True))
+        self.assertEqual((len(pagina1), hay_mas1), (2, False))
+
+    def test_operadores_fts_no_se_interpretan(self):
+        self.indice.indexar("ana", "TODOS", "hola NEAR mundo")
+        resultados, _ = self.indice.buscar("ana", 'NEAR( "hola')
+        self.assertEqual(len(resultados), 1)
+        self.assertEqual(self.indice.buscar("ana", "   ")[0], [])
+
+    def test_pendientes_se_confirman_sin_nuevos_mensajes(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ruta = os.path.join(directorio.name, "busqueda.db")
+        indice = IndiceBusqueda(ruta, tamanio_lote=256, intervalo_commit=0.1)
+        self.addCleanup(indice.cerrar)
+        lector = sqlite3.connect(ruta)
+        self.addCleanup(lector.close)
+
+        indice.indexar("ana", "TODOS", "sin lote completo")
+        # Otra conexión solo ve lo confirmado
+        self.assertEqual(lector.execute("SELECT COUNT(*) FROM mensajes_fts").fetchone()[0], 0)
+        time.sleep(0.3)
+        self.assertEqual(lector.execute("SELECT COUNT(*) FROM mensajes_fts").fetchone()[0], 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+"""
+Tests del índice de usuarios de la presentación
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from chatTCP.src.Presentacion.ObjetosPresentacion.IndiceUsuariosOP import IndiceUsuariosOP
+from chatTCP.src.Presentacion.Observadores.INotificadorNuevoMensaje import INotificadorNuevoMensaje
+
+
+class ObservadorLista(INotificadorNuevoMensaje):
+    def __init__(self):
+        self.actualizados = []
+        self.cambios = []
+
+    def actualizar(self, usuario_op):
+        self.actualizados.append(usuario_op.nombre)
+
+    def lista_cambiada(self, agregados, quitados):
+        self.cambios.append(([u.nombre for u in agregados], [u.nombre for u in quitados]))
+
+
+class TestIndiceUsuariosOP(unittest.TestCase):
+
+    def setUp(self):
+        self.indice = IndiceUsuariosOP()
+        self.observador = ObservadorLista()
+        self.indice.agregar_observador(self.observador)
+
+    def test_sincronizar_notifica_solo_diferencias(self):
+        self.indice.sincronizar(["ana", "beto"])
+        beto = self.indice.obtener("beto")
+        self.indice.sincronizar(["beto", "carla"])
+
+        self.assertEqual(self.observador.cambios, [(["ana", "beto"], []), (["carla"], ["ana"])])
+        self.assertIs(self.indice.obtener("beto"), beto)
+        self.assertEqual([u.nombre for u in self.indice], ["beto", "carla"])
+        self.assertNotIn("ana", self.indice)
+
+        self.indice.sincronizar(["beto", "carla"])
+        self.assertEqual(len(self.observador.cambios), 2)
+
+    def test_mensajes_sin_leer(self):
+        self.indice.sincronizar(["ana", "beto"])
+        self.indice.registrar_mensaje("ana", "hola")
+        self.indice.registrar_mensaje("ana", "sigues?")
+        self.indice.registrar_mensaje("beto", "oye")
+        self.assertIsNone(self.indice.registrar_mensaje("diego", "quién soy"))
+
+        ana = self.indice.obtener("ana")
+        self.assertEqual((ana.totalMsjNuevos, ana.ultimo_mensaje), (2, "sigues?"))
+        self.assertEqual(self.indice.total_no_leidos, 3)
+        self.assertEqual(self.observador.actualizados, ["ana", "ana", "beto"])
+
+        self.indice.marcar_leido("ana")
+        self.assertEqual(self.indice.total_no_leidos, 1)
+        self.indice.sincronizar(["ana"])
+        self.assertEqual(self.indice.total_no_leidos, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
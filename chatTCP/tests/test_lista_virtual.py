@@ -0,0 +1,78 @@
+"""
+Tests de la lista virtualizada de usuarios
+"""
+import os
+import sys
+import tkinter as tk
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.Presentacion.ListaVirtual import ListaVirtual, planificar, rango_visible
+
+
+def hay_pantalla():
+    try:
+        tk.Tk().destroy()
+        return True
+    except tk.TclError:
+        return False
+
+
+class TestPlanificacion(unittest.TestCase):
+
+    def test_rango_visible(self):
+        self.assertEqual(rango_visible(0, 640, 64, 10000, margen=2), (0, 13))
+        self.assertEqual(rango_visible(6400, 640, 64, 10000, margen=2), (98, 113))
+        self.assertEqual(rango_visible(0, 640, 64, 5, margen=2), (0, 5))
+        self.assertEqual(rango_visible(0, 640, 64, 0), (0, 0))
+
+    def test_solo_cambia_lo_que_cambio(self):
+        mostradas = {"ana": (0, ("hola", 0)), "beto": (1, ("", 0)), "carla": (2, ("", 0))}
+        deseadas = [("ana", ("hola", 0)), ("beto", ("nuevo", 1)), ("carla", ("", 0))]
+        self.assertEqual(planificar(mostradas, deseadas, 0), ([], [], [1], []))
+
+    def test_altas_bajas_y_movimientos(self):
+        mostradas = {"ana": (0, 1), "beto": (1, 1), "carla": (2, 1)}
+        deseadas = [("ana", 1), ("carla", 1), ("diego", 1)]
+        nuevas, movidas, cambiadas, quitadas = planificar(mostradas, deseadas, 0)
+        self.assertEqual(nuevas, [2])
+        self.assertEqual(movidas, [1])
+        self.assertEqual(cambiadas, [])
+        self.assertEqual(quitadas, ["beto"])
+
+
+@unittest.skipUnless(hay_pantalla(), "Tk necesita una pantalla")
+class TestListaVirtual(unittest.TestCase):
+
+    def setUp(self):
+        self.raiz = tk.Tk()
+        self.raiz.geometry("300x640")
+        self.addCleanup(self.raiz.destroy)
+        self.canvas = tk.Canvas(self.raiz)
+        self.canvas.pack(fill="both", expand=True)
+        self.raiz.update()
+        self.lista = ListaVirtual(self.canvas, 64, crear_fila=lambda p: tk.Label(p),
+                                  mostrar_fila=lambda fila, e: fila.config(text=e[1]),
+                                  clave=lambda e: e[0], firma=lambda e: e[1])
+
+    def test_solo_existen_las_filas_visibles(self):
+        self.lista.set_elementos([(n, f"usuario {n}") for n in range(10000)])
+        self.assertLess(self.lista.widgets(), 20)
+
+        self.lista.yview("moveto", 0.5)
+        self.assertLess(self.lista.widgets(), 30)
+        self.assertGreater(self.lista.metricas["recicladas"], 0)
+
+    def test_actualizar_un_elemento_toca_una_fila(self):
+        elementos = [(n, f"usuario {n}") for n in range(1000)]
+        self.lista.set_elementos(elementos)
+        creadas = self.lista.metricas["creadas"]
+        elementos[3] = (3, "mensaje nuevo")
+        self.lista.set_elementos(elementos)
+        self.assertEqual(self.lista.metricas["creadas"], creadas)
+        self.assertEqual(self.lista.metricas["actualizadas"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+"""
+Tests del registro de métricas
+"""
+import os
+import sys
+import tempfile
+import unittest
+import urllib.request
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.Red.Metricas import RegistroMetricas
+from src.Red.Receptor.ColaRecibos import ColaRecibos
+from src.Red.Receptor import ColaRecibos as modulo_cola_recibos
+from src.PaqueteDTO.PaqueteDTO import PaqueteDTO
+
+
+class TestRegistroMetricas(unittest.TestCase):
+
+    def setUp(self):
+        self.registro = RegistroMetricas()
+
+    def test_contador_y_medidor_con_etiquetas(self):
+        paquetes = self.registro.contador("paquetes_total", "Paquetes", ("modo",))
+        paquetes.inc(modo="H")
+        paquetes.inc(2, modo="H")
+        paquetes.inc(modo="X")
+        profundidad = self.registro.medidor("profundidad", "Profundidad")
+        profundidad.inc(3)
+        profundidad.dec()
+
+        self.assertEqual(paquetes.valor(modo="H"), 3)
+        self.assertEqual(profundidad.valor(), 2)
+        self.assertIs(self.registro.contador("paquetes_total", "Paquetes", ("modo",)), paquetes)
+        with self.assertRaises(ValueError):
+            self.registro.medidor("paquetes_total", "Paquetes", ("modo",))
+        with self.assertRaises(ValueError):
+            paquetes.inc(destino="x")
+
+        texto = self.registro.exportar()
+        self.assertIn("# TYPE paquetes_total counter\n", texto)
+        self.assertIn('paquetes_total{modo="H"} 3\n', texto)
+        self.assertIn("profundidad 2\n", texto)
+
+    def test_percentiles_con_error_acotado(self):
+        latencias = self.registro.histograma("latencia_segundos", "Latencia")
+        for n in range(1, 1001):
+            latencias.observar(n / 1000)
+
+        for p in (50, 90, 99):
+            esperado = p / 100
+            self.assertGreaterEqual(latencias.percentil(p), esperado)
+            self.assertLessEqual(latencias.percentil(p), esperado * 1.125 + 1e-6)
+        self.assertEqual(latencias.percentil(100), 1.0)
+        self.assertEqual(latencias.resumen()["total"], 1000)
+
+    def test_exportar_histograma_acumulado(self):
+        difusion = self.registro.histograma("difusion", "Servicios por evento", resolucion=1)
+        for valor in (0, 1, 3, 3, 100):
+            difusion.observar(valor)
+
+        lineas = [l for l in self.registro.exportar().splitlines() if l.startswith("difusion_bucket")]
+        cuentas = [int(l.rsplit(" ", 1)[1]) for l in lineas]
+        self.assertEqual(cuentas, sorted(cuentas))
+        self.assertEqual(lineas[0], 'difusion_bucket{le="1"} 1')
+        self.assertEqual(lineas[-1], 'difusion_bucket{le="+Inf"} 5')
+        self.assertIn("difusion_sum 107\n", self.registro.exportar())
+
+    def test_http_y_volcado(self):
+        self.registro.contador("arranques_total", "Arranques").inc()
+        servidor = self.registro.servir_http(0)
+        self.addCleanup(servidor.server_close)
+        self.addCleanup(servidor.shutdown)
+        with urllib.request.urlopen(f"http://127.0.0.1:{servidor.server_address[1]}/metrics", timeout=5) as respuesta:
+            self.assertIn("text/plain", respuesta.headers["Content-Type"])
+            self.assertIn("arranques_total 1", respuesta.read().decode())
+
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = os.path.join(directorio, "metricas.prom")
+            self.registro.volcar(ruta)
+            with open(ruta, encoding="utf-8") as f:
+                self.assertEqual(f.read(), self.registro.exportar())
+
+    def test_cola_recibos_instrumentada(self):
+        antes = modulo_cola_recibos.ENCOLADOS.valor()
+        cola = ColaRecibos()
+        cola.encolar(PaqueteDTO("MENSAJE", {"mensaje": "hola"}).to_json())
+        self.assertEqual(modulo_cola_recibos.PROFUNDIDAD.valor(), 1)
+        cola.desencolar()
+        self.assertEqual(modulo_cola_recibos.ENCOLADOS.valor(), antes + 1)
+        self.assertEqual(modulo_cola_recibos.PROFUNDIDAD.valor(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+"""
+Suite de conformidad para los backends de IRepositorioUsuarios
+Cada backend hereda las mismas pruebas; solo cambia cómo se crea y se reabre
+"""
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.Datos.FabricaRepositorio import ConfigDatos, crear_repositorio
+from src.Datos.RepositorioJSON import RepositorioJSON
+from src.Datos.RepositorioMemoria import RepositorioMemoria
+from src.Datos.RepositorioSQLite import RepositorioSQLite
+from src.Datos.RepositorioShards import RepositorioShards
+
+
+class ConformidadRepositorio:
+    """
+    Pruebas comunes; las subclases definen crear() y si el backend persiste
+    """
+
+    PERSISTENTE = True
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.repo = self.crear()
+
+    def tearDown(self):
+        self.repo.cerrar()
+        self._tmp.cleanup()
+
+    def crear(self):
+        raise NotImplementedError
+
+    def reabrir(self):
+        self.repo.cerrar()
+        self.repo = self.crear()
+
+    def test_agregar_y_obtener(self):
+        self.assertTrue(self.repo.agregar("ana", "h1"))
+        self.assertEqual(self.repo.obtener("ana"), "h1")
+        self.assertTrue(self.repo.existe("ana"))
+        self.assertIsNone(self.repo.obtener("beto"))
+        self.assertFalse(self.repo.existe("beto"))
+
+    def test_duplicado_no_sobrescribe(self):
+        self.assertTrue(self.repo.agregar("ana", "h1"))
+        self.assertFalse(self.repo.agregar("ana", "h2"))
+        self.assertEqual(self.repo.obtener("ana"), "h1")
+        self.assertEqual(self.repo.total(), 1)
+
+    def test_agregar_lote(self):
+        self.repo.agregar("u0", "original")
+        agregados = self.repo.agregar_lote((f"u{i}", f"h{i}") for i in range(500))
+        self.assertEqual(agregados, 499)
+        self.assertEqual(self.repo.total(), 500)
+        self.assertEqual(self.repo.obtener("u0"), "original")
+        self.assertEqual(self.repo.obtener("u499"), "h499")
+
+    def test_registros_concurrentes_sin_duplicados(self):
+        exitos = []
+
+        def registrar():
+            exitos.append(sum(self.repo.agregar(f"u{i}", "h") for i in range(100)))
+
+        hilos = [threading.Thread(target=registrar) for _ in range(4)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(sum(exitos), 100)
+        self.assertEqual(self.repo.total(), 100)
+
+    def test_persistencia_al_reabrir(self):
+        if not self.PERSISTENTE:
+            self.skipTest("backend sin persistencia")
+        self.repo.agregar("ana", "h1")
+        self.repo.agregar_lote([("u1", "x"), ("u2", "y")])
+        self.repo.agregar("ñandú", "h2")
+        self.reabrir()
+        self.assertEqual(self.repo.total(), 4)
+        self.assertEqual(self.repo.obtener("ana"), "h1")
+        self.assertEqual(self.repo.obtener("u2"), "y")
+        self.assertEqual(self.repo.obtener("ñandú"), "h2")
+
+
+class TestRepositorioMemoria(ConformidadRepositorio, unittest.TestCase):
+    PERSISTENTE = False
+
+    def crear(self):
+        return RepositorioMemoria()
+
+
+class TestRepositorioJSON(ConformidadRepositorio, unittest.TestCase):
+    def crear(self):
+        return RepositorioJSON(os.path.join(self._tmp.name, "usuarios.json"))
+
+
+class TestRepositorioSQLite(ConformidadRepositorio, unittest.TestCase):
+    def crear(self):
+        return RepositorioSQLite(os.path.join(self._tmp.name, "usuarios.db"))
+
+
+class TestRepositorioShards(ConformidadRepositorio, unittest.TestCase):
+    def crear(self):
+        return RepositorioShards(os.path.join(self._tmp.name, "shards"), total_shards=4)
+
+
+class TestFabricaRepositorio(unittest.TestCase):
+    """
+    La fábrica elige el backend según la configuración
+    """
+
+    def test_backend_segun_config(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            casos = {
+                "memoria": RepositorioMemoria,
+                "json": RepositorioJSON,
+                "sqlite": RepositorioSQLite,
+                "shards": RepositorioShards,
+            }
+            for backend, clase in casos.items():
+                config = ConfigDatos(backend=backend,
+                                     ruta_json=os.path.join(tmp, "u.json"),
+                                     ruta_sqlite=os.path.join(tmp, "u.db"),
+                                     ruta_shards=os.path.join(tmp, "shards"),
+                                     total_shards=2)
+                repo = crear_repositorio(config)
+                self.assertIsInstance(repo, clase)
+                repo.cerrar()
+
+    def test_backend_desconocido(self):
+        with self.assertRaises(ValueError):
+            crear_repositorio(ConfigDatos(backend="redis"))
+
+
+if __name__ == '__main__':
+    unittest.main()
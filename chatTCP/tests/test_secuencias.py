@@ -0,0 +1,228 @@
+"""
+Tests de números de secuencia: numeración, filtro de duplicados y reordenamiento
+"""
+import os
+import random
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from chatTCP.src.Bus.EventBus import EventBus
+from chatTCP.src.Bus.ServicioDTO import ServicioDTO
+from src.ComponenteReceptor.IReceptor import IReceptor
+from src.PaqueteDTO.PaqueteDTO import PaqueteDTO
+from src.Red.Emisor.Emisor import Emisor
+from src.Red.Emisor.NumeradorSecuencias import NumeradorSecuencias
+from src.Red.Receptor.ColaRecibos import ColaRecibos
+from src.Red.Receptor.Receptor import Receptor
+from src.Red.Receptor.VentanaRecepcion import VentanaRecepcion
+
+
+def paquete(seq=None, sesion="s1", host="localhost", puerto=5000):
+    p = PaqueteDTO("MENSAJE", {"n": seq}, host=host, puerto_destino=puerto)
+    p.seq = seq
+    p.sesion = sesion if seq is not None else None
+    return p
+
+
+def seqs(paquetes):
+    return [p.seq for p in paquetes]
+
+
+class ReceptorLista(IReceptor):
+    def __init__(self):
+        self.recibidos = []
+        self.lock = threading.Lock()
+
+    def recibir_cambio(self, paquete):
+        with self.lock:
+            self.recibidos.append(paquete)
+
+
+class TestNumeradorSecuencias(unittest.TestCase):
+
+    def test_secuencia_por_destino(self):
+        numerador = NumeradorSecuencias("abc")
+        a1 = numerador.numerar(paquete(puerto=1))
+        b1 = numerador.numerar(paquete(puerto=2))
+        a2 = numerador.numerar(paquete(puerto=1))
+
+        self.assertEqual((a1.seq, b1.seq, a2.seq), (1, 1, 2))
+        self.assertEqual({a1.sesion, b1.sesion, a2.sesion}, {"abc"})
+        self.assertEqual(len({a1.id_mensaje, b1.id_mensaje, a2.id_mensaje}), 3)
+
+    def test_retransmision_conserva_numeracion(self):
+        numerador = NumeradorSecuencias()
+        p = numerador.numerar(paquete())
+        seq, id_mensaje = p.seq, p.id_mensaje
+        numerador.numerar(p)
+        self.assertEqual((p.seq, p.id_mensaje), (seq, id_mensaje))
+
+    def test_paquete_reutilizado_hacia_otro_destino(self):
+        numerador = NumeradorSecuencias("abc")
+        for _ in range(3):
+            numerador.numerar(paquete(puerto=2))
+        p = numerador.numerar(paquete(puerto=1))
+        p.puerto_destino = 2
+        numerador.numerar(p)
+        self.assertEqual(p.seq, 4)
+
+    def test_reiniciar_abre_epoca_nueva(self):
+        numerador = NumeradorSecuencias("abc")
+        numerador.numerar(paquete())
+        numerador.reiniciar("localhost", 5000)
+        p = numerador.numerar(paquete())
+        self.assertEqual((p.sesion, p.seq), ("abc.1", 1))
+
+    def test_json_ida_y_vuelta(self):
+        p = NumeradorSecuencias("abc").numerar(paquete())
+        copia = PaqueteDTO.from_json(p.to_json())
+        self.assertEqual((copia.sesion, copia.seq, copia.id_mensaje), (p.sesion, p.seq, p.id_mensaje))
+
+        sin_numerar = PaqueteDTO("MENSAJE", "hola").to_json()
+        self.assertNotIn("seq", sin_numerar)
+        self.assertIsNone(PaqueteDTO.from_json(sin_numerar).seq)
+
+
+class TestVentanaRecepcion(unittest.TestCase):
+
+    def test_en_orden_y_duplicados(self):
+        ventana = VentanaRecepcion()
+        self.assertEqual(seqs(ventana.recibir(paquete(1))), [1])
+        self.assertEqual(ventana.recibir(paquete(1)), [])
+        self.assertEqual(seqs(ventana.recibir(paquete(2))), [2])
+        self.assertEqual(ventana.metricas["duplicados"], 1)
+
+    def test_reordena_adelantados(self):
+        ventana = VentanaRecepcion()
+        self.assertEqual(ventana.recibir(paquete(3)), [])
+        self.assertEqual(ventana.recibir(paquete(2)), [])
+        self.assertEqual(ventana.recibir(paquete(3)), [])  # repetido en el buffer
+        self.assertEqual(seqs(ventana.recibir(paquete(1))), [1, 2, 3])
+        self.assertFalse(ventana.hay_pendientes())
+
+    def test_hueco_vencido_y_paquete_tardio(self):
+        ventana = VentanaRecepcion(espera_max=0.5)
+        ventana.recibir(paquete(1), ahora=0.0)
+        self.assertEqual(ventana.recibir(paquete(3), ahora=0.0), [])
+        self.assertEqual(ventana.vencidos(ahora=0.2), [])
+        self.assertEqual(seqs(ventana.vencidos(ahora=0.6)), [3])
+
+        # El saltado llega tarde: se entrega una vez, fuera de orden
+        self.assertEqual(seqs(ventana.recibir(paquete(2))), [2])
+        self.assertEqual(ventana.recibir(paquete(2)), [])
+        self.assertEqual((ventana.metricas["saltados"], ventana.metricas["tardios"]), (1, 1))
+
+    def test_replay_fuera_de_ventana(self):
+        ventana = VentanaRecepcion(tamanio=4)
+        for seq in range(1, 11):
+            ventana.recibir(paquete(seq))
+        self.assertEqual(ventana.recibir(paquete(1)), [])
+        self.assertEqual(ventana.recibir(paquete(9)), [])
+
+    def test_sin_reordenar_solo_descarta_duplicados(self):
+        ventana = VentanaRecepcion(reordenar=False)
+        self.assertEqual(seqs(ventana.recibir(paquete(5))), [5])
+        self.assertEqual(seqs(ventana.recibir(paquete(2))), [2])
+        self.assertEqual(ventana.recibir(paquete(5)), [])
+        self.assertEqual(ventana.metricas["entregados"], 2)
+
+
+class RedEnMemoria:
+    """Cola de envíos que entrega el JSON de cada paquete a la ColaRecibos de su puerto"""
+
+    def __init__(self, colas):
+        self.colas = colas
+
+    def encolar(self, paquete):
+        self.colas[paquete.puerto_destino].encolar(paquete.to_json())
+
+
+class TestReceptorSecuencias(unittest.TestCase):
+
+    def armar(self, **kwargs):
+        cola = ColaRecibos()
+        receptor = Receptor(**kwargs)
+        destino = ReceptorLista()
+        receptor.set_cola(cola)
+        receptor.set_receptor(destino)
+        cola.agregar_observador(receptor)
+        return cola, receptor, destino
+
+    def test_entrega_en_orden_desde_varios_hilos(self):
+        cola, receptor, destino = self.armar()
+        llegada = [paquete(seq, sesion) for sesion in ("a", "b") for seq in range(1, 101)]
+        llegada += llegada[:20]  # duplicados
+        random.Random(7).shuffle(llegada)
+
+        hilos = [threading.Thread(target=lambda parte=llegada[i::4]: [cola.encolar(p.to_json()) for p in parte])
+                 for i in range(4)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        for sesion in ("a", "b"):
+            self.assertEqual([p.seq for p in destino.recibidos if p.sesion == sesion], list(range(1, 101)))
+        metricas = receptor.metricas_secuencia()
+        self.assertEqual((metricas["entregados"], metricas["duplicados"], metricas["sesiones"]), (200, 20, 2))
+
+    def test_hueco_se_libera_por_tiempo(self):
+        cola, _, destino = self.armar(espera_reorden=0.05)
+        cola.encolar(paquete(2).to_json())
+        self.assertEqual(destino.recibidos, [])
+        time.sleep(0.3)
+        self.assertEqual(seqs(destino.recibidos), [2])
+
+    def test_sesion_retirada_no_acepta_repeticiones(self):
+        for reordenar in (True, False):
+            cola, receptor, destino = self.armar(reordenar=reordenar)
+            receptor.MAX_SESIONES = 2
+            for p in (paquete(1, "a"), paquete(2, "a"), paquete(1, "b"), paquete(1, "c")):
+                cola.encolar(p.to_json())
+            self.assertEqual(receptor.metricas_secuencia()["sesiones"], 2)
+
+            # "a" se retiró: sus paquetes viejos se descartan y los nuevos siguen sin hueco
+            for p in (paquete(1, "a"), paquete(2, "a"), paquete(3, "a")):
+                cola.encolar(p.to_json())
+            self.assertEqual([p.seq for p in destino.recibidos if p.sesion == "a"], [1, 2, 3], reordenar)
+            self.assertEqual(receptor.metricas_secuencia()["duplicados"], 2)
+
+    def test_topes_retirados_acotados(self):
+        cola, receptor, _ = self.armar()
+        receptor.MAX_SESIONES = 1
+        receptor.MAX_TOPES_RETIRADOS = 2
+        for sesion in "abcde":
+            cola.encolar(paquete(1, sesion).to_json())
+        # Quedan solo los de las dos sesiones retiradas más recientemente
+        self.assertEqual(list(receptor._topes_retirados), ["c", "d"])
+
+    def test_paquetes_sin_numerar_pasan_directo(self):
+        cola, _, destino = self.armar()
+        cola.encolar(paquete().to_json())
+        cola.encolar(paquete().to_json())
+        self.assertEqual(len(destino.recibidos), 2)
+
+    def test_difusion_llega_a_todos_los_receptores(self):
+        armados = {puerto: self.armar() for puerto in (7001, 7002, 7003)}
+        emisor = Emisor(RedEnMemoria({puerto: cola for puerto, (cola, _, _) in armados.items()}), NumeradorSecuencias())
+        for n in range(3):
+            emisor.enviar_cambio(PaqueteDTO("MENSAJE", {"n": n}, host="127.0.0.1", puerto_destino=7002))
+
+        bus = EventBus()
+        bus.set_emisor(emisor)
+        for puerto in armados:
+            bus.registrar_servicio("MENSAJE", ServicioDTO(puerto=puerto, host="127.0.0.1", llave_publica=str(puerto)))
+        bus.notificar_servicios(PaqueteDTO("MENSAJE", {"n": "todos"}, origen="ana", host="127.0.0.1", puerto_origen=5000))
+
+        for puerto, (_, receptor, destino) in armados.items():
+            self.assertEqual(destino.recibidos[-1].contenido, {"n": "todos"}, puerto)
+            self.assertEqual(receptor.metricas_secuencia()["duplicados"], 0)
+        self.assertEqual(seqs(armados[7002][2].recibidos), [1, 2, 3, 4])
+
+
+if __name__ == '__main__':
+    unittest.main()
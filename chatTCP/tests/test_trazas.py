@@ -0,0 +1,157 @@
+"""
+Tests de las trazas por paquete
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.ComponenteReceptor.IReceptor import IReceptor
+from src.PaqueteDTO.PaqueteDTO import PaqueteDTO
+from src.Red.Cifrado.seguridad import GestorSeguridad
+from src.Red.Emisor.ClienteTCP import ClienteTCP
+from src.Red.Emisor.ColaEnvios import ColaEnvios
+from src.Red.Emisor.Emisor import Emisor
+from src.Red.Receptor.ColaRecibos import ColaRecibos
+from src.Red.Receptor.Receptor import Receptor
+from src.Red.Receptor.ServidorTCP import ServidorTCP
+from src.Red.Trazas import RegistroTrazas, combinar
+
+
+class TestRegistroTrazas(unittest.TestCase):
+
+    def setUp(self):
+        self.trazas = RegistroTrazas()
+
+    def test_apagado_no_registra(self):
+        traza = {"id": "abc"}
+        with self.trazas.tramo("x", traza):
+            pass
+        self.assertIsNone(self.trazas.contexto_envio())
+        self.assertEqual(self.trazas.eventos(), [])
+
+    def test_tramos_anidados_y_contexto(self):
+        self.trazas.activar()
+        traza = self.trazas.contexto_envio()
+        with self.trazas.tramo("afuera", traza, tipo="MENSAJE"):
+            respuesta = self.trazas.contexto_envio()
+            with self.trazas.tramo("adentro", traza):
+                pass
+        self.assertIsNone(self.trazas.contexto_actual())
+        self.assertEqual(respuesta["id"], traza["id"])
+
+        adentro, afuera = self.trazas.eventos()
+        self.assertEqual((adentro["name"], afuera["name"]), ("adentro", "afuera"))
+        self.assertEqual(afuera["args"], {"tipo": "MENSAJE", "traza": traza["id"]})
+        self.assertLessEqual(afuera["ts"], adentro["ts"])
+        self.assertGreaterEqual(afuera["ts"] + afuera["dur"], adentro["ts"] + adentro["dur"])
+
+    def test_muestreo_y_error(self):
+        self.trazas.activar(muestreo=0)
+        self.assertIsNone(self.trazas.contexto_envio())
+        with self.assertRaises(ValueError):
+            self.trazas.activar(muestreo=2)
+
+        with self.assertRaises(KeyError):
+            with self.trazas.tramo("falla", {"id": "t1"}):
+                raise KeyError("x")
+        self.assertEqual(self.trazas.eventos()[0]["args"]["error"], "KeyError")
+
+    def test_exportar_chrome_y_combinar(self):
+        self.trazas.activar()
+        self.trazas.registrar("red", {"id": "t1"}, 1000.0, 1500.0)
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = os.path.join(directorio, "servidor.json")
+            self.trazas.volcar(ruta, proceso="servidor")
+            with open(ruta, encoding="utf-8") as f:
+                datos = json.load(f)
+            self.assertEqual(datos["traceEvents"][0]["ph"], "M")
+            self.assertEqual(datos["traceEvents"][1]["dur"], 500.0)
+
+            combinada = os.path.join(directorio, "todo.json")
+            combinar([ruta, ruta], combinada)
+            with open(combinada, encoding="utf-8") as f:
+                self.assertEqual(len(json.load(f)["traceEvents"]), 4)
+
+    def test_paquete_lleva_la_traza(self):
+        sin_traza = PaqueteDTO("MENSAJE", {"mensaje": "hola"})
+        self.assertNotIn("traza", json.loads(sin_traza.to_json()))
+        paquete = PaqueteDTO("MENSAJE", {"mensaje": "hola"}, traza={"id": "t1", "inicio": 1.0, "envio": 2.0})
+        self.assertEqual(PaqueteDTO.from_json(paquete.to_json()).traza, paquete.traza)
+
+
+class ReceptorQueResponde(IReceptor):
+    """Contesta cada MENSAJE con un ECO hacia otro puerto"""
+
+    def __init__(self, emisor, puerto):
+        self.emisor = emisor
+        self.puerto = puerto
+        self.recibidos = []
+
+    def recibir_cambio(self, paquete):
+        self.recibidos.append(paquete)
+        if paquete.tipo == "MENSAJE":
+            self.emisor.enviar_cambio(PaqueteDTO("ECO", paquete.contenido, host="127.0.0.1", puerto_destino=self.puerto))
+
+
+class TestTrazasDePuntaAPunta(unittest.TestCase):
+
+    def setUp(self):
+        self.trazas = RegistroTrazas.obtener_instancia()
+        self.trazas.limpiar()
+        self.trazas.activar()
+        self.addCleanup(self.trazas.limpiar)
+        self.addCleanup(self.trazas.desactivar)
+        self.seguridad = GestorSeguridad()
+
+    def armar_servidor(self, receptor_final):
+        cola = ColaRecibos()
+        receptor = Receptor()
+        receptor.set_cola(cola)
+        receptor.set_receptor(receptor_final)
+        cola.agregar_observador(receptor)
+        servidor = ServidorTCP(cola, self.seguridad, puerto=0, host="127.0.0.1")
+        servidor.iniciar()
+        self.addCleanup(servidor.detener)
+        return servidor.get_puerto()
+
+    def armar_emisor(self):
+        cola = ColaEnvios()
+        cola.agregar_observador(ClienteTCP(cola, self.seguridad, self.seguridad.public_key))
+        return Emisor(cola)
+
+    def test_respuesta_continua_la_traza(self):
+        final = ReceptorQueResponde(None, None)
+        puerto_final = self.armar_servidor(final)
+        intermedio = ReceptorQueResponde(self.armar_emisor(), puerto_final)
+        puerto = self.armar_servidor(intermedio)
+
+        paquete = PaqueteDTO("MENSAJE", {"mensaje": "hola"}, host="127.0.0.1", puerto_destino=puerto)
+        self.armar_emisor().enviar_cambio(paquete)
+        fin = time.monotonic() + 5
+        while not final.recibidos and time.monotonic() < fin:
+            time.sleep(0.01)
+
+        self.assertEqual(len(final.recibidos), 1)
+        self.assertEqual(final.recibidos[0].traza["id"], paquete.traza["id"])
+        nombres = {e["name"] for e in self.trazas.eventos() if e["args"]["traza"] == paquete.traza["id"]}
+        self.assertTrue({"emisor.enviar_cambio", "cliente.enviar_paquete", "cliente.cifrar", "cliente.conectar_y_enviar",
+                         "envio_a_llegada", "servidor.leer_y_descifrar", "servidor.recibir_paquete", "receptor.actualizar",
+                         "receptor.entregar"} <= nombres)
+
+        # Cada llegada se mide desde el ClienteTCP, dentro del enviar_cambio de su salto
+        def inicios(nombre):
+            return sorted(e["ts"] for e in self.trazas.eventos()
+                          if e["name"] == nombre and e["args"]["traza"] == paquete.traza["id"])
+        saltos = list(zip(inicios("emisor.enviar_cambio"), inicios("envio_a_llegada")))
+        self.assertEqual(len(saltos), 2)
+        for enviar_cambio, llegada in saltos:
+            self.assertGreaterEqual(llegada, enviar_cambio)
+
+
+if __name__ == '__main__':
+    unittest.main()
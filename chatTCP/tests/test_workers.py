@@ -0,0 +1,202 @@
+"""
+Tests del modo pre-fork: sesiones compartidas y varios workers con SO_REUSEPORT
+"""
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from chatTCP.src.Bus.ServicioDTO import ServicioDTO
+from chatTCP.src.Datos.AlmacenOfflineCompartido import AlmacenOfflineCompartido
+from chatTCP.src.Datos.SesionesCompartidas import SesionesCompartidas
+from chatTCP.src.Red.Cifrado.seguridad import GestorSeguridad
+from cliente_prueba import ClientePrueba, esperar_puerto, puerto_libre
+
+SERVER_MAIN = os.path.join(os.path.dirname(__file__), '..', 'server_main.py')
+
+
+class TestSesionesCompartidas(unittest.TestCase):
+    """
+    Dos conexiones al mismo archivo (como dos workers) ven las mismas sesiones
+    """
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        ruta = os.path.join(self._tmp.name, "sesiones.db")
+        self.worker_a = SesionesCompartidas(ruta)
+        self.worker_b = SesionesCompartidas(ruta)
+
+    def tearDown(self):
+        self.worker_a.cerrar()
+        self.worker_b.cerrar()
+        self._tmp.cleanup()
+
+    def test_login_visible_en_otro_worker(self):
+        self.worker_a["ana"] = ServicioDTO("127.0.0.1", 7001, b"llave")
+        self.assertIn("ana", self.worker_b)
+        self.assertEqual(self.worker_b.get("ana").puerto, 7001)
+        self.assertEqual(self.worker_b["ana"].llave_publica, b"llave")
+        self.assertEqual(self.worker_b["ana"].suite, "FERNET")
+        self.worker_a["ana"] = ServicioDTO("127.0.0.1", 7001, b"llave", suite="AESGCM")
+        self.assertEqual([s.suite for s in self.worker_b.values()], ["AESGCM"])
+        self.assertEqual(list(self.worker_b.keys()), ["ana"])
+
+    def test_reemplazo_y_borrado(self):
+        self.worker_a["ana"] = ServicioDTO("127.0.0.1", 7001)
+        self.worker_b["ana"] = ServicioDTO("127.0.0.1", 7002)
+        self.assertEqual([s.puerto for s in self.worker_a.values()], [7002])
+        del self.worker_a["ana"]
+        self.assertIsNone(self.worker_b.get("ana"))
+        self.worker_a["beto"] = ServicioDTO("127.0.0.1", 7003)
+        self.worker_b.limpiar()
+        self.assertEqual(len(self.worker_a), 0)
+
+
+class TestAlmacenOfflineCompartido(unittest.TestCase):
+    """
+    Un worker encola y otro entrega y confirma sobre el mismo archivo
+    """
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        ruta = os.path.join(self._tmp.name, "offline.db")
+        self.worker_a = AlmacenOfflineCompartido(ruta, max_mensajes_por_usuario=3)
+        self.worker_b = AlmacenOfflineCompartido(ruta, max_mensajes_por_usuario=3)
+
+    def tearDown(self):
+        self.worker_a.cerrar()
+        self.worker_b.cerrar()
+        self._tmp.cleanup()
+
+    def test_encolar_en_uno_y_entregar_en_otro(self):
+        ids = [self.worker_a.encolar("ana", {"origen": "beto", "contenido": {"mensaje": f"m{i}"}}) for i in range(2)]
+        ids.append(self.worker_b.encolar("ana", {"origen": "caro", "contenido": {"mensaje": "m2"}}))
+        self.assertEqual(ids, [1, 2, 3])
+        self.assertEqual([m["contenido"]["mensaje"] for _, m in self.worker_b.pendientes("ana")], ["m0", "m1", "m2"])
+
+        self.assertEqual(self.worker_b.confirmar("ana", 3), 3)
+        self.assertEqual(self.worker_a.total_pendientes("ana"), 0)
+        # Los ids siguen creciendo aunque la cola haya quedado vacía
+        self.assertEqual(self.worker_a.encolar("ana", {"origen": "beto", "contenido": {}}), 4)
+
+    def test_retencion(self):
+        for i in range(5):
+            self.worker_a.encolar("ana", {"origen": "beto", "contenido": {"mensaje": f"m{i}"}})
+        self.assertEqual([i for i, _ in self.worker_b.pendientes("ana")], [3, 4, 5])
+
+
+@unittest.skipUnless(hasattr(socket, "SO_REUSEPORT"), "SO_REUSEPORT no disponible")
+class TestServidorConWorkers(unittest.TestCase):
+    """
+    Levanta server_main.py --workers 2 y verifica que los paquetes de una
+    misma sesión se atienden aunque caigan en workers distintos
+    """
+
+    WORKERS = 2
+
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        tmp = cls._tmp.name
+        cls.puerto = puerto_libre()
+        cls.ruta_pem = os.path.join(tmp, "server_public.pem")
+        cls.bitacora = os.path.join(tmp, "servidor.log")
+        cls.proceso = subprocess.Popen(
+            [sys.executable, SERVER_MAIN, "--workers", str(cls.WORKERS), "--puerto", str(cls.puerto),
+             "--datos", os.path.join(tmp, "datos"), "--pem", cls.ruta_pem, "--bitacora", cls.bitacora],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        if not esperar_puerto(cls.puerto):
+            cls.tearDownClass()
+            raise unittest.SkipTest("El servidor con workers no arrancó")
+
+        with open(cls.ruta_pem, "rb") as f:
+            cls.pem_servidor = f.read()
+        cls.llave_servidor = GestorSeguridad().importar_publica(cls.pem_servidor)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.proceso.terminate()
+        cls.proceso.wait(timeout=10)
+        cls._tmp.cleanup()
+
+    def test_mensajes_entre_workers(self):
+        # ana es un cliente anterior (sin suites); beto negocia AEAD; caro usa
+        # una sesión X25519, que cualquier worker deriva de la llave compartida
+        ana = ClientePrueba("ana", self.llave_servidor)
+        beto = ClientePrueba("beto", self.llave_servidor, suites=["CHACHA20", "FERNET"])
+        caro = ClientePrueba("caro", self.llave_servidor, pem_servidor=self.pem_servidor)
+        try:
+            for cliente in (ana, beto, caro):
+                cliente.enviar(self.puerto, "REGISTRO", cliente.credenciales())
+                cliente.esperar("REGISTRO_OK")
+                cliente.enviar(self.puerto, "LOGIN", cliente.credenciales())
+                cliente.esperar("LOGIN_OK")
+
+            total = 20
+            for i in range(total):
+                ana.enviar(self.puerto, "MENSAJE", {"mensaje": f"m{i}", "remitente": "ana"}, destino="beto")
+            recibidos = set()
+            while len(recibidos) < total:
+                paquete = beto.esperar("MENSAJE")
+                recibidos.add(paquete.contenido["mensaje"])
+            self.assertEqual(recibidos, {f"m{i}" for i in range(total)})
+
+            # La suite de la sesión se respeta en cualquier worker
+            self.assertEqual(set(beto.modos_recibidos), {"CHACHA20"})
+            self.assertEqual(set(ana.modos_recibidos), {"HIBRIDO"})
+
+            for i in range(5):
+                caro.enviar(self.puerto, "MENSAJE", {"mensaje": f"x{i}", "remitente": "caro"}, destino="ana")
+                ana.enviar(self.puerto, "MENSAJE", {"mensaje": f"y{i}", "remitente": "ana"}, destino="caro")
+            self.assertEqual({caro.esperar("MENSAJE").contenido["mensaje"] for _ in range(5)}, {f"y{i}" for i in range(5)})
+            self.assertEqual({ana.esperar("MENSAJE").contenido["mensaje"] for _ in range(5)}, {f"x{i}" for i in range(5)})
+            self.assertEqual(set(caro.modos_recibidos), {"X25519"})
+        finally:
+            ana.cerrar()
+            beto.cerrar()
+            caro.cerrar()
+
+        # Las conexiones se repartieron entre más de un worker
+        with open(self.bitacora, encoding='utf-8') as f:
+            bitacora = f.read()
+        workers_usados = {w for w in range(self.WORKERS) if f"SERVER w{w} - Procesando paquete" in bitacora}
+        self.assertGreater(len(workers_usados), 1)
+
+    def test_mensajes_offline_con_workers(self):
+        eva = ClientePrueba("eva", self.llave_servidor)
+        fede = ClientePrueba("fede", self.llave_servidor)
+        try:
+            for cliente in (eva, fede):
+                cliente.enviar(self.puerto, "REGISTRO", cliente.credenciales())
+                cliente.esperar("REGISTRO_OK")
+            eva.enviar(self.puerto, "LOGIN", eva.credenciales())
+            eva.esperar("LOGIN_OK")
+
+            for i in range(3):
+                eva.enviar(self.puerto, "MENSAJE", {"mensaje": f"o{i}", "remitente": "eva"}, destino="fede")
+            # Los mensajes pueden quedar en cualquier worker: se espera a verlos guardados
+            almacen = AlmacenOfflineCompartido(os.path.join(self._tmp.name, "datos", "offline.db"))
+            fin = time.monotonic() + 10
+            while almacen.total_pendientes("fede") < 3 and time.monotonic() < fin:
+                time.sleep(0.05)
+            almacen.cerrar()
+            fede.enviar(self.puerto, "LOGIN", fede.credenciales())
+            fede.esperar("LOGIN_OK")
+            recibidos = [fede.esperar("MENSAJE").contenido for _ in range(3)]
+            self.assertEqual({c["mensaje"] for c in recibidos}, {"o0", "o1", "o2"})
+            self.assertTrue(all("id_offline" in c for c in recibidos))
+        finally:
+            eva.cerrar()
+            fede.cerrar()
+
+
+if __name__ == '__main__':
+    unittest.main()